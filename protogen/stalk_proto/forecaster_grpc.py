@@ -23,6 +23,13 @@ class StalkForecasterBase(abc.ABC):
     ) -> None:
         pass
 
+    @abc.abstractmethod
+    async def ForecastPricesBatch(
+        self,
+        stream: "grpclib.server.Stream[protogen.stalk_proto.models_pb2.TickerBatch, protogen.stalk_proto.models_pb2.ForecastBatch]",
+    ) -> None:
+        pass
+
     def __mapping__(self) -> typing.Dict[str, grpclib.const.Handler]:
         return {
             "/proto.StalkForecaster/ForecastPrices": grpclib.const.Handler(
@@ -31,6 +38,12 @@ class StalkForecasterBase(abc.ABC):
                 protogen.stalk_proto.models_pb2.Ticker,
                 protogen.stalk_proto.models_pb2.Forecast,
             ),
+            "/proto.StalkForecaster/ForecastPricesBatch": grpclib.const.Handler(
+                self.ForecastPricesBatch,
+                grpclib.const.Cardinality.UNARY_UNARY,
+                protogen.stalk_proto.models_pb2.TickerBatch,
+                protogen.stalk_proto.models_pb2.ForecastBatch,
+            ),
         }
 
 
@@ -42,3 +55,9 @@ class StalkForecasterStub:
             protogen.stalk_proto.models_pb2.Ticker,
             protogen.stalk_proto.models_pb2.Forecast,
         )
+        self.ForecastPricesBatch = grpclib.client.UnaryUnaryMethod(
+            channel,
+            "/proto.StalkForecaster/ForecastPricesBatch",
+            protogen.stalk_proto.models_pb2.TickerBatch,
+            protogen.stalk_proto.models_pb2.ForecastBatch,
+        )
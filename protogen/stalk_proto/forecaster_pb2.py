@@ -21,7 +21,7 @@ DESCRIPTOR = _descriptor.FileDescriptor(
     package="proto",
     syntax="proto3",
     serialized_options=b"Z1github.com/peake100/stalkforecaster-go/stalkproto",
-    serialized_pb=b'\n\x1cstalk_proto/forecaster.proto\x12\x05proto\x1a(stalk_proto/google/api/annotations.proto\x1a\x18stalk_proto/models.proto2]\n\x0fStalkForecaster\x12J\n\x0e\x46orecastPrices\x12\r.proto.Ticker\x1a\x0f.proto.Forecast"\x18\x82\xd3\xe4\x93\x02\x12"\r/api/forecast:\x01*B3Z1github.com/peake100/stalkforecaster-go/stalkprotob\x06proto3',
+    serialized_pb=b'\n\x1cstalk_proto/forecaster.proto\x12\x05proto\x1a(stalk_proto/google/api/annotations.proto\x1a\x18stalk_proto/models.proto2\xbe\x01\n\x0fStalkForecaster\x12J\n\x0e\x46orecastPrices\x12\r.proto.Ticker\x1a\x0f.proto.Forecast"\x18\x82\xd3\xe4\x93\x02\x12"\r/api/forecast:\x01*\x12_\n\x13\x46orecastPricesBatch\x12\x12.proto.TickerBatch\x1a\x14.proto.ForecastBatch"\x1e\x82\xd3\xe4\x93\x02\x18"\x13/api/forecast/batch:\x01*B3Z1github.com/peake100/stalkforecaster-go/stalkprotob\x06proto3',
     dependencies=[
         stalk__proto_dot_google_dot_api_dot_annotations__pb2.DESCRIPTOR,
         stalk__proto_dot_models__pb2.DESCRIPTOR,
@@ -40,8 +40,8 @@ _STALKFORECASTER = _descriptor.ServiceDescriptor(
     file=DESCRIPTOR,
     index=0,
     serialized_options=None,
-    serialized_start=107,
-    serialized_end=200,
+    serialized_start=108,
+    serialized_end=298,
     methods=[
         _descriptor.MethodDescriptor(
             name="ForecastPrices",
@@ -52,6 +52,15 @@ _STALKFORECASTER = _descriptor.ServiceDescriptor(
             output_type=stalk__proto_dot_models__pb2._FORECAST,
             serialized_options=b'\202\323\344\223\002\022"\r/api/forecast:\001*',
         ),
+        _descriptor.MethodDescriptor(
+            name="ForecastPricesBatch",
+            full_name="proto.StalkForecaster.ForecastPricesBatch",
+            index=1,
+            containing_service=None,
+            input_type=stalk__proto_dot_models__pb2._TICKERBATCH,
+            output_type=stalk__proto_dot_models__pb2._FORECASTBATCH,
+            serialized_options=b'\202\323\344\223\002\030"\023/api/forecast/batch:\001*',
+        ),
     ],
 )
 _sym_db.RegisterServiceDescriptor(_STALKFORECASTER)
@@ -18,7 +18,7 @@ DESCRIPTOR = _descriptor.FileDescriptor(
     package="proto",
     syntax="proto3",
     serialized_options=b"Z1github.com/peake100/stalkforecaster-go/stalkproto",
-    serialized_pb=b'\n\x18stalk_proto/models.proto\x12\x05proto"x\n\x06Ticker\x12\x16\n\x0epurchase_price\x18\x01 \x01(\x05\x12.\n\x10previous_pattern\x18\x02 \x01(\x0e\x32\x14.proto.PricePatterns\x12\x0e\n\x06prices\x18\x03 \x03(\x05\x12\x16\n\x0e\x63urrent_period\x18\x04 \x01(\x05"9\n\x0bPricePeriod\x12\x0b\n\x03min\x18\x01 \x01(\x05\x12\x0b\n\x03max\x18\x02 \x01(\x05\x12\x10\n\x08is_spike\x18\x03 \x01(\x08"\x83\x01\n\rPricesSummary\x12\x0b\n\x03min\x18\x01 \x01(\x05\x12\x0b\n\x03max\x18\x02 \x01(\x05\x12\x12\n\nguaranteed\x18\x06 \x01(\x05\x12\x13\n\x0bmin_periods\x18\x03 \x03(\x05\x12\x13\n\x0bmax_periods\x18\x04 \x03(\x05\x12\x1a\n\x12guaranteed_periods\x18\x05 \x03(\x05"5\n\nSpikeRange\x12\x0b\n\x03has\x18\x01 \x01(\x08\x12\r\n\x05start\x18\x02 \x01(\x05\x12\x0b\n\x03\x65nd\x18\x03 \x01(\x05"\xc0\x01\n\rPotentialWeek\x12\x0e\n\x06\x63hance\x18\x01 \x01(\x01\x12"\n\x06prices\x18\x03 \x03(\x0b\x32\x12.proto.PricePeriod\x12,\n\x0eprices_summary\x18\x04 \x01(\x0b\x32\x14.proto.PricesSummary\x12+\n\rprices_future\x18\x06 \x01(\x0b\x32\x14.proto.PricesSummary\x12 \n\x05spike\x18\x05 \x01(\x0b\x32\x11.proto.SpikeRange"\xf5\x01\n\x10PotentialPattern\x12%\n\x07pattern\x18\x01 \x01(\x0e\x32\x14.proto.PricePatterns\x12\x0e\n\x06\x63hance\x18\x02 \x01(\x01\x12,\n\x0eprices_summary\x18\x03 \x01(\x0b\x32\x14.proto.PricesSummary\x12+\n\rprices_future\x18\x06 \x01(\x0b\x32\x14.proto.PricesSummary\x12 \n\x05spike\x18\x04 \x01(\x0b\x32\x11.proto.SpikeRange\x12-\n\x0fpotential_weeks\x18\x05 \x03(\x0b\x32\x14.proto.PotentialWeek"Z\n\x0cSpikeChances\x12\x0b\n\x03has\x18\x01 \x01(\x08\x12\r\n\x05start\x18\x02 \x01(\x05\x12\x0b\n\x03\x65nd\x18\x03 \x01(\x05\x12\x0e\n\x06\x63hance\x18\x04 \x01(\x01\x12\x11\n\tbreakdown\x18\x05 \x03(\x01"x\n\x0e\x46orecastSpikes\x12"\n\x05small\x18\x01 \x01(\x0b\x32\x13.proto.SpikeChances\x12 \n\x03\x62ig\x18\x02 \x01(\x0b\x32\x13.proto.SpikeChances\x12 \n\x03\x61ny\x18\x03 \x01(\x0b\x32\x13.proto.SpikeChances"\xc5\x01\n\x08\x46orecast\x12,\n\x0eprices_summary\x18\x01 \x01(\x0b\x32\x14.proto.PricesSummary\x12+\n\rprices_future\x18\x04 \x01(\x0b\x32\x14.proto.PricesSummary\x12%\n\x06spikes\x18\x02 \x01(\x0b\x32\x15.proto.ForecastSpikes\x12)\n\x08patterns\x18\x03 \x03(\x0b\x32\x17.proto.PotentialPattern\x12\x0c\n\x04heat\x18\x05 \x01(\x05"\xa3\x01\n\x10ReqForecastChart\x12\x1d\n\x06ticker\x18\x01 \x01(\x0b\x32\r.proto.Ticker\x12!\n\x08\x66orecast\x18\x02 \x01(\x0b\x32\x0f.proto.Forecast\x12"\n\x06\x66ormat\x18\x03 \x01(\x0e\x32\x12.proto.ImageFormat\x12\x18\n\x10\x63olor_background\x18\x04 \x01(\t\x12\x0f\n\x07padding\x18\x05 \x01(\x02"\x1a\n\tRespChart\x12\r\n\x05\x63hart\x18\x01 \x01(\x0c*[\n\rPricePatterns\x12\x0f\n\x0b\x46LUCTUATING\x10\x00\x12\x0c\n\x08\x42IGSPIKE\x10\x01\x12\x0e\n\nDECREASING\x10\x02\x12\x0e\n\nSMALLSPIKE\x10\x03\x12\x0b\n\x07UNKNOWN\x10\x04*\x1f\n\x0bImageFormat\x12\x07\n\x03SVG\x10\x00\x12\x07\n\x03PNG\x10\x01\x42\x33Z1github.com/peake100/stalkforecaster-go/stalkprotob\x06proto3',
+    serialized_pb=b'\n\x18stalk_proto/models.proto\x12\x05proto"x\n\x06Ticker\x12\x16\n\x0epurchase_price\x18\x01 \x01(\x05\x12.\n\x10previous_pattern\x18\x02 \x01(\x0e\x32\x14.proto.PricePatterns\x12\x0e\n\x06prices\x18\x03 \x03(\x05\x12\x16\n\x0e\x63urrent_period\x18\x04 \x01(\x05"9\n\x0bPricePeriod\x12\x0b\n\x03min\x18\x01 \x01(\x05\x12\x0b\n\x03max\x18\x02 \x01(\x05\x12\x10\n\x08is_spike\x18\x03 \x01(\x08"\x83\x01\n\rPricesSummary\x12\x0b\n\x03min\x18\x01 \x01(\x05\x12\x0b\n\x03max\x18\x02 \x01(\x05\x12\x12\n\nguaranteed\x18\x06 \x01(\x05\x12\x13\n\x0bmin_periods\x18\x03 \x03(\x05\x12\x13\n\x0bmax_periods\x18\x04 \x03(\x05\x12\x1a\n\x12guaranteed_periods\x18\x05 \x03(\x05"5\n\nSpikeRange\x12\x0b\n\x03has\x18\x01 \x01(\x08\x12\r\n\x05start\x18\x02 \x01(\x05\x12\x0b\n\x03\x65nd\x18\x03 \x01(\x05"\xc0\x01\n\rPotentialWeek\x12\x0e\n\x06\x63hance\x18\x01 \x01(\x01\x12"\n\x06prices\x18\x03 \x03(\x0b\x32\x12.proto.PricePeriod\x12,\n\x0eprices_summary\x18\x04 \x01(\x0b\x32\x14.proto.PricesSummary\x12+\n\rprices_future\x18\x06 \x01(\x0b\x32\x14.proto.PricesSummary\x12 \n\x05spike\x18\x05 \x01(\x0b\x32\x11.proto.SpikeRange"\xf5\x01\n\x10PotentialPattern\x12%\n\x07pattern\x18\x01 \x01(\x0e\x32\x14.proto.PricePatterns\x12\x0e\n\x06\x63hance\x18\x02 \x01(\x01\x12,\n\x0eprices_summary\x18\x03 \x01(\x0b\x32\x14.proto.PricesSummary\x12+\n\rprices_future\x18\x06 \x01(\x0b\x32\x14.proto.PricesSummary\x12 \n\x05spike\x18\x04 \x01(\x0b\x32\x11.proto.SpikeRange\x12-\n\x0fpotential_weeks\x18\x05 \x03(\x0b\x32\x14.proto.PotentialWeek"Z\n\x0cSpikeChances\x12\x0b\n\x03has\x18\x01 \x01(\x08\x12\r\n\x05start\x18\x02 \x01(\x05\x12\x0b\n\x03\x65nd\x18\x03 \x01(\x05\x12\x0e\n\x06\x63hance\x18\x04 \x01(\x01\x12\x11\n\tbreakdown\x18\x05 \x03(\x01"x\n\x0e\x46orecastSpikes\x12"\n\x05small\x18\x01 \x01(\x0b\x32\x13.proto.SpikeChances\x12 \n\x03\x62ig\x18\x02 \x01(\x0b\x32\x13.proto.SpikeChances\x12 \n\x03\x61ny\x18\x03 \x01(\x0b\x32\x13.proto.SpikeChances"\xc5\x01\n\x08\x46orecast\x12,\n\x0eprices_summary\x18\x01 \x01(\x0b\x32\x14.proto.PricesSummary\x12+\n\rprices_future\x18\x04 \x01(\x0b\x32\x14.proto.PricesSummary\x12%\n\x06spikes\x18\x02 \x01(\x0b\x32\x15.proto.ForecastSpikes\x12)\n\x08patterns\x18\x03 \x03(\x0b\x32\x17.proto.PotentialPattern\x12\x0c\n\x04heat\x18\x05 \x01(\x05"\xa3\x01\n\x10ReqForecastChart\x12\x1d\n\x06ticker\x18\x01 \x01(\x0b\x32\r.proto.Ticker\x12!\n\x08\x66orecast\x18\x02 \x01(\x0b\x32\x0f.proto.Forecast\x12"\n\x06\x66ormat\x18\x03 \x01(\x0e\x32\x12.proto.ImageFormat\x12\x18\n\x10\x63olor_background\x18\x04 \x01(\t\x12\x0f\n\x07padding\x18\x05 \x01(\x02"\x1a\n\tRespChart\x12\r\n\x05\x63hart\x18\x01 \x01(\x0c"-\n\x0bTickerBatch\x12\x1e\n\x07tickers\x18\x01 \x03(\x0b\x32\r.proto.Ticker"^\n\x0e\x46orecastResult\x12!\n\x08\x66orecast\x18\x01 \x01(\x0b\x32\x0f.proto.Forecast\x12\x12\n\nerror_code\x18\x02 \x01(\x05\x12\x15\n\rerror_message\x18\x03 \x01(\t"7\n\rForecastBatch\x12&\n\x07results\x18\x01 \x03(\x0b\x32\x15.proto.ForecastResult*[\n\rPricePatterns\x12\x0f\n\x0b\x46LUCTUATING\x10\x00\x12\x0c\n\x08\x42IGSPIKE\x10\x01\x12\x0e\n\nDECREASING\x10\x02\x12\x0e\n\nSMALLSPIKE\x10\x03\x12\x0b\n\x07UNKNOWN\x10\x04*\x1f\n\x0bImageFormat\x12\x07\n\x03SVG\x10\x00\x12\x07\n\x03PNG\x10\x01\x42\x33Z1github.com/peake100/stalkforecaster-go/stalkprotob\x06proto3',
 )
 
 _PRICEPATTERNS = _descriptor.EnumDescriptor(
@@ -45,8 +45,8 @@ _PRICEPATTERNS = _descriptor.EnumDescriptor(
     ],
     containing_type=None,
     serialized_options=None,
-    serialized_start=1456,
-    serialized_end=1547,
+    serialized_start=1656,
+    serialized_end=1747,
 )
 _sym_db.RegisterEnumDescriptor(_PRICEPATTERNS)
 
@@ -66,8 +66,8 @@ _IMAGEFORMAT = _descriptor.EnumDescriptor(
     ],
     containing_type=None,
     serialized_options=None,
-    serialized_start=1549,
-    serialized_end=1580,
+    serialized_start=1749,
+    serialized_end=1780,
 )
 _sym_db.RegisterEnumDescriptor(_IMAGEFORMAT)
 
@@ -1139,6 +1139,159 @@ _RESPCHART = _descriptor.Descriptor(
     serialized_end=1454,
 )
 
+
+_TICKERBATCH = _descriptor.Descriptor(
+    name="TickerBatch",
+    full_name="proto.TickerBatch",
+    filename=None,
+    file=DESCRIPTOR,
+    containing_type=None,
+    fields=[
+        _descriptor.FieldDescriptor(
+            name="tickers",
+            full_name="proto.TickerBatch.tickers",
+            index=0,
+            number=1,
+            type=11,
+            cpp_type=10,
+            label=3,
+            has_default_value=False,
+            default_value=[],
+            message_type=None,
+            enum_type=None,
+            containing_type=None,
+            is_extension=False,
+            extension_scope=None,
+            serialized_options=None,
+            file=DESCRIPTOR,
+        ),
+    ],
+    extensions=[],
+    nested_types=[],
+    enum_types=[],
+    serialized_options=None,
+    is_extendable=False,
+    syntax="proto3",
+    extension_ranges=[],
+    oneofs=[],
+    serialized_start=1456,
+    serialized_end=1501,
+)
+
+
+_FORECASTRESULT = _descriptor.Descriptor(
+    name="ForecastResult",
+    full_name="proto.ForecastResult",
+    filename=None,
+    file=DESCRIPTOR,
+    containing_type=None,
+    fields=[
+        _descriptor.FieldDescriptor(
+            name="forecast",
+            full_name="proto.ForecastResult.forecast",
+            index=0,
+            number=1,
+            type=11,
+            cpp_type=10,
+            label=1,
+            has_default_value=False,
+            default_value=None,
+            message_type=None,
+            enum_type=None,
+            containing_type=None,
+            is_extension=False,
+            extension_scope=None,
+            serialized_options=None,
+            file=DESCRIPTOR,
+        ),
+        _descriptor.FieldDescriptor(
+            name="error_code",
+            full_name="proto.ForecastResult.error_code",
+            index=1,
+            number=2,
+            type=5,
+            cpp_type=1,
+            label=1,
+            has_default_value=False,
+            default_value=0,
+            message_type=None,
+            enum_type=None,
+            containing_type=None,
+            is_extension=False,
+            extension_scope=None,
+            serialized_options=None,
+            file=DESCRIPTOR,
+        ),
+        _descriptor.FieldDescriptor(
+            name="error_message",
+            full_name="proto.ForecastResult.error_message",
+            index=2,
+            number=3,
+            type=9,
+            cpp_type=9,
+            label=1,
+            has_default_value=False,
+            default_value=b"".decode("utf-8"),
+            message_type=None,
+            enum_type=None,
+            containing_type=None,
+            is_extension=False,
+            extension_scope=None,
+            serialized_options=None,
+            file=DESCRIPTOR,
+        ),
+    ],
+    extensions=[],
+    nested_types=[],
+    enum_types=[],
+    serialized_options=None,
+    is_extendable=False,
+    syntax="proto3",
+    extension_ranges=[],
+    oneofs=[],
+    serialized_start=1503,
+    serialized_end=1597,
+)
+
+
+_FORECASTBATCH = _descriptor.Descriptor(
+    name="ForecastBatch",
+    full_name="proto.ForecastBatch",
+    filename=None,
+    file=DESCRIPTOR,
+    containing_type=None,
+    fields=[
+        _descriptor.FieldDescriptor(
+            name="results",
+            full_name="proto.ForecastBatch.results",
+            index=0,
+            number=1,
+            type=11,
+            cpp_type=10,
+            label=3,
+            has_default_value=False,
+            default_value=[],
+            message_type=None,
+            enum_type=None,
+            containing_type=None,
+            is_extension=False,
+            extension_scope=None,
+            serialized_options=None,
+            file=DESCRIPTOR,
+        ),
+    ],
+    extensions=[],
+    nested_types=[],
+    enum_types=[],
+    serialized_options=None,
+    is_extendable=False,
+    syntax="proto3",
+    extension_ranges=[],
+    oneofs=[],
+    serialized_start=1599,
+    serialized_end=1654,
+)
+
 _TICKER.fields_by_name["previous_pattern"].enum_type = _PRICEPATTERNS
 _POTENTIALWEEK.fields_by_name["prices"].message_type = _PRICEPERIOD
 _POTENTIALWEEK.fields_by_name["prices_summary"].message_type = _PRICESSUMMARY
@@ -1159,6 +1312,9 @@ _FORECAST.fields_by_name["patterns"].message_type = _POTENTIALPATTERN
 _REQFORECASTCHART.fields_by_name["ticker"].message_type = _TICKER
 _REQFORECASTCHART.fields_by_name["forecast"].message_type = _FORECAST
 _REQFORECASTCHART.fields_by_name["format"].enum_type = _IMAGEFORMAT
+_TICKERBATCH.fields_by_name["tickers"].message_type = _TICKER
+_FORECASTRESULT.fields_by_name["forecast"].message_type = _FORECAST
+_FORECASTBATCH.fields_by_name["results"].message_type = _FORECASTRESULT
 DESCRIPTOR.message_types_by_name["Ticker"] = _TICKER
 DESCRIPTOR.message_types_by_name["PricePeriod"] = _PRICEPERIOD
 DESCRIPTOR.message_types_by_name["PricesSummary"] = _PRICESSUMMARY
@@ -1170,6 +1326,9 @@ DESCRIPTOR.message_types_by_name["ForecastSpikes"] = _FORECASTSPIKES
 DESCRIPTOR.message_types_by_name["Forecast"] = _FORECAST
 DESCRIPTOR.message_types_by_name["ReqForecastChart"] = _REQFORECASTCHART
 DESCRIPTOR.message_types_by_name["RespChart"] = _RESPCHART
+DESCRIPTOR.message_types_by_name["TickerBatch"] = _TICKERBATCH
+DESCRIPTOR.message_types_by_name["ForecastResult"] = _FORECASTRESULT
+DESCRIPTOR.message_types_by_name["ForecastBatch"] = _FORECASTBATCH
 DESCRIPTOR.enum_types_by_name["PricePatterns"] = _PRICEPATTERNS
 DESCRIPTOR.enum_types_by_name["ImageFormat"] = _IMAGEFORMAT
 _sym_db.RegisterFileDescriptor(DESCRIPTOR)
@@ -1295,6 +1454,39 @@ RespChart = _reflection.GeneratedProtocolMessageType(
 )
 _sym_db.RegisterMessage(RespChart)
 
+TickerBatch = _reflection.GeneratedProtocolMessageType(
+    "TickerBatch",
+    (_message.Message,),
+    {
+        "DESCRIPTOR": _TICKERBATCH,
+        "__module__": "stalk_proto.models_pb2"
+        # @@protoc_insertion_point(class_scope:proto.TickerBatch)
+    },
+)
+_sym_db.RegisterMessage(TickerBatch)
+
+ForecastResult = _reflection.GeneratedProtocolMessageType(
+    "ForecastResult",
+    (_message.Message,),
+    {
+        "DESCRIPTOR": _FORECASTRESULT,
+        "__module__": "stalk_proto.models_pb2"
+        # @@protoc_insertion_point(class_scope:proto.ForecastResult)
+    },
+)
+_sym_db.RegisterMessage(ForecastResult)
+
+ForecastBatch = _reflection.GeneratedProtocolMessageType(
+    "ForecastBatch",
+    (_message.Message,),
+    {
+        "DESCRIPTOR": _FORECASTBATCH,
+        "__module__": "stalk_proto.models_pb2"
+        # @@protoc_insertion_point(class_scope:proto.ForecastBatch)
+    },
+)
+_sym_db.RegisterMessage(ForecastBatch)
+
 
 DESCRIPTOR._options = None
 # @@protoc_insertion_point(module_scope)
@@ -591,3 +591,99 @@ class RespChart(google___protobuf___message___Message):
     ) -> None: ...
 
 global___RespChart = RespChart
+
+class TickerBatch(google___protobuf___message___Message):
+    DESCRIPTOR: google___protobuf___descriptor___Descriptor = ...
+    @property
+    def tickers(
+        self,
+    ) -> google___protobuf___internal___containers___RepeatedCompositeFieldContainer[
+        global___Ticker
+    ]: ...
+    def __init__(
+        self, *, tickers: typing___Optional[typing___Iterable[global___Ticker]] = None,
+    ) -> None: ...
+    if sys.version_info >= (3,):
+        @classmethod
+        def FromString(cls, s: builtin___bytes) -> TickerBatch: ...
+    else:
+        @classmethod
+        def FromString(
+            cls, s: typing___Union[builtin___bytes, builtin___buffer, builtin___unicode]
+        ) -> TickerBatch: ...
+    def MergeFrom(self, other_msg: google___protobuf___message___Message) -> None: ...
+    def CopyFrom(self, other_msg: google___protobuf___message___Message) -> None: ...
+    def ClearField(
+        self, field_name: typing_extensions___Literal["tickers", b"tickers"]
+    ) -> None: ...
+
+global___TickerBatch = TickerBatch
+
+class ForecastResult(google___protobuf___message___Message):
+    DESCRIPTOR: google___protobuf___descriptor___Descriptor = ...
+    error_code = ...  # type: builtin___int
+    error_message = ...  # type: typing___Text
+    @property
+    def forecast(self) -> global___Forecast: ...
+    def __init__(
+        self,
+        *,
+        forecast: typing___Optional[global___Forecast] = None,
+        error_code: typing___Optional[builtin___int] = None,
+        error_message: typing___Optional[typing___Text] = None,
+    ) -> None: ...
+    if sys.version_info >= (3,):
+        @classmethod
+        def FromString(cls, s: builtin___bytes) -> ForecastResult: ...
+    else:
+        @classmethod
+        def FromString(
+            cls, s: typing___Union[builtin___bytes, builtin___buffer, builtin___unicode]
+        ) -> ForecastResult: ...
+    def MergeFrom(self, other_msg: google___protobuf___message___Message) -> None: ...
+    def CopyFrom(self, other_msg: google___protobuf___message___Message) -> None: ...
+    def HasField(
+        self, field_name: typing_extensions___Literal["forecast", b"forecast"]
+    ) -> builtin___bool: ...
+    def ClearField(
+        self,
+        field_name: typing_extensions___Literal[
+            "error_code",
+            b"error_code",
+            "error_message",
+            b"error_message",
+            "forecast",
+            b"forecast",
+        ],
+    ) -> None: ...
+
+global___ForecastResult = ForecastResult
+
+class ForecastBatch(google___protobuf___message___Message):
+    DESCRIPTOR: google___protobuf___descriptor___Descriptor = ...
+    @property
+    def results(
+        self,
+    ) -> google___protobuf___internal___containers___RepeatedCompositeFieldContainer[
+        global___ForecastResult
+    ]: ...
+    def __init__(
+        self,
+        *,
+        results: typing___Optional[typing___Iterable[global___ForecastResult]] = None,
+    ) -> None: ...
+    if sys.version_info >= (3,):
+        @classmethod
+        def FromString(cls, s: builtin___bytes) -> ForecastBatch: ...
+    else:
+        @classmethod
+        def FromString(
+            cls, s: typing___Union[builtin___bytes, builtin___buffer, builtin___unicode]
+        ) -> ForecastBatch: ...
+    def MergeFrom(self, other_msg: google___protobuf___message___Message) -> None: ...
+    def CopyFrom(self, other_msg: google___protobuf___message___Message) -> None: ...
+    def ClearField(
+        self, field_name: typing_extensions___Literal["results", b"results"]
+    ) -> None: ...
+
+global___ForecastBatch = ForecastBatch
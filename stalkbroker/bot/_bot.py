@@ -1,10 +1,109 @@
+import aiohttp.web
 import discord.ext.commands
+import concurrent.futures
+import functools
+import multiprocessing
 import os
+import pathlib
 import grpclib.client
 import asyncio
-from stalkbroker import db
-from protogen.stalk_proto import forecaster_grpc as forecaster
-from protogen.stalk_proto import reporter_grpc as reporter
+from typing import Dict, List, Optional
+
+from stalkbroker import (
+    db,
+    caching,
+    charting,
+    date_utils,
+    forecasting,
+    metrics,
+    rpc,
+    tracing,
+)
+from protogen.stalk_proto import models_pb2 as backend
+
+from ._guild_index import GuildIndexes
+from ._instrument import register_resource_metrics, trace_discord_requests
+from ._consts import (
+    FORECAST_CACHE_SIZE,
+    FORECAST_CACHE_TTL,
+    CHART_CACHE_MEMORY_BYTES,
+    CHART_CACHE_DISK_BYTES,
+    FORECAST_BATCH_WINDOW,
+    FORECAST_BATCH_SIZE,
+    FORECAST_HEDGE_PERCENTILE,
+    FORECAST_HEDGE_BUDGET,
+    LOCAL_WORKERS,
+    CHART_FALLBACK_TIMEOUT,
+    BACKEND_CHANNELS,
+    BACKEND_DEADLINES,
+    BACKEND_RETRIES,
+    BACKEND_RETRY_BACKOFF,
+    BACKEND_BREAKER_FAILURES,
+    BACKEND_BREAKER_RESET,
+    METRICS_HOST,
+    TRACE_SAMPLE_RATE,
+)
+
+
+def _configure_tracing() -> None:
+    """
+    Send traces to the OTLP collector at ``TRACE_OTLP_ENDPOINT`` if set, otherwise to
+    the JSON-lines file at ``TRACE_FILE`` if set. Nothing is traced if neither is.
+    """
+    if tracing.TRACER.exporter is not None:
+        return
+
+    tracing.TRACER.sample_rate = float(
+        os.environ.get("TRACE_SAMPLE_RATE", TRACE_SAMPLE_RATE)
+    )
+
+    endpoint = os.environ.get("TRACE_OTLP_ENDPOINT")
+    path = os.environ.get("TRACE_FILE")
+    if endpoint:
+        tracing.TRACER.exporter = tracing.OTLPExporter(endpoint)
+    elif path:
+        tracing.TRACER.exporter = tracing.JSONLinesExporter(path)
+
+
+def _report_watcher_stopped(task: asyncio.Task) -> None:
+    """
+    Report the server watcher dying, since nothing awaits it and server caches across
+    bot processes stop being kept in sync.
+    """
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        print(f"server cache watcher stopped: {error!r}")
+
+
+# Settings that only do anything when the setting they are keyed by is on.
+_FORECASTER_SUBSETTINGS: Dict[str, List[str]] = {
+    "FORECAST_HEDGING": ["FORECAST_HEDGE_PERCENTILE", "FORECAST_HEDGE_BUDGET"],
+    "FORECAST_BATCHING": ["FORECAST_BATCH_WINDOW", "FORECAST_BATCH_SIZE"],
+}
+
+
+def _check_forecaster_settings() -> None:
+    """Warn about forecaster settings in the environment that will have no effect."""
+    for feature, settings in _FORECASTER_SUBSETTINGS.items():
+        if os.environ.get(feature):
+            continue
+        for setting in settings:
+            if os.environ.get(setting):
+                print(f"{setting} is set without {feature} and is ignored")
+
+    # The in-process forecaster has not been checked against the service, and its heat
+    # differs from the service's, which bulletin thresholds are tuned for. So it is not
+    # used to answer for the service.
+    if os.environ.get("LOCAL_FORECASTER"):
+        print("LOCAL_FORECASTER is not supported and is ignored")
+        enabled = [f for f in _FORECASTER_SUBSETTINGS if os.environ.get(f)]
+        if enabled:
+            print(
+                "forecasts come from the forecasting service, with"
+                f" {' and '.join(enabled)}"
+            )
 
 
 class _StalkBrokerBot(discord.ext.commands.Bot):
@@ -20,25 +119,211 @@ class _StalkBrokerBot(discord.ext.commands.Bot):
         """
         self.db = db.DBConnection()
         """The database connection to be used by our bot."""
+        self.guild_indexes = GuildIndexes()
+        """Member and role lookup tables for each guild."""
+        trace_discord_requests(self.http)
 
         # set up grpc channels
+        self.backend_client: Optional[rpc.BackendClient] = None
+        """
+        The channel pool, circuit breakers and latency histograms behind our calls to
+        the backend services.
+        """
+
+        self.client_forecaster: forecasting.ForecastEngine = None  # type: ignore
+        """
+        Forecasts prices with the forecasting service's client stub. Concurrent
+        requests are sent in batches when ``FORECAST_BATCHING`` is set, and slow
+        requests are hedged when ``FORECAST_HEDGING`` is set.
+        """
+        self.client_reporter: charting.ChartEngine = None  # type: ignore
+        """
+        Renders charts. The reporting service's client stub unless the
+        ``LOCAL_CHARTS`` environment variable selects the in-process renderer as the
+        primary engine or as a fallback for the service.
+        """
+        self.worker_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        """
+        The worker processes charts are rendered in, when they are rendered locally.
+        ``LOCAL_WORKERS`` sets how many there are.
+        """
+
+        self.forecast_cache: caching.CoalescingCache[
+            bytes, backend.Forecast
+        ] = caching.CoalescingCache(maxsize=FORECAST_CACHE_SIZE, ttl=FORECAST_CACHE_TTL)
+        """Forecasts keyed by the serialized backend ticker they were made for."""
+        self.chart_store: caching.BlobStore = caching.BlobStore(
+            max_memory_bytes=CHART_CACHE_MEMORY_BYTES
+        )
+        """Rendered charts keyed by a hash of the chart request that produced them."""
 
-        self.client_forecaster: forecaster.StalkForecasterStub = None  # type: ignore
-        self.client_reporter: reporter.StalkReporterStub = None  # type: ignore
+        self.ticker_single_write: bool = False
+        """
+        Whether price updates are forecast before being saved, so the price and the
+        pattern it confirms go out in one write. Set by the ``TICKER_SINGLE_WRITE``
+        environment variable.
+        """
 
         self.started: asyncio.Event = asyncio.Event()
 
+        self.resources_started: bool = False
+        """
+        Whether :meth:`start_resources` has run. Discord can send ``on_ready`` more
+        than once, and the resources set up the first time are kept.
+        """
+
+        self.server_watcher: Optional[asyncio.Task] = None
+        """
+        Task keeping the db's server cache coherent with other bot processes. Only
+        started when the ``SERVER_CACHE_WATCH`` environment variable is set.
+        """
+
+        self.metrics_server: Optional[aiohttp.web.AppRunner] = None
+        """
+        Serves the bot's metrics over HTTP. Only started when the ``METRICS_PORT``
+        environment variable is set.
+        """
+
+    def _worker_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        """Returns :attr:`worker_pool`, starting it if it hasn't been."""
+        if self.worker_pool is None:
+            # Workers are spawned rather than forked so they don't inherit the event
+            # loop and the threads of the running bot.
+            self.worker_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=int(os.environ.get("LOCAL_WORKERS", LOCAL_WORKERS)),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self.worker_pool
+
+    def _start_forecaster(self, backend_client: rpc.BackendClient) -> None:
+        """
+        Set up :attr:`client_forecaster` as chosen by the environment.
+
+        :param backend_client: the client calls to the forecasting service are made
+            with.
+        """
+        # Slow forecasts can be hedged with a second request to cut tail latency.
+        forecast_hedge: Optional[rpc.Hedge] = None
+        if os.environ.get("FORECAST_HEDGING"):
+            forecast_hedge = rpc.Hedge(
+                percentile=float(
+                    os.environ.get(
+                        "FORECAST_HEDGE_PERCENTILE", FORECAST_HEDGE_PERCENTILE
+                    )
+                ),
+                budget=float(
+                    os.environ.get("FORECAST_HEDGE_BUDGET", FORECAST_HEDGE_BUDGET)
+                ),
+            )
+
+        forecaster_stub = rpc.ForecasterClient(backend_client, forecast_hedge)
+        self.client_forecaster = forecaster_stub
+
+        if os.environ.get("FORECAST_BATCHING"):
+            self.client_forecaster = forecasting.BatchingForecaster(
+                forecaster_stub,
+                window=float(
+                    os.environ.get("FORECAST_BATCH_WINDOW", FORECAST_BATCH_WINDOW)
+                ),
+                max_size=int(
+                    os.environ.get("FORECAST_BATCH_SIZE", FORECAST_BATCH_SIZE)
+                ),
+            )
+
+        _check_forecaster_settings()
+
     async def start_resources(self) -> None:
+        # Only set up the db connection, backend channels and workers once, however
+        # many times we are told the bot is ready.
+        if self.resources_started:
+            return
+        self.resources_started = True
+
         # Connect to db
         await STALKBROKER.db.connect()
+        self.db.bulk_chunk_size = int(
+            os.environ.get("MEMBER_SYNC_CHUNK_SIZE", db.BULK_CHUNK_SIZE)
+        )
+        self.db.validate_documents = bool(os.environ.get("DB_VALIDATE_DOCUMENTS"))
+        # Load the zones users have set now, so loading users never parses zoneinfo.
+        date_utils.TIMEZONES.preload(await self.db.fetch_user_timezones())
+
+        self.ticker_single_write = bool(os.environ.get("TICKER_SINGLE_WRITE"))
 
         # set up grpc channels
         backend_host = os.environ["BACKEND_HOST"]
         backend_port = int(os.environ["BACKEND_PORT"])
-        backend_channel = grpclib.client.Channel(host=backend_host, port=backend_port,)
+        backend_pool = rpc.ChannelPool(
+            functools.partial(
+                grpclib.client.Channel, host=backend_host, port=backend_port,
+            ),
+            size=int(os.environ.get("BACKEND_CHANNELS", BACKEND_CHANNELS)),
+        )
+        self.backend_client = rpc.BackendClient(
+            backend_pool,
+            deadlines=(
+                dict() if os.environ.get("BACKEND_NO_DEADLINES") else BACKEND_DEADLINES
+            ),
+            retries=int(os.environ.get("BACKEND_RETRIES", BACKEND_RETRIES)),
+            retry_backoff=BACKEND_RETRY_BACKOFF,
+            breaker_failures=BACKEND_BREAKER_FAILURES,
+            breaker_reset=BACKEND_BREAKER_RESET,
+        )
+
+        self._start_forecaster(self.backend_client)
+        self.client_reporter = rpc.ReporterClient(self.backend_client)
+
+        local_charts = os.environ.get("LOCAL_CHARTS")
+        if local_charts in ("primary", "fallback"):
+            local_renderer = charting.LocalChartRenderer(self._worker_pool())
+
+            if local_charts == "primary":
+                self.client_reporter = local_renderer
+            else:
+                self.client_reporter = charting.FallbackChartRenderer(
+                    primary=self.client_reporter,
+                    fallback=local_renderer,
+                    timeout=float(
+                        os.environ.get("LOCAL_CHARTS_TIMEOUT", CHART_FALLBACK_TIMEOUT)
+                    ),
+                )
+
+        # Rendered charts can optionally be kept on disk as well as in memory, so they
+        # survive restarts.
+        chart_cache_dir = os.environ.get("CHART_CACHE_DIR")
+        if chart_cache_dir:
+            self.chart_store = caching.BlobStore(
+                max_memory_bytes=CHART_CACHE_MEMORY_BYTES,
+                directory=pathlib.Path(chart_cache_dir),
+                max_disk_bytes=int(
+                    os.environ.get("CHART_CACHE_DISK_BYTES", CHART_CACHE_DISK_BYTES)
+                ),
+            )
+
+        # If more than one bot process shares the database, server settings changed
+        # through one process need to reach the server cache of the others.
+        if os.environ.get("SERVER_CACHE_WATCH") and self.server_watcher is None:
+            poll_interval = float(
+                os.environ.get("SERVER_CACHE_POLL_SECONDS", db.SERVER_POLL_INTERVAL)
+            )
+            self.server_watcher = asyncio.create_task(
+                self.db.watch_servers(poll_interval=poll_interval)
+            )
+            self.server_watcher.add_done_callback(_report_watcher_stopped)
+
+        # Trace a sample of commands to a local file or an OTLP collector.
+        _configure_tracing()
 
-        self.client_forecaster = forecaster.StalkForecasterStub(backend_channel)
-        self.client_reporter = reporter.StalkReporterStub(backend_channel)
+        # Expose the statistics of the resources we just set up, and optionally serve
+        # every metric over HTTP to be scraped.
+        register_resource_metrics(self)
+        metrics_port = os.environ.get("METRICS_PORT")
+        if metrics_port and self.metrics_server is None:
+            self.metrics_server = await metrics.start_http_server(
+                metrics.REGISTRY,
+                host=os.environ.get("METRICS_HOST", METRICS_HOST),
+                port=int(metrics_port),
+            )
 
 
 # Set up the bot and db connection
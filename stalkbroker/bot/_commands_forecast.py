@@ -3,6 +3,7 @@ import asyncio
 
 from stalkbroker import messages
 from ._bot import STALKBROKER
+from ._instrument import instrument_command
 from ._common import (
     fetch_message_ticker_info,
     get_forecast_from_backend,
@@ -20,6 +21,7 @@ _IMPORT_HELPER = None
         "that user's island will be fetched"
     ),
 )
+@instrument_command
 async def forecast(ctx: discord.ext.commands.Context) -> None:
     """
     Handles responses to the ``'$ticker'`` command.
@@ -4,6 +4,7 @@ import pytz.exceptions
 
 from stalkbroker import date_utils, errors, messages
 from ._bot import STALKBROKER
+from ._instrument import instrument_command
 from ._commands_utils import confirm_execution, user_change_bulletin_subscription
 
 
@@ -15,6 +16,7 @@ _IMPORT_HELPER = None
     case_insensitive=True,
     help="<zone> Sets the timezone for your user (ie pst)",
 )
+@instrument_command
 async def set_user_timezone(ctx: discord.ext.commands.Context, zone_arg: str) -> None:
     """
     Sets a user's local timezone in the database.
@@ -38,7 +40,12 @@ async def set_user_timezone(ctx: discord.ext.commands.Context, zone_arg: str) ->
 
 
 # TODO: put this behind some sort of role check
-@STALKBROKER.group(case_insensitive=True, pass_context=True)
+# The group's own handler only runs when no subcommand is given, so subcommands are
+# not recorded twice.
+@STALKBROKER.group(
+    case_insensitive=True, pass_context=True, invoke_without_command=True
+)
+@instrument_command
 async def bulletins(ctx: discord.ext.commands.Context) -> None:
     pass
 
@@ -46,6 +53,7 @@ async def bulletins(ctx: discord.ext.commands.Context) -> None:
 @bulletins.command(
     name="here", pass_context=True, help="send bulletins to this channel",
 )
+@instrument_command
 async def set_bulletins_channel(ctx: discord.ext.commands.Context) -> None:
     """
     Sets the channel a server wishes bulletins to be sent to.
@@ -62,6 +70,7 @@ async def set_bulletins_channel(ctx: discord.ext.commands.Context) -> None:
     pass_context=True,
     help="set the minimum bell price for a bulletin to be sent to the bulletin channel",
 )
+@instrument_command
 async def set_bulletins_minimum(
     ctx: discord.ext.commands.Context, price_minimum: int,
 ) -> None:
@@ -84,6 +93,7 @@ async def set_bulletins_minimum(
         " channel"
     ),
 )
+@instrument_command
 async def set_bulletins_minimum_heat(
     ctx: discord.ext.commands.Context, heat_minimum: int,
 ) -> None:
@@ -105,6 +115,7 @@ async def set_bulletins_minimum_heat(
     "you up for the 'stalk investor role'. This is a discord-wide subscription and"
     " will assign you to the role on every server you are a part of.",
 )
+@instrument_command
 async def bulletins_user_subscribe(ctx: discord.ext.commands.Context) -> None:
     """
     Assigns the user to the 'stalk investor' role so they get notified when bulletins
@@ -121,6 +132,7 @@ async def bulletins_user_subscribe(ctx: discord.ext.commands.Context) -> None:
     help="stop being notified when a turnip price bulletin occurs. This change is "
     "applied to every server you are a part of.",
 )
+@instrument_command
 async def bulletins_user_unsubscribe(ctx: discord.ext.commands.Context) -> None:
     """
     Assigns the user to the 'stalk investor' role so they get notified when bulletins
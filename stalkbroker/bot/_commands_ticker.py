@@ -3,18 +3,21 @@ import re
 import asyncio
 import datetime
 import dataclasses
-from typing import Optional, Tuple, List, Coroutine
+from typing import Optional, Tuple, List
 
 from protogen.stalk_proto import models_pb2 as backend
-from stalkbroker import date_utils, errors, messages, models, constants
+from stalkbroker import date_utils, errors, messages, models, constants, tracing
 
 from ._bot import STALKBROKER
-from ._commands_utils import confirm_execution
-from ._consts import PATTERN_FROM_BACKEND
+from ._instrument import instrument_command
+from ._commands_utils import confirm_execution, get_guild_role
+from ._consts import PATTERN_FROM_BACKEND, TICKER_WRITE_ATTEMPTS
+from ._pipeline import Pipeline
 from ._common import (
     fetch_message_ticker_info,
     get_forecast_from_backend,
-    get_forecast_chart_from_backend,
+    get_forecast_chart_bytes,
+    forecast_chart_file,
     MessageTickerInfo,
 )
 
@@ -53,14 +56,18 @@ class BulletinInfo(MessageTickerInfo):
     forecast: backend.Forecast
     """The forecast for this user."""
 
+    forecast_chart: Optional["asyncio.Future[bytes]"] = dataclasses.field(
+        default=None, init=False
+    )
+    """
+    The forecast chart request, shared by every server this bulletin goes out to.
+    Started by the first server that needs a forecast bulletin.
+    """
 
-def get_bulletin_role(server: models.Server) -> discord.Role:
-    guild: discord.Guild = STALKBROKER.get_guild(server.discord_id)
 
-    bulletin_role: discord.Role = discord.utils.get(
-        guild.roles, name=constants.BULLETIN_ROLE
-    )
-    return bulletin_role
+def get_bulletin_role(server: models.Server) -> Optional[discord.Role]:
+    guild: discord.Guild = STALKBROKER.get_guild(server.discord_id)
+    return get_guild_role(guild, constants.BULLETIN_ROLE)
 
 
 def build_ticker_bulletin(server: models.Server, info: BulletinInfo,) -> Optional[str]:
@@ -89,6 +96,39 @@ def build_ticker_bulletin(server: models.Server, info: BulletinInfo,) -> Optiona
     return bulletin
 
 
+async def _fetch_bulletin_chart(info: BulletinInfo) -> bytes:
+    """
+    Fetches the forecast chart for a bulletin and lets the user know a forecast is
+    going out. Only run once per ticker update, no matter how many servers the
+    bulletin is sent to.
+    """
+    # send a reaction to the client to indicate we are sending a forecast for this
+    # ticker. We'll await this simultaneously with the request to get the chart.
+    message: discord.Message = info.ctx.message
+    react_coro = message.add_reaction(messages.REACTIONS.CONFIRM_FORECAST)
+
+    chart_coro = get_forecast_chart_bytes(
+        info.ctx, info, info.ticker_backend, info.forecast,
+    )
+
+    # await both our forecast confirmation to the user and the chart request.
+    chart_bytes: bytes
+    _, chart_bytes = await asyncio.gather(react_coro, chart_coro)
+    return chart_bytes
+
+
+def _report_chart_failure(chart: "asyncio.Future[bytes]") -> None:
+    """
+    Report a bulletin chart that could not be fetched. Bulletins go out without it, so
+    the error would otherwise never be retrieved.
+    """
+    if chart.cancelled():
+        return
+    error = chart.exception()
+    if error is not None:
+        print(f"bulletin chart failed: {error!r}")
+
+
 async def build_forecast_bulletin(
     server: models.Server, info: BulletinInfo,
 ) -> Tuple[Optional[str], Optional[discord.File]]:
@@ -100,25 +140,20 @@ async def build_forecast_bulletin(
     if heat < server.heat_minimum or max_future < server.bulletin_minimum:
         return None, None
 
-    # send a reaction to the client to indicate we are sending a forecast for this
-    # ticker. We'll await this simultaneously with the request to get the chart.
-    message: discord.Message = info.ctx.message
-    react_coro = message.add_reaction(messages.REACTIONS.CONFIRM_FORECAST)
-
-    # -1 values break the forecasting service, but are needed by the charting service
-    # for cursor placement on sundays, so check here if we need to tweak the backend
-    # ticker.
-    if info.user_time.weekday() == date_utils.SUNDAY:
-        info.ticker_backend.current_period = -1
-
-    forecast_coro = get_forecast_chart_from_backend(
-        info.ctx, info, info.ticker_backend, info.forecast,
-    )
+    # The chart is the same for every server, so the first server to get here starts
+    # the request and the rest wait on it.
+    if info.forecast_chart is None:
+        info.forecast_chart = asyncio.ensure_future(_fetch_bulletin_chart(info))
+        info.forecast_chart.add_done_callback(_report_chart_failure)
 
-    # await both our forecast confirmation to the user and the chart request.
-    chart_file: discord.File
-    _, chart_file = await asyncio.gather(react_coro, forecast_coro)
+    # Waiting rather than awaiting leaves the shared request running if this server's
+    # bulletin is cancelled.
+    chart = info.forecast_chart
+    await asyncio.wait([chart])
 
+    # -1 values break the forecasting service, but are needed by the charting service
+    # for cursor placement on sundays. The chart request sets it on the backend ticker
+    # for us.
     bulletin = messages.bulletin_forecast(
         info.discord_user,
         ticker=info.ticker,
@@ -126,9 +161,14 @@ async def build_forecast_bulletin(
         current_period=info.ticker_backend.current_period,
     )
 
-    return bulletin, chart_file
+    # A chart we couldn't get shouldn't hold up the bulletin, so it goes out without
+    # one. Otherwise, each server gets its own file object over the shared chart bytes.
+    if chart.exception() is not None:
+        return bulletin, None
+    return bulletin, forecast_chart_file(chart.result())
 
 
+@tracing.traced("send_bulletins_to_server")
 async def send_bulletins_to_server(
     server: discord.Guild, bulletin_info: BulletinInfo,
 ) -> None:
@@ -141,6 +181,8 @@ async def send_bulletins_to_server(
     :raises NoBulletinChannelError: When the server does not have the channel it wants
         to receive bulletins on set.
     """
+    # Server settings are cached by the db connection, so this does not need a round
+    # trip for every guild we fan out to.
     server_info = await STALKBROKER.db.fetch_server(server)
 
     # If the server has not set a bulletin channel, raise an error to be returned to
@@ -156,6 +198,8 @@ async def send_bulletins_to_server(
 
     # Get the bulletin role
     bulletin_role = get_bulletin_role(server_info)
+    # Type assertion for mypy
+    assert bulletin_role is not None
 
     # Set the default file value to none
     file: Optional[discord.File] = None
@@ -173,6 +217,7 @@ async def send_bulletins_to_server(
     await bulletin_channel.send(bulletin, file=file)
 
 
+@tracing.traced("send_bulletins_to_all_user_servers")
 async def send_bulletins_to_all_user_servers(bulletin_info: BulletinInfo,) -> None:
     """
     For a given user, send a price update bulletin to every server they are a part of
@@ -182,18 +227,23 @@ async def send_bulletins_to_all_user_servers(bulletin_info: BulletinInfo,) -> No
     """
 
     # Build a list of bulletins to send out.
-    bulletin_coros: List[Coroutine] = list()
+    bulletin_tasks: List[asyncio.Future] = list()
     for server_discord_id in bulletin_info.stalk_user.servers:
         server = STALKBROKER.get_guild(server_discord_id)
         # This user might be part of a server we don't have access to.
         if server is None:
             continue
 
-        this_coro = send_bulletins_to_server(server, bulletin_info)
-        bulletin_coros.append(this_coro)
+        this_task = asyncio.ensure_future(
+            send_bulletins_to_server(server, bulletin_info)
+        )
+        bulletin_tasks.append(this_task)
+
+    if not bulletin_tasks:
+        return
 
     # Asynchronously send them all.
-    done, _ = await asyncio.wait(bulletin_coros)
+    done, _ = await asyncio.wait(bulletin_tasks)
 
     # Check if we had any errors when sending (such as a server not having a bulletin
     # channel set)
@@ -234,6 +284,194 @@ def is_bulletin_possible(bulletin_info: BulletinInfo,) -> bool:
     return True
 
 
+@dataclasses.dataclass
+class _TickerUpdate:
+    """
+    The stages of a price update. Run as a pipeline by :func:`update_ticker` so that
+    independent stages overlap.
+    """
+
+    ctx: discord.ext.commands.Context
+    """The message context."""
+    stalk_user: models.User
+    """The user the price belongs to."""
+    message_time_local: datetime.datetime
+    """The time the message was sent in the user's timezone."""
+    price: int
+    """The new price."""
+    price_date: datetime.date
+    """The date the price occurred on."""
+    price_time_of_day: Optional[models.TimeOfDay]
+    """The time of day the price occurred on."""
+    week_of: datetime.date
+    """The sunday the week of the ticker starts."""
+    current_period: int
+    """The price period the user is currently in."""
+
+    async def write_price(self) -> models.Ticker:
+        return await STALKBROKER.db.update_ticker_price(
+            user=self.stalk_user,
+            week_of=self.week_of,
+            price_date=self.price_date,
+            price_time_of_day=self.price_time_of_day,
+            price=self.price,
+        )
+
+    async def read_ticker(self) -> models.Ticker:
+        return await STALKBROKER.db.fetch_ticker(self.stalk_user, self.week_of)
+
+    async def fetch_previous_pattern(self) -> models.Patterns:
+        return await STALKBROKER.db.fetch_previous_pattern(
+            user=self.stalk_user, week_of_current=self.week_of,
+        )
+
+    async def confirm_price(self, _: object) -> None:
+        reactions = messages.REACTIONS.price_update_reactions(
+            price_date=self.price_date,
+            price_time_of_day=self.price_time_of_day,
+            message_datetime_local=self.message_time_local,
+        )
+        await confirm_execution(self.ctx, reactions)
+
+    async def forecast(
+        self, user_ticker: models.Ticker, previous_pattern: models.Patterns,
+    ) -> BulletinInfo:
+        message: discord.Message = self.ctx.message
+
+        message_info = MessageTickerInfo(
+            discord_user=message.author,
+            stalk_user=self.stalk_user,
+            price_date=self.price_date,
+            user_time=self.message_time_local,
+            ticker=user_ticker,
+            current_period=self.current_period,
+        )
+        ticker_backend, forecast = await get_forecast_from_backend(
+            self.ctx, message_info, previous_pattern=previous_pattern,
+        )
+
+        return BulletinInfo(
+            ctx=self.ctx,
+            stalk_user=self.stalk_user,
+            discord_user=message.author,
+            price=self.price,
+            price_date=self.price_date,
+            price_time_of_day=self.price_time_of_day,
+            ticker=user_ticker,
+            ticker_backend=ticker_backend,
+            forecast=forecast,
+            user_time=self.message_time_local,
+            current_period=self.current_period,
+        )
+
+    async def write_pattern(self, bulletin_info: BulletinInfo) -> None:
+        # Update our weeks price pattern. It will be set as 'UNKNOWN' if there are
+        # multiple possible prices.
+        price_pattern = confirmed_pattern_from_forecast(bulletin_info.forecast)
+        # Most prices don't change what we know about the week's pattern.
+        if price_pattern == bulletin_info.ticker.final_pattern:
+            return
+        await STALKBROKER.db.update_ticker_pattern(
+            self.stalk_user, self.week_of, price_pattern
+        )
+
+    async def forecast_or_save(
+        self,
+        user_ticker: models.Ticker,
+        previous_pattern: models.Patterns,
+        saved: bool,
+    ) -> BulletinInfo:
+        """
+        Forecast ``user_ticker``. If the forecast fails, the new price is still saved
+        and confirmed before the error is raised, just like when the price is written
+        before it is forecast.
+
+        :param saved: whether the new price has already been saved.
+        """
+        try:
+            return await self.forecast(user_ticker, previous_pattern)
+        except Exception:
+            if not saved:
+                await self.write_price()
+            await self.confirm_price(None)
+            raise
+
+    async def forecast_and_write(
+        self, user_ticker: models.Ticker, previous_pattern: models.Patterns,
+    ) -> BulletinInfo:
+        # Forecast the ticker as it will be with the new price, then save the price and
+        # the pattern it confirms together. If someone else writes to the ticker in the
+        # meantime our write is refused, and we start again from their version.
+        for attempt in range(TICKER_WRITE_ATTEMPTS):
+            if attempt > 0:
+                user_ticker = await self.read_ticker()
+            user_ticker.set_price(self.price, self.price_date, self.price_time_of_day)
+
+            bulletin_info = await self.forecast_or_save(
+                user_ticker, previous_pattern, saved=False
+            )
+            price_pattern = confirmed_pattern_from_forecast(bulletin_info.forecast)
+
+            saved_ticker = await STALKBROKER.db.update_ticker_price_and_pattern(
+                user=self.stalk_user,
+                week_of=self.week_of,
+                price_date=self.price_date,
+                price_time_of_day=self.price_time_of_day,
+                price=self.price,
+                pattern=price_pattern,
+                expected_version=user_ticker.version,
+            )
+            if saved_ticker is not None:
+                bulletin_info.ticker = saved_ticker
+                return bulletin_info
+
+        # The ticker is too busy to win a conditional write. Price writes are atomic on
+        # their own, so fall back to saving the price and then the pattern.
+        bulletin_info = await self.forecast_or_save(
+            await self.write_price(), previous_pattern, saved=True
+        )
+        await self.write_pattern(bulletin_info)
+        return bulletin_info
+
+    async def send_bulletins(self, bulletin_info: BulletinInfo) -> None:
+        # If a bulletin would never go out to any server, we don't need to do anything.
+        if not is_bulletin_possible(bulletin_info):
+            return
+        await send_bulletins_to_all_user_servers(bulletin_info)
+
+    async def run(self) -> None:
+        # Last week's pattern is fetched while the ticker is written or read, the user
+        # gets their confirmation reactions as soon as the price is saved, and
+        # bulletins go out as soon as we have a forecast.
+        pipeline = Pipeline("ticker update")
+
+        previous_pattern = pipeline.stage(
+            "previous_pattern", self.fetch_previous_pattern
+        )
+
+        if STALKBROKER.ticker_single_write:
+            ticker_read = pipeline.stage("ticker_read", self.read_ticker)
+            forecast = pipeline.stage(
+                "forecast_write",
+                self.forecast_and_write,
+                ticker_read,
+                previous_pattern,
+            )
+            pipeline.stage("confirm", self.confirm_price, forecast)
+        else:
+            price_written = pipeline.stage("price_write", self.write_price)
+            pipeline.stage("confirm", self.confirm_price, price_written)
+            forecast = pipeline.stage(
+                "forecast", self.forecast, price_written, previous_pattern
+            )
+            pipeline.stage("pattern_write", self.write_pattern, forecast)
+
+        pipeline.stage("bulletins", self.send_bulletins, forecast)
+
+        await pipeline.wait()
+
+
+@tracing.traced("update_ticker")
 async def update_ticker(
     ctx: discord.ext.commands.Context,
     *,
@@ -251,6 +489,7 @@ async def update_ticker(
     :param price_time_of_day_arg: the time of day this price occurred on (AM/PM). If
         none, then the current time of day is used.
 
+    :raises BadPriceError: If the price is too large for a ticker to hold.
     :raises UnknownUserTimezoneError: If the user's timezone is unknown and we cannot
         convert their message time.
     :raises ImaginaryDateError: If the user has specified a date that does not exist.
@@ -259,6 +498,9 @@ async def update_ticker(
     :raises TimeOfDayRequiredError: If the user has not supplied an AM/PM argument for a
         past date.
     """
+    # Catch prices the ticker can't hold before anything is written.
+    if not 0 <= price <= models.MAX_PRICE:
+        raise errors.BadPriceError(ctx, price)
 
     message: discord.Message = ctx.message
     stalk_user = await STALKBROKER.db.fetch_user(message.author, message.guild)
@@ -275,69 +517,23 @@ async def update_ticker(
         ctx, price_date_arg, price_time_of_day_arg, stalk_user.timezone,
     )
 
-    week_of = date_utils.previous_sunday(price_date)
-
-    user_ticker = await STALKBROKER.db.update_ticker_price(
-        user=stalk_user,
-        week_of=week_of,
-        price_date=price_date,
-        price_time_of_day=price_time_of_day,
-        price=price,
-    )
-
-    # Now we need to make a forecast and check if we have a confirmed price pattern
-    # so that we can update it.
-    current_period = user_ticker.phase_from_datetime(message_time_local)
+    # Which period of the week we are in only depends on the message time, so we can
+    # work it out before the ticker is saved.
+    current_period = models.Ticker.phase_from_datetime(message_time_local)
     if current_period is None:
         current_period = 0
 
-    message_info = MessageTickerInfo(
-        discord_user=message.author,
-        stalk_user=stalk_user,
-        price_date=price_date,
-        user_time=message_time_local,
-        ticker=user_ticker,
-        current_period=current_period,
-    )
-    ticker_backend, forecast = await get_forecast_from_backend(ctx, message_info)
-
-    # Update our weeks price pattern. It will be set as 'UNKNOWN' if there are multiple
-    # possible prices.
-    price_pattern = confirmed_pattern_from_forecast(forecast)
-    await STALKBROKER.db.update_ticker_pattern(stalk_user, week_of, price_pattern)
-
-    # Add confirmation reactions to the original message now that we are done.
-    coroutines: List[Coroutine] = list()
-    reactions = messages.REACTIONS.price_update_reactions(
-        price_date=price_date,
-        price_time_of_day=price_time_of_day,
-        message_datetime_local=message_time_local,
-    )
-    confirm_coro = confirm_execution(ctx, reactions)
-    coroutines.append(confirm_coro)
-
-    # Get ready to send out bulletins.
-    bulletin_info = BulletinInfo(
+    ticker_update = _TickerUpdate(
         ctx=ctx,
         stalk_user=stalk_user,
-        discord_user=message.author,
+        message_time_local=message_time_local,
         price=price,
         price_date=price_date,
         price_time_of_day=price_time_of_day,
-        ticker=user_ticker,
-        ticker_backend=ticker_backend,
-        forecast=forecast,
-        user_time=message_time_local,
+        week_of=date_utils.previous_sunday(price_date),
         current_period=current_period,
     )
-
-    # If a bulletin would never go out to any server, we don't need to do anything,
-    # otherwise add it to our list of coroutines to execute.
-    if is_bulletin_possible(bulletin_info):
-        bulletin_coro = send_bulletins_to_all_user_servers(bulletin_info)
-        coroutines.append(bulletin_coro)
-
-    await asyncio.gather(*coroutines)
+    await ticker_update.run()
 
 
 async def fetch_ticker(
@@ -405,6 +601,7 @@ def _parse_ticker_args(
         + " to get their ticker."
     ),
 )
+@instrument_command
 async def ticker(ctx: discord.ext.commands.Context, *args: str) -> None:
     """
     Handles responses to the ``'$ticker'`` command.
@@ -1,6 +1,7 @@
 import discord.ext.commands
 import asyncio
-from typing import List, Coroutine, Union
+import functools
+from typing import List, Coroutine, Union, Optional, Callable, Awaitable
 
 from stalkbroker import messages, constants, models
 
@@ -37,8 +38,42 @@ async def confirm_execution(
     await asyncio.gather(*react_coros)
 
 
-def get_guild_role(guild: discord.Guild, role_name: str) -> discord.Role:
-    return discord.utils.get(guild.roles, name=role_name)
+def get_guild_role(guild: discord.Guild, role_name: str) -> Optional[discord.Role]:
+    """Look up a guild role by name."""
+    return STALKBROKER.guild_indexes[guild].role(role_name)
+
+
+def bulletin_role_change(
+    guild: discord.Guild, stalk_user: models.User, member: discord.Member,
+) -> Optional[Callable[[], Awaitable[None]]]:
+    """
+    Work out whether a member's bulletin role needs to change to match their settings.
+
+    :param guild: the guild the member belongs to.
+    :param stalk_user: the stalkbroker user the member belongs to.
+    :param member: the guild member.
+
+    :returns: a callable making the discord request that brings the member in line
+        with their settings, or ``None`` if they already have the right roles or the
+        guild has no bulletin role.
+    """
+    bulletins_role = get_guild_role(guild, constants.BULLETIN_ROLE)
+    if bulletins_role is None:
+        return None
+
+    # Every role change is a REST request that counts against our rate limit, so we
+    # only make one if the member's roles are actually wrong.
+    wants_role = stalk_user.notify_on_bulletin is True
+    if wants_role == (bulletins_role in member.roles):
+        return None
+
+    # Add or remove the guild member from the guild role.
+    if wants_role:
+        mutate = member.add_roles
+    else:
+        mutate = member.remove_roles
+
+    return functools.partial(mutate, bulletins_role, reason="stalkbroker request")
 
 
 async def user_update_guild_roles(
@@ -50,20 +85,13 @@ async def user_update_guild_roles(
     Update the guild roles of a user based on their settings.
     """
     # We need to transform the user into the member for THAT GUILD.
-    discord_user = discord.utils.get(guild.members, id=discord_user.id)
+    guild_member = STALKBROKER.guild_indexes[guild].member(discord_user.id)
     # Type assertion for mypy
-    assert isinstance(discord_user, discord.Member)
-
-    # Get the bulletin role for the guild.
-    bulletins_role: discord.Role = get_guild_role(guild, constants.BULLETIN_ROLE)
-    if bulletins_role is None:
-        return
+    assert guild_member is not None
 
-    # Add or remove the guild member from the guild role.
-    if stalk_user.notify_on_bulletin is True:
-        await discord_user.add_roles(bulletins_role, reason="stalkbroker request")
-    else:
-        await discord_user.remove_roles(bulletins_role, reason="stalkbroker request")
+    role_change = bulletin_role_change(guild, stalk_user, guild_member)
+    if role_change is not None:
+        await role_change()
 
 
 async def user_change_bulletin_subscription(
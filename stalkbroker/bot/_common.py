@@ -1,13 +1,15 @@
+import asyncio
 import discord.ext.commands
 import dataclasses
 import datetime
+import functools
 import grpclib.exceptions
 import io
 from typing import Tuple, Optional
 
 from protogen.stalk_proto import models_pb2 as backend
 
-from stalkbroker import models, errors, date_utils
+from stalkbroker import models, errors, date_utils, caching, forecasting, tracing
 from ._bot import STALKBROKER
 from ._consts import PATTERN_TO_BACKEND, CHART_PADDING, CHART_BG_COLOR
 
@@ -75,37 +77,65 @@ def current_period_for_backend(user_time_local: datetime.datetime) -> int:
     return current_period
 
 
+@tracing.traced("get_forecast_from_backend")
 async def get_forecast_from_backend(
-    ctx: discord.ext.commands.Context, info: MessageTickerInfo
+    ctx: discord.ext.commands.Context,
+    info: MessageTickerInfo,
+    previous_pattern: Optional[models.Patterns] = None,
 ) -> Tuple[backend.Ticker, backend.Forecast]:
-    """Gets forecast from backend based on user info."""
+    """
+    Gets forecast from backend based on user info.
+
+    :param ctx: message context passed in by discord.py to the calling command.
+    :param info: the ticker to forecast.
+    :param previous_pattern: the user's price pattern from last week, if the caller
+        has already fetched it. Fetched from the database when ``None``.
+    """
     # Now we need to submit that to the forecasting service
-
-    previous_pattern = await STALKBROKER.db.fetch_previous_pattern(
-        user=info.stalk_user, week_of_current=info.ticker.week_of,
-    )
+    if previous_pattern is None:
+        previous_pattern = await STALKBROKER.db.fetch_previous_pattern(
+            user=info.stalk_user, week_of_current=info.ticker.week_of,
+        )
     previous_pattern_backend = PATTERN_TO_BACKEND[previous_pattern]
 
     backend_ticker = info.ticker.to_backend(
         previous_pattern=previous_pattern_backend, current_period=info.current_period,
     )
 
+    # Identical tickers always produce identical forecasts, so repeated requests with
+    # no new prices are served from the cache, and concurrent ones share a single
+    # call to the forecaster.
+    cache_key = backend_ticker.SerializeToString(deterministic=True)
+    forecast_prices = functools.partial(
+        STALKBROKER.client_forecaster.ForecastPrices, backend_ticker,
+    )
+
+    # Deadlines that run out surface as timeouts rather than gRPC errors, and calls the
+    # circuit breaker stopped as CircuitOpenError.
     try:
-        island_forecast = await STALKBROKER.client_forecaster.ForecastPrices(
-            backend_ticker,
+        island_forecast = await STALKBROKER.forecast_cache.get(
+            cache_key, forecast_prices
         )
-    except grpclib.exceptions.GRPCError as error:
+    except (
+        grpclib.exceptions.GRPCError,
+        asyncio.TimeoutError,
+        errors.CircuitOpenError,
+    ) as error:
         raise errors.BackendError(ctx, error)
+    except forecasting.ImpossiblePricesError:
+        raise errors.ImpossibleTickerError(ctx)
 
     return backend_ticker, island_forecast
 
 
-async def get_forecast_chart_from_backend(
+@tracing.traced("get_forecast_chart_bytes")
+async def get_forecast_chart_bytes(
     ctx: discord.ext.commands.Context,
     info: MessageTickerInfo,
     backend_ticker: backend.Ticker,
     forecast: backend.Forecast,
-) -> discord.File:
+) -> bytes:
+    """Gets the rendered PNG forecast chart from the backend."""
     if info.user_time.weekday() == date_utils.SUNDAY:
         backend_ticker.current_period = -1
 
@@ -119,16 +149,43 @@ async def get_forecast_chart_from_backend(
         padding=CHART_PADDING,
     )
 
-    # Catch backend errors and raise them wrapped in a response error.
-    try:
+    # The chart request fully determines the image, so charts are stored by a hash of
+    # the request and only rendered the first time we see it.
+    chart_key = caching.content_key(req_chart.SerializeToString(deterministic=True))
+
+    async def render_chart() -> bytes:
         forecast_chart: backend.RespChart = (
             await STALKBROKER.client_reporter.ForecastChart(req_chart)
         )
-    except grpclib.exceptions.GRPCError as error:
+        return forecast_chart.chart
+
+    # Catch backend errors, including deadlines that ran out and calls the circuit
+    # breaker stopped, and raise them wrapped in a response error.
+    try:
+        return await STALKBROKER.chart_store.get(chart_key, render_chart)
+    except (
+        grpclib.exceptions.GRPCError,
+        asyncio.TimeoutError,
+        errors.CircuitOpenError,
+    ) as error:
         raise errors.BackendError(ctx, error)
 
-    # Embed the resulting image in the return message, and include a high-level chart
-    image_buffer = io.BytesIO(forecast_chart.chart)
-    image_file = discord.File(image_buffer, filename="forecast.png")
 
-    return image_file
+def forecast_chart_file(chart_bytes: bytes) -> discord.File:
+    """
+    Wrap chart bytes in a file to embed in a message. Each message needs its own file
+    object, but they can all share the same bytes.
+    """
+    return discord.File(io.BytesIO(chart_bytes), filename="forecast.png")
+
+
+@tracing.traced("get_forecast_chart_from_backend")
+async def get_forecast_chart_from_backend(
+    ctx: discord.ext.commands.Context,
+    info: MessageTickerInfo,
+    backend_ticker: backend.Ticker,
+    forecast: backend.Forecast,
+) -> discord.File:
+    chart_bytes = await get_forecast_chart_bytes(ctx, info, backend_ticker, forecast)
+    # Embed the resulting image in the return message, and include a high-level chart
+    return forecast_chart_file(chart_bytes)
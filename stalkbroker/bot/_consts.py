@@ -1,3 +1,5 @@
+from typing import Dict
+
 from protogen.stalk_proto import models_pb2 as backend
 from stalkbroker import models
 
@@ -5,6 +7,78 @@ from stalkbroker import models
 CHART_BG_COLOR = "#2C2F33"
 CHART_PADDING = 0.03
 
+# The number of role changes to have in flight at once when syncing a guild's roles.
+# Discord rate limits role changes per guild, so there is little to gain from going
+# higher.
+ROLE_SYNC_CONCURRENCY = 4
+
+# Forecasts are fully determined by the backend ticker they are made for, so we can
+# hold on to them. The TTL only bounds how long we serve forecasts made by an older
+# version of the forecasting service.
+FORECAST_CACHE_SIZE = 4096
+FORECAST_CACHE_TTL = 3600.0
+
+# Calls to the backend services go out over a pool of this many channels.
+BACKEND_CHANNELS = 2
+
+# Seconds each backend method may take before we give up on it, across retries. Setting
+# the BACKEND_NO_DEADLINES environment variable waits on every method as long as it
+# takes.
+BACKEND_DEADLINES: Dict[str, float] = {
+    "ForecastPrices": 2.0,
+    "ForecastPricesBatch": 5.0,
+    "ForecastChart": 10.0,
+}
+
+# Calls that could not reach the backend are retried this many times, after a random
+# backoff of up to BACKEND_RETRY_BACKOFF seconds that doubles with each retry. The
+# BACKEND_RETRIES environment variable overrides the count, and 0 turns retries off.
+BACKEND_RETRIES = 2
+BACKEND_RETRY_BACKOFF = 0.05
+
+# After this many failures to reach a backend service in a row, calls to it fail fast
+# for BACKEND_BREAKER_RESET seconds before it is tried again.
+BACKEND_BREAKER_FAILURES = 5
+BACKEND_BREAKER_RESET = 10.0
+
+# When forecasts are hedged, a forecast that has taken longer than this share of recent
+# forecasts is requested a second time, as long as hedges add no more than
+# FORECAST_HEDGE_BUDGET extra requests per forecast.
+FORECAST_HEDGE_PERCENTILE = 0.95
+FORECAST_HEDGE_BUDGET = 0.05
+
+# When forecasts are batched, how many seconds we collect concurrent requests for
+# before sending them to the forecasting service, and the most we send in one batch.
+FORECAST_BATCH_WINDOW = 0.005
+FORECAST_BATCH_SIZE = 64
+
+# Rendered forecast charts are kept in memory up to this many bytes. An on-disk tier can
+# be added by setting the CHART_CACHE_DIR environment variable.
+CHART_CACHE_MEMORY_BYTES = 64 * 1024 * 1024
+CHART_CACHE_DISK_BYTES = 1024 * 1024 * 1024
+
+# When charts are rendered locally, the number of worker processes doing it. Set with
+# the LOCAL_WORKERS environment variable.
+LOCAL_WORKERS = 2
+
+# When the local chart renderer is a fallback, how many seconds we wait on the reporting
+# service before rendering locally instead.
+CHART_FALLBACK_TIMEOUT = 5.0
+
+# When prices are saved together with the pattern they confirm, this is how many times
+# we re-read the ticker and re-forecast after losing a write to a concurrent update
+# before falling back to saving the price on its own.
+TICKER_WRITE_ATTEMPTS = 3
+
+
+# The fraction of commands traced when the TRACE_FILE or TRACE_OTLP_ENDPOINT
+# environment variable is set, unless TRACE_SAMPLE_RATE says otherwise.
+TRACE_SAMPLE_RATE = 0.1
+
+# When the METRICS_PORT environment variable is set, metrics are served on this
+# interface unless METRICS_HOST says otherwise.
+METRICS_HOST = "127.0.0.1"
+
 
 # Converts this bots price pattern enum values to our backend service model's enum
 # values.
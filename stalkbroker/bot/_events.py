@@ -1,11 +1,14 @@
 import asyncio
+import datetime
+import hashlib
 import discord.ext.commands
-from typing import Coroutine, List
+from typing import Coroutine, List, Tuple
 
 from stalkbroker import errors, constants, models
 
 from ._bot import STALKBROKER
-from ._commands_utils import user_update_guild_roles
+from ._commands_utils import user_update_guild_roles, get_guild_role
+from ._role_sync import reconcile_guild_roles
 
 
 _IMPORT_HELPER = None
@@ -28,56 +31,94 @@ async def on_command_error(
 # one of their servers, we would miss that they are part of the other.
 async def _add_all_guild_members(guild: discord.Guild) -> None:
     """Adds all the users on a server to the db."""
-    # We're going to build a list of coroutines to execute these updates then run
-    # them all at once.
-    user_coros: List[Coroutine] = list()
-
-    user: discord.Member
-    for member in guild.members:
-        user_coros.append(STALKBROKER.db.add_user(member, guild))
-
-    # Create / fetch all the user records
-    users: List[models.User] = await asyncio.gather(*user_coros)
+    # Large guilds can have tens of thousands of members, so rather than an upsert per
+    # member, we register them with chunked bulk writes.
+    users: List[models.User] = await STALKBROKER.db.add_users_bulk(
+        guild.members, guild
+    )
 
     # Now we want to update all the user roles on this server in case it is a new server
-    roles_coros: List[Coroutine] = list()
-    for stalk_user in users:
-        guild_member = guild.get_member(stalk_user.discord_id)
-        roles_coros.append(user_update_guild_roles(guild, stalk_user, guild_member))
-
-    await asyncio.gather(*roles_coros)
+    report = await reconcile_guild_roles(guild, users)
+    print(
+        f"synced roles for {guild.name}: {report.applied} changed,"
+        f" {report.skipped} skipped, {report.failed} failed"
+    )
 
 
 async def _add_roles(guild: discord.Guild) -> None:
     """Creates any roles on the server that the bot will need."""
     # If the role already exists we don't want to have to create it again, as this will
     # result in a duplicate role.
-    if discord.utils.get(guild.roles, name=constants.BULLETIN_ROLE):
+    if get_guild_role(guild, constants.BULLETIN_ROLE):
         return
 
-    await guild.create_role(
+    role = await guild.create_role(
         name=constants.BULLETIN_ROLE,
         mentionable=True,
         reason="This role will be mentioned in turnip price bulletins from stalkbroker",
     )
+    # Index the role now rather than waiting on the gateway's role create event, so
+    # member role updates can find it straight away.
+    STALKBROKER.guild_indexes[guild].add_role(role)
+
+
+def _membership_watermark(guild: discord.Guild) -> Tuple[int, str]:
+    """
+    Summarize the membership of a guild so we can tell later whether it has changed.
+
+    :returns: the member count, and an order-independent hash of the member ids.
+    """
+    member_ids = sorted(member.id for member in guild.members)
+    member_hash = hashlib.sha1(",".join(map(str, member_ids)).encode()).hexdigest()
+    return len(member_ids), member_hash
 
 
 async def _add_guild(guild: discord.Guild) -> None:
     """Add a single guild and it's users to stalkbroker's database."""
+    # Take the watermark before syncing, so that members who join or leave part way
+    # through get picked up by the next sync.
+    member_count, member_hash = _membership_watermark(guild)
+    sync_time = datetime.datetime.utcnow()
+
     guild_add_coro = STALKBROKER.db.add_server(guild)
     member_add_coro = _add_all_guild_members(guild)
     create_server_roles_coro = _add_roles(guild)
 
     await asyncio.gather(guild_add_coro, member_add_coro, create_server_roles_coro)
 
+    await STALKBROKER.db.server_set_sync_watermark(
+        guild, member_count, member_hash, sync_time
+    )
+
+
+async def _resync_guild(guild: discord.Guild) -> bool:
+    """
+    Re-add a guild and its users only if its membership has changed since the last
+    sync.
+
+    :returns: whether the guild was re-synced.
+    """
+    server = await STALKBROKER.db.fetch_server(guild)
+    member_count, member_hash = _membership_watermark(guild)
+
+    if (
+        server.sync_member_count == member_count
+        and server.sync_member_hash == member_hash
+    ):
+        return False
+
+    await _add_guild(guild)
+    return True
+
 
 async def _initialize() -> None:
     """
     When the bot starts up, we want to go through all of the servers we are connected
     to and make sure they are saved in our database, along with all their users.
 
-    This event is invoked by discord.py when the bot client is ready to start sending
-    and receiving messages, whether for the first time or when resuming a session.
+    This is invoked when the bot client is ready to start sending and receiving
+    messages for the first time. Resumed sessions only re-sync guilds whose membership
+    has changed.
     """
     print("doing some bookkeeping")
     guild_coros: List[Coroutine] = list()
@@ -100,17 +141,66 @@ async def on_ready() -> None:
 @STALKBROKER.event
 async def on_resumed() -> None:
     """Called when the bot reconnects to discord after looses the connection."""
-    await _initialize()
+    # We may have missed member and role events while disconnected, so our guild
+    # indexes need to be rebuilt.
+    STALKBROKER.guild_indexes.clear()
+
+    # A flaky gateway connection can resume many times a day. Rather than re-adding
+    # every guild, member and role each time, we only re-sync guilds whose membership
+    # changed while we were away.
+    print("checking for membership changes")
+    resynced: List[bool] = await asyncio.gather(
+        *(_resync_guild(guild) for guild in STALKBROKER.guilds)
+    )
+    print(f"re-synced {sum(resynced)} of {len(resynced)} guilds")
 
 
 @STALKBROKER.event
 async def on_guild_join(guild: discord.Guild) -> None:
     """When a new guild joins the bot, we need to add it's members."""
+    STALKBROKER.guild_indexes.drop(guild)
     await _add_guild(guild)
 
 
+@STALKBROKER.event
+async def on_guild_remove(guild: discord.Guild) -> None:
+    """Forget the lookup tables of guilds we are no longer a part of."""
+    STALKBROKER.guild_indexes.drop(guild)
+
+
 @STALKBROKER.event
 async def on_member_join(member: discord.Member) -> None:
     """Add any new members that join."""
+    STALKBROKER.guild_indexes[member.guild].add_member(member)
     stalk_user = await STALKBROKER.db.add_user(member, member.guild)
     await user_update_guild_roles(member.guild, stalk_user, member)
+
+
+@STALKBROKER.event
+async def on_member_remove(member: discord.Member) -> None:
+    """Keep the guild index current when a member leaves."""
+    STALKBROKER.guild_indexes[member.guild].remove_member(member)
+
+
+@STALKBROKER.event
+async def on_member_update(before: discord.Member, after: discord.Member) -> None:
+    """Keep the guild index current when a member changes."""
+    STALKBROKER.guild_indexes[after.guild].add_member(after)
+
+
+@STALKBROKER.event
+async def on_guild_role_create(role: discord.Role) -> None:
+    """Keep the guild index current when a role is added."""
+    STALKBROKER.guild_indexes[role.guild].add_role(role)
+
+
+@STALKBROKER.event
+async def on_guild_role_delete(role: discord.Role) -> None:
+    """Keep the guild index current when a role is removed."""
+    STALKBROKER.guild_indexes[role.guild].reindex_roles()
+
+
+@STALKBROKER.event
+async def on_guild_role_update(before: discord.Role, after: discord.Role) -> None:
+    """Keep the guild index current when a role is renamed or reordered."""
+    STALKBROKER.guild_indexes[after.guild].reindex_roles()
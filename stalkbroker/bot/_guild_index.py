@@ -0,0 +1,82 @@
+import discord
+from typing import Dict, Optional
+
+
+class GuildIndex:
+    """
+    Constant-time member and role lookups for a single guild.
+
+    ``discord.Guild.members`` builds a fresh list on every access and role lookups by
+    name scan ``discord.Guild.roles``, so resolving every member of a large guild that
+    way is quadratic. This index is built once per guild and kept current by the bot's
+    member and role events.
+    """
+
+    def __init__(self, guild: discord.Guild) -> None:
+        """
+        :param guild: the guild to index.
+        """
+        self.guild: discord.Guild = guild
+        """The guild this index describes."""
+
+        self.members: Dict[int, discord.Member] = {m.id: m for m in guild.members}
+        """Guild members by discord id."""
+        self.roles: Dict[str, discord.Role] = dict()
+        """Guild roles by name."""
+
+        self.reindex_roles()
+
+    def member(self, member_id: int) -> Optional[discord.Member]:
+        """Returns the guild member with ``member_id``, or ``None``."""
+        return self.members.get(member_id)
+
+    def role(self, name: str) -> Optional[discord.Role]:
+        """Returns the guild role called ``name``, or ``None``."""
+        return self.roles.get(name)
+
+    def add_member(self, member: discord.Member) -> None:
+        """Add or replace a member in the index."""
+        self.members[member.id] = member
+
+    def remove_member(self, member: discord.Member) -> None:
+        """Drop a member from the index."""
+        self.members.pop(member.id, None)
+
+    def add_role(self, role: discord.Role) -> None:
+        """Add a role to the index, unless an existing role already has its name."""
+        self.roles.setdefault(role.name, role)
+
+    def reindex_roles(self) -> None:
+        """
+        Rebuild the role index from the guild.
+
+        Guilds have few roles, so we rebuild on deletes and renames rather than track
+        duplicate names. When names collide, the first role in ``guild.roles`` wins,
+        which matches ``discord.utils.get``.
+        """
+        self.roles = dict()
+        for role in self.guild.roles:
+            self.add_role(role)
+
+
+class GuildIndexes:
+    """Lazily built :class:`GuildIndex` objects for every guild the bot is in."""
+
+    def __init__(self) -> None:
+        self._indexes: Dict[int, GuildIndex] = dict()
+
+    def __getitem__(self, guild: discord.Guild) -> GuildIndex:
+        try:
+            return self._indexes[guild.id]
+        except KeyError:
+            index = GuildIndex(guild)
+            self._indexes[guild.id] = index
+            return index
+
+    def drop(self, guild: discord.Guild) -> None:
+        """Forget the index for a guild. It will be rebuilt on next access."""
+        self._indexes.pop(guild.id, None)
+
+    def clear(self) -> None:
+        """Forget every index, for instance after missing gateway events."""
+        self._indexes.clear()
@@ -0,0 +1,194 @@
+import functools
+import time
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Tuple, TypeVar
+
+import discord.ext.commands
+import discord.http
+
+from stalkbroker import metrics, rpc, tracing
+
+if TYPE_CHECKING:
+    from ._bot import _StalkBrokerBot
+
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+_Samples = Iterable[Tuple[metrics.LabelValues, metrics.SampleValue]]
+
+
+_COMMAND_SECONDS = metrics.REGISTRY.histogram(
+    "stalkbroker_command_seconds",
+    "Time taken to handle a command, from invocation to the last reply.",
+    ["command"],
+)
+_COMMANDS = metrics.REGISTRY.counter(
+    "stalkbroker_commands_total",
+    "Commands handled, by whether they finished or raised an error.",
+    ["command", "outcome"],
+)
+
+
+def instrument_command(func: _F) -> _F:
+    """
+    Decorate a command handler to record how long it takes and how it ends, and to
+    trace it. Goes beneath the ``STALKBROKER.command`` decorator, so discord.py still
+    sees the arguments of the handler itself.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(
+        ctx: discord.ext.commands.Context, *args: Any, **kwargs: Any
+    ) -> Any:
+        name = ctx.command.qualified_name if ctx.command else func.__name__
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            with tracing.TRACER.trace(f"command {name}", command=name):
+                result = await func(ctx, *args, **kwargs)
+            outcome = "ok"
+            return result
+        finally:
+            _COMMAND_SECONDS.labels(name).observe(time.perf_counter() - start)
+            _COMMANDS.inc(name, outcome)
+
+    wrapper._instrumented = True  # type: ignore
+    return wrapper  # type: ignore
+
+
+def is_instrumented(func: Callable[..., Any]) -> bool:
+    """Whether ``func`` was decorated with :func:`instrument_command`."""
+    return getattr(func, "_instrumented", False)
+
+
+def trace_discord_requests(http: discord.http.HTTPClient) -> None:
+    """
+    Trace every request made to the Discord REST API, like sending messages and adding
+    reactions, as a span named for its route.
+    """
+    request = http.request
+
+    @functools.wraps(request)
+    async def traced_request(route: discord.http.Route, **kwargs: Any) -> Any:
+        with tracing.span(f"discord {route.method} {route.path}"):
+            return await request(route, **kwargs)
+
+    http.request = traced_request  # type: ignore
+
+
+def register_resource_metrics(bot: "_StalkBrokerBot") -> None:
+    """
+    Expose the statistics kept by the bot's caches and backend clients. They are read
+    from ``bot`` each time the metrics are collected, so they follow resources that are
+    replaced when the bot restarts them.
+    """
+
+    def cache_hits() -> _Samples:
+        yield ("forecast",), bot.forecast_cache.cache.hits
+        yield ("chart_memory",), bot.chart_store.memory_hits
+        yield ("chart_disk",), bot.chart_store.disk_hits
+        yield ("db_user",), bot.db.user_cache.hits
+        yield ("db_server",), bot.db.server_cache.hits
+
+    def cache_misses() -> _Samples:
+        yield ("forecast",), bot.forecast_cache.cache.misses
+        yield ("chart",), bot.chart_store.misses
+        yield ("db_user",), bot.db.user_cache.misses
+        yield ("db_server",), bot.db.server_cache.misses
+
+    def forecasts_coalesced() -> _Samples:
+        yield (), bot.forecast_cache.coalesced
+
+    registry = metrics.REGISTRY
+    registry.callback(
+        "gauge",
+        "stalkbroker_cache_hits",
+        "Lookups served from a cache.",
+        ["cache"],
+        cache_hits,
+    )
+    registry.callback(
+        "gauge",
+        "stalkbroker_cache_misses",
+        "Lookups a cache could not serve.",
+        ["cache"],
+        cache_misses,
+    )
+    registry.callback(
+        "gauge",
+        "stalkbroker_forecasts_coalesced",
+        "Forecast requests that shared a request already in flight.",
+        [],
+        forecasts_coalesced,
+    )
+
+    if bot.backend_client is not None:
+        _register_backend_call_metrics(registry, bot.backend_client)
+        _register_breaker_metrics(registry, bot.backend_client)
+
+
+def _register_backend_call_metrics(
+    registry: metrics.Registry, client: rpc.BackendClient
+) -> None:
+    def call_seconds() -> _Samples:
+        for name, method in client.methods.items():
+            yield (name,), method.latencies
+
+    def retries() -> _Samples:
+        for name, method in client.methods.items():
+            yield (name,), method.retried
+
+    def hedges() -> _Samples:
+        for name, method in client.methods.items():
+            if method.hedge is not None:
+                yield (name, "fired"), method.hedge.fired
+                yield (name, "won"), method.hedge.won
+
+    registry.callback(
+        "histogram",
+        "stalkbroker_backend_call_seconds",
+        "Latency of each attempt at a backend call.",
+        ["method"],
+        call_seconds,
+    )
+    registry.callback(
+        "counter",
+        "stalkbroker_backend_retries_total",
+        "Backend calls retried after failing to reach the service.",
+        ["method"],
+        retries,
+    )
+    registry.callback(
+        "counter",
+        "stalkbroker_backend_hedges_total",
+        "Hedged backend calls sent, and how many answered first.",
+        ["method", "result"],
+        hedges,
+    )
+
+
+def _register_breaker_metrics(
+    registry: metrics.Registry, client: rpc.BackendClient
+) -> None:
+    def circuit_open() -> _Samples:
+        for service, breaker in client.breakers.items():
+            is_open = breaker.state is not rpc.CircuitState.CLOSED
+            yield (service,), float(is_open)
+
+    def circuit_trips() -> _Samples:
+        for service, breaker in client.breakers.items():
+            yield (service,), breaker.trips
+
+    registry.callback(
+        "gauge",
+        "stalkbroker_backend_circuit_open",
+        "Whether calls to a backend service are being stopped.",
+        ["service"],
+        circuit_open,
+    )
+    registry.callback(
+        "counter",
+        "stalkbroker_backend_circuit_trips_total",
+        "Times calls to a backend service were stopped after repeated failures.",
+        ["service"],
+        circuit_trips,
+    )
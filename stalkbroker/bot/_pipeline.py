@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, TypeVar
+
+from stalkbroker import metrics, tracing
+
+_T = TypeVar("_T")
+
+_STAGE_SECONDS = metrics.REGISTRY.histogram(
+    "stalkbroker_pipeline_stage_seconds",
+    "Time each stage of a command pipeline ran for, not counting time waiting on "
+    "other stages.",
+    ["pipeline", "stage"],
+)
+
+
+class Pipeline:
+    """
+    Runs the steps of a command as concurrent stages. Each stage starts as soon as the
+    stages it depends on have finished, and how long it ran is recorded.
+    """
+
+    def __init__(self, name: str) -> None:
+        """
+        :param name: the name of the pipeline, used when logging stage latencies.
+        """
+        self.name: str = name
+        """The name of the pipeline."""
+        self.latencies: Dict[str, float] = dict()
+        """Seconds each finished stage ran for, not counting time waiting on others."""
+
+        self._stages: List["asyncio.Future[Any]"] = list()
+
+    def stage(
+        self,
+        name: str,
+        run: Callable[..., Awaitable[_T]],
+        *after: "asyncio.Future[Any]",
+    ) -> "asyncio.Future[_T]":
+        """
+        Schedule a stage.
+
+        :param name: the name of the stage.
+        :param run: called with the results of ``after`` once they are done.
+        :param after: the stages this stage depends on.
+
+        If a stage this one depends on fails, this stage fails with the same error
+        without being run.
+
+        :returns: the running stage, which can be passed as a dependency of others.
+        """
+
+        async def run_stage() -> _T:
+            results = await asyncio.gather(*after)
+
+            start = time.perf_counter()
+            try:
+                with tracing.span(f"stage {name}"):
+                    return await run(*results)
+            finally:
+                latency = time.perf_counter() - start
+                self.latencies[name] = latency
+                _STAGE_SECONDS.labels(self.name, name).observe(latency)
+
+        task = asyncio.ensure_future(run_stage())
+        self._stages.append(task)
+        return task
+
+    async def wait(self) -> None:
+        """
+        Wait for every stage to finish.
+
+        Stages are allowed to settle even if one fails, so work that is already
+        underway (like confirming a saved price) is not abandoned.
+
+        :raises: the error of the first stage to fail, in the order stages were
+            scheduled. Since dependents fail with the error of their dependency,
+            this is the root cause.
+        """
+        try:
+            results = await asyncio.gather(*self._stages, return_exceptions=True)
+        finally:
+            logging.debug(
+                f"{self.name} stage latencies: "
+                + ", ".join(f"{k}={v * 1000:.1f}ms" for k, v in self.latencies.items())
+            )
+
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
@@ -0,0 +1,103 @@
+import asyncio
+import dataclasses
+import discord
+from typing import Awaitable, Callable, Iterable
+
+from stalkbroker import models
+
+from ._bot import STALKBROKER
+from ._commands_utils import bulletin_role_change
+from ._consts import ROLE_SYNC_CONCURRENCY
+
+
+_RoleChange = Callable[[], Awaitable[None]]
+
+
+@dataclasses.dataclass
+class RoleSyncReport:
+    """Totals from reconciling the roles of a guild."""
+
+    applied: int = 0
+    """Role changes sent to discord."""
+    skipped: int = 0
+    """Members whose roles were already correct, and needed no request."""
+    failed: int = 0
+    """Role changes discord rejected."""
+
+
+class _RoleChangeQueue:
+    """
+    Runs role changes with bounded concurrency.
+
+    discord.py's HTTP client already waits out rate limits for as long as discord asks,
+    and retries the request. So a change that still fails here has been rejected for
+    good, or rate limited more times than the client will retry, and is not tried
+    again.
+    """
+
+    def __init__(self, concurrency: int) -> None:
+        self.concurrency: int = concurrency
+        self._queue: "asyncio.Queue[_RoleChange]" = asyncio.Queue()
+
+    def put(self, change: _RoleChange) -> None:
+        self._queue.put_nowait(change)
+
+    async def _send(self, change: _RoleChange, report: RoleSyncReport) -> None:
+        try:
+            await change()
+        except discord.HTTPException as error:
+            print(f"role change rejected by discord: {error}")
+            report.failed += 1
+        else:
+            report.applied += 1
+
+    async def _worker(self, report: RoleSyncReport) -> None:
+        while True:
+            try:
+                change = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await self._send(change, report)
+
+    async def run(self, report: RoleSyncReport) -> None:
+        """Work through the queue until it is empty."""
+        workers = [self._worker(report) for _ in range(self.concurrency)]
+        await asyncio.gather(*workers)
+
+
+async def reconcile_guild_roles(
+    guild: discord.Guild,
+    users: Iterable[models.User],
+    concurrency: int = ROLE_SYNC_CONCURRENCY,
+) -> RoleSyncReport:
+    """
+    Bring the bulletin role of every member of a guild in line with their settings.
+
+    :param guild: the guild to reconcile.
+    :param users: the stalkbroker users found on the guild.
+    :param concurrency: the number of role changes to have in flight at once.
+
+    Members who already have the right roles are skipped without a request. The
+    remaining changes are sent through a queue that keeps at most ``concurrency`` of
+    them in flight.
+
+    :returns: totals of the changes made and skipped.
+    """
+    report = RoleSyncReport()
+    queue = _RoleChangeQueue(concurrency)
+    index = STALKBROKER.guild_indexes[guild]
+
+    for stalk_user in users:
+        member = index.member(stalk_user.discord_id)
+        # The member may have left since we fetched the member list.
+        if member is None:
+            continue
+
+        change = bulletin_role_change(guild, stalk_user, member)
+        if change is None:
+            report.skipped += 1
+        else:
+            queue.put(change)
+
+    await queue.run(report)
+    return report
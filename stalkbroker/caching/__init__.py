@@ -0,0 +1,5 @@
+from ._ttl import TTLCache
+from ._coalescing import CoalescingCache
+from ._blob_store import BlobStore, content_key
+
+(TTLCache, CoalescingCache, BlobStore, content_key)
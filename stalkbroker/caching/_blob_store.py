@@ -0,0 +1,203 @@
+import asyncio
+import functools
+import hashlib
+import logging
+import os
+import pathlib
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+
+# Once the disk tier is over its budget, files are evicted until it is down to this
+# fraction of it, so the directory isn't scanned again on the very next write.
+_DISK_LOW_WATER = 0.9
+
+
+def content_key(data: bytes) -> str:
+    """Returns the content address of ``data``."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class _MemoryTier:
+    """Least recently used blobs, bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes: int = max_bytes
+        self.size: int = 0
+        self._blobs: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        blob = self._blobs.get(key)
+        if blob is not None:
+            self._blobs.move_to_end(key)
+        return blob
+
+    def put(self, key: str, blob: bytes) -> None:
+        # A blob bigger than the whole tier would just evict everything else.
+        if len(blob) > self.max_bytes or key in self._blobs:
+            return
+
+        self._blobs[key] = blob
+        self.size += len(blob)
+
+        while self.size > self.max_bytes:
+            _, evicted = self._blobs.popitem(last=False)
+            self.size -= len(evicted)
+
+
+class _DiskTier:
+    """
+    Blobs stored as files named by their key, bounded by their total size in bytes.
+    File modification times are bumped on read, so the least recently used files are
+    evicted first.
+
+    All methods block, and are expected to be run in an executor.
+    """
+
+    def __init__(self, directory: pathlib.Path, max_bytes: int) -> None:
+        self.directory: pathlib.Path = directory
+        self.max_bytes: int = max_bytes
+        self.low_water_bytes: int = int(max_bytes * _DISK_LOW_WATER)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.size: int = sum(p.stat().st_size for p in self._files())
+
+    def _files(self) -> List[pathlib.Path]:
+        return [p for p in self.directory.iterdir() if p.is_file()]
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / key
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            blob = path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+        os.utime(path)
+        return blob
+
+    def put(self, key: str, blob: bytes) -> None:
+        path = self._path(key)
+        if len(blob) > self.max_bytes or path.exists():
+            return
+
+        # Write to a temporary file and move it into place so another process never
+        # reads a partial blob.
+        temp_path = path.with_suffix(".tmp")
+        temp_path.write_bytes(blob)
+        temp_path.replace(path)
+        self.size += len(blob)
+
+        if self.size > self.max_bytes:
+            self._evict()
+
+    def _evict(self) -> None:
+        by_age = sorted(self._files(), key=lambda p: p.stat().st_mtime)
+        for path in by_age:
+            if self.size <= self.low_water_bytes:
+                break
+            try:
+                file_size = path.stat().st_size
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            self.size -= file_size
+
+
+class BlobStore:
+    """
+    A content-addressed store for generated binary data, such as rendered charts.
+
+    Blobs are looked up in memory, then on disk if a directory is configured, and
+    only then generated. Concurrent requests for a blob that is being generated share
+    a single load.
+    """
+
+    def __init__(
+        self,
+        max_memory_bytes: int,
+        directory: Optional[pathlib.Path] = None,
+        max_disk_bytes: int = 0,
+    ) -> None:
+        """
+        :param max_memory_bytes: the total size of the blobs to keep in memory.
+        :param directory: the directory of the on-disk tier. ``None`` to keep blobs
+            in memory only.
+        :param max_disk_bytes: the total size of the blobs to keep on disk.
+        """
+        self._memory: _MemoryTier = _MemoryTier(max_memory_bytes)
+        self._disk: Optional[_DiskTier] = None
+        if directory is not None:
+            self._disk = _DiskTier(directory, max_disk_bytes)
+
+        self._in_flight: Dict[str, "asyncio.Future[bytes]"] = dict()
+
+        self.memory_hits: int = 0
+        """The number of blobs served from memory."""
+        self.disk_hits: int = 0
+        """The number of blobs served from disk."""
+        self.misses: int = 0
+        """The number of blobs that had to be generated."""
+        self.disk_errors: int = 0
+        """The number of disk tier reads and writes that failed."""
+
+    async def _run_on_disk(self, method: Callable, *args: object) -> Optional[bytes]:
+        """
+        Run a method of the disk tier in an executor. The disk tier is only a cache, so
+        if the disk fails, the error is logged and ``None`` returned: a read is treated
+        as a miss, and a write is skipped.
+        """
+        loop = asyncio.get_event_loop()
+        try:
+            return await loop.run_in_executor(None, functools.partial(method, *args))
+        except OSError as error:
+            self.disk_errors += 1
+            logging.warning(f"blob store disk tier failed: {error!r}")
+            return None
+
+    async def _load(self, key: str, load: Callable[[], Awaitable[bytes]]) -> bytes:
+        if self._disk is not None:
+            blob = await self._run_on_disk(self._disk.get, key)
+            if blob is not None:
+                self.disk_hits += 1
+                self._memory.put(key, blob)
+                return blob
+
+        self.misses += 1
+        blob = await load()
+        self._memory.put(key, blob)
+
+        if self._disk is not None:
+            await self._run_on_disk(self._disk.put, key, blob)
+
+        return blob
+
+    def _load_done(self, key: str, task: "asyncio.Future[bytes]") -> None:
+        self._in_flight.pop(key, None)
+        # Mark any error as retrieved in case every waiter has gone.
+        if not task.cancelled():
+            task.exception()
+
+    async def get(self, key: str, load: Callable[[], Awaitable[bytes]]) -> bytes:
+        """
+        Fetch a blob, generating it on a miss.
+
+        :param key: the content address of the blob. See :func:`content_key`.
+        :param load: called to generate the blob if it is not stored anywhere.
+
+        :returns: the blob.
+        """
+        blob = self._memory.get(key)
+        if blob is not None:
+            self.memory_hits += 1
+            return blob
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, load))
+            self._in_flight[key] = task
+            task.add_done_callback(functools.partial(self._load_done, key))
+
+        return await asyncio.shield(task)
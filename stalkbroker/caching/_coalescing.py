@@ -0,0 +1,70 @@
+import asyncio
+import functools
+from typing import Awaitable, Callable, Dict, Generic, Optional
+
+from ._ttl import TTLCache, KeyType, ValueType
+
+
+class CoalescingCache(Generic[KeyType, ValueType]):
+    """
+    An async loading cache. Values are loaded on a miss and held in a
+    :class:`TTLCache`. Concurrent misses for the same key share a single load rather
+    than each starting their own.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float]) -> None:
+        """
+        :param maxsize: the maximum number of values to hold.
+        :param ttl: the number of seconds a value is valid for. ``None`` for values
+            that never expire.
+        """
+        self.cache: TTLCache[KeyType, ValueType] = TTLCache(maxsize=maxsize, ttl=ttl)
+        """The cache loaded values are stored in. Exposes hit and miss counts."""
+
+        self.coalesced: int = 0
+        """The number of misses that were served by joining an in-flight load."""
+
+        self._in_flight: Dict[KeyType, "asyncio.Future[ValueType]"] = dict()
+
+    @property
+    def in_flight(self) -> int:
+        """The number of loads currently running."""
+        return len(self._in_flight)
+
+    def _load_done(self, key: KeyType, task: "asyncio.Future[ValueType]") -> None:
+        self._in_flight.pop(key, None)
+
+        # Failed loads are not cached, so the next request will try again. Checking
+        # the exception here also marks it as retrieved if every waiter has gone.
+        if task.cancelled() or task.exception() is not None:
+            return
+
+        self.cache.put(key, task.result())
+
+    async def get(
+        self, key: KeyType, load: Callable[[], Awaitable[ValueType]]
+    ) -> ValueType:
+        """
+        Fetch a value, loading it on a miss.
+
+        :param key: the key of the value.
+        :param load: called to load the value if it is not cached or already loading.
+
+        If ``load`` raises, the error is raised to every caller waiting on it.
+        Cancelling one caller does not cancel a load other callers are waiting on.
+
+        :returns: the cached or loaded value.
+        """
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(load())
+            self._in_flight[key] = task
+            task.add_done_callback(functools.partial(self._load_done, key))
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
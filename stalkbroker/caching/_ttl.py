@@ -0,0 +1,119 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+
+KeyType = TypeVar("KeyType", bound=Hashable)
+ValueType = TypeVar("ValueType")
+
+
+class TTLCache(Generic[KeyType, ValueType]):
+    """
+    A bounded, in-process cache which evicts the least recently used entry when full
+    and expires entries once they are older than ``ttl`` seconds.
+
+    Everything in this bot runs on a single event loop, so no locking is done here.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: Optional[float],
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        :param maxsize: the maximum number of entries to hold.
+        :param ttl: the number of seconds an entry is valid for. ``None`` for entries
+            that never expire.
+        :param clock: monotonic clock used to timestamp entries.
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+
+        self.maxsize: int = maxsize
+        """The maximum number of entries to hold."""
+        self.ttl: Optional[float] = ttl
+        """The number of seconds an entry is valid for."""
+
+        self.hits: int = 0
+        """The number of lookups served from the cache."""
+        self.misses: int = 0
+        """The number of lookups that could not be served from the cache."""
+
+        self._clock: Callable[[], float] = clock
+        # Values are stored alongside the time they expire at.
+        self._entries: "OrderedDict[KeyType, Tuple[ValueType, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: KeyType) -> bool:
+        return self._lookup(key) is not None
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of lookups that were served from the cache."""
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        return self.hits / total
+
+    def _lookup(self, key: KeyType) -> Optional[Tuple[ValueType, float]]:
+        """Returns the live entry for a key, dropping it if it has expired."""
+        try:
+            entry = self._entries[key]
+        except KeyError:
+            return None
+
+        if entry[1] <= self._clock():
+            del self._entries[key]
+            return None
+
+        return entry
+
+    def get(
+        self,
+        key: KeyType,
+        validate: Optional[Callable[[ValueType], bool]] = None,
+    ) -> Optional[ValueType]:
+        """
+        Fetch a value from the cache.
+
+        :param key: the key to look up.
+        :param validate: optional check the cached value must pass to be served. If it
+            fails, the lookup is counted as a miss, and the caller is expected to
+            refresh the entry.
+
+        :returns: the cached value, or ``None`` on a miss.
+        """
+        entry = self._lookup(key)
+        if entry is None or (validate is not None and not validate(entry[0])):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: KeyType, value: ValueType) -> None:
+        """
+        Store a value, evicting the least recently used entry if the cache is full.
+        """
+        if self.ttl is None:
+            expires = float("inf")
+        else:
+            expires = self._clock() + self.ttl
+
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: KeyType) -> None:
+        """Drop a single entry from the cache if it exists."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry from the cache. Hit and miss counts are kept."""
+        self._entries.clear()
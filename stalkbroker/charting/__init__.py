@@ -0,0 +1,4 @@
+from ._render import render_forecast_chart
+from ._engines import ChartEngine, LocalChartRenderer, FallbackChartRenderer
+
+(render_forecast_chart, ChartEngine, LocalChartRenderer, FallbackChartRenderer)
@@ -0,0 +1,83 @@
+import asyncio
+import concurrent.futures
+import logging
+from typing import Awaitable, Callable, Optional, Protocol
+
+from protogen.stalk_proto import models_pb2 as backend
+from stalkbroker import errors
+
+from ._render import render_forecast_chart
+
+
+class ChartEngine(Protocol):
+    """
+    Anything that can render charts. Matches the reporting service's client stub, so
+    the stub, :class:`LocalChartRenderer` and :class:`FallbackChartRenderer` can be
+    used interchangeably.
+    """
+
+    @property
+    def ForecastChart(
+        self,
+    ) -> Callable[[backend.ReqForecastChart], Awaitable[backend.RespChart]]:
+        """Renders the chart for a forecast."""
+
+
+class LocalChartRenderer:
+    """
+    Renders charts in-process with :func:`render_forecast_chart`. Rendering is CPU
+    bound, so it is done in a pool of worker processes to keep the event loop free.
+    """
+
+    def __init__(self, executor: concurrent.futures.Executor) -> None:
+        """
+        :param executor: the pool charts are rendered in.
+        """
+        self.executor: concurrent.futures.Executor = executor
+
+    async def ForecastChart(
+        self, request: backend.ReqForecastChart
+    ) -> backend.RespChart:
+        loop = asyncio.get_event_loop()
+        response = await loop.run_in_executor(
+            self.executor, render_forecast_chart, request.SerializeToString()
+        )
+        return backend.RespChart.FromString(response)
+
+
+class FallbackChartRenderer:
+    """
+    Renders with a primary engine, switching to a fallback for any request the
+    primary can't answer in time or can't be reached for.
+    """
+
+    def __init__(
+        self, primary: ChartEngine, fallback: ChartEngine, timeout: Optional[float],
+    ) -> None:
+        """
+        :param primary: the engine to try first.
+        :param fallback: the engine to use when the primary is down.
+        :param timeout: seconds to wait on the primary before giving up on it.
+            ``None`` to wait as long as the primary takes.
+        """
+        self.primary: ChartEngine = primary
+        self.fallback: ChartEngine = fallback
+        self.timeout: Optional[float] = timeout
+
+        self.fallbacks: int = 0
+        """The number of requests answered by the fallback engine."""
+
+    async def ForecastChart(
+        self, request: backend.ReqForecastChart
+    ) -> backend.RespChart:
+        try:
+            return await asyncio.wait_for(
+                self.primary.ForecastChart(request), self.timeout
+            )
+        except Exception as error:
+            if not errors.is_backend_unreachable(error):
+                raise
+            logging.warning(f"rendering chart with fallback engine: {error!r}")
+
+        self.fallbacks += 1
+        return await self.fallback.ForecastChart(request)
@@ -0,0 +1,155 @@
+import io
+from typing import Any, Dict, List, Tuple
+
+from protogen.stalk_proto import models_pb2 as backend
+
+
+# Colors of the price range drawn for each pattern.
+_PATTERN_COLORS: Dict[int, str] = {
+    backend.FLUCTUATING: "#7289DA",
+    backend.BIGSPIKE: "#43B581",
+    backend.DECREASING: "#F04747",
+    backend.SMALLSPIKE: "#FAA61A",
+}
+
+_PATTERN_NAMES: Dict[int, str] = {
+    backend.FLUCTUATING: "fluctuating",
+    backend.BIGSPIKE: "big spike",
+    backend.DECREASING: "decreasing",
+    backend.SMALLSPIKE: "small spike",
+}
+
+_DEFAULT_BACKGROUND = "#FFFFFF"
+_TEXT_COLOR = "#DCDDDE"
+_PRICE_COLOR = "#FFFFFF"
+
+_PERIOD_LABELS: List[str] = [
+    f"{day}\n{time_of_day}"
+    for day in ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat")
+    for time_of_day in ("AM", "PM")
+]
+
+_IMAGE_FORMATS: Dict[int, str] = {
+    backend.ImageFormat.PNG: "png",
+    backend.ImageFormat.SVG: "svg",
+}
+
+# Size of the chart in inches, and the resolution of rasterized formats.
+_FIGURE_SIZE = (8.0, 4.5)
+_DPI = 100
+
+
+def _pyplot() -> Any:
+    # matplotlib is an optional dependency, only needed when charts are rendered
+    # locally. It is imported here rather than at the top of the module so the bot
+    # can run without it. The Agg backend renders without a display.
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot
+
+    return matplotlib.pyplot
+
+
+def _pattern_ranges(
+    pattern: backend.PotentialPattern,
+) -> Tuple[List[int], List[int]]:
+    """The lowest and highest price of each period, over the weeks of a pattern."""
+    lows = [min(w.prices[i].min for w in pattern.potential_weeks) for i in range(12)]
+    highs = [max(w.prices[i].max for w in pattern.potential_weeks) for i in range(12)]
+    return lows, highs
+
+
+def render_forecast_chart(request_bytes: bytes) -> bytes:
+    """
+    Render a forecast chart. Implements the contract of the reporting service's
+    ``ForecastChart``.
+
+    Takes and returns serialized messages so it can be run in a process pool without
+    pickling protobuf objects.
+
+    :param request_bytes: a serialized ``ReqForecastChart``.
+
+    :returns: a serialized ``RespChart``.
+    """
+    request = backend.ReqForecastChart.FromString(request_bytes)
+    ticker = request.ticker
+    forecast = request.forecast
+
+    background = request.color_background or _DEFAULT_BACKGROUND
+
+    pyplot = _pyplot()
+    figure, axes = pyplot.subplots(figsize=_FIGURE_SIZE, dpi=_DPI)
+    try:
+        figure.patch.set_facecolor(background)
+        axes.set_facecolor(background)
+
+        periods = list(range(12))
+
+        # A band for every pattern the week could still be, more opaque the more
+        # likely the pattern is.
+        for pattern in forecast.patterns:
+            if len(pattern.potential_weeks) == 0:
+                continue
+            lows, highs = _pattern_ranges(pattern)
+            axes.fill_between(
+                periods,
+                lows,
+                highs,
+                color=_PATTERN_COLORS[pattern.pattern],
+                alpha=0.15 + 0.5 * pattern.chance,
+                linewidth=0,
+                label=(
+                    f"{_PATTERN_NAMES[pattern.pattern]} "
+                    f"{round(pattern.chance * 100)}%"
+                ),
+            )
+
+        known = [(i, price) for i, price in enumerate(ticker.prices) if price > 0]
+        if known:
+            axes.plot(
+                [i for i, _ in known],
+                [price for _, price in known],
+                color=_PRICE_COLOR,
+                marker="o",
+                linewidth=2,
+            )
+
+        if ticker.purchase_price > 0:
+            axes.axhline(
+                ticker.purchase_price,
+                color=_TEXT_COLOR,
+                linestyle="--",
+                linewidth=1,
+            )
+
+        # The current period is -1 on sundays, before the first price period.
+        if 0 <= ticker.current_period < 12:
+            axes.axvline(
+                ticker.current_period, color=_TEXT_COLOR, linestyle=":", linewidth=1,
+            )
+
+        axes.set_xticks(periods)
+        axes.set_xticklabels(_PERIOD_LABELS)
+        axes.set_xlim(0, 11)
+        axes.tick_params(colors=_TEXT_COLOR)
+        for spine in axes.spines.values():
+            spine.set_color(_TEXT_COLOR)
+        axes.grid(axis="y", color=_TEXT_COLOR, alpha=0.15)
+
+        legend = axes.legend(loc="upper left", frameon=False, fontsize="small")
+        for text in legend.get_texts():
+            text.set_color(_TEXT_COLOR)
+
+        buffer = io.BytesIO()
+        figure.savefig(
+            buffer,
+            format=_IMAGE_FORMATS.get(request.format, "png"),
+            facecolor=background,
+            bbox_inches="tight",
+            pad_inches=request.padding * _FIGURE_SIZE[0],
+        )
+    finally:
+        pyplot.close(figure)
+
+    return backend.RespChart(chart=buffer.getvalue()).SerializeToString()
@@ -9,6 +9,8 @@ from .functions import (
     validate_price_period,
     SUNDAY,
 )
+from .timezones import TIMEZONES, TimezoneRegistry
+from .weeks import bucket_weeks, SUNDAY_PHASE
 
 (
     parse_timezone_arg,
@@ -20,4 +22,8 @@ from .functions import (
     is_price_period,
     validate_price_period,
     SUNDAY,
+    TIMEZONES,
+    TimezoneRegistry,
+    bucket_weeks,
+    SUNDAY_PHASE,
 )
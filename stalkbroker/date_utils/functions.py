@@ -4,11 +4,17 @@ import discord.ext.commands
 from typing import Optional, Tuple
 
 from stalkbroker import models, errors
+from .timezones import TIMEZONES
 
 
 ONE_DAY: datetime.timedelta = datetime.timedelta(days=1)
 SUNDAY = 6
 
+# How long it has been since the last sunday, by weekday.
+_SINCE_SUNDAY: Tuple[datetime.timedelta, ...] = tuple(
+    datetime.timedelta(days=(weekday - SUNDAY) % 7) for weekday in range(7)
+)
+
 
 def validate_price_period(
     date: datetime.date, time_of_day: Optional[models.TimeOfDay]
@@ -40,16 +46,13 @@ def serialize_date(date: datetime.date) -> datetime.datetime:
 
 
 def parse_timezone_arg(value: str) -> pytz.BaseTzInfo:
-    """Parse a timezone argument supplied by a user."""
-    value = value.lower()
-    if value == "pst":
-        return pytz.timezone("US/Pacific")
-    elif value == "est":
-        return pytz.timezone("US/Eastern")
-    elif value == "cst":
-        return pytz.timezone("US/Central")
+    """
+    Parse a timezone argument supplied by a user. Accepts zone names in any case, and
+    the abbreviations in :data:`timezones.ABBREVIATIONS`.
 
-    return pytz.timezone(value)
+    :raises pytz.exceptions.UnknownTimeZoneError: if the zone is not recognized.
+    """
+    return TIMEZONES.parse(value)
 
 
 def _parse_date_arg_core(
@@ -185,15 +188,7 @@ def previous_sunday(anchor_date: datetime.date) -> datetime.date:
     if isinstance(anchor_date, datetime.datetime):
         anchor_date = anchor_date.date()
 
-    candidate_date = anchor_date
-
-    while True:
-        if candidate_date.weekday() == SUNDAY:
-            break
-
-        candidate_date = candidate_date - ONE_DAY
-
-    return candidate_date
+    return anchor_date - _SINCE_SUNDAY[anchor_date.weekday()]
 
 
 def deduce_price_date(
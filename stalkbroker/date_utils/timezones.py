@@ -0,0 +1,113 @@
+import logging
+import pytz
+import pytz.exceptions
+from typing import Dict, Iterable, Optional
+
+
+# Abbreviations users give for the zones they mean. Each maps to a zone that follows
+# daylight saving, so "est" still gives the right time in summer. Names pytz already
+# has a fixed zone for, like "gmt" and "mst", are left to pytz, except the "est" the
+# bot has always read as US/Eastern.
+ABBREVIATIONS: Dict[str, str] = {
+    "akst": "US/Alaska",
+    "akdt": "US/Alaska",
+    "pst": "US/Pacific",
+    "pdt": "US/Pacific",
+    "pt": "US/Pacific",
+    "mdt": "US/Mountain",
+    "mt": "US/Mountain",
+    "cst": "US/Central",
+    "cdt": "US/Central",
+    "ct": "US/Central",
+    "est": "US/Eastern",
+    "edt": "US/Eastern",
+    "et": "US/Eastern",
+    "ast": "America/Halifax",
+    "adt": "America/Halifax",
+    "nst": "America/St_Johns",
+    "ndt": "America/St_Johns",
+    "bst": "Europe/London",
+    "west": "Europe/Lisbon",
+    "cest": "Europe/Paris",
+    "eest": "Europe/Athens",
+    "msk": "Europe/Moscow",
+    "ist": "Asia/Kolkata",
+    "jst": "Asia/Tokyo",
+    "kst": "Asia/Seoul",
+    "hkt": "Asia/Hong_Kong",
+    "sgt": "Asia/Singapore",
+    "awst": "Australia/Perth",
+    "acst": "Australia/Adelaide",
+    "acdt": "Australia/Adelaide",
+    "aest": "Australia/Sydney",
+    "aedt": "Australia/Sydney",
+    "nzst": "Pacific/Auckland",
+    "nzdt": "Pacific/Auckland",
+}
+
+# Every name a user can give for a zone, lower-cased, mapped to the zone's name.
+_ZONE_NAMES: Dict[str, str] = {name.lower(): name for name in pytz.all_timezones}
+_ZONE_NAMES.update(ABBREVIATIONS)
+
+
+class TimezoneRegistry:
+    """
+    Interns timezones by name, so each zone is loaded from pytz's zoneinfo files once
+    and every later lookup is a dict hit.
+    """
+
+    def __init__(self) -> None:
+        self._zones: Dict[str, pytz.BaseTzInfo] = dict()
+        self.misses: int = 0
+        """The number of lookups that had to go to pytz."""
+
+    def get(self, name: str) -> pytz.BaseTzInfo:
+        """
+        Get a timezone by its exact name, as stored on user documents.
+
+        :raises pytz.exceptions.UnknownTimeZoneError: if there is no such zone.
+        """
+        try:
+            return self._zones[name]
+        except KeyError:
+            pass
+
+        self.misses += 1
+        zone = pytz.timezone(name)
+        self._zones[name] = zone
+        return zone
+
+    def parse(self, value: str) -> pytz.BaseTzInfo:
+        """
+        Get a timezone from a name or abbreviation a user gave, in any case.
+
+        :raises pytz.exceptions.UnknownTimeZoneError: if there is no such zone.
+        """
+        try:
+            name = _ZONE_NAMES[value.lower()]
+        except KeyError:
+            raise pytz.exceptions.UnknownTimeZoneError(value)
+        return self.get(name)
+
+    def preload(self, names: Iterable[Optional[str]]) -> int:
+        """
+        Load zones ahead of the lookups that will need them. Names that are ``None`` or
+        unknown are skipped.
+
+        :returns: the number of zones loaded.
+        """
+        loaded = 0
+        for name in names:
+            if name is None or name in self._zones:
+                continue
+            try:
+                self.get(name)
+            except pytz.exceptions.UnknownTimeZoneError:
+                logging.warning(f"not preloading unknown timezone {name!r}")
+                continue
+            loaded += 1
+        return loaded
+
+
+TIMEZONES = TimezoneRegistry()
+"""The registry timezones are looked up in."""
@@ -0,0 +1,47 @@
+import numpy as np
+from typing import Optional, Tuple
+
+from .functions import SUNDAY
+
+
+# The unix epoch, 1970-01-01, was a thursday: 4 days after the sunday starting its
+# week, and weekday 3 counting from monday.
+_EPOCH_DAYS_SINCE_SUNDAY = 4
+_EPOCH_WEEKDAY = 3
+
+SUNDAY_PHASE = -1
+"""The phase index :func:`bucket_weeks` gives sunday prices."""
+
+
+def bucket_weeks(
+    price_times: np.ndarray, times_of_day: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the week and phase of many prices at once. The batch version of
+    :func:`previous_sunday` and :meth:`models.Ticker.phase_from_datetime`, for bulk
+    imports and analytics.
+
+    :param price_times: the local times, or dates, of the prices, as a ``datetime64``
+        array of any unit.
+    :param times_of_day: the :class:`models.TimeOfDay` value of each price. If not
+        given, prices before noon are AM, which needs ``price_times`` to hold times
+        rather than dates.
+
+    :returns: the sunday starting the week of each price, as a ``datetime64[D]``
+        array, and the phase index of each price, with :data:`SUNDAY_PHASE` for
+        sunday prices.
+    """
+    price_days = price_times.astype("datetime64[D]")
+    days = price_days.astype(np.int64)
+
+    weeks_of = price_days - (days + _EPOCH_DAYS_SINCE_SUNDAY) % 7
+
+    if times_of_day is None:
+        noon = np.timedelta64(12, "h")
+        times_of_day = (price_times - price_days >= noon).astype(np.int64)
+
+    weekdays = (days + _EPOCH_WEEKDAY) % 7
+    phases = weekdays * 2 + times_of_day
+    phases[weekdays == SUNDAY] = SUNDAY_PHASE
+
+    return weeks_of, phases.astype(np.int8)
@@ -1,3 +1,3 @@
-from ._connection import DBConnection
+from ._connection import DBConnection, SERVER_POLL_INTERVAL, BULK_CHUNK_SIZE
 
-(DBConnection,)
+(DBConnection, SERVER_POLL_INTERVAL, BULK_CHUNK_SIZE)
@@ -1,5 +1,7 @@
 import os
 import uuid
+import asyncio
+import dataclasses
 import marshmallow
 import pytz.tzinfo
 import motor.motor_asyncio
@@ -7,10 +9,20 @@ import motor.core
 import pymongo.errors
 import datetime
 import discord
-from typing import Optional, Dict, Any, DefaultDict, Mapping
+from typing import (
+    Optional,
+    Dict,
+    Any,
+    DefaultDict,
+    Mapping,
+    Callable,
+    Iterable,
+    List,
+    Union,
+)
 from collections import defaultdict
 
-from stalkbroker import models, schemas, date_utils
+from stalkbroker import models, schemas, date_utils, caching, metrics, tracing
 
 
 # The schema used to serialize and deserialize the Server model.
@@ -23,12 +35,57 @@ SCHEMA_USER_FULL = schemas.User(use_defaults=True, unknown=marshmallow.EXCLUDE)
 SCHEMA_TICKER_FULL = schemas.Ticker(
     # If only the sunday price has been set, there maybe know 'phases' field
     partial=("phases",),
-    use_defaults=True,
     unknown=marshmallow.EXCLUDE,
 )
 
+# Compiled codecs that load documents without marshmallow. Each falls back to its
+# schema above when documents are validated.
+CODEC_SERVER = schemas.Codec(models.Server, SCHEMA_SERVER_FULL)
+CODEC_USER = schemas.Codec(models.User, SCHEMA_USER_FULL)
+CODEC_TICKER = schemas.Codec(models.Ticker, SCHEMA_TICKER_FULL)
+
 ONE_WEEK = datetime.timedelta(days=7)
 
+# Default bounds of the in-process user cache. Entries expire so that changes made by
+# other bot processes are eventually picked up.
+USER_CACHE_SIZE = 10_000
+USER_CACHE_TTL = 300.0
+
+# Servers are few and only change through our own setters, so they are cached until
+# replaced rather than expired. The size bound only protects against runaway growth.
+SERVER_CACHE_SIZE = 10_000
+
+# How often to re-read the servers collection when change streams are not supported by
+# the mongo deployment (for instance, a standalone mongod).
+SERVER_POLL_INTERVAL = 30.0
+
+# Change stream operations that remove server documents without telling us which
+# discord id they belonged to.
+_CHANGES_REMOVED = ("delete", "drop", "dropDatabase", "invalidate")
+
+# Mongo's error code, and the message of older versions, for opening a change stream
+# on a deployment that is not a replica set.
+_CHANGE_STREAMS_UNSUPPORTED_ERROR = 40573
+_CHANGE_STREAMS_UNSUPPORTED_MESSAGE = "only supported on replica sets"
+
+# The number of member upserts to send per bulk_write when registering a whole guild.
+BULK_CHUNK_SIZE = 1000
+
+# Mongo's error code for a unique index violation.
+_DUPLICATE_KEY_ERROR = 11000
+
+# Latency and failures of each database operation, by DBConnection method.
+_OPERATION_SECONDS = metrics.REGISTRY.histogram(
+    "stalkbroker_db_operation_seconds",
+    "Latency of database operations.",
+    ["operation"],
+)
+_OPERATION_ERRORS = metrics.REGISTRY.counter(
+    "stalkbroker_db_operation_errors_total",
+    "Database operations that raised an error.",
+    ["operation"],
+)
+
 # Types Aliases for mypy
 _QueryType = Dict[str, Any]
 _UpdateType = DefaultDict[str, DefaultDict[str, Any]]
@@ -54,6 +111,43 @@ def _query_ticker(user: models.User, week_of: datetime.date) -> _QueryType:
     return {"user_id": user.id, "week_of": mongo_week}
 
 
+def _ticker_on_insert(user: models.User, week_of: datetime.date) -> Dict[str, Any]:
+    mongo_week = date_utils.serialize_date(week_of)
+    return {"user_id": user.id, "week_of": mongo_week}
+
+
+def _copy_user(user: models.User) -> models.User:
+    """
+    Copy a cached user, so callers that change it don't change the cached record.
+    """
+    return dataclasses.replace(user, servers=list(user.servers))
+
+
+def _change_streams_unsupported(error: pymongo.errors.OperationFailure) -> bool:
+    """Whether ``error`` means the deployment does not support change streams."""
+    return (
+        error.code == _CHANGE_STREAMS_UNSUPPORTED_ERROR
+        or _CHANGE_STREAMS_UNSUPPORTED_MESSAGE in str(error)
+    )
+
+
+def _ticker_set_price(
+    price_date: datetime.date,
+    price_time_of_day: Optional[models.TimeOfDay],
+    price: int,
+) -> Dict[str, Any]:
+    """Returns the ``$set`` fields that store a price in a ticker."""
+    set_price: Dict[str, Any] = dict()
+    if price_date.weekday() != date_utils.SUNDAY:
+        date_utils.validate_price_period(date=price_date, time_of_day=price_time_of_day)
+        phase_index = models.Ticker.phase_from_date(price_date, price_time_of_day)
+        set_price[f"phases.{phase_index}"] = price
+    else:
+        set_price["purchase_price"] = price
+
+    return set_price
+
+
 class _Collections:
     """
     Houses the motor collection objects for asynchronously accessing data in mongodb.
@@ -91,16 +185,45 @@ class _Collections:
         )
 
 
+# watch_servers runs for the life of the bot, so timing it would tell us nothing.
+@tracing.trace_methods("db", exclude=("watch_servers",))
+@metrics.time_methods(
+    _OPERATION_SECONDS, errors=_OPERATION_ERRORS, exclude=("watch_servers",)
+)
 class DBConnection:
     """Adapter used to fetch and store data with our mongodb database."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        user_cache_size: int = USER_CACHE_SIZE,
+        user_cache_ttl: Optional[float] = USER_CACHE_TTL,
+    ) -> None:
+        """
+        :param user_cache_size: the maximum number of users to keep in memory.
+        :param user_cache_ttl: the number of seconds a cached user is considered fresh.
+        """
         self.client: Optional[motor.core.AgnosticClient] = None
         """Client object"""
         self.db: Optional[motor.core.AgnosticDatabase] = None
         """Database object"""
         self.collections: Optional[_Collections] = None
         """Collections object"""
+        self.user_cache: caching.TTLCache[int, models.User] = caching.TTLCache(
+            maxsize=user_cache_size, ttl=user_cache_ttl,
+        )
+        """Read-through cache of user models, keyed by discord id."""
+        self.server_cache: caching.TTLCache[int, models.Server] = caching.TTLCache(
+            maxsize=SERVER_CACHE_SIZE, ttl=None,
+        )
+        """Cache of server models, keyed by discord id."""
+        self.bulk_chunk_size: int = BULK_CHUNK_SIZE
+        """The number of users to upsert per request in :meth:`add_users_bulk`."""
+        self.validate_documents: bool = False
+        """
+        Whether to validate documents with the marshmallow schemas when loading them,
+        rather than trusting them to the compiled codecs. Set by the
+        ``DB_VALIDATE_DOCUMENTS`` environment variable.
+        """
 
     async def connect(self) -> None:
         """Connect to the database. Generates indexes if this is the first time."""
@@ -132,9 +255,14 @@ class DBConnection:
             query, update, upsert=True, return_document=pymongo.ReturnDocument.AFTER,
         )
 
-        server = SCHEMA_SERVER_FULL.load(server_data)
-        assert isinstance(server, models.Server)
+        server = self._cache_server_document(server_data)
+        return server
+
+    def _cache_server_document(self, server_data: Mapping[str, Any]) -> models.Server:
+        """Load a raw server document and store the result in the server cache."""
+        server = CODEC_SERVER.load(server_data, self.validate_documents)
 
+        self.server_cache.put(server.discord_id, server)
         return server
 
     async def add_server(self, server: discord.Guild) -> models.Server:
@@ -145,8 +273,7 @@ class DBConnection:
 
         :returns: the updated / created server data.
         """
-        query = _query_discord_id(server.id)
-        return await self._upsert_server(query, None)
+        return await self.fetch_server(server)
 
     async def fetch_server(self, server: discord.Guild) -> models.Server:
         """
@@ -156,11 +283,94 @@ class DBConnection:
 
         If a record does not already exist for the server, it will be created.
 
+        Servers are served from :attr:`server_cache` when possible. The cache is filled
+        when the bot adds its servers at startup and refreshed by every setter, so
+        bulletin fan-out does not need to touch the database.
+
         :returns: the server data.
         """
+        cached = self.server_cache.get(server.id)
+        if cached is not None:
+            return cached
+
         query = _query_discord_id(server.id)
         return await self._upsert_server(query, None)
 
+    async def _refresh_server_cache(self) -> None:
+        """
+        Rebuild the server cache from every server record, so servers deleted by
+        other bot processes are dropped from it.
+        """
+        assert self.collections is not None
+
+        servers = [
+            CODEC_SERVER.load(server_data, self.validate_documents)
+            async for server_data in self.collections.servers.find({})
+        ]
+
+        self.server_cache.clear()
+        for server in servers:
+            self.server_cache.put(server.discord_id, server)
+
+    async def _poll_servers(self, interval: float) -> None:
+        """Keep the server cache coherent by re-reading it every ``interval``."""
+        while True:
+            await self._refresh_server_cache()
+            await asyncio.sleep(interval)
+
+    async def watch_servers(self, poll_interval: float = SERVER_POLL_INTERVAL) -> None:
+        """
+        Keep :attr:`server_cache` coherent with changes made by other bot processes.
+
+        :param poll_interval: seconds between re-reads of the servers collection if
+            change streams are not available.
+
+        Subscribes to a change stream on the servers collection. Change streams
+        require a replica set, so if the deployment does not support them this falls
+        back to polling. Runs until cancelled.
+        """
+        assert self.collections is not None
+
+        resume_token: Optional[Mapping[str, Any]] = None
+
+        while True:
+            try:
+                async with self.collections.servers.watch(
+                    full_document="updateLookup", resume_after=resume_token,
+                ) as stream:
+                    # Anything that changed before the stream opened would be missed,
+                    # so we re-sync the cache once the stream is live.
+                    await self._refresh_server_cache()
+
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        document = change.get("fullDocument")
+                        if document is not None:
+                            self._cache_server_document(document)
+                        elif change["operationType"] in _CHANGES_REMOVED:
+                            # We can't map a bare document key back to a discord id,
+                            # so drop everything and let the cache refill on demand.
+                            self.server_cache.clear()
+
+                        # An invalidated stream cannot be resumed, so the next one
+                        # needs to start fresh.
+                        if change["operationType"] == "invalidate":
+                            resume_token = None
+            except pymongo.errors.OperationFailure as error:
+                if _change_streams_unsupported(error):
+                    break
+                # The stream failed for some other reason, like the point we would
+                # resume from having aged out of the oplog. Start a fresh stream, which
+                # re-syncs the cache when it opens.
+                resume_token = None
+                await asyncio.sleep(1)
+            except pymongo.errors.PyMongoError:
+                # The stream was interrupted. Wait a moment before re-opening it from
+                # where we left off.
+                await asyncio.sleep(1)
+
+        await self._poll_servers(poll_interval)
+
     async def server_set_bulletin_channel(
         self, server: discord.Guild, channel: discord.TextChannel,
     ) -> models.Server:
@@ -209,6 +419,30 @@ class DBConnection:
         update["$set"]["heat_minimum"] = heat_threshold
         return await self._upsert_server(query, update)
 
+    async def server_set_sync_watermark(
+        self,
+        server: discord.Guild,
+        member_count: int,
+        member_hash: str,
+        sync_time: datetime.datetime,
+    ) -> models.Server:
+        """
+        Record the membership of a server at the time its members were last synced.
+
+        :param server: the server that was synced.
+        :param member_count: the number of members on the server.
+        :param member_hash: a hash of the server's member ids.
+        :param sync_time: the utc time of the sync.
+
+        :returns: the updated server data.
+        """
+        query = _query_discord_id(server.id)
+        update = _new_update()
+        update["$set"]["sync_member_count"] = member_count
+        update["$set"]["sync_member_hash"] = member_hash
+        update["$set"]["sync_time"] = sync_time
+        return await self._upsert_server(query, update)
+
     @staticmethod
     def _add_server_to_user_update(
         update: _UpdateType, server: Optional[discord.Guild]
@@ -242,6 +476,44 @@ class DBConnection:
             query, update, upsert=True, return_document=pymongo.ReturnDocument.AFTER,
         )
 
+    @staticmethod
+    def _user_has_server(
+        server: Optional[discord.Guild],
+    ) -> Callable[[models.User], bool]:
+        """
+        Returns a check for whether a cached user record already knows about
+        ``server``. If it does not, the record needs to be written to.
+        """
+
+        def validate(user: models.User) -> bool:
+            return server is None or server.id in user.servers
+
+        return validate
+
+    async def _load_user(
+        self, discord_user: discord.User, server: Optional[discord.Guild]
+    ) -> models.User:
+        """
+        Serve a user from the cache, only going to the database if the user is unknown
+        or we need to add ``server`` to their record.
+        """
+        cached = self.user_cache.get(
+            discord_user.id, validate=self._user_has_server(server)
+        )
+        if cached is not None:
+            return _copy_user(cached)
+
+        query = _query_discord_id(discord_user.id)
+
+        update = _new_update()
+        self._add_server_to_user_update(update, server)
+
+        user_document = await self._upsert_user(query, update)
+        user = CODEC_USER.load(user_document, self.validate_documents)
+
+        self.user_cache.put(user.discord_id, user)
+        return _copy_user(user)
+
     async def add_user(
         self, discord_user: discord.User, server: Optional[discord.Guild]
     ) -> models.User:
@@ -257,17 +529,7 @@ class DBConnection:
 
         :returns: User data.
         """
-        query = _query_discord_id(discord_user.id)
-
-        update = _new_update()
-        self._add_server_to_user_update(update, server)
-
-        user_document = await self._upsert_user(query, update)
-        user = SCHEMA_USER_FULL.load(user_document)
-
-        assert isinstance(user, models.User)
-
-        return user
+        return await self._load_user(discord_user, server)
 
     async def fetch_user(
         self, discord_user: discord.User, server: Optional[discord.Guild]
@@ -281,17 +543,120 @@ class DBConnection:
         If the user is not known to stalkbroker, a record will be created for them and
         returned.
 
+        Users are served from :attr:`user_cache` when possible, so the database is
+        only written to when the user is new or ``server`` is new to them. Each call
+        gets its own copy of the cached record.
+
         :returns: User data.
         """
+        return await self._load_user(discord_user, server)
+
+    async def fetch_user_timezones(self) -> List[str]:
+        """
+        Fetch the name of every timezone users have set.
+
+        :returns: the distinct timezone names on user documents.
+        """
         assert self.collections is not None
 
-        query = _query_discord_id(discord_user.id)
+        zones = await self.collections.users.distinct("timezone")
+        return [zone for zone in zones if zone is not None]
 
-        update = _new_update()
-        self._add_server_to_user_update(update, server)
-        user_data = await self._upsert_user(query, update)
+    @staticmethod
+    def _user_bulk_upsert(
+        discord_id: int, server: discord.Guild, upsert: bool = True
+    ) -> pymongo.UpdateOne:
+        """
+        Build the bulk operation that registers a user with a server.
+
+        :param upsert: whether to create the user's record if it does not exist.
+        """
+        update: Dict[str, Any] = {"$addToSet": {"servers": server.id}}
+        if upsert:
+            update["$setOnInsert"] = {"id": uuid.uuid4(), "discord_id": discord_id}
+
+        return pymongo.UpdateOne(_query_discord_id(discord_id), update, upsert=upsert)
+
+    async def _bulk_upsert_users(
+        self, discord_ids: List[int], server: discord.Guild
+    ) -> None:
+        """
+        Send a chunk of user upserts as a single unordered bulk write.
+
+        Upserts racing with another writer for the same discord id can fail on the
+        unique index. By then the record exists, so those users are retried once with
+        plain updates.
+        """
+        assert self.collections is not None
+
+        operations = [self._user_bulk_upsert(i, server) for i in discord_ids]
+        try:
+            await self.collections.users.bulk_write(operations, ordered=False)
+        except pymongo.errors.BulkWriteError as error:
+            write_errors = error.details.get("writeErrors", [])
+            if any(e["code"] != _DUPLICATE_KEY_ERROR for e in write_errors):
+                raise
+
+            retries = [
+                self._user_bulk_upsert(discord_ids[e["index"]], server, upsert=False)
+                for e in write_errors
+            ]
+            await self.collections.users.bulk_write(retries, ordered=False)
+
+    async def add_users_bulk(
+        self,
+        discord_users: Iterable[Union[discord.User, discord.Member]],
+        server: discord.Guild,
+        chunk_size: Optional[int] = None,
+    ) -> List[models.User]:
+        """
+        Add many users found on the same server to the database.
+
+        :param discord_users: the discord users we want to add.
+        :param server: the server these users were found on.
+        :param chunk_size: the number of upserts to send per bulk write. Defaults to
+            :attr:`bulk_chunk_size`.
+
+        Like :meth:`add_user`, this is safe to call for users that already exist.
+        Users who are cached with ``server`` already on their record are skipped. The
+        rest are upserted in chunked, unordered bulk writes, sent one chunk at a time
+        so a large guild does not flood the connection pool, then read back with a
+        single query.
+
+        :returns: User data for every user passed in, in the order they were passed.
+        """
+        assert self.collections is not None
 
-        return SCHEMA_USER_FULL.load(user_data)
+        if chunk_size is None:
+            chunk_size = self.bulk_chunk_size
+
+        validate = self._user_has_server(server)
+
+        discord_ids = [discord_user.id for discord_user in discord_users]
+        users: Dict[int, models.User] = dict()
+        pending_ids: List[int] = list()
+
+        for discord_id in discord_ids:
+            cached = self.user_cache.get(discord_id, validate=validate)
+            if cached is not None:
+                users[discord_id] = _copy_user(cached)
+            else:
+                pending_ids.append(discord_id)
+
+        if pending_ids:
+            for chunk_start in range(0, len(pending_ids), chunk_size):
+                chunk_end = chunk_start + chunk_size
+                chunk = pending_ids[chunk_start:chunk_end]
+                await self._bulk_upsert_users(chunk, server)
+
+            query = {"discord_id": {"$in": pending_ids}}
+            async for user_document in self.collections.users.find(query):
+                user = CODEC_USER.load(user_document, self.validate_documents)
+
+                self.user_cache.put(user.discord_id, user)
+                users[user.discord_id] = _copy_user(user)
+
+        return [users[i] for i in discord_ids if i in users]
 
     async def update_user_timezone(
         self,
@@ -319,6 +684,8 @@ class DBConnection:
         if updated is None:
             await self._upsert_user(query, update)
 
+        self.user_cache.invalidate(discord_user.id)
+
     async def update_user_notify_on_bulletin(
         self, discord_user: discord.User, server: Optional[discord.Guild], notify: bool,
     ) -> models.User:
@@ -344,8 +711,9 @@ class DBConnection:
         if updated is None:
             updated = await self._upsert_user(query, update)
 
-        stalk_user = SCHEMA_USER_FULL.load(updated)
-        assert isinstance(stalk_user, models.User)
+        self.user_cache.invalidate(discord_user.id)
+
+        stalk_user = CODEC_USER.load(updated, self.validate_documents)
 
         return stalk_user
 
@@ -368,31 +736,76 @@ class DBConnection:
         """
         assert self.collections is not None
 
-        mongo_date = date_utils.serialize_date(week_of)
-
         query = _query_ticker(user, week_of)
         update: Dict[str, Any] = {
-            "$setOnInsert": {"user_id": user.id, "week_of": mongo_date},
+            "$setOnInsert": _ticker_on_insert(user, week_of),
+            "$set": _ticker_set_price(price_date, price_time_of_day, price),
+            "$inc": {"version": 1},
         }
 
-        set_price: Dict[str, Any] = dict()
-        if price_date.weekday() != date_utils.SUNDAY:
-            date_utils.validate_price_period(
-                date=price_date, time_of_day=price_time_of_day
-            )
-            phase_index = models.Ticker.phase_from_date(price_date, price_time_of_day)
-            print("PHASE INDEX:", phase_index)
-            set_price[f"phases.{phase_index}"] = price
+        ticker_raw = await self.collections.tickers.find_one_and_update(
+            query, update, upsert=True, return_document=pymongo.ReturnDocument.AFTER
+        )
+        return CODEC_TICKER.load(ticker_raw, self.validate_documents)
+
+    async def update_ticker_price_and_pattern(
+        self,
+        user: models.User,
+        week_of: datetime.date,
+        price_date: datetime.date,
+        price_time_of_day: Optional[models.TimeOfDay],
+        price: int,
+        pattern: models.Patterns,
+        expected_version: int,
+    ) -> Optional[models.Ticker]:
+        """
+        Save a price and the price pattern it confirms in a single write, as long as
+        the ticker has not changed since it was read.
+
+        :param user: the stalkbroker user the ticker belongs to.
+        :param week_of: the sunday date this ticker starts.
+        :param price_date: the date this bell price occurred.
+        :param price_time_of_day: the time of day (AM/PM) this price occured.
+        :param price: the price to save.
+        :param pattern: the price pattern the ticker describes with the new price.
+        :param expected_version: the ``version`` of the ticker the pattern was worked
+            out from. ``0`` if no ticker was stored.
+
+        :returns: the updated ticker, or ``None`` if the stored ticker was written to
+            by someone else after ``expected_version``, in which case nothing is saved.
+        """
+        assert self.collections is not None
 
+        query = _query_ticker(user, week_of)
+        if expected_version == 0:
+            # Tickers written before versioning was added have no version field.
+            query["version"] = {"$in": [0, None]}
         else:
-            set_price["purchase_price"] = price
+            query["version"] = expected_version
 
-        update["$set"] = set_price
+        set_fields = _ticker_set_price(price_date, price_time_of_day, price)
+        set_fields["final_pattern"] = pattern.value
 
-        ticker_raw = await self.collections.tickers.find_one_and_update(
-            query, update, upsert=True, return_document=pymongo.ReturnDocument.AFTER
-        )
-        return SCHEMA_TICKER_FULL.load(ticker_raw)
+        update: Dict[str, Any] = {
+            "$setOnInsert": _ticker_on_insert(user, week_of),
+            "$set": set_fields,
+            "$inc": {"version": 1},
+        }
+
+        # If a ticker for the week exists but its version has moved on, the upsert
+        # tries to insert a second ticker for the week, which the unique user_week_of
+        # index rejects.
+        try:
+            ticker_raw = await self.collections.tickers.find_one_and_update(
+                query,
+                update,
+                upsert=True,
+                return_document=pymongo.ReturnDocument.AFTER,
+            )
+        except pymongo.errors.DuplicateKeyError:
+            return None
+
+        return CODEC_TICKER.load(ticker_raw, self.validate_documents)
 
     async def update_ticker_pattern(
         self, user: models.User, week_of: datetime.date, pattern: models.Patterns,
@@ -412,12 +825,13 @@ class DBConnection:
 
         update: Dict[str, Any] = {
             "$set": {"final_pattern": pattern.value},
+            "$inc": {"version": 1},
         }
 
         ticker_raw = await self.collections.tickers.find_one_and_update(
             query, update, upsert=True, return_document=pymongo.ReturnDocument.AFTER
         )
-        return SCHEMA_TICKER_FULL.load(ticker_raw)
+        return CODEC_TICKER.load(ticker_raw, self.validate_documents)
 
     async def fetch_previous_pattern(
         self, user: models.User, week_of_current: datetime.date,
@@ -464,6 +878,6 @@ class DBConnection:
         if ticker_data is None:
             ticker = models.Ticker(user_id=user.id, week_of=week_of)
         else:
-            ticker = SCHEMA_TICKER_FULL.load(ticker_data)
+            ticker = CODEC_TICKER.load(ticker_data, self.validate_documents)
 
         return ticker
@@ -3,13 +3,16 @@ from ._classes import (
     BulkResponseError,
     AbstractBadValueError,
     BadTimezoneError,
+    BadPriceError,
     ImaginaryDateError,
     FutureDateError,
     TimeOfDayRequiredError,
     UnknownUserTimezoneError,
     NoBulletinChannelError,
     BackendError,
+    CircuitOpenError,
     ImpossibleTickerError,
+    is_backend_unreachable,
 )
 from ._handle import handle_command_error
 
@@ -18,6 +21,7 @@ from ._handle import handle_command_error
     BulkResponseError,
     AbstractBadValueError,
     BadTimezoneError,
+    BadPriceError,
     ImaginaryDateError,
     UnknownUserTimezoneError,
     FutureDateError,
@@ -25,5 +29,7 @@ from ._handle import handle_command_error
     NoBulletinChannelError,
     handle_command_error,
     BackendError,
+    CircuitOpenError,
     ImpossibleTickerError,
+    is_backend_unreachable,
 )
@@ -1,9 +1,11 @@
+import asyncio
 import discord.ext.commands
+import grpclib.const
 import grpclib.exceptions
-from typing import Any, Iterable
+from typing import Any, Iterable, Tuple, Type, Union
 
 
-from stalkbroker import messages
+from stalkbroker import messages, models
 
 
 class AbstractResponseError(Exception):
@@ -101,6 +103,22 @@ class BadTimezoneError(AbstractBadValueError):
         return messages.error_bad_timezone(self.ctx.author, self.bad_value)
 
 
+class BadPriceError(AbstractBadValueError):
+    """Raised when a user-supplied price is too large for a ticker to hold."""
+
+    @staticmethod
+    def value_type() -> str:
+        return "price"
+
+    def send_as_dm(self) -> bool:
+        return False
+
+    def response(self) -> str:
+        return messages.error_bad_price(
+            self.ctx.author, self.bad_value, models.MAX_PRICE
+        )
+
+
 class ImaginaryDateError(AbstractBadValueError):
     """Raised when a user-supplied date is not a valid caslendar date."""
 
@@ -208,16 +226,39 @@ _IMPOSSIBLE_PATTERN_MESSAGE = (
 )
 
 
+class CircuitOpenError(Exception):
+    """
+    Raised in place of calling a backend service that has been failing, without
+    reaching it. Counts as the service being unreachable, so it triggers fallback
+    engines, but it is not a gRPC error: no call was made, and none should be retried
+    or hedged until the service is tried again.
+    """
+
+    def __init__(self, service: str, retry_in: float) -> None:
+        """
+        :param service: the name of the service that is failing.
+        :param retry_in: seconds until the service will be tried again.
+        """
+        self.service: str = service
+        self.retry_in: float = retry_in
+        super().__init__(f"{service} is failing, next attempt in {retry_in:.1f}s")
+
+
 class BackendError(Exception):
     """
-    This class can be used to wrap grpc errors returned from our backend client stubs.
-    The error will be converted during handling to one of our known errors if it is
-    known. This allows us to wrap and raise the error in command handlers without having
-    tp worry about parsing it there.
+    This class can be used to wrap grpc errors returned from our backend client stubs,
+    timeouts from calls that ran out of time, and calls a circuit breaker stopped. The
+    error will be converted during handling to one of our known errors if it is known.
+    This allows us to wrap and raise the error in command handlers without having tp
+    worry about parsing it there.
     """
 
     def __init__(
-        self, ctx: discord.ext.commands.Context, error: grpclib.exceptions.GRPCError
+        self,
+        ctx: discord.ext.commands.Context,
+        error: Union[
+            grpclib.exceptions.GRPCError, asyncio.TimeoutError, CircuitOpenError
+        ],
     ) -> None:
         """
         :param ctx: message context passed in by discord.py to the calling command.
@@ -228,16 +269,47 @@ class BackendError(Exception):
         :param kwargs: additional keyword arguments for subclasses.
         """
         self.ctx: discord.ext.commands.Context = ctx
-        self.error: grpclib.exceptions.GRPCError = error
+        self.error: Union[
+            grpclib.exceptions.GRPCError, asyncio.TimeoutError, CircuitOpenError
+        ] = error
         super().__init__()
 
     def convert_to_bot_error(self) -> Exception:
-        if self.error.message == _IMPOSSIBLE_PATTERN_MESSAGE:
+        if (
+            isinstance(self.error, grpclib.exceptions.GRPCError)
+            and self.error.message == _IMPOSSIBLE_PATTERN_MESSAGE
+        ):
             return ImpossibleTickerError(self.ctx)
         else:
             return self.error
 
 
+# Errors that mean we could not reach a backend service, rather than that it turned our
+# request down.
+_UNREACHABLE_ERRORS: Tuple[Type[BaseException], ...] = (
+    CircuitOpenError,
+    asyncio.TimeoutError,
+    OSError,
+    grpclib.exceptions.StreamTerminatedError,
+    grpclib.exceptions.ProtocolError,
+)
+_UNREACHABLE_STATUSES = (
+    grpclib.const.Status.UNAVAILABLE,
+    grpclib.const.Status.DEADLINE_EXCEEDED,
+)
+
+
+def is_backend_unreachable(error: BaseException) -> bool:
+    """
+    Whether ``error`` means a backend service could not be reached or did not answer
+    in time. Errors that are the service's answer to a request, like an impossible
+    ticker, are not.
+    """
+    if isinstance(error, grpclib.exceptions.GRPCError):
+        return error.status in _UNREACHABLE_STATUSES
+    return isinstance(error, _UNREACHABLE_ERRORS)
+
+
 class ImpossibleTickerError(AbstractResponseError):
     def send_as_dm(self) -> bool:
         return False
@@ -0,0 +1,15 @@
+from ._forecast import forecast_prices, ImpossiblePricesError
+from ._engines import ForecastEngine, LocalForecaster, FallbackForecaster
+from ._batching import BatchForecastEngine, BatchingForecaster
+from ._server import LocalForecastServer
+
+(
+    forecast_prices,
+    ImpossiblePricesError,
+    ForecastEngine,
+    LocalForecaster,
+    FallbackForecaster,
+    BatchForecastEngine,
+    BatchingForecaster,
+    LocalForecastServer,
+)
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional, Protocol, Tuple
+
+import grpclib.const
+import grpclib.exceptions
+
+from protogen.stalk_proto import models_pb2 as backend
+
+
+class BatchForecastEngine(Protocol):
+    """
+    Anything that can forecast prices one ticker or many tickers at a time. Matches
+    the forecasting service's client stub.
+    """
+
+    @property
+    def ForecastPrices(
+        self,
+    ) -> Callable[[backend.Ticker], Awaitable[backend.Forecast]]:
+        """Forecasts the prices for a ticker."""
+
+    @property
+    def ForecastPricesBatch(
+        self,
+    ) -> Callable[[backend.TickerBatch], Awaitable[backend.ForecastBatch]]:
+        """Forecasts the prices for a batch of tickers."""
+
+
+_Pending = Tuple[backend.Ticker, "asyncio.Future[backend.Forecast]"]
+
+
+class BatchingForecaster:
+    """
+    Collects the tickers of concurrent requests for a short window, and sends them to
+    the forecasting service as a single batch.
+
+    Switches to sending each ticker on its own for good if the service turns out not
+    to support batches.
+    """
+
+    def __init__(
+        self, engine: BatchForecastEngine, window: float, max_size: int
+    ) -> None:
+        """
+        :param engine: the engine to send batches to.
+        :param window: seconds to wait for more tickers after the first ticker of a
+            batch comes in.
+        :param max_size: the most tickers to send in one batch. A full batch is sent
+            without waiting out the window.
+        """
+        self.engine: BatchForecastEngine = engine
+        self.window: float = window
+        self.max_size: int = max_size
+
+        self.batching_supported: bool = True
+        """Whether the engine has accepted our batches so far."""
+
+        self.batches: int = 0
+        """The number of batches sent to the engine."""
+
+        self._pending: List[_Pending] = list()
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+
+    async def ForecastPrices(self, ticker: backend.Ticker) -> backend.Forecast:
+        if not self.batching_supported:
+            return await self.engine.ForecastPrices(ticker)
+
+        loop = asyncio.get_event_loop()
+        future: "asyncio.Future[backend.Forecast]" = loop.create_future()
+        self._pending.append((ticker, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._flush_timer is None:
+            self._flush_timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        """Send off the tickers collected so far."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        pending, self._pending = self._pending, list()
+        if not pending:
+            return
+
+        # A lone ticker gains nothing from being wrapped in a batch.
+        if len(pending) == 1:
+            asyncio.ensure_future(self._send_unary(pending))
+        else:
+            asyncio.ensure_future(self._send_batch(pending))
+
+    async def _send_unary(self, pending: List[_Pending]) -> None:
+        """Forecast each pending ticker with its own request."""
+
+        async def send(ticker: backend.Ticker, future: asyncio.Future) -> None:
+            try:
+                forecast = await self.engine.ForecastPrices(ticker)
+            except Exception as error:
+                if not future.done():
+                    future.set_exception(error)
+            else:
+                if not future.done():
+                    future.set_result(forecast)
+
+        await asyncio.gather(*(send(ticker, future) for ticker, future in pending))
+
+    async def _send_batch(self, pending: List[_Pending]) -> None:
+        """Forecast the pending tickers with a single request."""
+        batch = backend.TickerBatch()
+        for ticker, _ in pending:
+            batch.tickers.add().CopyFrom(ticker)
+
+        try:
+            response = await self.engine.ForecastPricesBatch(batch)
+        except grpclib.exceptions.GRPCError as error:
+            if error.status is not grpclib.const.Status.UNIMPLEMENTED:
+                self._fail(pending, error)
+                return
+
+            logging.info("forecasting service does not support batches")
+            self.batching_supported = False
+            await self._send_unary(pending)
+            return
+        except Exception as error:
+            self._fail(pending, error)
+            return
+
+        self.batches += 1
+
+        if len(response.results) != len(pending):
+            self._fail(
+                pending,
+                grpclib.exceptions.GRPCError(
+                    grpclib.const.Status.INTERNAL,
+                    f"batch of {len(pending)} tickers answered with"
+                    f" {len(response.results)} forecasts",
+                ),
+            )
+            return
+
+        for (_, future), result in zip(pending, response.results):
+            # The caller may have stopped waiting on its forecast.
+            if future.done():
+                continue
+
+            if result.error_code != grpclib.const.Status.OK.value:
+                future.set_exception(
+                    grpclib.exceptions.GRPCError(
+                        grpclib.const.Status(result.error_code), result.error_message,
+                    )
+                )
+            else:
+                future.set_result(result.forecast)
+
+    @staticmethod
+    def _fail(pending: List[_Pending], error: Exception) -> None:
+        """Fail every pending ticker in a batch that could not be forecast."""
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(error)
@@ -0,0 +1,98 @@
+import asyncio
+import concurrent.futures
+import logging
+from typing import Awaitable, Callable, Optional, Protocol
+
+from protogen.stalk_proto import models_pb2 as backend
+from stalkbroker import errors
+
+from ._forecast import forecast_serialized
+
+
+class ForecastEngine(Protocol):
+    """
+    Anything that can forecast prices. Matches the forecasting service's client stub,
+    so the stub, :class:`LocalForecaster` and :class:`FallbackForecaster` can be used
+    interchangeably.
+    """
+
+    @property
+    def ForecastPrices(
+        self,
+    ) -> Callable[[backend.Ticker], Awaitable[backend.Forecast]]:
+        """Forecasts the prices for a ticker."""
+
+
+async def forecast_in_executor(
+    executor: Optional[concurrent.futures.Executor], ticker: backend.Ticker
+) -> backend.Forecast:
+    """
+    Forecast ``ticker`` with :func:`forecast_prices` in ``executor``, so the event loop
+    is not held up while the forecast is made.
+
+    :param executor: the pool to forecast in. ``None`` for the event loop's default
+        thread pool.
+    """
+    loop = asyncio.get_event_loop()
+    forecast = await loop.run_in_executor(
+        executor, forecast_serialized, ticker.SerializeToString()
+    )
+    return backend.Forecast.FromString(forecast)
+
+
+class LocalForecaster:
+    """
+    Forecasts prices in-process with :func:`forecast_prices`. Forecasting is CPU bound,
+    so it is done in a worker pool to keep the event loop free.
+    """
+
+    def __init__(self, executor: Optional[concurrent.futures.Executor] = None) -> None:
+        """
+        :param executor: the pool forecasts are made in. ``None`` for the event loop's
+            default thread pool.
+        """
+        self.executor: Optional[concurrent.futures.Executor] = executor
+
+    async def ForecastPrices(self, ticker: backend.Ticker) -> backend.Forecast:
+        return await forecast_in_executor(self.executor, ticker)
+
+
+class FallbackForecaster:
+    """
+    Forecasts with a primary engine, switching to a fallback for any request the
+    primary can't answer in time or can't be reached for.
+    """
+
+    def __init__(
+        self,
+        primary: ForecastEngine,
+        fallback: ForecastEngine,
+        timeout: Optional[float],
+    ) -> None:
+        """
+        :param primary: the engine to try first.
+        :param fallback: the engine to use when the primary is down.
+        :param timeout: seconds to wait on the primary before giving up on it.
+            ``None`` to wait as long as the primary takes.
+        """
+        self.primary: ForecastEngine = primary
+        self.fallback: ForecastEngine = fallback
+        self.timeout: Optional[float] = timeout
+
+        self.fallbacks: int = 0
+        """The number of requests answered by the fallback engine."""
+
+    async def ForecastPrices(self, ticker: backend.Ticker) -> backend.Forecast:
+        try:
+            return await asyncio.wait_for(
+                self.primary.ForecastPrices(ticker), self.timeout
+            )
+        except Exception as error:
+            # Errors like an impossible ticker are the answer to our request, and the
+            # fallback would give the same one.
+            if not errors.is_backend_unreachable(error):
+                raise
+            logging.warning(f"forecasting with fallback engine: {error!r}")
+
+        self.fallbacks += 1
+        return await self.fallback.ForecastPrices(ticker)
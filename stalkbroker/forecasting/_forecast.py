@@ -0,0 +1,296 @@
+import numpy as np
+from typing import List
+
+from protogen.stalk_proto import models_pb2 as backend
+
+from ._weeks import CANDIDATES, PATTERNS, PERIODS, pattern_chances
+
+
+# The range of purchase prices the game picks from.
+_BASE_PRICE_MIN = 90
+_BASE_PRICE_MAX = 110
+
+
+class ImpossiblePricesError(ValueError):
+    """Raised when no week the game can generate matches the prices of a ticker."""
+
+
+def _intceil(values: np.ndarray) -> np.ndarray:
+    # The game rounds prices up this way rather than with a true ceiling, so a rate
+    # that lands a hair over a whole number of bells is not bumped up a bell.
+    return np.floor(values + 0.99999).astype(np.int64)
+
+
+def _periods(mask: np.ndarray, first_period: int) -> List[int]:
+    return (np.flatnonzero(mask) + first_period).tolist()
+
+
+# NOTE: messages are filled in place rather than built and passed to their parent's
+# constructor. Constructing a parent copies every sub-message handed to it, which
+# made building the per-week messages the slowest part of a forecast.
+
+
+def _cap_shoulders(
+    price_min: np.ndarray, price_max: np.ndarray, capped_by: np.ndarray
+) -> None:
+    """
+    Narrow, in place, the prices of periods whose rate is picked below the rate of
+    another period, against the prices of the period capping them. The capped period
+    is a bell under the capping one at most, so each bounds the other once its price
+    is known.
+    """
+    weeks, periods = np.nonzero(capped_by >= 0)
+    caps = capped_by[weeks, periods]
+    np.minimum.at(price_max, (weeks, periods), price_max[weeks, caps] - 1)
+    np.maximum.at(price_min, (weeks, caps), price_min[weeks, periods] + 1)
+
+
+def _fill_summary(
+    summary: backend.PricesSummary,
+    price_min: np.ndarray,
+    price_max: np.ndarray,
+    first_period: int = 0,
+) -> None:
+    """
+    Summarize the prices of one or more weeks.
+
+    :param summary: the message to fill.
+    :param price_min: the lowest price of each week (rows) in each period (columns).
+    :param price_max: the highest price of each week (rows) in each period (columns).
+    :param first_period: the period of the first column.
+    """
+    period_min = price_min.min(axis=0)
+    period_max = price_max.max(axis=0)
+    low = period_min.min()
+    high = period_max.max()
+
+    # The best price each week is sure to offer, and the lowest of those is the best
+    # price we are sure to be offered whichever week this is.
+    week_guaranteed = price_min.max(axis=1)
+    guaranteed = week_guaranteed.min()
+    worst_weeks = price_min[week_guaranteed == guaranteed]
+
+    summary.min = int(low)
+    summary.max = int(high)
+    summary.guaranteed = int(guaranteed)
+    summary.min_periods.extend(_periods(period_min == low, first_period))
+    summary.max_periods.extend(_periods(period_max == high, first_period))
+    summary.guaranteed_periods.extend(
+        _periods((worst_weeks == guaranteed).any(axis=0), first_period)
+    )
+
+
+def _fill_week_summaries(
+    summaries: List[backend.PricesSummary],
+    price_min: np.ndarray,
+    price_max: np.ndarray,
+    first_period: int = 0,
+) -> None:
+    """
+    Summarize the prices of each week on its own. Equivalent to calling
+    :func:`_fill_summary` on every row, but worked out for all weeks at once.
+    """
+    low = price_min.min(axis=1, keepdims=True)
+    high = price_max.max(axis=1, keepdims=True)
+    guaranteed = price_min.max(axis=1, keepdims=True)
+
+    periods = list(range(first_period, first_period + price_min.shape[1]))
+
+    for summary, week_low, week_high, week_guaranteed, mins, maxes, guarantees in zip(
+        summaries,
+        low[:, 0].tolist(),
+        high[:, 0].tolist(),
+        guaranteed[:, 0].tolist(),
+        (price_min == low).tolist(),
+        (price_max == high).tolist(),
+        (price_min == guaranteed).tolist(),
+    ):
+        summary.min = week_low
+        summary.max = week_high
+        summary.guaranteed = week_guaranteed
+        summary.min_periods.extend(p for p, is_min in zip(periods, mins) if is_min)
+        summary.max_periods.extend(p for p, is_max in zip(periods, maxes) if is_max)
+        summary.guaranteed_periods.extend(
+            p for p, is_guaranteed in zip(periods, guarantees) if is_guaranteed
+        )
+
+
+def _fill_spike_range(spike_range: backend.SpikeRange, spike: np.ndarray) -> None:
+    """The periods spanned by the spikes of one or more weeks."""
+    periods = np.flatnonzero(spike.any(axis=0))
+    if len(periods) > 0:
+        spike_range.has = True
+        spike_range.start = int(periods[0])
+        spike_range.end = int(periods[-1])
+
+
+def _fill_spike_chances(
+    spike_chances: backend.SpikeChances, chance: np.ndarray, spike: np.ndarray
+) -> None:
+    """The chance of a spike in each period."""
+    breakdown = (chance[:, np.newaxis] * spike).sum(axis=0)
+    periods = np.flatnonzero(breakdown > 0)
+
+    spike_chances.chance = float(chance[spike.any(axis=1)].sum())
+    spike_chances.breakdown.extend(breakdown.tolist())
+    if len(periods) > 0:
+        spike_chances.has = True
+        spike_chances.start = int(periods[0])
+        spike_chances.end = int(periods[-1])
+
+
+def _fill_weeks(
+    pattern: backend.PotentialPattern,
+    chance: np.ndarray,
+    price_min: np.ndarray,
+    price_max: np.ndarray,
+    spike: np.ndarray,
+    current_period: int,
+) -> None:
+    """Add a potential week to ``pattern`` for every row of the week tables."""
+    weeks: List[backend.PotentialWeek] = [
+        pattern.potential_weeks.add(chance=week_chance)
+        for week_chance in chance.tolist()
+    ]
+
+    _fill_week_summaries([w.prices_summary for w in weeks], price_min, price_max)
+    _fill_week_summaries(
+        [w.prices_future for w in weeks],
+        price_min[:, current_period:],
+        price_max[:, current_period:],
+        current_period,
+    )
+
+    for week, mins, maxes, spikes_at in zip(
+        weeks, price_min.tolist(), price_max.tolist(), spike.tolist()
+    ):
+        for low, high, is_spike in zip(mins, maxes, spikes_at):
+            week.prices.add(min=low, max=high, is_spike=is_spike)
+
+        spiking = [p for p, is_spike in enumerate(spikes_at) if is_spike]
+        if spiking:
+            week.spike.has = True
+            week.spike.start = spiking[0]
+            week.spike.end = spiking[-1]
+
+
+def forecast_prices(ticker: backend.Ticker) -> backend.Forecast:
+    """
+    Forecast the prices for the rest of the week.
+
+    Implements the contract of the forecasting service's ``ForecastPrices``, so the
+    two can be used interchangeably.
+
+    :param ticker: the prices so far this week. Prices (and the purchase price) we
+        don't know are ``0``.
+
+    :returns: the possible patterns and weeks the prices could belong to, and how
+        likely each is.
+
+    :raises ImpossiblePricesError: if no week the game can generate matches the
+        prices.
+    """
+    weeks = CANDIDATES
+
+    if ticker.purchase_price > 0:
+        base_min = base_max = ticker.purchase_price
+    else:
+        base_min, base_max = _BASE_PRICE_MIN, _BASE_PRICE_MAX
+
+    price_min = _intceil(weeks.rate_min * base_min) + weeks.offset
+    price_max = _intceil(weeks.rate_max * base_max) + weeks.offset
+
+    prices = np.zeros(PERIODS, dtype=np.int64)
+    known_prices = list(ticker.prices)[:PERIODS]
+    prices[: len(known_prices)] = known_prices
+    known = prices > 0
+
+    fits = ((price_min <= prices) & (prices <= price_max)) | ~known
+
+    # From here on prices we know are exact.
+    price_min = np.where(known, prices, price_min)
+    price_max = np.where(known, prices, price_max)
+    _cap_shoulders(price_min, price_max, weeks.capped_by)
+    possible = fits.all(axis=1) & (price_min <= price_max).all(axis=1)
+
+    priors = pattern_chances(ticker.previous_pattern)
+    prior = np.array([priors[pattern] for pattern in weeks.pattern])
+    chance = np.where(possible, weeks.chance * prior, 0.0)
+
+    total = chance.sum()
+    if total == 0:
+        raise ImpossiblePricesError(
+            "could not generate possibilities because ticker prices are impossible"
+        )
+    chance = chance / total
+
+    # From here on only the possible weeks matter.
+    price_min = price_min[possible]
+    price_max = price_max[possible]
+    chance = chance[possible]
+    pattern = weeks.pattern[possible]
+    spike = weeks.spike[possible]
+
+    current_period = min(max(ticker.current_period, 0), PERIODS - 1)
+    future_min = price_min[:, current_period:]
+    future_max = price_max[:, current_period:]
+
+    forecast = backend.Forecast()
+    _fill_summary(forecast.prices_summary, price_min, price_max)
+    _fill_summary(forecast.prices_future, future_min, future_max, current_period)
+
+    for this_pattern in PATTERNS:
+        is_pattern = pattern == this_pattern
+        potential = forecast.patterns.add(pattern=this_pattern)
+        if not is_pattern.any():
+            continue
+
+        potential.chance = float(chance[is_pattern].sum())
+        _fill_summary(
+            potential.prices_summary, price_min[is_pattern], price_max[is_pattern]
+        )
+        _fill_summary(
+            potential.prices_future,
+            future_min[is_pattern],
+            future_max[is_pattern],
+            current_period,
+        )
+        _fill_spike_range(potential.spike, spike[is_pattern])
+        _fill_weeks(
+            potential,
+            chance[is_pattern],
+            price_min[is_pattern],
+            price_max[is_pattern],
+            spike[is_pattern],
+            current_period,
+        )
+
+    is_big = (pattern == backend.BIGSPIKE)[:, np.newaxis]
+    is_small = (pattern == backend.SMALLSPIKE)[:, np.newaxis]
+    _fill_spike_chances(forecast.spikes.small, chance, spike & is_small)
+    _fill_spike_chances(forecast.spikes.big, chance, spike & is_big)
+    _fill_spike_chances(forecast.spikes.any, chance, spike)
+
+    # How good the rest of the week looks: the average of the best price each week
+    # could reach and the best price it is sure to offer, weighted by the chance of
+    # the week.
+    week_likely = (future_max.max(axis=1) + future_min.max(axis=1)) / 2
+    forecast.heat = int(round(float((chance * week_likely).sum())))
+
+    return forecast
+
+
+def forecast_serialized(ticker_bytes: bytes) -> bytes:
+    """
+    :func:`forecast_prices` for serialized messages, so it can be run in a process pool
+    without pickling protobuf objects.
+
+    :param ticker_bytes: a serialized ``Ticker``.
+
+    :returns: a serialized ``Forecast``.
+
+    :raises ImpossiblePricesError: if no week the game can generate matches the
+        prices.
+    """
+    forecast = forecast_prices(backend.Ticker.FromString(ticker_bytes))
+    return forecast.SerializeToString()
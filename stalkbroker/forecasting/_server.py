@@ -0,0 +1,82 @@
+import concurrent.futures
+import grpclib.const
+import grpclib.exceptions
+import grpclib.server
+from typing import Optional
+
+from protogen.stalk_proto import models_pb2 as backend
+from protogen.stalk_proto import forecaster_grpc as forecaster
+
+from ._engines import forecast_in_executor
+from ._forecast import ImpossiblePricesError
+
+
+class LocalForecastServer(forecaster.StalkForecasterBase):
+    """
+    Serves the forecasting service's API with :func:`forecast_prices`. A stand-in for
+    the real service when testing and benchmarking the bot's clients.
+    """
+
+    def __init__(
+        self,
+        batching: bool = True,
+        executor: Optional[concurrent.futures.Executor] = None,
+    ) -> None:
+        """
+        :param batching: whether to serve batches. When ``False``, batches are answered
+            the way gRPC servers answer unknown methods, like a version of the service
+            from before batches.
+        :param executor: the pool forecasts are made in. ``None`` for the event loop's
+            default thread pool.
+        """
+        self.batching: bool = batching
+        self.executor: Optional[concurrent.futures.Executor] = executor
+
+        self.unary_calls: int = 0
+        """The number of single tickers served."""
+
+        self.batch_calls: int = 0
+        """The number of batches served."""
+
+    async def ForecastPrices(
+        self, stream: "grpclib.server.Stream[backend.Ticker, backend.Forecast]",
+    ) -> None:
+        ticker = await stream.recv_message()
+        assert ticker is not None
+        self.unary_calls += 1
+
+        try:
+            forecast = await forecast_in_executor(self.executor, ticker)
+        except ImpossiblePricesError as error:
+            raise grpclib.exceptions.GRPCError(
+                grpclib.const.Status.INVALID_ARGUMENT, str(error)
+            )
+
+        await stream.send_message(forecast)
+
+    async def ForecastPricesBatch(
+        self,
+        stream: "grpclib.server.Stream[backend.TickerBatch, backend.ForecastBatch]",
+    ) -> None:
+        if not self.batching:
+            raise grpclib.exceptions.GRPCError(
+                grpclib.const.Status.UNIMPLEMENTED, "Method not found"
+            )
+
+        batch = await stream.recv_message()
+        assert batch is not None
+        self.batch_calls += 1
+
+        # A ticker we can't forecast fails on its own, not with the rest of the batch.
+        response = backend.ForecastBatch()
+        for ticker in batch.tickers:
+            result = response.results.add()
+            try:
+                result.forecast.CopyFrom(
+                    await forecast_in_executor(self.executor, ticker)
+                )
+            except ImpossiblePricesError as error:
+                result.error_code = grpclib.const.Status.INVALID_ARGUMENT.value
+                result.error_message = str(error)
+
+        await stream.send_message(response)
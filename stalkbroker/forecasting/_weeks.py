@@ -0,0 +1,276 @@
+import dataclasses
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from protogen.stalk_proto import models_pb2 as backend
+
+
+# The game picks a pattern for the week, then a few random parameters for that pattern
+# (when the spike starts, how long each phase lasts). Every combination of those
+# parameters is a candidate week, which we describe by the range of the sell rate in
+# each price period. There are only 72 of them, so they are enumerated once here and
+# every forecast checks the whole table at once.
+
+
+PERIODS = 12
+"""The number of price periods in a week, Monday AM through Saturday PM."""
+
+# The chance of each pattern this week, given the pattern last week, as (this week,
+# chance) pairs.
+_TRANSITIONS: Dict[int, Dict[int, float]] = {
+    backend.FLUCTUATING: {
+        backend.FLUCTUATING: 0.20,
+        backend.BIGSPIKE: 0.30,
+        backend.DECREASING: 0.15,
+        backend.SMALLSPIKE: 0.35,
+    },
+    backend.BIGSPIKE: {
+        backend.FLUCTUATING: 0.50,
+        backend.BIGSPIKE: 0.05,
+        backend.DECREASING: 0.20,
+        backend.SMALLSPIKE: 0.25,
+    },
+    backend.DECREASING: {
+        backend.FLUCTUATING: 0.25,
+        backend.BIGSPIKE: 0.45,
+        backend.DECREASING: 0.05,
+        backend.SMALLSPIKE: 0.25,
+    },
+    backend.SMALLSPIKE: {
+        backend.FLUCTUATING: 0.45,
+        backend.BIGSPIKE: 0.25,
+        backend.DECREASING: 0.15,
+        backend.SMALLSPIKE: 0.15,
+    },
+}
+
+PATTERNS: Tuple[int, ...] = (
+    backend.FLUCTUATING,
+    backend.BIGSPIKE,
+    backend.DECREASING,
+    backend.SMALLSPIKE,
+)
+"""The patterns the game can pick from, in backend enum order."""
+
+# The sell rate drop per period in a decreasing phase.
+_FLUCTUATING_DROP = (0.04, 0.10)
+_DROP = (0.03, 0.05)
+
+# Sell rate ranges of the non-decreasing phases.
+_HIGH = (0.9, 1.4)
+_SPIKE_RISE = (1.4, 2.0)
+_SPIKE_PEAK = (2.0, 6.0)
+_POST_SPIKE = (0.4, 0.9)
+
+
+@dataclasses.dataclass
+class CandidateWeeks:
+    """Every candidate week, one row per week and one column per price period."""
+
+    pattern: np.ndarray
+    """The backend pattern of each week."""
+    chance: np.ndarray
+    """The chance of each week, given its pattern was picked."""
+    rate_min: np.ndarray
+    """The lowest sell rate in each period."""
+    rate_max: np.ndarray
+    """The highest sell rate in each period."""
+    offset: np.ndarray
+    """Bells added to the price after the rate is applied (the game takes one off)."""
+    spike: np.ndarray
+    """Whether each period is part of a price spike."""
+    capped_by: np.ndarray
+    """
+    The period whose rate each period's rate is picked below, or ``-1`` for periods
+    whose rate is picked on its own.
+    """
+
+
+class _WeekBuilder:
+    """Collects candidate weeks one phase at a time."""
+
+    def __init__(self) -> None:
+        self.rows: List[Tuple[int, float, list, list, list, list, list]] = list()
+
+    def add(self, pattern: int, chance: float, phases: List["_Phase"]) -> None:
+        rate_min: List[float] = list()
+        rate_max: List[float] = list()
+        offset: List[int] = list()
+        spike: List[bool] = list()
+        capped_by: List[int] = list()
+        for phase in phases:
+            first_period = len(rate_min)
+            rate_min.extend(phase.rate_min)
+            rate_max.extend(phase.rate_max)
+            offset.extend(phase.offset)
+            spike.extend(phase.spike)
+            capped_by.extend(
+                -1 if cap is None else first_period + i + cap
+                for i, cap in enumerate(phase.capped_by)
+            )
+
+        assert len(rate_min) == PERIODS
+        self.rows.append(
+            (pattern, chance, rate_min, rate_max, offset, spike, capped_by)
+        )
+
+    def build(self) -> CandidateWeeks:
+        patterns, chances, rate_min, rate_max, offset, spike, capped_by = zip(
+            *self.rows
+        )
+        return CandidateWeeks(
+            pattern=np.array(patterns, dtype=np.int64),
+            chance=np.array(chances, dtype=np.float64),
+            rate_min=np.array(rate_min, dtype=np.float64),
+            rate_max=np.array(rate_max, dtype=np.float64),
+            offset=np.array(offset, dtype=np.int64),
+            spike=np.array(spike, dtype=bool),
+            capped_by=np.array(capped_by, dtype=np.int64),
+        )
+
+
+@dataclasses.dataclass
+class _Phase:
+    rate_min: List[float]
+    rate_max: List[float]
+    offset: List[int]
+    spike: List[bool]
+    capped_by: List[Optional[int]]
+    """For each period, how many periods away the period capping its rate is."""
+
+
+def _flat(length: int, rates: Tuple[float, float], spike: bool = False) -> _Phase:
+    """A phase where the rate of each period is picked independently."""
+    return _Phase(
+        rate_min=[rates[0]] * length,
+        rate_max=[rates[1]] * length,
+        offset=[0] * length,
+        spike=[spike] * length,
+        capped_by=[None] * length,
+    )
+
+
+def _decreasing(
+    length: int, start: Tuple[float, float], drop: Tuple[float, float]
+) -> _Phase:
+    """A phase where the rate starts in a range and drops every period."""
+    return _Phase(
+        rate_min=[start[0] - drop[1] * i for i in range(length)],
+        rate_max=[start[1] - drop[0] * i for i in range(length)],
+        offset=[0] * length,
+        spike=[False] * length,
+        capped_by=[None] * length,
+    )
+
+
+def _fluctuating(builder: _WeekBuilder) -> None:
+    for high_1 in range(7):
+        high_2_and_3 = 7 - high_1
+        for high_3 in range(high_2_and_3):
+            for decreasing_1 in (2, 3):
+                chance = 1 / 7 * 1 / high_2_and_3 * 1 / 2
+                builder.add(
+                    backend.FLUCTUATING,
+                    chance,
+                    [
+                        _flat(high_1, _HIGH),
+                        _decreasing(decreasing_1, (0.6, 0.8), _FLUCTUATING_DROP),
+                        _flat(high_2_and_3 - high_3, _HIGH),
+                        _decreasing(5 - decreasing_1, (0.6, 0.8), _FLUCTUATING_DROP),
+                        _flat(high_3, _HIGH),
+                    ],
+                )
+
+
+def _big_spike(builder: _WeekBuilder) -> None:
+    for peak_start in range(1, 8):
+        builder.add(
+            backend.BIGSPIKE,
+            1 / 7,
+            [
+                _decreasing(peak_start, (0.85, 0.9), _DROP),
+                _flat(1, _HIGH),
+                _flat(1, _SPIKE_RISE, spike=True),
+                _flat(1, _SPIKE_PEAK, spike=True),
+                _flat(1, _SPIKE_RISE, spike=True),
+                _flat(1, _HIGH),
+                _flat(PERIODS - peak_start - 5, _POST_SPIKE),
+            ],
+        )
+
+
+def _decreasing_week(builder: _WeekBuilder) -> None:
+    builder.add(
+        backend.DECREASING, 1.0, [_decreasing(PERIODS, (0.85, 0.9), _DROP)],
+    )
+
+
+def _small_spike(builder: _WeekBuilder) -> None:
+    # The peak rate is picked first, and the rate of each period either side of it is
+    # picked between the bottom of the spike range and the peak's rate, then a bell is
+    # taken off. Their ranges only narrow once the peak price is known, so each is
+    # capped by the peak rather than given a range of its own.
+    def shoulder(peak_offset: int) -> _Phase:
+        return _Phase(
+            rate_min=[_SPIKE_RISE[0]],
+            rate_max=[_SPIKE_RISE[1]],
+            offset=[-1],
+            spike=[True],
+            capped_by=[peak_offset],
+        )
+
+    for peak_start in range(8):
+        builder.add(
+            backend.SMALLSPIKE,
+            1 / 8,
+            [
+                _decreasing(peak_start, (0.4, 0.9), _DROP),
+                _flat(2, _HIGH),
+                shoulder(1),
+                _flat(1, _SPIKE_RISE, spike=True),
+                shoulder(-1),
+                _decreasing(PERIODS - peak_start - 5, (0.4, 0.9), _DROP),
+            ],
+        )
+
+
+def _build_candidates() -> CandidateWeeks:
+    builder = _WeekBuilder()
+    _fluctuating(builder)
+    _big_spike(builder)
+    _decreasing_week(builder)
+    _small_spike(builder)
+    return builder.build()
+
+
+def _stationary_chances() -> Dict[int, float]:
+    """
+    The long run chance of each pattern, used when we don't know last week's
+    pattern.
+    """
+    matrix = np.array(
+        [[_TRANSITIONS[prev][this] for this in PATTERNS] for prev in PATTERNS]
+    )
+    chances = np.full(len(PATTERNS), 1 / len(PATTERNS))
+    for _ in range(100):
+        chances = chances @ matrix
+    return {pattern: float(chance) for pattern, chance in zip(PATTERNS, chances)}
+
+
+CANDIDATES: CandidateWeeks = _build_candidates()
+"""Every week the game can generate."""
+
+_STATIONARY = _stationary_chances()
+
+
+def pattern_chances(previous_pattern: int) -> Dict[int, float]:
+    """
+    The chance of each pattern this week.
+
+    :param previous_pattern: last week's backend pattern. ``UNKNOWN`` if we don't know
+        it.
+    """
+    try:
+        return _TRANSITIONS[previous_pattern]
+    except KeyError:
+        return _STATIONARY
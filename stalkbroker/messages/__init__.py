@@ -6,6 +6,7 @@ from ._error_messages import (
     error_general_details,
     error_bad_value,
     error_bad_timezone,
+    error_bad_price,
     error_time_of_day_required,
     error_imaginary_date,
     error_future_date,
@@ -22,6 +23,7 @@ from ._reports import report_ticker, report_forecast
     error_general_details,
     error_bad_value,
     error_bad_timezone,
+    error_bad_price,
     error_imaginary_date,
     error_future_date,
     error_time_of_day_required,
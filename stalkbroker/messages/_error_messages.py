@@ -99,6 +99,22 @@ def error_general_details(traceback_str: str) -> str:
     return f"Here is some more info on the error I encountered:\n```{traceback_str}```"
 
 
+def error_bad_price(user: discord.User, bad_price: int, max_price: int) -> str:
+    """
+    Error message returned when the user supplies a price too large for a ticker.
+
+    :param user: The user who's command resulted in this error.
+    :param bad_price: The price the user supplied.
+    :param max_price: The largest price a ticker can hold.
+
+    :returns: the formatted message.
+    """
+    return (
+        f"Whoa there, {user.mention}! {bad_price} bells? Not even the Stalk Market"
+        f" goes that high. Prices can be at most {max_price} bells."
+    )
+
+
 def error_imaginary_date(user: discord.User, date_arg: str) -> str:
     """
     Error message returned when the user specifies a date that does not exist, i.e.
@@ -28,28 +28,32 @@ def report_ticker(
     }
 
     if ticker.purchase_price is None:
-        info["Daisey's Deal"] = "?"
+        info[models.SUNDAY_PHASE_NAME] = "?"
     else:
-        info["Daisey's Deal"] = ticker.purchase_price
+        info[models.SUNDAY_PHASE_NAME] = ticker.purchase_price
 
-    for phase in ticker:
+    # Phases are read straight from the ticker's prices and the phase tables, rather
+    # than through its PhaseInfo views.
+    message_date = message_time_local.date()
+    dates = models.phase_dates(ticker.week_of)
+    for phase, phase_date, price in zip(models.PHASES, dates, ticker.phases):
         # We don't need to report prices that haven't happened yet
-        if phase.date > message_time_local.date():
+        if phase_date > message_date:
             break
 
         # We don't need to report prices for the PM of a day if it is currently the AM
         # of that day.
         if (
-            phase.date == message_time_local.date()
+            phase_date == message_date
             and phase.time_of_day is models.TimeOfDay.PM
             and message_time_local.hour < 12
         ):
             break
 
-        if phase.price is None:
+        if price == models.UNKNOWN_PRICE:
             price_report: Union[str, int] = "?"
         else:
-            price_report = phase.price
+            price_report = price
 
         info[phase.name] = price_report
 
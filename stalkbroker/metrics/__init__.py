@@ -0,0 +1,30 @@
+from ._histogram import LatencyHistogram, DEFAULT_BUCKETS
+from ._registry import (
+    Metric,
+    Counter,
+    Histogram,
+    Callback,
+    Registry,
+    REGISTRY,
+    LabelValues,
+    SampleValue,
+)
+from ._timing import timed, time_methods
+from ._server import start_http_server, CONTENT_TYPE
+
+(
+    LatencyHistogram,
+    DEFAULT_BUCKETS,
+    Metric,
+    Counter,
+    Histogram,
+    Callback,
+    Registry,
+    REGISTRY,
+    LabelValues,
+    SampleValue,
+    timed,
+    time_methods,
+    start_http_server,
+    CONTENT_TYPE,
+)
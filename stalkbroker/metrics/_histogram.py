@@ -0,0 +1,80 @@
+import bisect
+import math
+from typing import Iterable, List, Tuple
+
+
+# Upper bounds of the default latency buckets, in seconds.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class LatencyHistogram:
+    """
+    Counts latencies into fixed buckets, so percentiles can be estimated without
+    holding on to every sample.
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        """
+        :param buckets: the upper bound of each bucket, in seconds. Latencies above the
+            last bound are counted in an overflow bucket.
+        """
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        """The upper bound of each bucket, in seconds."""
+
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        """
+        The number of latencies in each bucket, followed by the number above the
+        highest bound.
+        """
+
+        self.count: int = 0
+        """The number of latencies observed."""
+        self.total: float = 0.0
+        """The sum of the latencies observed, in seconds."""
+
+    def observe(self, seconds: float) -> None:
+        """Count a latency."""
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    @property
+    def mean(self) -> float:
+        """The mean latency, in seconds."""
+        if self.count == 0:
+            return 0.0
+        return self.total / self.count
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a latency quantile as the upper bound of the bucket it falls in.
+
+        :param q: the quantile, between 0 and 1.
+
+        :returns: the bucket bound in seconds. ``math.inf`` if the quantile falls in the
+            overflow bucket, and 0 if nothing has been observed.
+        """
+        if self.count == 0:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return math.inf
@@ -0,0 +1,236 @@
+import abc
+import math
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple, TypeVar, Union
+
+from ._histogram import LatencyHistogram, DEFAULT_BUCKETS
+
+
+LabelValues = Tuple[str, ...]
+"""The values of a metric's labels, in the order its label names were declared."""
+
+SampleValue = Union[float, LatencyHistogram]
+"""A counter or gauge value, or the histogram of a histogram metric."""
+
+_MetricType = TypeVar("_MetricType", bound="Metric")
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = (
+        '{}="{}"'.format(
+            name,
+            str(value)
+            .replace("\\", "\\\\")
+            .replace("\n", "\\n")
+            .replace('"', '\\"'),
+        )
+        for name, value in zip(names, values)
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metric(abc.ABC):
+    """
+    A named family of samples, one for each combination of label values.
+
+    Everything in this bot runs on a single event loop, so metrics are updated without
+    locking.
+    """
+
+    kind: str = "untyped"
+    """The metric type reported in the exposition format."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        """
+        :param name: the name of the metric.
+        :param help: a description of what the metric measures.
+        :param labelnames: the names of the labels that tell the metric's samples
+            apart.
+        """
+        self.name: str = name
+        self.help: str = help
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+
+    @abc.abstractmethod
+    def collect(self) -> Iterable[Tuple[LabelValues, SampleValue]]:
+        """The current value of each of the metric's samples."""
+        ...
+
+    def render(self) -> List[str]:
+        """The metric in the text exposition format, one line per item."""
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+        for labelvalues, value in self.collect():
+            labels = _format_labels(self.labelnames, labelvalues)
+            if not isinstance(value, LatencyHistogram):
+                lines.append(f"{self.name}{labels} {_format_value(value)}")
+                continue
+
+            bucket_names = self.labelnames + ("le",)
+            cumulative = 0
+            for bound, count in zip(value.buckets, value.counts):
+                cumulative += count
+                bucket_labels = _format_labels(
+                    bucket_names, labelvalues + (_format_value(bound),)
+                )
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+
+            bucket_labels = _format_labels(bucket_names, labelvalues + ("+Inf",))
+            lines.append(f"{self.name}_bucket{bucket_labels} {value.count}")
+            lines.append(f"{self.name}_sum{labels} {_format_value(value.total)}")
+            lines.append(f"{self.name}_count{labels} {value.count}")
+
+        return lines
+
+
+class Counter(Metric):
+    """A count that only goes up."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = dict()
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        """Add ``amount`` to the sample for ``labelvalues``."""
+        self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        """The current count of the sample for ``labelvalues``."""
+        return self._values.get(labelvalues, 0.0)
+
+    def collect(self) -> Iterable[Tuple[LabelValues, SampleValue]]:
+        return self._values.items()
+
+
+class Histogram(Metric):
+    """Latencies counted into fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        """
+        :param buckets: the upper bound of each bucket, in seconds.
+        """
+        super().__init__(name, help, labelnames)
+        self.buckets: Tuple[float, ...] = tuple(buckets)
+        self._children: Dict[LabelValues, LatencyHistogram] = dict()
+
+    def labels(self, *labelvalues: str) -> LatencyHistogram:
+        """The histogram of the sample for ``labelvalues``."""
+        try:
+            return self._children[labelvalues]
+        except KeyError:
+            child = LatencyHistogram(self.buckets)
+            self._children[labelvalues] = child
+            return child
+
+    def collect(self) -> Iterable[Tuple[LabelValues, SampleValue]]:
+        return self._children.items()
+
+
+class Callback(Metric):
+    """
+    A metric whose samples are read from elsewhere when the metrics are collected,
+    like the hit counts kept by a cache.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        name: str,
+        help: str,
+        labelnames: Sequence[str],
+        read: Callable[[], Iterable[Tuple[LabelValues, SampleValue]]],
+    ) -> None:
+        """
+        :param kind: the metric type to report: ``"counter"``, ``"gauge"`` or
+            ``"histogram"``.
+        :param read: returns the current value of each sample.
+        """
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self._read: Callable[[], Iterable[Tuple[LabelValues, SampleValue]]] = read
+
+    def collect(self) -> Iterable[Tuple[LabelValues, SampleValue]]:
+        return self._read()
+
+
+class Registry:
+    """The metrics exposed together, in the order they were registered."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = dict()
+
+    def register(self, metric: _MetricType) -> _MetricType:
+        """
+        Add a metric.
+
+        :raises ValueError: if a metric with the same name is already registered.
+        """
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Register a new :class:`Counter`."""
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Register a new :class:`Histogram`."""
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(
+        self,
+        kind: str,
+        name: str,
+        help: str,
+        labelnames: Sequence[str],
+        read: Callable[[], Iterable[Tuple[LabelValues, SampleValue]]],
+    ) -> Callback:
+        """
+        Register a new :class:`Callback`. Replaces any callback already registered
+        under ``name``, so the resources it reads from can be set up again.
+        """
+        existing = self._metrics.get(name)
+        if existing is not None and not isinstance(existing, Callback):
+            raise ValueError(f"metric {name} is already registered")
+
+        metric = Callback(kind, name, help, labelnames, read)
+        self._metrics[name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Every metric in the text exposition format."""
+        lines: List[str] = list()
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY: Registry = Registry()
+"""The registry the bot's metrics are kept in."""
@@ -0,0 +1,34 @@
+import aiohttp.web
+
+from ._registry import Registry
+
+
+# The content type of version 0.0.4 of the text exposition format.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+async def start_http_server(
+    registry: Registry, host: str, port: int
+) -> aiohttp.web.AppRunner:
+    """
+    Serve the metrics in ``registry`` at ``/metrics``, in the text exposition format.
+
+    :param registry: the metrics to serve.
+    :param host: the interface to listen on.
+    :param port: the port to listen on.
+
+    :returns: the running server. Clean it up to stop serving.
+    """
+
+    async def handle_metrics(request: aiohttp.web.Request) -> aiohttp.web.Response:
+        return aiohttp.web.Response(
+            body=registry.render().encode(), headers={"Content-Type": CONTENT_TYPE},
+        )
+
+    app = aiohttp.web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+
+    runner = aiohttp.web.AppRunner(app)
+    await runner.setup()
+    await aiohttp.web.TCPSite(runner, host, port).start()
+    return runner
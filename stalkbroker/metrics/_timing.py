@@ -0,0 +1,66 @@
+import functools
+import inspect
+import time
+from typing import Any, Callable, Collection, Optional, TypeVar
+
+from ._registry import Counter, Histogram
+
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+_C = TypeVar("_C", bound=type)
+
+
+def timed(
+    histogram: Histogram, *labelvalues: str, errors: Optional[Counter] = None,
+) -> Callable[[_F], _F]:
+    """
+    Decorate a coroutine function to record how long each call takes.
+
+    :param histogram: where call latencies are recorded.
+    :param labelvalues: the labels of the sample to record latencies in.
+    :param errors: counted with ``labelvalues`` whenever a call raises.
+    """
+    child = histogram.labels(*labelvalues)
+
+    def decorator(func: _F) -> _F:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.inc(*labelvalues)
+                raise
+            finally:
+                child.observe(time.perf_counter() - start)
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+def time_methods(
+    histogram: Histogram,
+    errors: Optional[Counter] = None,
+    exclude: Collection[str] = (),
+) -> Callable[[_C], _C]:
+    """
+    Decorate a class to record how long each call of its public coroutine methods
+    takes, labeled by method name.
+
+    :param histogram: where call latencies are recorded. Must have a single label.
+    :param errors: counted by method name whenever a call raises.
+    :param exclude: methods not to time, like ones that run for the life of the bot.
+    """
+
+    def decorator(cls: _C) -> _C:
+        for name, attr in list(vars(cls).items()):
+            if name.startswith("_") or name in exclude:
+                continue
+            if not inspect.iscoroutinefunction(attr):
+                continue
+            setattr(cls, name, timed(histogram, name, errors=errors)(attr))
+        return cls
+
+    return decorator
@@ -1,6 +1,28 @@
 from ._enums import TimeOfDay, Patterns
 from ._user import User
-from ._ticker import Ticker, PhaseInfo
+from ._ticker import (
+    Ticker,
+    PhaseInfo,
+    PhaseMetadata,
+    UNKNOWN_PRICE,
+    MAX_PRICE,
+    PHASES,
+    SUNDAY_PHASE_NAME,
+    phase_dates,
+)
 from ._server import Server
 
-(TimeOfDay, Patterns, User, Ticker, PhaseInfo, Server)
+(
+    TimeOfDay,
+    Patterns,
+    User,
+    Ticker,
+    PhaseInfo,
+    PhaseMetadata,
+    Server,
+    UNKNOWN_PRICE,
+    MAX_PRICE,
+    PHASES,
+    SUNDAY_PHASE_NAME,
+    phase_dates,
+)
@@ -1,4 +1,5 @@
 import uuid
+import datetime
 from dataclasses import dataclass
 
 
@@ -25,3 +26,9 @@ class Server:
     the minimum heat to auto-generate a chart and tag then investor role on forecasts
     after ticker updates.
     """
+    sync_member_count: Optional[int] = None
+    """the number of server members the last time its members were synced"""
+    sync_member_hash: Optional[str] = None
+    """a hash of the server's member ids the last time its members were synced"""
+    sync_time: Optional[datetime.datetime] = None
+    """the utc time the server's members were last synced"""
@@ -1,7 +1,9 @@
+import array
 import datetime
+import functools
 import uuid
-from dataclasses import dataclass, field
-from typing import Optional, Generator, Dict, List
+from dataclasses import dataclass
+from typing import Optional, Generator, Dict, NamedTuple, Tuple
 
 from protogen.stalk_proto import models_pb2 as backend
 
@@ -17,30 +19,126 @@ class PhaseInfo:
     time_of_day: Optional[TimeOfDay]
 
 
-@dataclass
+class PhaseMetadata(NamedTuple):
+    """What is the same about a phase every week."""
+
+    name: str
+    """The name to use in reports."""
+    day_offset: datetime.timedelta
+    """How long after the sunday starting the week the phase's day is."""
+    time_of_day: TimeOfDay
+
+
+_DAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday")
+
+PHASES: Tuple[PhaseMetadata, ...] = tuple(
+    PhaseMetadata(
+        name=f"{_DAY_NAMES[phase // 2]} {TimeOfDay.from_phase_index(phase).name}",
+        day_offset=datetime.timedelta(days=phase // 2 + 1),
+        time_of_day=TimeOfDay.from_phase_index(phase),
+    )
+    for phase in range(12)
+)
+"""The metadata of each phase, by phase index."""
+
+SUNDAY_PHASE_NAME = "Daisey's Deal"
+
+# The number of weeks to remember the phase dates of. Almost every lookup is for this
+# week or last week.
+_PHASE_DATES_CACHE_SIZE = 16
+
+
+@functools.lru_cache(maxsize=_PHASE_DATES_CACHE_SIZE)
+def phase_dates(week_of: datetime.date) -> Tuple[datetime.date, ...]:
+    """The date of each phase of the week starting ``week_of``, by phase index."""
+    return tuple(week_of + phase.day_offset for phase in PHASES)
+
+
+# Stands in for the price of a phase that is not known. Prices are never negative.
+UNKNOWN_PRICE = -1
+
+# The phases of a ticker with no prices, copied to start each ticker's prices.
+_NO_PRICES = array.array("h", [UNKNOWN_PRICE] * 12)
+
+MAX_PRICE = 2 ** 15 - 1
+"""The largest price a phase can hold."""
+
+
 class Ticker:
-    """Holds price updates for the week."""
+    """
+    Holds price updates for the week.
+
+    Prices are kept in a fixed array of 12 phases rather than as a dict of
+    :class:`PhaseInfo`, so a ticker is a handful of small objects. :class:`PhaseInfo`
+    is only built when a phase is looked up by index or the ticker is iterated.
+    """
+
+    __slots__ = (
+        "user_id",
+        "week_of",
+        "purchase_price",
+        "phases",
+        "final_pattern",
+        "version",
+    )
 
     user_id: uuid.UUID
     """User id for island"""
     week_of: datetime.date
     """Sunday date the week begins with"""
-
-    purchase_price: Optional[int] = None
+    purchase_price: Optional[int]
     """The initial purchase price from Maisey day"""
-
-    phases: Dict[int, int] = field(init=False, default_factory=dict)
+    phases: array.array
     """
-    An index of our known phases. We store as a map so that we aren't filling arrays
-    with lots of ``None`` values when we don't have info for a phase.
+    The price of each phase, Monday AM to Saturday PM, or :data:`UNKNOWN_PRICE` if
+    the price is not known.
     """
-
-    final_pattern: Optional[Patterns] = Patterns.UNKNOWN
+    final_pattern: Optional[Patterns]
     """The final pattern for the week 'None' if unknown"""
+    version: int
+    """
+    Incremented on every write to the stored ticker, so a writer can tell if the
+    ticker changed after it was read. ``0`` if the ticker has never been stored.
+    """
 
-    def __post_init__(self) -> None:
-        # Set up the dict where we store our phases.
-        self.phases = dict()
+    def __init__(
+        self,
+        user_id: uuid.UUID,
+        week_of: datetime.date,
+        purchase_price: Optional[int] = None,
+        final_pattern: Optional[Patterns] = Patterns.UNKNOWN,
+        version: int = 0,
+    ) -> None:
+        self.user_id = user_id
+        self.week_of = week_of
+        self.purchase_price = purchase_price
+        self.phases = array.array("h", _NO_PRICES)
+        self.final_pattern = final_pattern
+        self.version = version
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        assert isinstance(other, Ticker)
+        # Like the rest of the bot, the version is left out: it says when a ticker was
+        # written, not what it holds.
+        return (
+            self.user_id == other.user_id
+            and self.week_of == other.week_of
+            and self.purchase_price == other.purchase_price
+            and self.phases == other.phases
+            and self.final_pattern == other.final_pattern
+        )
+
+    # Tickers are mutable, so are not hashable.
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return (
+            f"Ticker(user_id={self.user_id!r}, week_of={self.week_of!r}, "
+            f"purchase_price={self.purchase_price!r}, phases={self.known_prices()!r}, "
+            f"final_pattern={self.final_pattern!r}, version={self.version!r})"
+        )
 
     def __iter__(self) -> Generator[PhaseInfo, None, None]:
         for phase_index in range(12):
@@ -48,11 +146,11 @@ class Ticker:
             yield phase_info
 
     def __getitem__(self, phase_index: int) -> PhaseInfo:
-        try:
-            price: Optional[int] = self.phases[phase_index]
-        except KeyError:
-            if phase_index > 11:
-                raise IndexError("phase index must be between 0 and 11")
+        if phase_index > 11:
+            raise IndexError("phase index must be between 0 and 11")
+
+        price: Optional[int] = self.phases[phase_index]
+        if price == UNKNOWN_PRICE:
             price = None
 
         return self._create_phase_info(phase_index=phase_index, price=price)
@@ -64,16 +162,27 @@ class Ticker:
             raise IndexError("phase index must be between 0 and 13")
 
         if price is None:
-            self.phases.pop(phase_index, None)
+            self.phases[phase_index] = UNKNOWN_PRICE
+        elif not 0 <= price <= MAX_PRICE:
+            raise ValueError(f"price must be between 0 and {MAX_PRICE}")
         else:
             self.phases[phase_index] = price
 
+    def known_prices(self) -> Dict[int, int]:
+        """The price of each phase whose price is known, by phase index."""
+        return {
+            phase: price
+            for phase, price in enumerate(self.phases)
+            if price != UNKNOWN_PRICE
+        }
+
     def _create_phase_info(self, phase_index: int, price: Optional[int]) -> PhaseInfo:
+        phase = PHASES[phase_index]
         phase_info = PhaseInfo(
             price=price,
-            name=self.phase_name(phase_index),
-            date=(self.week_of + datetime.timedelta(days=phase_index // 2 + 1)),
-            time_of_day=TimeOfDay.from_phase_index(phase_index),
+            name=phase.name,
+            date=phase_dates(self.week_of)[phase_index],
+            time_of_day=phase.time_of_day,
         )
         return phase_info
 
@@ -122,19 +231,11 @@ class Ticker:
         :returns: phase name.
         """
         if phase == -1:
-            return "Daisey's Deal"
-
-        day = phase // 2
-        day_str = {
-            0: "Monday",
-            1: "Tuesday",
-            2: "Wednesday",
-            3: "Thursday",
-            4: "Friday",
-            5: "Saturday",
-        }[day]
-        period_str = TimeOfDay.from_phase_index(phase).name
-        return day_str + " " + period_str
+            return SUNDAY_PHASE_NAME
+        if phase < 0:
+            raise IndexError("phase index must be between -1 and 11")
+
+        return PHASES[phase].name
 
     def for_date(
         self, date: datetime.date, time_of_day: Optional[TimeOfDay]
@@ -150,7 +251,7 @@ class Ticker:
         if phase is None:
             return PhaseInfo(
                 price=self.purchase_price,
-                name=self.phase_name(-1),
+                name=SUNDAY_PHASE_NAME,
                 date=date,
                 time_of_day=None,
             )
@@ -171,18 +272,13 @@ class Ticker:
         if phase is None:
             self.purchase_price = price
         else:
-            self.phases[phase] = price
+            self[phase] = price
 
     def to_backend(
         self, previous_pattern: backend.PricePatterns, current_period: int,
     ) -> backend.Ticker:
-        prices: List[int] = list()
-        for phase in self:
-            if phase.price is None:
-                price = 0
-            else:
-                price = phase.price
-            prices.append(price)
+        # The backend takes 0 for unknown prices.
+        prices = [0 if price == UNKNOWN_PRICE else price for price in self.phases]
 
         if self.purchase_price is None:
             purchase_price = 0
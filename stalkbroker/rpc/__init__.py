@@ -0,0 +1,17 @@
+from ._pool import ChannelPool
+from ._hedge import Hedge
+from ._breaker import CircuitBreaker, CircuitState
+from stalkbroker.errors import CircuitOpenError
+from ._client import ManagedMethod, BackendClient, ForecasterClient, ReporterClient
+
+(
+    ChannelPool,
+    CircuitBreaker,
+    CircuitState,
+    CircuitOpenError,
+    Hedge,
+    ManagedMethod,
+    BackendClient,
+    ForecasterClient,
+    ReporterClient,
+)
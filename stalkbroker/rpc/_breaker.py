@@ -0,0 +1,110 @@
+import enum
+import logging
+import time
+from typing import Callable, Optional
+
+from stalkbroker import errors
+
+
+class CircuitState(enum.Enum):
+    CLOSED = "closed"
+    """Calls go through."""
+    OPEN = "open"
+    """Calls fail fast without reaching the service."""
+    HALF_OPEN = "half_open"
+    """A single trial call is let through to see if the service has recovered."""
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a backend service after it fails too many times in a row, then
+    lets a single trial call through once ``reset_timeout`` seconds have passed.
+
+    Only failures to reach the service count. Errors that are the service's answer to
+    a request, like an impossible ticker, mean the service is up.
+    """
+
+    def __init__(
+        self,
+        service: str,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        :param service: the name of the service, for errors and logging.
+        :param failure_threshold: the number of failures in a row that open the
+            circuit.
+        :param reset_timeout: seconds to wait after opening the circuit before trying
+            the service again.
+        :param clock: monotonic clock used to time the circuit.
+        """
+        self.service: str = service
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout: float = reset_timeout
+
+        self.failures: int = 0
+        """The number of failures in a row."""
+        self.trips: int = 0
+        """The number of times the circuit has opened."""
+
+        self._clock: Callable[[], float] = clock
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight: bool = False
+
+    @property
+    def state(self) -> CircuitState:
+        if self._opened_at is None:
+            return CircuitState.CLOSED
+        if self._clock() - self._opened_at < self.reset_timeout:
+            return CircuitState.OPEN
+        return CircuitState.HALF_OPEN
+
+    def check(self) -> None:
+        """
+        Call before each call to the service. Every call let through must be followed
+        by :func:`CircuitBreaker.record` or :func:`CircuitBreaker.abandon`.
+
+        :raises errors.CircuitOpenError: if the call should not be made.
+        """
+        state = self.state
+        if state is CircuitState.CLOSED:
+            return
+
+        if state is CircuitState.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+
+        assert self._opened_at is not None
+        retry_in = max(self._opened_at + self.reset_timeout - self._clock(), 0.0)
+        raise errors.CircuitOpenError(self.service, retry_in)
+
+    def record(self, error: Optional[BaseException]) -> None:
+        """
+        Record the outcome of a call.
+
+        :param error: the error the call raised, ``None`` if it succeeded.
+        """
+        self._trial_in_flight = False
+
+        if error is None or not errors.is_backend_unreachable(error):
+            if self._opened_at is not None:
+                logging.info(f"{self.service} has recovered")
+            self.failures = 0
+            self._opened_at = None
+            return
+
+        self.failures += 1
+        # A failed trial re-opens the circuit straight away.
+        if self._opened_at is not None or self.failures >= self.failure_threshold:
+            if self._opened_at is None:
+                self.trips += 1
+                logging.warning(
+                    f"{self.service} failed {self.failures} times in a row, pausing"
+                    f" calls for {self.reset_timeout}s: {error!r}"
+                )
+            self._opened_at = self._clock()
+
+    def abandon(self) -> None:
+        """Record that a call was cancelled before it had an outcome."""
+        self._trial_in_flight = False
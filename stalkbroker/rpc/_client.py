@@ -0,0 +1,331 @@
+import asyncio
+import random
+import time
+from typing import Dict, Generic, Mapping, Optional, Sequence, TypeVar
+
+import grpclib.client
+import grpclib.const
+import grpclib.exceptions
+
+from protogen.stalk_proto import models_pb2 as backend
+from protogen.stalk_proto import forecaster_grpc as forecaster
+from protogen.stalk_proto import reporter_grpc as reporter
+from stalkbroker import tracing
+from stalkbroker.metrics import LatencyHistogram
+
+from ._breaker import CircuitBreaker, CircuitState
+from ._hedge import Hedge
+from ._pool import ChannelPool, is_channel_failure
+
+
+RequestType = TypeVar("RequestType")
+ResponseType = TypeVar("ResponseType")
+
+
+def _is_retryable(error: Exception) -> bool:
+    """
+    Whether a failed call is worth trying again: the service could not be reached, but
+    may be on the next attempt, over another channel if the pool has one. Calls that
+    ran out of time are not retried, as they would only run out of time again, and
+    neither are calls the circuit breaker stopped, which never reached the service.
+    """
+    return is_channel_failure(error)
+
+
+class ManagedMethod(Generic[RequestType, ResponseType]):
+    """
+    A unary method of a backend service, called through a :class:`ChannelPool` with a
+    deadline, retries and a circuit breaker. Has the same call signature as the method
+    on the service's client stub, so it can stand in for it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        pool: ChannelPool,
+        methods: Sequence[grpclib.client.UnaryUnaryMethod],
+        breaker: CircuitBreaker,
+        latencies: LatencyHistogram,
+        deadline: Optional[float],
+        retries: int,
+        retry_backoff: float,
+        hedge: Optional[Hedge] = None,
+    ) -> None:
+        """
+        :param name: the full name of the method, for errors and metrics.
+        :param pool: the channels to call the method on.
+        :param methods: the method on each channel of ``pool``, in the same order.
+        :param breaker: the circuit breaker of the method's service.
+        :param latencies: histogram to record the latency of each attempt in.
+        :param deadline: seconds a call may take, across all its attempts. ``None``
+            to wait as long as the service takes.
+        :param retries: the number of times a call that could not reach the service is
+            tried again. Only methods that are safe to repeat should be retried.
+        :param retry_backoff: seconds to back off before the first retry. The backoff
+            doubles with each retry, and a random fraction of it is waited.
+        :param hedge: when to send a second, identical call on another channel if the
+            first is slow. ``None`` to never hedge. Only methods that are safe to
+            repeat should be hedged.
+        """
+        self.name: str = name
+        self.pool: ChannelPool = pool
+        self.methods: Sequence[grpclib.client.UnaryUnaryMethod] = methods
+        self.breaker: CircuitBreaker = breaker
+        self.latencies: LatencyHistogram = latencies
+        self.deadline: Optional[float] = deadline
+        self.retries: int = retries
+        self.retry_backoff: float = retry_backoff
+        self.hedge: Optional[Hedge] = hedge
+
+        self.retried: int = 0
+        """The number of attempts that were retries."""
+
+    async def __call__(self, request: RequestType) -> ResponseType:
+        with tracing.span(f"rpc {self.name}"):
+            return await self._call(request)
+
+    async def _call(self, request: RequestType) -> ResponseType:
+        deadline_at: Optional[float] = None
+        if self.deadline is not None:
+            deadline_at = time.monotonic() + self.deadline
+
+        attempt = 0
+        while True:
+            timeout: Optional[float] = None
+            if deadline_at is not None:
+                timeout = deadline_at - time.monotonic()
+
+            try:
+                if self.hedge is None:
+                    return await self._attempt(request, timeout)
+                return await self._hedged_attempt(self.hedge, request, timeout)
+            except Exception as error:
+                if attempt >= self.retries or not _is_retryable(error):
+                    raise
+                # The failure may have opened the circuit, and a retry would only be
+                # stopped by it.
+                if self.breaker.state is CircuitState.OPEN:
+                    raise
+
+                # Full jitter keeps callers that failed together from retrying
+                # together.
+                delay = random.uniform(0, self.retry_backoff * 2 ** attempt)
+                if deadline_at is not None and time.monotonic() + delay >= deadline_at:
+                    raise
+
+            attempt += 1
+            self.retried += 1
+            await asyncio.sleep(delay)
+
+    async def _attempt(
+        self, request: RequestType, timeout: Optional[float]
+    ) -> ResponseType:
+        self.breaker.check()
+
+        start = time.perf_counter()
+        try:
+            with self.pool.lease() as index, tracing.span("attempt", channel=index):
+                response = await self.methods[index](request, timeout=timeout)
+        except Exception as error:
+            self.latencies.observe(time.perf_counter() - start)
+            self.breaker.record(error)
+            raise
+        except BaseException:
+            # Cancelled, often as the loser of a hedge. The time it ran for says
+            # nothing about how long the call would have taken.
+            self.breaker.abandon()
+            raise
+
+        latency = time.perf_counter() - start
+        self.latencies.observe(latency)
+        if self.hedge is not None:
+            self.hedge.observe(latency)
+
+        self.breaker.record(None)
+        return response
+
+    async def _hedged_attempt(
+        self, hedge: Hedge, request: RequestType, timeout: Optional[float]
+    ) -> ResponseType:
+        """
+        Make an attempt, and if it is slow, race it against a second, identical one.
+        The pool hands the second attempt the least loaded channel, which is never the
+        one the first is waiting on unless every channel is as busy. Calls are not
+        hedged unless the circuit is closed, as the breaker lets a single trial
+        through a circuit that is not.
+        """
+        started = time.monotonic()
+        delay = hedge.start()
+
+        primary = asyncio.ensure_future(self._attempt(request, timeout))
+        attempts = {primary}
+        try:
+            if delay is None:
+                return await primary
+
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if (
+                done
+                or self.breaker.state is not CircuitState.CLOSED
+                or not hedge.spend()
+            ):
+                return await primary
+
+            if timeout is not None:
+                timeout -= time.monotonic() - started
+            attempts.add(asyncio.ensure_future(self._attempt(request, timeout)))
+            tracing.current_span().set_attribute("hedged", True)
+
+            # If the first attempt to finish failed, the other may still succeed.
+            while True:
+                done, _ = await asyncio.wait(
+                    attempts, return_when=asyncio.FIRST_COMPLETED
+                )
+                winner = done.pop()
+                attempts.discard(winner)
+                if winner.exception() is None or not attempts:
+                    break
+
+            if winner is not primary and winner.exception() is None:
+                hedge.won += 1
+            return winner.result()
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+
+class BackendClient:
+    """
+    Calls to the backend services, made through a shared :class:`ChannelPool`. Each
+    service gets its own circuit breaker, and each method its own deadline and latency
+    histogram.
+    """
+
+    def __init__(
+        self,
+        pool: ChannelPool,
+        deadlines: Mapping[str, float],
+        retries: int,
+        retry_backoff: float,
+        breaker_failures: int,
+        breaker_reset: float,
+    ) -> None:
+        """
+        :param pool: the channels to the backend.
+        :param deadlines: seconds each method may take, by method name. Methods not
+            listed have no deadline.
+        :param retries: the number of times idempotent calls are retried.
+        :param retry_backoff: seconds to back off before the first retry.
+        :param breaker_failures: the number of failures in a row that stop calls to a
+            service.
+        :param breaker_reset: seconds to stop calls to a failing service for.
+        """
+        self.pool: ChannelPool = pool
+        self.deadlines: Mapping[str, float] = deadlines
+        self.retries: int = retries
+        self.retry_backoff: float = retry_backoff
+        self.breaker_failures: int = breaker_failures
+        self.breaker_reset: float = breaker_reset
+
+        self.breakers: Dict[str, CircuitBreaker] = dict()
+        """The circuit breaker of each service, by service name."""
+        self.methods: Dict[str, ManagedMethod] = dict()
+        """The managed methods, by full method name."""
+        self.latencies: Dict[str, LatencyHistogram] = dict()
+        """The latency of each attempt, by full method name."""
+
+    def method(
+        self,
+        service: str,
+        name: str,
+        methods: Sequence[grpclib.client.UnaryUnaryMethod],
+        idempotent: bool,
+        hedge: Optional[Hedge] = None,
+    ) -> ManagedMethod:
+        """
+        Manage a method of a backend service.
+
+        :param service: the name of the service.
+        :param name: the name of the method.
+        :param methods: the method on each channel of the pool, in pool order.
+        :param idempotent: whether the method is safe to retry.
+        :param hedge: when to hedge slow calls to the method. Ignored for methods that
+            are not idempotent.
+        """
+        try:
+            breaker = self.breakers[service]
+        except KeyError:
+            breaker = CircuitBreaker(
+                service,
+                failure_threshold=self.breaker_failures,
+                reset_timeout=self.breaker_reset,
+            )
+            self.breakers[service] = breaker
+
+        full_name = f"{service}/{name}"
+        latencies = LatencyHistogram()
+        self.latencies[full_name] = latencies
+
+        managed: ManagedMethod = ManagedMethod(
+            full_name,
+            pool=self.pool,
+            methods=methods,
+            breaker=breaker,
+            latencies=latencies,
+            deadline=self.deadlines.get(name),
+            retries=self.retries if idempotent else 0,
+            retry_backoff=self.retry_backoff,
+            hedge=hedge if idempotent else None,
+        )
+        self.methods[full_name] = managed
+        return managed
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+class ForecasterClient:
+    """The forecasting service's client stub, with calls managed by a BackendClient."""
+
+    def __init__(self, client: BackendClient, hedge: Optional[Hedge] = None) -> None:
+        """
+        :param client: the backend client to make calls with.
+        :param hedge: when to hedge slow forecasts. ``None`` to never hedge.
+        """
+        stubs = [forecaster.StalkForecasterStub(c) for c in client.pool.channels]
+
+        # Forecasts are pure functions of the tickers sent, so they are always safe to
+        # retry.
+        self.ForecastPrices: ManagedMethod[
+            backend.Ticker, backend.Forecast
+        ] = client.method(
+            "StalkForecaster",
+            "ForecastPrices",
+            [stub.ForecastPrices for stub in stubs],
+            idempotent=True,
+            hedge=hedge,
+        )
+        self.ForecastPricesBatch: ManagedMethod[
+            backend.TickerBatch, backend.ForecastBatch
+        ] = client.method(
+            "StalkForecaster",
+            "ForecastPricesBatch",
+            [stub.ForecastPricesBatch for stub in stubs],
+            idempotent=True,
+        )
+
+
+class ReporterClient:
+    """The reporting service's client stub, with calls managed by a BackendClient."""
+
+    def __init__(self, client: BackendClient) -> None:
+        stubs = [reporter.StalkReporterStub(c) for c in client.pool.channels]
+
+        self.ForecastChart: ManagedMethod[
+            backend.ReqForecastChart, backend.RespChart
+        ] = client.method(
+            "StalkReporter",
+            "ForecastChart",
+            [stub.ForecastChart for stub in stubs],
+            idempotent=True,
+        )
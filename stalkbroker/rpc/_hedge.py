@@ -0,0 +1,97 @@
+import collections
+from typing import Deque, Optional
+
+
+class Hedge:
+    """
+    Decides when a slow call is worth sending a second time. A call is hedged once it
+    has taken longer than ``percentile`` of recent calls, as long as hedges have not
+    used up their share of the load.
+    """
+
+    def __init__(
+        self,
+        percentile: float,
+        budget: float,
+        window: int = 1000,
+        min_samples: int = 50,
+        max_burst: float = 10.0,
+    ) -> None:
+        """
+        :param percentile: the share of recent calls, between 0 and 1, a call must be
+            slower than before it is hedged.
+        :param budget: the most extra load hedging may add, as a fraction of the calls
+            made. 0.05 means at most 1 hedge for every 20 calls.
+        :param window: the number of recent latencies the percentile is taken over.
+        :param min_samples: the number of latencies needed before calls are hedged.
+        :param max_burst: the most hedges that can be saved up while calls are fast.
+        """
+        self.percentile: float = percentile
+        self.budget: float = budget
+        self.min_samples: int = min_samples
+        self.max_burst: float = max_burst
+
+        self.calls: int = 0
+        """The number of calls that could have been hedged."""
+        self.fired: int = 0
+        """The number of hedges sent."""
+        self.won: int = 0
+        """The number of hedges that answered before the call they were hedging."""
+
+        self._latencies: Deque[float] = collections.deque(maxlen=window)
+        # The percentile is only recomputed every so often, rather than sorting the
+        # window on every call.
+        self._refresh_every: int = max(window // 50, 1)
+        self._since_refresh: int = 0
+        self._delay: Optional[float] = None
+        self._tokens: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Record the latency of a finished call."""
+        self._latencies.append(seconds)
+        self._since_refresh += 1
+
+        if (
+            len(self._latencies) >= self.min_samples
+            and self._since_refresh >= self._refresh_every
+        ):
+            ordered = sorted(self._latencies)
+            self._delay = ordered[int(self.percentile * (len(ordered) - 1))]
+            self._since_refresh = 0
+
+    def start(self) -> Optional[float]:
+        """
+        Record a new call, and earn its share of the hedging budget.
+
+        :returns: seconds to wait on the call before hedging it. ``None`` if there are
+            not enough recent latencies to go off of yet.
+        """
+        self.calls += 1
+        self._tokens = min(self._tokens + self.budget, self.max_burst)
+        return self._delay
+
+    def spend(self) -> bool:
+        """
+        Take a hedge out of the budget.
+
+        :returns: whether the budget allowed it.
+        """
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        self.fired += 1
+        return True
+
+    @property
+    def fire_rate(self) -> float:
+        """The fraction of calls that were hedged."""
+        if self.calls == 0:
+            return 0.0
+        return self.fired / self.calls
+
+    @property
+    def win_rate(self) -> float:
+        """The fraction of hedges that beat the call they were hedging."""
+        if self.fired == 0:
+            return 0.0
+        return self.won / self.fired
@@ -0,0 +1,123 @@
+import asyncio
+import contextlib
+import time
+from typing import Callable, Iterator, List, Optional
+
+import grpclib.client
+import grpclib.const
+import grpclib.exceptions
+
+
+def is_channel_failure(error: Optional[BaseException]) -> bool:
+    """
+    Whether a failed call means its channel could not reach the backend, rather than
+    that the backend answered with an error or took too long to.
+    """
+    if isinstance(error, grpclib.exceptions.GRPCError):
+        return error.status is grpclib.const.Status.UNAVAILABLE
+    # Timeouts are OSErrors on newer versions of python.
+    if isinstance(error, asyncio.TimeoutError):
+        return False
+    return isinstance(error, (OSError, grpclib.exceptions.StreamTerminatedError))
+
+
+class ChannelPool:
+    """
+    A fixed set of channels to a backend host. Each call goes out on the channel with
+    the fewest calls in flight, so one slow stream can't hold up every request behind
+    it.
+
+    A channel whose last call could not reach the backend is passed over for
+    ``recheck_after`` seconds, then tried again. When every channel is failing, calls
+    go out on them anyway.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], grpclib.client.Channel],
+        size: int,
+        recheck_after: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        :param connect: opens a new channel to the backend.
+        :param size: the number of channels to open.
+        :param recheck_after: seconds to pass over a failing channel for.
+        :param clock: monotonic clock used to time failing channels.
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+
+        self.channels: List[grpclib.client.Channel] = [connect() for _ in range(size)]
+        """The channels in the pool."""
+        self.in_flight: List[int] = [0] * size
+        """The number of calls in flight on each channel."""
+        self.recheck_after: float = recheck_after
+
+        self.failed_at: List[Optional[float]] = [None] * size
+        """
+        When the last call on each channel failed to reach the backend, ``None`` for
+        channels whose last call got through.
+        """
+
+        self._clock: Callable[[], float] = clock
+        # Where the search for the least loaded channel starts, rotated on every call
+        # so ties are spread across the pool.
+        self._next: int = 0
+
+    def is_healthy(self, index: int) -> bool:
+        """Whether the channel at ``index`` should be handed out for calls."""
+        failed_at = self.failed_at[index]
+        return failed_at is None or self._clock() - failed_at >= self.recheck_after
+
+    def acquire(self) -> int:
+        """
+        Pick the least loaded healthy channel for a call. Must be paired with
+        :func:`ChannelPool.release`.
+
+        :returns: the index of the channel in :attr:`ChannelPool.channels`.
+        """
+        size = len(self.channels)
+        start = self._next
+        self._next = (start + 1) % size
+
+        order = [(start + offset) % size for offset in range(size)]
+        healthy = [index for index in order if self.is_healthy(index)]
+        index = min(healthy or order, key=self.in_flight.__getitem__)
+        self.in_flight[index] += 1
+        return index
+
+    def release(self, index: int, error: Optional[BaseException] = None) -> None:
+        """
+        Mark a call on the channel at ``index`` as finished.
+
+        :param index: the channel the call was made on.
+        :param error: the error the call raised, ``None`` if it succeeded.
+        """
+        self.in_flight[index] -= 1
+        if is_channel_failure(error):
+            self.failed_at[index] = self._clock()
+        elif error is None or isinstance(error, grpclib.exceptions.GRPCError):
+            # The backend answered, so the channel is up.
+            self.failed_at[index] = None
+
+    @contextlib.contextmanager
+    def lease(self) -> Iterator[int]:
+        """Hold the least loaded healthy channel for the duration of a call."""
+        index = self.acquire()
+        try:
+            yield index
+        except Exception as error:
+            self.release(index, error)
+            raise
+        except BaseException:
+            # Cancelled, which says nothing about the channel.
+            self.in_flight[index] -= 1
+            raise
+        else:
+            self.release(index)
+
+    def close(self) -> None:
+        """Close every channel in the pool."""
+        for channel in self.channels:
+            channel.close()
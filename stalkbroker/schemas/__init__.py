@@ -1,3 +1,4 @@
 from ._schemas import Ticker, User, Server
+from ._codecs import Codec
 
-(Ticker, User, Server)
+(Ticker, User, Server, Codec)
@@ -0,0 +1,290 @@
+import array
+import dataclasses
+import datetime
+import inspect
+import typing
+import uuid
+import marshmallow
+import pytz
+from typing import Any, Callable, Dict, Generic, List, Mapping, Type, TypeVar
+
+from stalkbroker import models, date_utils
+
+from ._fields import load_phases, dump_phases
+
+
+# Codecs turn documents into models without going through marshmallow. For each
+# model we write out the source of a function that pulls each field out of the
+# document and converts it in a single expression, then compile it once at import time.
+# The marshmallow schemas are still the reference: a codec loads and dumps exactly what
+# its schema does for well-formed documents, and can hand loads to the schema when
+# documents need validating.
+
+_ModelType = TypeVar("_ModelType")
+
+# Marks a field that is missing from a document.
+_MISSING = object()
+
+
+@dataclasses.dataclass(frozen=True)
+class _Handler:
+    """
+    How to convert a value of a type. Each is a python expression, where ``{0}`` is the
+    name of the variable holding the value.
+    """
+
+    decode: str
+    """Converts a document value to a model value."""
+    encode: str
+    """Converts a model value to a document value."""
+
+
+# Mirrors the type handlers of the schemas.
+_TYPE_HANDLERS: Dict[Any, _Handler] = {
+    int: _Handler("{0}", "{0}"),
+    str: _Handler("{0}", "{0}"),
+    bool: _Handler("{0}", "{0}"),
+    # Documents written by the bot hold native uuids, but the schema accepts strings.
+    uuid.UUID: _Handler("({0} if {0}.__class__ is _UUID else _UUID({0}))", "str({0})"),
+    pytz.BaseTzInfo: _Handler("_timezone({0})", "{0}.zone"),
+    datetime.datetime: _Handler("{0}", "{0}"),
+    datetime.date: _Handler("{0}.date()", "_combine({0}, _MIDNIGHT)"),
+    models.Patterns: _Handler("_Patterns({0})", "{0}.value"),
+    # Arrays only hold ticker phases, which are stored as a map of the known prices.
+    array.array: _Handler("_load_phases({0})", "_dump_phases({0})"),
+}
+
+# Mongo documents have string keys, so keys are converted back when decoding.
+_KEY_HANDLERS: Dict[Any, _Handler] = {
+    int: _Handler("int({0})", "{0}"),
+    str: _Handler("{0}", "{0}"),
+}
+
+# The names the handlers use.
+_NAMESPACE: Dict[str, Any] = {
+    "_UUID": uuid.UUID,
+    "_timezone": date_utils.TIMEZONES.get,
+    "_combine": datetime.datetime.combine,
+    "_MIDNIGHT": datetime.time(),
+    "_Patterns": models.Patterns,
+    "_load_phases": load_phases,
+    "_dump_phases": dump_phases,
+    "_MISSING": _MISSING,
+}
+
+
+def _expression(hint: Any, value: str, direction: str, depth: int = 0) -> str:
+    """
+    The expression converting ``value``, of type ``hint``.
+
+    :param hint: the type of the value.
+    :param value: the name of the variable holding the value.
+    :param direction: ``"decode"`` or ``"encode"``.
+    :param depth: how deeply nested in containers the value is, to name the variables
+        of comprehensions.
+    """
+    origin = typing.get_origin(hint)
+    args = typing.get_args(hint)
+
+    if origin is typing.Union and type(None) in args:
+        (inner,) = [arg for arg in args if arg is not type(None)]
+        converted = _expression(inner, value, direction, depth)
+        if converted == value:
+            return value
+        return f"(None if {value} is None else {converted})"
+
+    if origin is list:
+        item = f"_item{depth}"
+        converted = _expression(args[0], item, direction, depth + 1)
+        if converted == item:
+            return f"list({value})"
+        return f"[{converted} for {item} in {value}]"
+
+    if origin is dict:
+        key, item = f"_key{depth}", f"_item{depth}"
+        key_converted = getattr(_KEY_HANDLERS[args[0]], direction).format(key)
+        converted = _expression(args[1], item, direction, depth + 1)
+        if (key_converted, converted) == (key, item):
+            return f"dict({value})"
+        return (
+            f"{{{key_converted}: {converted} for {key}, {item} in {value}.items()}}"
+        )
+
+    try:
+        handler = _TYPE_HANDLERS[hint]
+    except KeyError:
+        raise TypeError(f"no codec handler for {hint!r}")
+    return str(getattr(handler, direction).format(value))
+
+
+def _compile(
+    source: str, name: str, model: Type[Any], namespace: Dict[str, Any]
+) -> Callable:
+    code = compile(source, f"<codec {model.__name__}.{name}>", "exec")
+    exec(code, namespace)
+    return namespace[name]
+
+
+@dataclasses.dataclass(frozen=True)
+class _Field:
+    """A field of a model, as far as codecs are concerned."""
+
+    name: str
+    hint: Any
+    init: bool
+    """Whether the field is passed to the model's constructor."""
+    default: Any = _MISSING
+    default_factory: Any = _MISSING
+
+
+def _model_fields(model: Type[Any]) -> List[_Field]:
+    """
+    The fields of ``model``. For dataclasses these are the dataclass fields. Other
+    models, like slotted classes, have a field for each class annotation, which is
+    initialized by the constructor argument of the same name if there is one.
+    """
+    hints = typing.get_type_hints(model)
+
+    if dataclasses.is_dataclass(model):
+        return [
+            _Field(
+                name=field.name,
+                hint=hints[field.name],
+                init=field.init,
+                default=(
+                    _MISSING
+                    if field.default is dataclasses.MISSING
+                    else field.default
+                ),
+                default_factory=(
+                    _MISSING
+                    if field.default_factory is dataclasses.MISSING  # type: ignore
+                    else field.default_factory  # type: ignore
+                ),
+            )
+            for field in dataclasses.fields(model)
+        ]
+
+    parameters = inspect.signature(model).parameters
+    fields: List[_Field] = list()
+    for name, hint in hints.items():
+        parameter = parameters.get(name)
+        if parameter is None:
+            fields.append(_Field(name, hint, init=False))
+        elif parameter.default is inspect.Parameter.empty:
+            fields.append(_Field(name, hint, init=True))
+        else:
+            fields.append(_Field(name, hint, init=True, default=parameter.default))
+    return fields
+
+
+def _decoder_source(model: Type[Any], namespace: Dict[str, Any]) -> str:
+    """
+    Write the function decoding documents of ``model``, adding the defaults it uses to
+    ``namespace``.
+    """
+    lines = ["def decode(document):"]
+    arguments: List[str] = list()
+    post_init: List[str] = list()
+
+    for field in _model_fields(model):
+        name = field.name
+        converted = _expression(field.hint, "value", "decode")
+
+        if not field.init:
+            # Fields set up by the model itself are only overwritten when stored.
+            post_init.append(f"    value = document.get({name!r}, _MISSING)")
+            post_init.append("    if value is not _MISSING:")
+            post_init.append(f"        model.{name} = {converted}")
+            continue
+
+        lines.append(f"    value = document.get({name!r}, _MISSING)")
+
+        if field.default is not _MISSING:
+            namespace[f"_default_{name}"] = field.default
+            default = f"_default_{name}"
+        elif field.default_factory is not _MISSING:
+            namespace[f"_factory_{name}"] = field.default_factory
+            default = f"_factory_{name}()"
+        else:
+            lines.append("    if value is _MISSING:")
+            lines.append(f"        raise _missing({name!r})")
+            default = ""
+
+        if default:
+            lines.append(
+                f"    field_{name} = {default} if value is _MISSING else {converted}"
+            )
+        else:
+            lines.append(f"    field_{name} = {converted}")
+        arguments.append(f"{name}=field_{name}")
+
+    lines.append(f"    model = _model({', '.join(arguments)})")
+    lines.extend(post_init)
+    lines.append("    return model")
+    return "\n".join(lines) + "\n"
+
+
+def _encoder_source(model: Type[Any]) -> str:
+    """Write the function encoding ``model`` as a document."""
+    lines = ["def encode(model):", "    return {"]
+    for field in _model_fields(model):
+        converted = _expression(field.hint, f"model.{field.name}", "encode")
+        lines.append(f"        {field.name!r}: {converted},")
+    lines.append("    }")
+    return "\n".join(lines) + "\n"
+
+
+def _missing_field(name: str) -> marshmallow.ValidationError:
+    return marshmallow.ValidationError({name: ["Missing data for required field."]})
+
+
+class Codec(Generic[_ModelType]):
+    """
+    Loads and dumps a model with functions compiled for it, falling back to its
+    marshmallow schema when asked to validate.
+
+    Decoding trusts the document to be one the bot wrote: values are converted, not
+    checked, and fields the model does not have are ignored. Missing fields take the
+    model's defaults, except fields without a default, which raise
+    :class:`marshmallow.ValidationError` as the schema would.
+    """
+
+    def __init__(self, model: Type[_ModelType], schema: marshmallow.Schema) -> None:
+        """
+        :param model: the dataclass or slotted class to load and dump.
+        :param schema: the schema of ``model``, used to validate documents.
+        """
+        self.model: Type[_ModelType] = model
+        self.schema: marshmallow.Schema = schema
+
+        namespace = dict(_NAMESPACE, _model=model, _missing=_missing_field)
+        decoder_source = _decoder_source(model, namespace)
+        encoder_source = _encoder_source(model)
+
+        self.decode: Callable[[Mapping[str, Any]], _ModelType] = _compile(
+            decoder_source, "decode", model, namespace
+        )
+        """Loads a document as a model."""
+        self.encode: Callable[[_ModelType], Dict[str, Any]] = _compile(
+            encoder_source, "encode", model, namespace
+        )
+        """Dumps a model as a document."""
+        self.source: str = decoder_source + "\n\n" + encoder_source
+        """The source of the compiled functions, for debugging."""
+
+    def load(self, document: Mapping[str, Any], validate: bool = False) -> _ModelType:
+        """
+        Load a document as a model.
+
+        :param document: the document to load.
+        :param validate: validate the document with the schema instead.
+
+        :raises marshmallow.ValidationError: if a field without a default is missing,
+            or the document fails validation.
+        """
+        if validate:
+            loaded = self.schema.load(document)
+            assert isinstance(loaded, self.model)
+            return loaded
+        return self.decode(document)
@@ -1,10 +1,16 @@
+import array
+import logging
 import marshmallow
 import datetime
 import pytz
-from typing import Optional, Mapping, Any
+from typing import Optional, Mapping, Any, Dict
 
 
-from stalkbroker import models
+from stalkbroker import models, date_utils
+
+
+# The phases of a ticker with no prices.
+_NO_PRICES = array.array("h", [models.UNKNOWN_PRICE] * 12)
 
 
 class TzField(marshmallow.fields.Field):
@@ -25,7 +31,7 @@ class TzField(marshmallow.fields.Field):
         data: Optional[Mapping[str, Any]],
         **kwargs: Any,
     ) -> datetime.tzinfo:
-        return pytz.timezone(value)
+        return date_utils.TIMEZONES.get(value)
 
 
 class DateField(marshmallow.fields.Field):
@@ -50,6 +56,27 @@ class DateField(marshmallow.fields.Field):
         return value.date()
 
 
+class DateTimeField(marshmallow.fields.Field):
+    """
+    Used to serialize and deserialize datetime.datetime. Mongo stores datetimes
+    natively, so values are passed through as-is rather than converted to strings.
+    """
+
+    def _serialize(
+        self, value: datetime.datetime, attr: str, obj: Any, **kwargs: Any,
+    ) -> datetime.datetime:
+        return value
+
+    def _deserialize(
+        self,
+        value: datetime.datetime,
+        attr: Optional[str],
+        data: Optional[Mapping[str, Any]],
+        **kwargs: Any,
+    ) -> datetime.datetime:
+        return value
+
+
 class PatternsField(marshmallow.fields.Field):
     """Used to serialize and deserialize the Pattern enum."""
 
@@ -69,3 +96,61 @@ class PatternsField(marshmallow.fields.Field):
             return value
 
         return models.Patterns(value)
+
+
+def load_phases(stored: Mapping[str, int]) -> array.array:
+    """
+    Load the prices of stored phases, keyed by phase index, into a ticker array.
+    Prices a ticker cannot hold, which older versions of the bot would save, are logged
+    and left unknown rather than making the whole ticker unreadable.
+    """
+    phases = array.array("h", _NO_PRICES)
+    for phase, price in stored.items():
+        if 0 <= price <= models.MAX_PRICE:
+            phases[int(phase)] = price
+        else:
+            logging.warning(
+                f"stored price {price} for phase {phase} is out of range, loading it"
+                f" as unknown"
+            )
+    return phases
+
+
+def dump_phases(phases: array.array) -> Dict[int, int]:
+    """Dump the known prices of a ticker array, keyed by phase index."""
+    return {
+        phase: price
+        for phase, price in enumerate(phases)
+        if price != models.UNKNOWN_PRICE
+    }
+
+
+class PhasesField(marshmallow.fields.Field):
+    """
+    Used to serialize and deserialize ticker phases. Only known prices are stored, as a
+    map of phase index to price.
+    """
+
+    _PRICES = marshmallow.fields.Dict(
+        keys=marshmallow.fields.Integer(
+            validate=marshmallow.validate.Range(min=0, max=11)
+        ),
+        values=marshmallow.fields.Integer(
+            validate=marshmallow.validate.Range(min=0, max=models.MAX_PRICE)
+        ),
+    )
+
+    def _serialize(
+        self, value: array.array, attr: Optional[str], obj: Any, **kwargs: Any,
+    ) -> Dict[int, int]:
+        return dump_phases(value)
+
+    def _deserialize(
+        self,
+        value: Mapping[str, int],
+        attr: Optional[str],
+        data: Optional[Mapping[str, Any]],
+        **kwargs: Any,
+    ) -> array.array:
+        prices = self._PRICES.deserialize(value, attr, data, **kwargs)
+        return load_phases(prices)
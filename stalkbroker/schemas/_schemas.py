@@ -6,7 +6,7 @@ from typing import Any, Dict, Type, Union
 
 from stalkbroker import models
 
-from ._fields import TzField, DateField, PatternsField
+from ._fields import TzField, DateField, DateTimeField, PatternsField, PhasesField
 
 
 # These schemas are created using grahamcracker, which can automatically generate
@@ -16,6 +16,9 @@ _HandlerType = Union[marshmallow.fields.Field, marshmallow.Schema]
 _TYPE_HANDLERS: Dict[Type[Any], Type[_HandlerType]] = dict()
 
 _TYPE_HANDLERS[pytz.BaseTzInfo] = TzField
+# datetime.datetime is a subclass of datetime.date, so it needs to be registered first
+# or it will be handled (and truncated) by DateField.
+_TYPE_HANDLERS[datetime.datetime] = DateTimeField
 _TYPE_HANDLERS[datetime.date] = DateField
 _TYPE_HANDLERS[models.Patterns] = PatternsField
 
@@ -34,8 +37,25 @@ class User(grahamcracker.DataSchema[models.User]):
     pass
 
 
-@grahamcracker.schema_for(models.Ticker, type_handlers=_TYPE_HANDLERS)
-class Ticker(grahamcracker.DataSchema[models.Ticker]):
-    """Schema for serializing and deserializing user data"""
-
-    pass
+class Ticker(marshmallow.Schema):
+    """
+    Schema for serializing and deserializing ticker data. Tickers are not dataclasses,
+    so unlike the other schemas this one is written out rather than generated.
+    """
+
+    # NOTE: defaults are given with ``missing``, the only spelling the marshmallow we
+    # pin (3.7.1) has. It becomes ``load_default`` once we are on 3.13 or later.
+    user_id = marshmallow.fields.UUID(required=True)
+    week_of = DateField(required=True)
+    purchase_price = marshmallow.fields.Integer(allow_none=True, missing=None)
+    phases = PhasesField()
+    final_pattern = PatternsField(allow_none=True, missing=models.Patterns.UNKNOWN)
+    version = marshmallow.fields.Integer(missing=0)
+
+    @marshmallow.post_load
+    def _make_ticker(self, data: Dict[str, Any], **kwargs: Any) -> models.Ticker:
+        phases = data.pop("phases", None)
+        ticker = models.Ticker(**data)
+        if phases is not None:
+            ticker.phases = phases
+        return ticker
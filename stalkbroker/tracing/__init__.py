@@ -0,0 +1,26 @@
+from ._span import Span, AttributeValue, NON_RECORDING_SPAN
+from ._export import SpanExporter, JSONLinesExporter, OTLPExporter, otlp_request
+from ._tracer import (
+    Tracer,
+    TRACER,
+    current_span,
+    span,
+    traced,
+    trace_methods,
+)
+
+(
+    Span,
+    AttributeValue,
+    NON_RECORDING_SPAN,
+    SpanExporter,
+    JSONLinesExporter,
+    OTLPExporter,
+    otlp_request,
+    Tracer,
+    TRACER,
+    current_span,
+    span,
+    traced,
+    trace_methods,
+)
@@ -0,0 +1,225 @@
+import aiohttp
+import asyncio
+import json
+import logging
+import pathlib
+import queue
+import threading
+from typing import Any, Dict, IO, List, Optional, Protocol, Sequence, Set, Union
+
+from ._span import Span, AttributeValue
+
+
+class SpanExporter(Protocol):
+    """Sends the spans of finished traces somewhere they can be looked at."""
+
+    def export(self, spans: Sequence[Span]) -> None:
+        """
+        Send the spans of a finished trace. Called on the event loop, so must not
+        wait on anything slow.
+        """
+        ...
+
+
+class JSONLinesExporter:
+    """
+    Appends spans to a local file, one JSON object per line. Spans are written by a
+    background thread so the event loop never waits on the disk, and traces are dropped
+    rather than queued while too many are waiting to be written.
+    """
+
+    def __init__(
+        self, path: Union[str, pathlib.Path], max_pending: int = 1024
+    ) -> None:
+        """
+        :param path: the file to append to. Created if it does not exist.
+        :param max_pending: the most traces that may be waiting to be written.
+        """
+        self.path: pathlib.Path = pathlib.Path(path)
+
+        self.dropped: int = 0
+        """The number of spans dropped because too many traces were waiting."""
+
+        self._queue: "queue.Queue[Optional[List[Dict[str, Any]]]]" = queue.Queue(
+            maxsize=max_pending
+        )
+        self._writer: Optional[threading.Thread] = None
+
+    def export(self, spans: Sequence[Span]) -> None:
+        if self._writer is None:
+            # A daemon, so a bot that exits without closing the exporter isn't held
+            # up by it.
+            self._writer = threading.Thread(
+                target=self._write, name="trace-writer", daemon=True
+            )
+            self._writer.start()
+
+        try:
+            self._queue.put_nowait([span.to_dict() for span in spans])
+        except queue.Full:
+            self.dropped += len(spans)
+
+    def _write(self) -> None:
+        try:
+            file: Optional[IO[str]] = self.path.open("a")
+        except OSError as error:
+            # Traces are still taken off the queue, so closing doesn't wait forever.
+            logging.warning(f"could not open {self.path} for spans: {error!r}")
+            file = None
+
+        while True:
+            trace = self._queue.get()
+            if trace is None:
+                break
+            if file is None:
+                continue
+            try:
+                for span in trace:
+                    file.write(json.dumps(span) + "\n")
+                file.flush()
+            except Exception as error:
+                logging.warning(f"could not write spans to {self.path}: {error!r}")
+
+        if file is not None:
+            file.close()
+
+    def close(self) -> None:
+        """Write the spans still waiting, then close the file."""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+
+def _otlp_value(value: AttributeValue) -> Dict[str, Any]:
+    # bools are ints, so have to be checked first.
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    otlp: Dict[str, Any] = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        # SPAN_KIND_INTERNAL
+        "kind": 1,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [
+            {"key": key, "value": _otlp_value(value)}
+            for key, value in span.attributes.items()
+        ],
+    }
+    if span.parent_id is not None:
+        otlp["parentSpanId"] = span.parent_id
+    if span.error is not None:
+        # STATUS_CODE_ERROR
+        otlp["status"] = {"code": 2, "message": span.error}
+    return otlp
+
+
+def otlp_request(spans: Sequence[Span], service_name: str) -> Dict[str, Any]:
+    """
+    Encode spans as an OTLP export request, in the JSON encoding used over HTTP.
+
+    :param spans: the spans to encode.
+    :param service_name: the service the spans are reported as coming from.
+    """
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {
+                            "key": "service.name",
+                            "value": {"stringValue": service_name},
+                        }
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "stalkbroker"},
+                        "spans": [_otlp_span(span) for span in spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class OTLPExporter:
+    """
+    Posts spans to an OpenTelemetry collector, or anything else that accepts OTLP over
+    HTTP in the JSON encoding. Each trace is posted in the background, and traces are
+    dropped rather than queued while too many posts are outstanding, so a slow
+    collector cannot back up the bot.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        service_name: str = "stalkbroker",
+        max_pending: int = 16,
+        timeout: float = 5.0,
+    ) -> None:
+        """
+        :param endpoint: the URL to post spans to, like
+            ``http://localhost:4318/v1/traces``.
+        :param service_name: the service the spans are reported as coming from.
+        :param max_pending: the most posts that may be outstanding at once.
+        :param timeout: seconds a post may take.
+        """
+        self.endpoint: str = endpoint
+        self.service_name: str = service_name
+        self.max_pending: int = max_pending
+        self.timeout: float = timeout
+
+        self.exported: int = 0
+        """The number of spans the collector accepted."""
+        self.failed: int = 0
+        """The number of spans lost to failed posts."""
+        self.dropped: int = 0
+        """The number of spans dropped because too many posts were outstanding."""
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._pending: Set["asyncio.Future[None]"] = set()
+
+    def export(self, spans: Sequence[Span]) -> None:
+        if len(self._pending) >= self.max_pending:
+            self.dropped += len(spans)
+            return
+
+        task = asyncio.ensure_future(self._post(list(spans)))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _post(self, spans: List[Span]) -> None:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+
+        try:
+            async with self._session.post(
+                self.endpoint, json=otlp_request(spans, self.service_name)
+            ) as response:
+                response.raise_for_status()
+        except Exception as error:
+            self.failed += len(spans)
+            logging.warning(f"could not export spans to {self.endpoint}: {error!r}")
+        else:
+            self.exported += len(spans)
+
+    async def close(self) -> None:
+        """Wait for outstanding posts, then close the connection to the collector."""
+        if self._pending:
+            await asyncio.gather(*self._pending)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -0,0 +1,117 @@
+import random
+import time
+from typing import Any, Dict, List, Optional, Union
+
+
+AttributeValue = Union[str, int, float, bool]
+"""The value of a span attribute."""
+
+
+def new_trace_id() -> str:
+    """A random 128-bit trace id, as hex."""
+    return f"{random.getrandbits(128):032x}"
+
+
+def new_span_id() -> str:
+    """A random 64-bit span id, as hex."""
+    return f"{random.getrandbits(64):016x}"
+
+
+class Span:
+    """A timed operation, and the operation it was part of."""
+
+    recording: bool = True
+    """Whether the span is part of a sampled trace and will be exported."""
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        attributes: Dict[str, AttributeValue],
+        trace: List["Span"],
+    ) -> None:
+        """
+        :param name: what the span is timing.
+        :param trace_id: the id of the trace the span belongs to.
+        :param parent_id: the id of the span this one is part of. ``None`` for the root
+            span of a trace.
+        :param attributes: details of the operation.
+        :param trace: the finished spans of the trace, which this span is added to
+            when it finishes.
+        """
+        self.name: str = name
+        self.trace_id: str = trace_id
+        self.span_id: str = new_span_id()
+        self.parent_id: Optional[str] = parent_id
+        self.attributes: Dict[str, AttributeValue] = attributes
+
+        self.start_ns: int = time.time_ns()
+        """When the span started, in nanoseconds since the epoch."""
+        self.end_ns: Optional[int] = None
+        """When the span finished, in nanoseconds since the epoch."""
+        self.error: Optional[str] = None
+        """The error the operation failed with, if it failed."""
+
+        self._trace: List[Span] = trace
+
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        """Record a detail of the operation."""
+        if self.recording:
+            self.attributes[key] = value
+
+    def child(self, name: str, attributes: Dict[str, AttributeValue]) -> "Span":
+        """Start a span for an operation that is part of this one."""
+        return Span(name, self.trace_id, self.span_id, attributes, self._trace)
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """
+        End the span.
+
+        :param error: the error the operation failed with, if it failed.
+        """
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self._trace.append(self)
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Seconds the span took, once it has finished."""
+        if self.end_ns is None:
+            return None
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The span as a JSON-serializable dict."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NonRecordingSpan(Span):
+    recording = False
+
+    def __init__(self) -> None:
+        super().__init__("", "0" * 32, None, dict(), list())
+
+    def child(self, name: str, attributes: Dict[str, AttributeValue]) -> "Span":
+        return self
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+
+NON_RECORDING_SPAN: Span = _NonRecordingSpan()
+"""
+Stands in for spans of traces that were not sampled, so callers can set attributes
+without checking whether they are being traced.
+"""
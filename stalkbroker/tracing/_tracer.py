@@ -0,0 +1,164 @@
+import contextlib
+import contextvars
+import functools
+import inspect
+import logging
+import random
+from typing import Any, Callable, Collection, Iterator, List, Optional, TypeVar
+
+from ._span import Span, AttributeValue, NON_RECORDING_SPAN, new_trace_id
+from ._export import SpanExporter
+
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+_C = TypeVar("_C", bound=type)
+
+_CURRENT_SPAN: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "stalkbroker_current_span", default=None
+)
+
+
+def current_span() -> Span:
+    """The span of the running operation, or a non-recording one if not tracing."""
+    span = _CURRENT_SPAN.get()
+    return span if span is not None else NON_RECORDING_SPAN
+
+
+@contextlib.contextmanager
+def _activate(span: Span) -> Iterator[Span]:
+    # Tasks copy the context they are created in, so operations started from within
+    # the span become its children, even when they run concurrently.
+    token = _CURRENT_SPAN.set(span)
+    try:
+        yield span
+    except BaseException as error:
+        span.finish(error)
+        raise
+    else:
+        span.finish()
+    finally:
+        _CURRENT_SPAN.reset(token)
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: AttributeValue) -> Iterator[Span]:
+    """
+    Time an operation as part of the running trace. Does nothing outside of a sampled
+    trace.
+
+    :param name: what is being timed.
+    :param attributes: details of the operation.
+    """
+    child = current_span().child(name, attributes)
+    if not child.recording:
+        yield child
+        return
+
+    with _activate(child):
+        yield child
+
+
+def traced(name: str) -> Callable[[_F], _F]:
+    """
+    Decorate a coroutine function to time each call as a span of the running trace.
+
+    :param name: the name of the span.
+    """
+
+    def decorator(func: _F) -> _F:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+def trace_methods(prefix: str, exclude: Collection[str] = ()) -> Callable[[_C], _C]:
+    """
+    Decorate a class to time each call of its public coroutine methods as a span,
+    named for the method.
+
+    :param prefix: put before method names, to tell the spans of the class apart.
+    :param exclude: methods not to trace, like ones that run for the life of the bot.
+    """
+
+    def decorator(cls: _C) -> _C:
+        for name, attr in list(vars(cls).items()):
+            if name.startswith("_") or name in exclude:
+                continue
+            if not inspect.iscoroutinefunction(attr):
+                continue
+            setattr(cls, name, traced(f"{prefix} {name}")(attr))
+        return cls
+
+    return decorator
+
+
+class Tracer:
+    """
+    Starts traces, samples them and hands the spans of finished traces to an exporter.
+    """
+
+    def __init__(
+        self,
+        exporter: Optional[SpanExporter] = None,
+        sample_rate: float = 1.0,
+        random: Callable[[], float] = random.random,
+    ) -> None:
+        """
+        :param exporter: where finished traces are sent. ``None`` to not trace.
+        :param sample_rate: the fraction of traces to record. Unsampled traces cost
+            little more than a context variable lookup per span.
+        :param random: returns a random number in ``[0, 1)`` to sample traces with.
+        """
+        self.exporter: Optional[SpanExporter] = exporter
+        self.sample_rate: float = sample_rate
+
+        self.sampled: int = 0
+        """The number of traces recorded."""
+        self.unsampled: int = 0
+        """The number of traces skipped by sampling."""
+
+        self._random: Callable[[], float] = random
+
+    @contextlib.contextmanager
+    def trace(self, name: str, **attributes: AttributeValue) -> Iterator[Span]:
+        """
+        Start a trace, timing an operation like a command invocation as its root span.
+
+        :param name: what is being timed.
+        :param attributes: details of the operation.
+
+        The trace is exported when its root span finishes. Spans still running at that
+        point, like work shared with a later command, are left out.
+        """
+        exporter = self.exporter
+        if exporter is None or self._random() >= self.sample_rate:
+            self.unsampled += 1
+            token = _CURRENT_SPAN.set(NON_RECORDING_SPAN)
+            try:
+                yield NON_RECORDING_SPAN
+            finally:
+                _CURRENT_SPAN.reset(token)
+            return
+
+        self.sampled += 1
+        spans: List[Span] = list()
+        root = Span(name, new_trace_id(), None, attributes, spans)
+        try:
+            with _activate(root):
+                yield root
+        finally:
+            try:
+                exporter.export(spans)
+            except Exception as error:
+                logging.warning(f"could not export trace: {error!r}")
+
+
+TRACER: Tracer = Tracer()
+"""
+The tracer commands are traced with. Does not trace until it is given an exporter.
+"""
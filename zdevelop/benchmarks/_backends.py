@@ -0,0 +1,75 @@
+"""
+In-process gRPC servers standing in for the forecasting and reporting services.
+"""
+import asyncio
+import contextlib
+import grpclib.server
+from typing import AsyncIterator, Tuple
+
+from protogen.stalk_proto import models_pb2 as backend
+from protogen.stalk_proto import reporter_grpc as reporter
+from stalkbroker import forecasting
+
+
+# Enough of a PNG for discord.py to attach it to a message.
+_STUB_CHART = b"\x89PNG\r\n\x1a\n" + bytes(1024)
+
+
+class StubReporterServer(reporter.StalkReporterBase):
+    """
+    Serves the reporting service's API. Answers with a fixed image unless asked to
+    render real charts, which needs matplotlib.
+    """
+
+    def __init__(self, render: bool = False) -> None:
+        """
+        :param render: whether to render charts with
+            :func:`stalkbroker.charting.render_forecast_chart`.
+        """
+        self.render: bool = render
+        self.calls: int = 0
+        """The number of charts served."""
+
+    async def ForecastChart(
+        self,
+        stream: "grpclib.server.Stream[backend.ReqForecastChart, backend.RespChart]",
+    ) -> None:
+        request = await stream.recv_message()
+        assert request is not None
+        self.calls += 1
+
+        if not self.render:
+            await stream.send_message(backend.RespChart(chart=_STUB_CHART))
+            return
+
+        # Imported here so benchmarks with stub charts do not need matplotlib.
+        from stalkbroker import charting
+
+        loop = asyncio.get_event_loop()
+        response = await loop.run_in_executor(
+            None, charting.render_forecast_chart, request.SerializeToString()
+        )
+        await stream.send_message(backend.RespChart.FromString(response))
+
+
+@contextlib.asynccontextmanager
+async def serve_backends(
+    path: str, batching: bool = True, render_charts: bool = False,
+) -> AsyncIterator[Tuple[forecasting.LocalForecastServer, StubReporterServer]]:
+    """
+    Serve both backend services on a unix socket for the length of the context.
+
+    :param path: the path of the socket.
+    :param batching: whether the forecaster serves batches.
+    :param render_charts: whether the reporter renders real charts.
+    """
+    forecaster = forecasting.LocalForecastServer(batching=batching)
+    charts = StubReporterServer(render=render_charts)
+
+    server = grpclib.server.Server([forecaster, charts])
+    await server.start(path=path)
+    try:
+        yield forecaster, charts
+    finally:
+        server.close()
+        await server.wait_closed()
@@ -0,0 +1,81 @@
+"""
+Points the bot at in-process stand-ins for discord, mongo and the backend services, so
+benchmarks and load tests can drive its command handlers.
+"""
+import functools
+import grpclib.client
+import motor.motor_asyncio
+from typing import Any, List, Optional
+
+from stalkbroker import bot, forecasting, rpc
+from stalkbroker.bot import _consts
+from stalkbroker.db._connection import _Collections
+
+from zdevelop.tests._fakes import setup_fake_db
+
+
+# The database used when running against a real mongod. Dropped before and after each
+# run.
+MONGO_DATABASE = "stalkbroker_benchmark"
+
+
+async def setup_db(
+    mongo_uri: Optional[str], latency: float
+) -> Optional[motor.motor_asyncio.AsyncIOMotorClient]:
+    """
+    Point the bot at a fresh database: the :data:`MONGO_DATABASE` database of the
+    mongod at ``mongo_uri`` if given, otherwise an in-process stand-in whose operations
+    take ``latency`` seconds.
+
+    :returns: the motor client if a mongod is used, so the database can be dropped.
+    """
+    if mongo_uri is None:
+        await setup_fake_db(latency)
+        return None
+
+    client = motor.motor_asyncio.AsyncIOMotorClient(mongo_uri)
+    await client.drop_database(MONGO_DATABASE)
+    database: Any = client[MONGO_DATABASE]
+
+    bot.STALKBROKER.db.collections = _Collections(database)
+    await bot.STALKBROKER.db.collections.make_indexes()
+    return client
+
+
+def setup_backends(socket_path: str, batching: bool) -> rpc.BackendClient:
+    """
+    Point the bot's backend clients at the servers listening on ``socket_path``.
+
+    :param socket_path: where :func:`serve_backends` is serving.
+    :param batching: whether concurrent forecasts are sent in batches.
+    """
+    client = rpc.BackendClient(
+        rpc.ChannelPool(
+            functools.partial(grpclib.client.Channel, path=socket_path),
+            size=_consts.BACKEND_CHANNELS,
+        ),
+        deadlines=_consts.BACKEND_DEADLINES,
+        retries=_consts.BACKEND_RETRIES,
+        retry_backoff=_consts.BACKEND_RETRY_BACKOFF,
+        breaker_failures=_consts.BACKEND_BREAKER_FAILURES,
+        breaker_reset=_consts.BACKEND_BREAKER_RESET,
+    )
+
+    stalkbroker = bot.STALKBROKER
+    stalkbroker.backend_client = client
+    stalkbroker.client_forecaster = rpc.ForecasterClient(client)
+    if batching:
+        stalkbroker.client_forecaster = forecasting.BatchingForecaster(
+            rpc.ForecasterClient(client),
+            window=_consts.FORECAST_BATCH_WINDOW,
+            max_size=_consts.FORECAST_BATCH_SIZE,
+        )
+    stalkbroker.client_reporter = rpc.ReporterClient(client)
+    return client
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """The value ``fraction`` of ``values`` are at or below, by nearest rank."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
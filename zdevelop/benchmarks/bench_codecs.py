@@ -0,0 +1,96 @@
+"""
+Measures what it costs to load a document as a model, with the compiled codecs the
+database adapter uses and with the marshmallow schemas they replace.
+
+Run from the repo root:
+
+    python -m zdevelop.benchmarks.bench_codecs --number 20000
+"""
+import argparse
+import datetime
+import timeit
+import uuid
+import bson
+from typing import Any, Dict, List, Mapping, Tuple
+
+from stalkbroker import schemas
+from stalkbroker.db._connection import CODEC_SERVER, CODEC_TICKER, CODEC_USER
+
+
+def _documents() -> List[Tuple[schemas.Codec, Mapping[str, Any]]]:
+    """Documents as the bot stores them, with the codec that loads each."""
+    server: Dict[str, Any] = {
+        "_id": bson.ObjectId(),
+        "id": uuid.uuid4(),
+        "discord_id": 700000000000000001,
+        "bulletin_channel": 700000000000000002,
+        "bulletin_minimum": 200,
+        "heat_minimum": 300,
+        "sync_member_count": 250,
+        "sync_member_hash": "5d41402abc4b2a76b9719d911017c592",
+        "sync_time": datetime.datetime(2020, 4, 8, 10, 30),
+    }
+    user: Dict[str, Any] = {
+        "_id": bson.ObjectId(),
+        "id": uuid.uuid4(),
+        "discord_id": 700000000000000003,
+        "timezone": "US/Pacific",
+        "servers": [700000000000000001, 700000000000000004],
+        "notify_on_bulletin": True,
+    }
+    ticker: Dict[str, Any] = {
+        "_id": bson.ObjectId(),
+        "user_id": uuid.uuid4(),
+        "week_of": datetime.datetime(2020, 4, 5),
+        "purchase_price": 98,
+        "phases": {str(phase): 90 - phase * 4 for phase in range(8)},
+        "final_pattern": "DECREASING",
+        "version": 9,
+    }
+    return [(CODEC_SERVER, server), (CODEC_USER, user), (CODEC_TICKER, ticker)]
+
+
+def run(number: int, repeat: int) -> List[Dict[str, Any]]:
+    """
+    Time loading each kind of document ``number`` times, best of ``repeat``.
+
+    :returns: microseconds per document for each model and loader.
+    """
+    results: List[Dict[str, Any]] = list()
+    for codec, document in _documents():
+        # Both loaders have to agree for the comparison to mean anything.
+        assert codec.load(document) == codec.load(document, validate=True)
+
+        timings: Dict[str, Any] = {"model": codec.model.__name__}
+        for loader, validate in (("codec", False), ("schema", True)):
+            seconds = min(
+                timeit.repeat(
+                    lambda: codec.load(document, validate),
+                    number=number,
+                    repeat=repeat,
+                )
+            )
+            timings[loader] = seconds / number * 1e6
+        results.append(timings)
+    return results
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--number", type=int, default=10000, help="loads per timing run"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs per loader")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = _parse_args()
+    print(f"{'model':<8} {'codec us':>9} {'schema us':>10} {'speedup':>8}")
+    for timing in run(arguments.number, arguments.repeat):
+        print(
+            f"{timing['model']:<8} {timing['codec']:>9.2f} {timing['schema']:>10.2f} "
+            f"{timing['schema'] / timing['codec']:>7.1f}x"
+        )
@@ -0,0 +1,370 @@
+"""
+Benchmarks the bot's commands end to end without discord, mongo or the backend
+services. Commands are invoked with synthetic contexts against an in-process mongo
+stand-in (or a local mongod), and in-process forecasting and reporting servers. Reports
+throughput and latency percentiles for each scenario at a given concurrency.
+
+Run from the repo root:
+
+    python -m zdevelop.benchmarks.bench_commands --concurrency 32 --requests 2000
+
+Scenarios:
+
+- ``ticker_update``: ``$ticker <price>``, with no bulletins going out.
+- ``ticker_fetch``: ``$ticker``.
+- ``forecast``: ``$forecast``.
+- ``bulletins``: ``$ticker <price>``, with every update sent as a bulletin to each
+  server the user is on.
+"""
+import argparse
+import asyncio
+import collections
+import dataclasses
+import datetime
+import json
+import pathlib
+import random
+import tempfile
+import time
+import pytz
+from typing import Any, Awaitable, Callable, Dict, List
+
+from stalkbroker import bot, constants, date_utils, models
+from stalkbroker.bot._commands_forecast import forecast
+from stalkbroker.bot._commands_ticker import fetch_ticker, update_ticker
+
+from zdevelop.benchmarks._backends import serve_backends
+from zdevelop.benchmarks._harness import (
+    MONGO_DATABASE,
+    setup_db,
+    setup_backends,
+    percentile,
+)
+from zdevelop.tests._fakes import (
+    FakeContext,
+    FakeGuild,
+    FakeMember,
+    FakeMessage,
+    FakeTextChannel,
+    register_guilds,
+)
+
+
+SCENARIOS = ("ticker_update", "ticker_fetch", "forecast", "bulletins")
+
+# Every island has the same prices up to wednesday morning: a decreasing pattern that
+# any of these wednesday morning prices can follow.
+_SEED_PURCHASE_PRICE = 100
+_SEED_PRICES = [90, 86, 82, 78]
+_UPDATE_PRICES = list(range(60, 79)) + list(range(90, 141))
+
+
+@dataclasses.dataclass
+class Result:
+    """The outcome of running a scenario."""
+
+    scenario: str
+    concurrency: int
+    seconds: float
+    """Wall-clock seconds the scenario took."""
+    latencies: List[float]
+    """Seconds each request took."""
+    errors: Dict[str, int]
+    """The number of requests that failed, by error type."""
+
+    @property
+    def throughput(self) -> float:
+        """Requests finished per second."""
+        return len(self.latencies) / self.seconds
+
+    def percentile(self, fraction: float) -> float:
+        """The latency ``fraction`` of requests finished within, in seconds."""
+        return percentile(self.latencies, fraction)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "scenario": self.scenario,
+            "concurrency": self.concurrency,
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "throughput": self.throughput,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "max": max(self.latencies),
+        }
+
+
+@dataclasses.dataclass
+class Island:
+    """A synthetic user, and where they send commands from."""
+
+    member: FakeMember
+    channel: FakeTextChannel
+    """The channel the user sends commands in."""
+
+
+class World:
+    """The synthetic guilds and users commands are sent by."""
+
+    def __init__(
+        self,
+        guild_count: int,
+        user_count: int,
+        servers_per_user: int,
+        discord_latency: float,
+        message_time: datetime.datetime,
+    ) -> None:
+        self.message_time: datetime.datetime = message_time
+        self.guilds: List[FakeGuild] = [
+            FakeGuild(0, role_names=["@everyone", constants.BULLETIN_ROLE])
+            for _ in range(guild_count)
+        ]
+        self.channels: List[FakeTextChannel] = [
+            FakeTextChannel(guild, discord_latency) for guild in self.guilds
+        ]
+
+        self.islands: List[Island] = list()
+        self.memberships: Dict[int, List[FakeGuild]] = dict()
+        for i in range(user_count):
+            guilds = [
+                self.guilds[(i + k) % guild_count]
+                for k in range(min(servers_per_user, guild_count))
+            ]
+            member = FakeMember(guilds[0])
+            self.islands.append(Island(member, self.channels[i % guild_count]))
+            self.memberships[member.id] = guilds
+
+    def context(self, request: int) -> FakeContext:
+        """The context of a command sent by the island whose turn it is."""
+        island = self.islands[request % len(self.islands)]
+        message = FakeMessage(island.member, island.channel, self.message_time)
+        return FakeContext(message)
+
+
+def _message_time() -> datetime.datetime:
+    """Wednesday morning of last week, so every command is about a past price period."""
+    this_sunday = date_utils.previous_sunday(datetime.date.today())
+    wednesday = this_sunday - datetime.timedelta(days=4)
+    return datetime.datetime.combine(
+        wednesday, datetime.time(hour=10), tzinfo=pytz.utc
+    )
+
+
+async def _setup_world(world: World) -> None:
+    """Register the world's servers and users, and seed every island's ticker."""
+    stalkbroker = bot.STALKBROKER
+    await register_guilds(world.guilds, world.channels)
+
+    message_date = world.message_time.date()
+    week_of = date_utils.previous_sunday(message_date)
+    for island in world.islands:
+        for guild in world.memberships[island.member.id]:
+            await stalkbroker.db.update_user_timezone(island.member, guild, pytz.utc)
+
+        user = await stalkbroker.db.fetch_user(island.member, island.channel.guild)
+        await stalkbroker.db.update_ticker_price(
+            user, week_of, week_of, None, _SEED_PURCHASE_PRICE
+        )
+        for i, price in enumerate(_SEED_PRICES):
+            await stalkbroker.db.update_ticker_price(
+                user,
+                week_of,
+                week_of + datetime.timedelta(days=1 + i // 2),
+                models.TimeOfDay.AM if i % 2 == 0 else models.TimeOfDay.PM,
+                price,
+            )
+
+
+async def _set_bulletins(world: World, enabled: bool) -> None:
+    """Send every price update out as a bulletin, or none of them."""
+    minimum = 0 if enabled else 10 ** 6
+    for guild in world.guilds:
+        await bot.STALKBROKER.db.server_set_bulletin_minimum(guild, minimum)
+        await bot.STALKBROKER.db.server_set_heat_minimum(guild, minimum)
+
+
+def _scenario_call(
+    scenario: str, world: World, rng: random.Random
+) -> Callable[[int], Awaitable[None]]:
+    async def ticker_update(request: int) -> None:
+        await update_ticker(
+            world.context(request),  # type: ignore
+            price=rng.choice(_UPDATE_PRICES),
+            price_date_arg=None,
+            price_time_of_day_arg=None,
+        )
+
+    async def ticker_fetch(request: int) -> None:
+        await fetch_ticker(world.context(request), None)  # type: ignore
+
+    async def forecast_chart(request: int) -> None:
+        await forecast.callback(world.context(request))
+
+    calls: Dict[str, Callable[[int], Awaitable[None]]] = {
+        "ticker_update": ticker_update,
+        "ticker_fetch": ticker_fetch,
+        "forecast": forecast_chart,
+        "bulletins": ticker_update,
+    }
+    return calls[scenario]
+
+
+async def measure(
+    scenario: str,
+    call: Callable[[int], Awaitable[None]],
+    requests: int,
+    concurrency: int,
+) -> Result:
+    """
+    Make ``requests`` calls, ``concurrency`` at a time.
+
+    :param scenario: the name of what is being measured.
+    :param call: makes a request, given its index.
+    :param requests: the number of requests to make.
+    :param concurrency: the number of requests in flight at once.
+    """
+    latencies: List[float] = list()
+    errors: Dict[str, int] = collections.Counter()
+    pending = iter(range(requests))
+
+    async def worker() -> None:
+        # Workers share one iterator, so each request is made exactly once.
+        for request in pending:
+            start = time.perf_counter()
+            try:
+                await call(request)
+            except Exception as error:
+                errors[type(error).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return Result(
+        scenario=scenario,
+        concurrency=concurrency,
+        seconds=time.perf_counter() - start,
+        latencies=latencies,
+        errors=dict(errors),
+    )
+
+
+def _print_results(results: List[Result]) -> None:
+    print(
+        f"{'scenario':<14} {'requests':>8} {'errors':>7} {'req/s':>9} "
+        f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    )
+    for result in results:
+        summary = result.summary()
+        print(
+            f"{result.scenario:<14} {summary['requests']:>8} "
+            f"{sum(result.errors.values()):>7} {result.throughput:>9.1f} "
+            + " ".join(
+                f"{summary[key] * 1000:>8.2f}" for key in ("p50", "p90", "p99", "max")
+            )
+        )
+        for error, count in result.errors.items():
+            print(f"    {count} x {error}")
+
+
+async def run(args: argparse.Namespace) -> List[Result]:
+    client = await setup_db(args.mongo_uri, args.db_latency)
+    bot.STALKBROKER.ticker_single_write = args.single_write
+
+    world = World(
+        guild_count=args.guilds,
+        user_count=args.users,
+        servers_per_user=args.servers_per_user,
+        discord_latency=args.discord_latency,
+        message_time=_message_time(),
+    )
+    rng = random.Random(args.seed)
+
+    results: List[Result] = list()
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = str(pathlib.Path(directory) / "backend.sock")
+        async with serve_backends(socket_path, render_charts=args.render_charts):
+            backend_client = setup_backends(socket_path, args.batching)
+            try:
+                await _setup_world(world)
+                for scenario in args.scenarios:
+                    await _set_bulletins(world, enabled=scenario == "bulletins")
+                    call = _scenario_call(scenario, world, rng)
+                    await measure(scenario, call, args.warmup, args.concurrency)
+                    results.append(
+                        await measure(scenario, call, args.requests, args.concurrency)
+                    )
+            finally:
+                backend_client.close()
+
+    if client is not None:
+        await client.drop_database(MONGO_DATABASE)
+    return results
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--requests", type=int, default=1000, help="requests measured per scenario"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=100, help="requests made before measuring"
+    )
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--guilds", type=int, default=8)
+    parser.add_argument(
+        "--servers-per-user",
+        type=int,
+        default=3,
+        help="servers each user is on, and so gets bulletins sent to",
+    )
+    parser.add_argument(
+        "--db-latency",
+        type=float,
+        default=0.0005,
+        help="seconds each operation on the mongo stand-in takes",
+    )
+    parser.add_argument(
+        "--discord-latency",
+        type=float,
+        default=0.05,
+        help="seconds each discord request takes",
+    )
+    parser.add_argument(
+        "--mongo-uri",
+        help=f"benchmark against a mongod, in the {MONGO_DATABASE} database",
+    )
+    parser.add_argument(
+        "--render-charts",
+        action="store_true",
+        help="render real charts in the reporter, which needs matplotlib",
+    )
+    parser.add_argument(
+        "--batching", action="store_true", help="send forecasts in batches"
+    )
+    parser.add_argument(
+        "--single-write",
+        action="store_true",
+        help="forecast price updates before saving them",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--json", type=pathlib.Path, help="also write the results to this file"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = _parse_args()
+    benchmark_results = asyncio.run(run(arguments))
+    _print_results(benchmark_results)
+    if arguments.json is not None:
+        arguments.json.write_text(
+            json.dumps([r.summary() for r in benchmark_results], indent=2)
+        )
@@ -0,0 +1,88 @@
+"""
+Benchmarks the startup role sync of a single large guild, comparing the original
+linear member / role lookups against the per-guild index.
+
+Run from the repo root:
+
+    python -m zdevelop.benchmarks.bench_guild_index --members 50000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+import discord.utils
+from typing import Any, Callable, Coroutine, List
+
+from stalkbroker import bot, constants, models
+from stalkbroker.bot._commands_utils import user_update_guild_roles
+
+from zdevelop.tests._fakes import FakeGuild, FakeMember
+
+
+async def _update_roles_linear(
+    guild: Any, stalk_user: models.User, discord_user: Any
+) -> None:
+    """The role update as it was before the guild index, kept here for comparison."""
+    member = discord.utils.get(guild.members, id=discord_user.id)
+    bulletins_role = discord.utils.get(guild.roles, name=constants.BULLETIN_ROLE)
+    if bulletins_role is None:
+        return
+
+    if stalk_user.notify_on_bulletin is True:
+        await member.add_roles(bulletins_role, reason="stalkbroker request")
+    else:
+        await member.remove_roles(bulletins_role, reason="stalkbroker request")
+
+
+def _stalk_users(members: List[FakeMember]) -> List[models.User]:
+    return [
+        models.User(id=uuid.uuid4(), discord_id=m.id, notify_on_bulletin=i % 2 == 0)
+        for i, m in enumerate(members)
+    ]
+
+
+async def _sync_guild(
+    guild: FakeGuild,
+    users: List[models.User],
+    update_roles: Callable[[Any, models.User, Any], Coroutine],
+) -> float:
+    """Runs the role sync step of startup and returns the elapsed seconds."""
+    start = time.perf_counter()
+
+    coros = [update_roles(guild, u, guild.get_member(u.discord_id)) for u in users]
+    await asyncio.gather(*coros)
+
+    return time.perf_counter() - start
+
+
+async def run(member_count: int, skip_linear: bool) -> None:
+    guild = FakeGuild(member_count, role_names=["@everyone", constants.BULLETIN_ROLE])
+    users = _stalk_users(guild.members)
+
+    print(f"synthetic guild: {member_count} members")
+
+    if not skip_linear:
+        elapsed = await _sync_guild(guild, users, _update_roles_linear)
+        print(f"linear lookups:  {elapsed:.3f}s")
+
+    # Start both runs from the same role state, so neither gets to skip more changes
+    # than the other.
+    for member in guild.members:
+        member.roles = []
+
+    bot.STALKBROKER.guild_indexes.clear()
+    elapsed = await _sync_guild(guild, users, user_update_guild_roles)
+    print(f"indexed lookups: {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--members", type=int, default=50_000)
+    parser.add_argument(
+        "--skip-linear",
+        action="store_true",
+        help="skip the original quadratic lookups, which take minutes at 50k members",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(run(args.members, args.skip_linear))
@@ -0,0 +1,81 @@
+"""
+Measures rendering ticker reports, as ``$ticker`` does for each lookup.
+
+Tickers are spread over a number of weeks, with a random set of known prices, and each
+is reported at a random time in its week.
+
+Run from the repo root:
+
+    python -m zdevelop.benchmarks.bench_reports --calls 10000
+"""
+import argparse
+import datetime
+import random
+import time
+import uuid
+from typing import Any, Dict, List, Tuple
+
+from stalkbroker import date_utils, models, messages
+
+
+def _tickers(
+    rng: random.Random, count: int, weeks: int
+) -> List[Tuple[models.Ticker, datetime.datetime]]:
+    """Tickers to report on, with the local time each is reported at."""
+    this_sunday = date_utils.previous_sunday(datetime.date.today())
+    reports: List[Tuple[models.Ticker, datetime.datetime]] = list()
+    for _ in range(count):
+        week_of = this_sunday - datetime.timedelta(weeks=rng.randrange(weeks))
+        ticker = models.Ticker(
+            user_id=uuid.uuid4(), week_of=week_of, purchase_price=rng.randint(90, 110)
+        )
+        for phase in range(12):
+            if rng.random() < 0.7:
+                ticker[phase] = rng.randint(40, 600)
+
+        reported_at = datetime.datetime.combine(
+            week_of, datetime.time()
+        ) + datetime.timedelta(hours=rng.uniform(24, 24 * 7))
+        reports.append((ticker, reported_at))
+    return reports
+
+
+def run(calls: int, weeks: int, seed: int) -> Dict[str, Any]:
+    """
+    Render ``calls`` reports.
+
+    :returns: the wall-clock seconds taken, and microseconds per report.
+    """
+    reports = _tickers(random.Random(seed), calls, weeks)
+
+    start = time.perf_counter()
+    for ticker, reported_at in reports:
+        messages.report_ticker("island", ticker, reported_at)
+    seconds = time.perf_counter() - start
+
+    return {
+        "calls": calls,
+        "seconds": seconds,
+        "us_per_report": seconds / calls * 1e6,
+    }
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--calls", type=int, default=10000)
+    parser.add_argument(
+        "--weeks", type=int, default=4, help="weeks the tickers are spread over"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = _parse_args()
+    result = run(arguments.calls, arguments.weeks, arguments.seed)
+    print(
+        f"{result['calls']} reports in {result['seconds']:.3f}s: "
+        f"{result['us_per_report']:.2f} us per report"
+    )
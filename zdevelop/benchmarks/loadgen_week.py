@@ -0,0 +1,549 @@
+"""
+Replays a synthetic week of turnip traffic through the bot's command handlers, against
+in-process stand-ins for discord, mongo and the backend services, for capacity
+planning.
+
+Users are spread across timezones and post on a local-time schedule: Sunday purchase
+prices, then morning and afternoon prices peaking around opening, lunch and the
+evening. Prices follow the week of a real pattern, so spikes happen, and a price over
+500 sets off a burst of ``$ticker @user`` and ``$forecast`` messages from the poster's
+server. Some posts are followed by a ``$forecast``.
+
+The week is compressed into ``--duration`` seconds of wall-clock time. Each command is
+dispatched when it falls due, so a handler that starts late shows the bot falling
+behind. The report gives, for each kind of command, the sustained throughput, how
+late handlers started (queueing delay), how long they took, and the database and
+backend calls they made.
+
+Run from the repo root:
+
+    python -m zdevelop.benchmarks.loadgen_week --users 1000 --duration 120
+"""
+import argparse
+import asyncio
+import collections
+import dataclasses
+import datetime
+import json
+import pathlib
+import random
+import tempfile
+import time
+import pytz
+from typing import Any, DefaultDict, Dict, List, Optional, Sequence, Tuple
+
+from protogen.stalk_proto import models_pb2 as backend
+from stalkbroker import bot, constants, date_utils, forecasting, tracing
+from stalkbroker.bot._commands_forecast import forecast
+from stalkbroker.bot._commands_ticker import ticker
+
+from zdevelop.benchmarks._backends import serve_backends
+from zdevelop.tests._fakes import (
+    FakeContext,
+    FakeGuild,
+    FakeMember,
+    FakeMessage,
+    FakeTextChannel,
+    register_guilds,
+)
+from zdevelop.benchmarks._harness import (
+    MONGO_DATABASE,
+    setup_db,
+    setup_backends,
+    percentile,
+)
+
+
+# Where users are, and how many of them are there, relative to each other.
+TIMEZONES: Sequence[Tuple[str, float]] = (
+    ("US/Pacific", 3),
+    ("US/Central", 2),
+    ("US/Eastern", 4),
+    ("Europe/London", 2),
+    ("Europe/Berlin", 2),
+    ("Asia/Tokyo", 1),
+    ("Australia/Sydney", 1),
+)
+
+# The kinds of command reported on.
+TICKER_UPDATE = "ticker_update"
+TICKER_FETCH = "ticker_fetch"
+FORECAST = "forecast"
+
+# Chances a user posts a given price. Engagement drops off as the week goes on.
+_POST_SUNDAY = 0.8
+_POST_AM = [0.8, 0.75, 0.7, 0.65, 0.6, 0.55]
+_POST_PM = [0.65, 0.6, 0.55, 0.5, 0.45, 0.4]
+# Chance a post is followed by a forecast, and a user checks their ticker each day.
+_FORECAST_AFTER_POST = 0.25
+_FETCH_DAILY = 0.15
+
+# Prices that set off a burst of lookups from the poster's server.
+_SPIKE_PRICE = 500
+_BURST_SIZE = (5, 25)
+_BURST_MINUTES = 2.0
+
+
+@dataclasses.dataclass
+class Island:
+    """A synthetic user."""
+
+    member: FakeMember
+    tz: pytz.BaseTzInfo
+    channel: FakeTextChannel
+    """The channel the user posts in."""
+    guilds: List[FakeGuild]
+    """The servers the user is on."""
+
+
+@dataclasses.dataclass(order=True)
+class Event:
+    """A command, and when it is sent."""
+
+    at: datetime.datetime
+    """When the command is sent, in UTC."""
+    kind: str = dataclasses.field(compare=False)
+    island: Island = dataclasses.field(compare=False)
+    args: Tuple[str, ...] = dataclasses.field(compare=False, default=())
+    mentions: List[FakeMember] = dataclasses.field(compare=False, default_factory=list)
+
+
+class WeekSampler:
+    """
+    Samples the prices of an island's week from the weeks the forecaster thinks are
+    possible for its purchase price, so every ticker can be forecast.
+    """
+
+    def __init__(self, rng: random.Random) -> None:
+        self.rng: random.Random = rng
+        self._forecasts: Dict[int, backend.Forecast] = dict()
+
+    def sample(self) -> Tuple[int, List[int]]:
+        """:returns: the purchase price and the 12 prices of a week."""
+        purchase_price = self.rng.randint(90, 110)
+        try:
+            forecast_ = self._forecasts[purchase_price]
+        except KeyError:
+            forecast_ = forecasting.forecast_prices(
+                backend.Ticker(purchase_price=purchase_price, prices=[0] * 12)
+            )
+            self._forecasts[purchase_price] = forecast_
+
+        pattern = self.rng.choices(
+            forecast_.patterns, [p.chance for p in forecast_.patterns]
+        )[0]
+        week = self.rng.choices(
+            pattern.potential_weeks, [w.chance for w in pattern.potential_weeks]
+        )[0]
+
+        # The same position in every period's range keeps the prices consistent with
+        # each other.
+        position = self.rng.random()
+        prices = [round(p.min + position * (p.max - p.min)) for p in week.prices]
+        return purchase_price, prices
+
+
+def _local_hour(rng: random.Random, period: Optional[str]) -> float:
+    """The local hour a price for ``period`` is posted at. ``None`` for sunday."""
+    if period is None:
+        return rng.triangular(6, 12, 8.5)
+    if period == "AM":
+        return min(max(rng.gauss(9, 1), 5), 11.9)
+    # Afternoon posts come at lunch or in the evening.
+    if rng.random() < 0.4:
+        return min(max(rng.gauss(12.75, 0.5), 12), 14)
+    return min(max(rng.gauss(19.5, 1.5), 14), 23.9)
+
+
+def _at(island: Island, day: datetime.date, hour: float) -> datetime.datetime:
+    local = datetime.datetime.combine(day, datetime.time()) + datetime.timedelta(
+        hours=hour
+    )
+    return island.tz.localize(local).astimezone(pytz.utc)
+
+
+def _burst(
+    rng: random.Random, poster: Island, at: datetime.datetime, neighbours: List[Island]
+) -> List[Event]:
+    """The lookups set off by ``poster`` posting a spike price at ``at``."""
+    events: List[Event] = list()
+    for _ in range(rng.randint(*_BURST_SIZE)):
+        island = rng.choice(neighbours)
+        kind = rng.choice([TICKER_FETCH, FORECAST])
+        delay = datetime.timedelta(minutes=rng.expovariate(1 / _BURST_MINUTES))
+        args = (poster.member.mention,) if kind == TICKER_FETCH else ()
+        events.append(Event(at + delay, kind, island, args, [poster.member]))
+    return events
+
+
+def _island_posts(
+    rng: random.Random, island: Island, week_of: datetime.date, sampler: WeekSampler
+) -> List[Tuple[datetime.datetime, int]]:
+    """When the island posts each of its prices that week, and the price."""
+    purchase_price, prices = sampler.sample()
+    posts: List[Tuple[datetime.datetime, int]] = list()
+    if rng.random() < _POST_SUNDAY:
+        posts.append((_at(island, week_of, _local_hour(rng, None)), purchase_price))
+
+    for day_index in range(6):
+        day = week_of + datetime.timedelta(days=day_index + 1)
+        if rng.random() < _POST_AM[day_index]:
+            at = _at(island, day, _local_hour(rng, "AM"))
+            posts.append((at, prices[day_index * 2]))
+        if rng.random() < _POST_PM[day_index]:
+            at = _at(island, day, _local_hour(rng, "PM"))
+            posts.append((at, prices[day_index * 2 + 1]))
+    return posts
+
+
+def synthesize_week(
+    rng: random.Random,
+    islands: List[Island],
+    week_of: datetime.date,
+    sampler: WeekSampler,
+) -> List[Event]:
+    """
+    The commands sent over the week starting ``week_of``, in the order they are sent.
+    """
+    by_guild: DefaultDict[int, List[Island]] = collections.defaultdict(list)
+    for island in islands:
+        by_guild[island.channel.guild.id].append(island)
+
+    events: List[Event] = list()
+    for island in islands:
+        for at, price in _island_posts(rng, island, week_of, sampler):
+            events.append(Event(at, TICKER_UPDATE, island, (str(price),)))
+            if rng.random() < _FORECAST_AFTER_POST:
+                delay = datetime.timedelta(minutes=rng.expovariate(1 / 3))
+                events.append(Event(at + delay, FORECAST, island))
+            if price > _SPIKE_PRICE:
+                neighbours = by_guild[island.channel.guild.id]
+                events.extend(_burst(rng, island, at, neighbours))
+
+        for day_index in range(6):
+            if rng.random() < _FETCH_DAILY:
+                day = week_of + datetime.timedelta(days=day_index + 1)
+                at = _at(island, day, rng.uniform(8, 23))
+                events.append(Event(at, TICKER_FETCH, island))
+
+    events.sort()
+    return events
+
+
+def _event_kind(spans: Sequence[tracing.Span]) -> str:
+    # $ticker both updates and fetches, which only its spans tell apart.
+    if any(span.name == "update_ticker" for span in spans):
+        return TICKER_UPDATE
+    if spans[-1].attributes.get("command") == "forecast":
+        return FORECAST
+    return TICKER_FETCH
+
+
+class CallCounter:
+    """
+    Counts the database and backend calls each kind of command makes, from the spans
+    of its traces.
+    """
+
+    def __init__(self) -> None:
+        self.db_calls: DefaultDict[str, int] = collections.defaultdict(int)
+        self.backend_calls: DefaultDict[str, int] = collections.defaultdict(int)
+        self.backend_attempts: DefaultDict[str, int] = collections.defaultdict(int)
+
+    def export(self, spans: Sequence[tracing.Span]) -> None:
+        kind = _event_kind(spans)
+        for span in spans:
+            if span.name.startswith("db "):
+                self.db_calls[kind] += 1
+            elif span.name.startswith("rpc "):
+                self.backend_calls[kind] += 1
+            elif span.name == "attempt":
+                self.backend_attempts[kind] += 1
+
+
+@dataclasses.dataclass
+class Stats:
+    """What happened to each kind of command."""
+
+    queue_delays: DefaultDict[str, List[float]] = dataclasses.field(
+        default_factory=lambda: collections.defaultdict(list)
+    )
+    """Seconds each command's handler started after the command fell due."""
+    latencies: DefaultDict[str, List[float]] = dataclasses.field(
+        default_factory=lambda: collections.defaultdict(list)
+    )
+    """Seconds each command's handler took."""
+    errors: DefaultDict[str, collections.Counter] = dataclasses.field(
+        default_factory=lambda: collections.defaultdict(collections.Counter)
+    )
+    """The number of handlers that failed, by error type."""
+    seconds: float = 0.0
+    """Wall-clock seconds the replay took."""
+
+
+async def replay(
+    events: List[Event], duration: float, max_in_flight: Optional[int]
+) -> Stats:
+    """
+    Send each command when it falls due, with the week compressed into ``duration``
+    seconds.
+
+    :param events: the commands to send, in order.
+    :param duration: wall-clock seconds to replay the week in.
+    :param max_in_flight: the most handlers that may run at once. ``None`` for no
+        limit, like discord.py.
+    """
+    stats = Stats()
+    commands = {TICKER_UPDATE: ticker, TICKER_FETCH: ticker, FORECAST: forecast}
+    limit = asyncio.Semaphore(max_in_flight or len(events) or 1)
+
+    first, last = events[0].at, events[-1].at
+    speedup = max((last - first).total_seconds(), 1) / duration
+
+    async def handle(event: Event, due: float) -> None:
+        async with limit:
+            start = time.perf_counter()
+            stats.queue_delays[event.kind].append(max(start - due, 0.0))
+
+            message = FakeMessage(
+                event.island.member, event.island.channel, event.at, event.mentions
+            )
+            context = FakeContext(message)
+            context.command = commands[event.kind]
+            try:
+                await context.command.callback(context, *event.args)
+            except Exception as error:
+                stats.errors[event.kind][type(error).__name__] += 1
+            stats.latencies[event.kind].append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    handlers: List["asyncio.Future[None]"] = list()
+    for event in events:
+        due = started + (event.at - first).total_seconds() / speedup
+        wait = due - time.perf_counter()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        handlers.append(asyncio.ensure_future(handle(event, due)))
+
+    await asyncio.gather(*handlers)
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+@dataclasses.dataclass
+class Report:
+    """The outcome of replaying a week."""
+
+    events: List[Event]
+    """The commands sent."""
+    stats: Stats
+    calls: CallCounter
+    totals: Dict[str, int]
+    """Calls made to each stand-in over the whole week."""
+
+    def summary(self) -> Dict[str, Any]:
+        commands: Dict[str, Any] = dict()
+        for kind in (TICKER_UPDATE, TICKER_FETCH, FORECAST):
+            latencies = self.stats.latencies[kind]
+            if not latencies:
+                continue
+            count = len(latencies)
+            delays = self.stats.queue_delays[kind]
+            commands[kind] = {
+                "count": count,
+                "errors": dict(self.stats.errors[kind]),
+                "throughput": count / self.stats.seconds,
+                "queue_p50": percentile(delays, 0.5),
+                "queue_p99": percentile(delays, 0.99),
+                "queue_max": max(delays),
+                "p50": percentile(latencies, 0.5),
+                "p99": percentile(latencies, 0.99),
+                "max": max(latencies),
+                "db_calls": self.calls.db_calls[kind] / count,
+                "backend_calls": self.calls.backend_calls[kind] / count,
+                "backend_attempts": self.calls.backend_attempts[kind] / count,
+            }
+        return {
+            "seconds": self.stats.seconds,
+            "commands": commands,
+            "totals": self.totals,
+        }
+
+
+def _print_report(report: Report) -> None:
+    events, stats = report.events, report.stats
+    simulated = events[-1].at - events[0].at
+    print(
+        f"replayed {len(events)} commands spanning {simulated} "
+        f"in {stats.seconds:.1f}s"
+    )
+    print(
+        f"{'command':<14} {'count':>6} {'errors':>6} {'cmd/s':>7} "
+        f"{'queue p50':>9} {'queue p99':>9} {'p50 ms':>8} {'p99 ms':>8} "
+        f"{'db/cmd':>7} {'rpc/cmd':>7}"
+    )
+    summary = report.summary()
+    for kind, row in summary["commands"].items():
+        print(
+            f"{kind:<14} {row['count']:>6} {sum(row['errors'].values()):>6} "
+            f"{row['throughput']:>7.1f} "
+            + " ".join(
+                f"{row[key] * 1000:>{width}.2f}"
+                for key, width in (
+                    ("queue_p50", 9),
+                    ("queue_p99", 9),
+                    ("p50", 8),
+                    ("p99", 8),
+                )
+            )
+            + f" {row['db_calls']:>7.2f} {row['backend_calls']:>7.2f}"
+        )
+        for error, count in row["errors"].items():
+            print(f"    {count} x {error}")
+
+    print("totals:")
+    for name, value in report.totals.items():
+        print(f"    {name}: {value}")
+
+
+def _build_islands(
+    rng: random.Random, args: argparse.Namespace
+) -> Tuple[List[FakeGuild], List[FakeTextChannel], List[Island]]:
+    guilds = [
+        FakeGuild(0, role_names=["@everyone", constants.BULLETIN_ROLE])
+        for _ in range(args.guilds)
+    ]
+    channels = [FakeTextChannel(guild, args.discord_latency) for guild in guilds]
+
+    zones = [pytz.timezone(name) for name, _ in TIMEZONES]
+    weights = [weight for _, weight in TIMEZONES]
+    islands: List[Island] = list()
+    for _ in range(args.users):
+        member_guilds = rng.sample(guilds, min(args.servers_per_user, len(guilds)))
+        home = member_guilds[0]
+        islands.append(
+            Island(
+                member=FakeMember(home),
+                tz=rng.choices(zones, weights)[0],
+                channel=channels[guilds.index(home)],
+                guilds=member_guilds,
+            )
+        )
+    return guilds, channels, islands
+
+
+async def run(args: argparse.Namespace) -> Report:
+    rng = random.Random(args.seed)
+    guilds, channels, islands = _build_islands(rng, args)
+
+    # The last full week, so no command is about a day that has not happened yet.
+    week_of = date_utils.previous_sunday(datetime.date.today()) - datetime.timedelta(
+        days=7
+    )
+    events = synthesize_week(rng, islands, week_of, WeekSampler(rng))
+
+    client = await setup_db(args.mongo_uri, args.db_latency)
+    bot.STALKBROKER.ticker_single_write = args.single_write
+
+    # Every command is traced, to count the calls it makes.
+    calls = CallCounter()
+    tracer = tracing.TRACER
+    saved_tracer = (tracer.exporter, tracer.sample_rate)
+    tracer.exporter, tracer.sample_rate = calls, 1.0
+
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = str(pathlib.Path(directory) / "backend.sock")
+        async with serve_backends(
+            socket_path, render_charts=args.render_charts
+        ) as (forecaster, reporter):
+            backend_client = setup_backends(socket_path, args.batching)
+            try:
+                await register_guilds(guilds, channels)
+                for island in islands:
+                    for guild in island.guilds:
+                        await bot.STALKBROKER.db.update_user_timezone(
+                            island.member, guild, island.tz
+                        )
+                stats = await replay(events, args.duration, args.max_in_flight)
+            finally:
+                backend_client.close()
+                tracer.exporter, tracer.sample_rate = saved_tracer
+
+    totals: Dict[str, int] = {
+        "forecaster calls": forecaster.unary_calls,
+        "forecaster batches": forecaster.batch_calls,
+        "charts rendered": reporter.calls,
+        "discord messages": sum(channel.sent for channel in channels),
+    }
+    collections_ = bot.STALKBROKER.db.collections
+    for name in ("servers", "users", "tickers"):
+        # Only the mongo stand-in counts its operations.
+        operations = getattr(getattr(collections_, name), "operations", None)
+        if operations is not None:
+            totals[f"mongo {name} operations"] = operations
+
+    if client is not None:
+        await client.drop_database(MONGO_DATABASE)
+    return Report(events, stats, calls, totals)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--guilds", type=int, default=25)
+    parser.add_argument("--servers-per-user", type=int, default=2)
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=60,
+        help="wall-clock seconds to replay the week in",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        help="the most commands handled at once. Unlimited by default, like discord.py",
+    )
+    parser.add_argument(
+        "--db-latency",
+        type=float,
+        default=0.0005,
+        help="seconds each operation on the mongo stand-in takes",
+    )
+    parser.add_argument(
+        "--discord-latency",
+        type=float,
+        default=0.05,
+        help="seconds each discord request takes",
+    )
+    parser.add_argument(
+        "--mongo-uri",
+        help=f"run against a mongod, in the {MONGO_DATABASE} database",
+    )
+    parser.add_argument(
+        "--render-charts",
+        action="store_true",
+        help="render real charts in the reporter, which needs matplotlib",
+    )
+    parser.add_argument(
+        "--batching", action="store_true", help="send forecasts in batches"
+    )
+    parser.add_argument(
+        "--single-write",
+        action="store_true",
+        help="forecast price updates before saving them",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--json", type=pathlib.Path, help="also write the report to this file"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = _parse_args()
+    week_report = asyncio.run(run(arguments))
+    _print_report(week_report)
+    if arguments.json is not None:
+        arguments.json.write_text(json.dumps(week_report.summary(), indent=2))
@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import pathlib
+import random
+import dotenv
+import grpclib.client
+import grpclib.exceptions
+from typing import Any, Dict, List
+
+from google.protobuf import json_format
+
+from protogen.stalk_proto import forecaster_grpc as forecaster
+from protogen.stalk_proto import models_pb2 as backend
+
+
+RECORDINGS_PATH = pathlib.Path("./zdevelop/tests/forecast_recordings.jsonl")
+
+
+def intceil(value: float) -> int:
+    return math.trunc(value + 0.99999)
+
+
+def decreasing(
+    rng: random.Random,
+    length: int,
+    start: float,
+    end: float,
+    drop_min: float,
+    drop_max: float,
+) -> List[float]:
+    rate = rng.uniform(start, end)
+    rates = list()
+    for _ in range(length):
+        rates.append(rate)
+        rate -= drop_min + rng.uniform(0, drop_max - drop_min)
+    return rates
+
+
+def game_week(rng: random.Random, pattern: int, base: int) -> List[int]:
+    """generates a week of prices the way the game does"""
+    rates: List[float] = list()
+    offsets = [0] * 12
+
+    if pattern == backend.FLUCTUATING:
+        dec_1 = rng.choice((2, 3))
+        high_1 = rng.randint(0, 6)
+        high_3 = rng.randint(0, 6 - high_1)
+        rates += [rng.uniform(0.9, 1.4) for _ in range(high_1)]
+        rates += decreasing(rng, dec_1, 0.6, 0.8, 0.04, 0.10)
+        rates += [rng.uniform(0.9, 1.4) for _ in range(7 - high_1 - high_3)]
+        rates += decreasing(rng, 5 - dec_1, 0.6, 0.8, 0.04, 0.10)
+        rates += [rng.uniform(0.9, 1.4) for _ in range(high_3)]
+    elif pattern == backend.BIGSPIKE:
+        peak = rng.randint(1, 7)
+        rates += decreasing(rng, peak, 0.85, 0.9, 0.03, 0.05)
+        rates += [
+            rng.uniform(0.9, 1.4),
+            rng.uniform(1.4, 2.0),
+            rng.uniform(2.0, 6.0),
+            rng.uniform(1.4, 2.0),
+            rng.uniform(0.9, 1.4),
+        ]
+        rates += [rng.uniform(0.4, 0.9) for _ in range(12 - peak - 5)]
+    elif pattern == backend.DECREASING:
+        rates += decreasing(rng, 12, 0.85, 0.9, 0.03, 0.05)
+    else:
+        peak = rng.randint(0, 7)
+        rates += decreasing(rng, peak, 0.4, 0.9, 0.03, 0.05)
+        rates += [rng.uniform(0.9, 1.4), rng.uniform(0.9, 1.4)]
+        top = rng.uniform(1.4, 2.0)
+        rates += [rng.uniform(1.4, top), top, rng.uniform(1.4, top)]
+        offsets[peak + 2] = offsets[peak + 4] = -1
+        rates += decreasing(rng, 12 - peak - 5, 0.4, 0.9, 0.03, 0.05)
+
+    return [intceil(rate * base) + offset for rate, offset in zip(rates, offsets)]
+
+
+def sample_tickers(count: int, seed: int) -> List[backend.Ticker]:
+    rng = random.Random(seed)
+    patterns = [
+        backend.FLUCTUATING,
+        backend.BIGSPIKE,
+        backend.DECREASING,
+        backend.SMALLSPIKE,
+    ]
+
+    # An empty ticker for every previous pattern.
+    tickers = [
+        backend.Ticker(previous_pattern=p, prices=[0] * 12)
+        for p in patterns + [backend.UNKNOWN]
+    ]
+
+    while len(tickers) < count:
+        base = rng.randint(90, 110)
+        prices = game_week(rng, rng.choice(patterns), base)
+
+        # Reveal the first few prices, like a user part way through the week.
+        known = rng.randint(1, 12)
+        prices = prices[:known] + [0] * (12 - known)
+        tickers.append(
+            backend.Ticker(
+                purchase_price=base if rng.random() < 0.7 else 0,
+                previous_pattern=rng.choice(patterns + [backend.UNKNOWN]),
+                prices=prices,
+                current_period=known - 1,
+            )
+        )
+
+    return tickers
+
+
+async def record(count: int, seed: int) -> None:
+    dotenv.load_dotenv()
+    channel = grpclib.client.Channel(
+        host=os.environ["BACKEND_HOST"], port=int(os.environ["BACKEND_PORT"]),
+    )
+    client = forecaster.StalkForecasterStub(channel)
+
+    recordings: List[Dict[str, Any]] = list()
+    for ticker in sample_tickers(count, seed):
+        recording: Dict[str, Any] = {
+            "ticker": json_format.MessageToDict(
+                ticker, including_default_value_fields=True
+            )
+        }
+        try:
+            forecast = await client.ForecastPrices(ticker)
+        except grpclib.exceptions.GRPCError as error:
+            recording["error"] = error.message
+        else:
+            recording["forecast"] = json_format.MessageToDict(
+                forecast, including_default_value_fields=True
+            )
+        recordings.append(recording)
+
+    channel.close()
+
+    with RECORDINGS_PATH.open("w") as f:
+        for recording in recordings:
+            f.write(json.dumps(recording) + "\n")
+
+    print(f"recorded {len(recordings)} forecasts to {RECORDINGS_PATH}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="record forecasting service responses for parity tests"
+    )
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.get_event_loop().run_until_complete(record(args.count, args.seed))
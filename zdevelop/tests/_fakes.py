@@ -0,0 +1,182 @@
+"""
+Light-weight stand-ins for discord.py objects, so tests and benchmarks can build guilds
+with tens of thousands of members and invoke commands without a gateway connection.
+"""
+import asyncio
+import datetime
+import itertools
+from typing import Any, Iterable, List, Optional, Sequence
+
+from stalkbroker import bot
+from stalkbroker.db._connection import _Collections
+
+from zdevelop.tests._mongo import FakeDatabase
+
+
+_IDS = itertools.count(10 ** 17)
+
+
+def next_id() -> int:
+    """Returns a unique, discord-sized snowflake id."""
+    return next(_IDS)
+
+
+class FakeRole:
+    def __init__(self, name: str, guild: Optional["FakeGuild"] = None) -> None:
+        self.id: int = next_id()
+        self.name: str = name
+        self.mention: str = f"<@&{self.id}>"
+        self.guild: Optional[FakeGuild] = guild
+
+
+class FakeMember:
+    def __init__(self, guild: "FakeGuild", roles: Optional[List[FakeRole]] = None):
+        self.id: int = next_id()
+        self.guild: FakeGuild = guild
+        self.roles: List[FakeRole] = list(roles or [])
+        self.display_name: str = f"member-{self.id}"
+        self.mention: str = f"<@{self.id}>"
+        self.bot: bool = False
+
+        self.role_requests: int = 0
+        """Number of role mutations that would have been sent to discord."""
+
+    async def add_roles(self, *roles: FakeRole, reason: Any = None) -> None:
+        self.role_requests += 1
+        for role in roles:
+            if role not in self.roles:
+                self.roles.append(role)
+
+    async def remove_roles(self, *roles: FakeRole, reason: Any = None) -> None:
+        self.role_requests += 1
+        self.roles = [r for r in self.roles if r not in roles]
+
+
+class FakeGuild:
+    """
+    Mirrors the parts of ``discord.Guild`` the bot touches. Like discord.py,
+    ``members`` builds a new list on every access.
+    """
+
+    def __init__(self, member_count: int, role_names: Iterable[str]) -> None:
+        self.id: int = next_id()
+        self.name: str = f"guild-{self.id}"
+        self._roles: List[FakeRole] = [FakeRole(n, self) for n in role_names]
+        self._members = {m.id: m for m in self._create_members(member_count)}
+
+    def _create_members(self, count: int) -> Iterable[FakeMember]:
+        for _ in range(count):
+            yield FakeMember(self)
+
+    @property
+    def members(self) -> List[FakeMember]:
+        return list(self._members.values())
+
+    @property
+    def roles(self) -> List[FakeRole]:
+        return list(self._roles)
+
+    def get_member(self, member_id: int) -> Optional[FakeMember]:
+        return self._members.get(member_id)
+
+    def join(self) -> FakeMember:
+        """Add a new member, as discord does before sending ``on_member_join``."""
+        member = FakeMember(self)
+        self._members[member.id] = member
+        return member
+
+    def leave(self, member: FakeMember) -> None:
+        """Remove a member, as discord does before sending ``on_member_remove``."""
+        del self._members[member.id]
+
+    async def create_role(self, name: str, **kwargs: Any) -> FakeRole:
+        role = FakeRole(name, self)
+        self._roles.append(role)
+        return role
+
+    def delete_role(self, role: FakeRole) -> None:
+        """Remove a role, as discord does before sending ``on_guild_role_delete``."""
+        self._roles.remove(role)
+
+
+class FakeTextChannel:
+    def __init__(self, guild: FakeGuild, latency: float = 0.0) -> None:
+        """
+        :param latency: seconds each request waits, to stand in for discord's REST API.
+        """
+        self.id: int = next_id()
+        self.guild: FakeGuild = guild
+        self.mention: str = f"<#{self.id}>"
+        self.latency: float = latency
+
+        self.sent: int = 0
+        """Number of messages that would have been sent to discord."""
+
+    async def send(self, content: Optional[str] = None, **kwargs: Any) -> None:
+        self.sent += 1
+        await asyncio.sleep(self.latency)
+
+
+class FakeMessage:
+    def __init__(
+        self,
+        author: FakeMember,
+        channel: FakeTextChannel,
+        created_at: datetime.datetime,
+        mentions: Optional[List[FakeMember]] = None,
+    ) -> None:
+        self.id: int = next_id()
+        self.author: FakeMember = author
+        self.channel: FakeTextChannel = channel
+        self.guild: FakeGuild = channel.guild
+        self.created_at: datetime.datetime = created_at
+        self.mentions: List[FakeMember] = list(mentions or [])
+
+        self.reactions: List[str] = list()
+
+    async def add_reaction(self, emoji: str) -> None:
+        self.reactions.append(emoji)
+        await asyncio.sleep(self.channel.latency)
+
+
+class FakeContext:
+    """Mirrors the parts of ``discord.ext.commands.Context`` commands touch."""
+
+    def __init__(self, message: FakeMessage) -> None:
+        self.message: FakeMessage = message
+        self.author: FakeMember = message.author
+        self.guild: FakeGuild = message.guild
+        self.channel: FakeTextChannel = message.channel
+        self.command: Any = None
+
+    async def send(self, content: Optional[str] = None, **kwargs: Any) -> None:
+        await self.channel.send(content, **kwargs)
+
+
+async def setup_fake_db(latency: float = 0.0) -> FakeDatabase:
+    """
+    Point the bot at a fresh in-process database whose operations take ``latency``
+    seconds.
+    """
+    database = FakeDatabase(latency)
+    bot.STALKBROKER.db.collections = _Collections(database)
+    await bot.STALKBROKER.db.collections.make_indexes()
+    return database
+
+
+async def register_guilds(
+    guilds: Sequence[FakeGuild], channels: Sequence[FakeTextChannel]
+) -> None:
+    """
+    Make the bot aware of ``guilds``, each sending bulletins to the channel at the same
+    position in ``channels``.
+    """
+    stalkbroker = bot.STALKBROKER
+    guild_lookup = {guild.id: guild for guild in guilds}
+    channel_lookup = {channel.id: channel for channel in channels}
+    # Lookups the bot would serve from its gateway connection.
+    stalkbroker.get_guild = guild_lookup.get  # type: ignore
+    stalkbroker.get_channel = channel_lookup.get  # type: ignore
+
+    for guild, channel in zip(guilds, channels):
+        await stalkbroker.db.server_set_bulletin_channel(guild, channel)
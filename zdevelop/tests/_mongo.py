@@ -0,0 +1,251 @@
+"""
+An in-process stand-in for the parts of a motor database the bot uses, so tests and
+benchmarks can drive the bot's commands without a mongod.
+
+Only the query and update operators ``DBConnection`` sends are supported: equality and
+``$in`` matches on (dotted) fields, and ``$set``, ``$setOnInsert``, ``$inc`` and
+``$addToSet`` updates. Unique indexes are enforced, so racing upserts fail the same way
+they do against a real server, and queries on their fields are served from them
+rather than by scanning the collection.
+"""
+import asyncio
+import copy
+import bson
+import pymongo
+import pymongo.errors
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+
+_DUPLICATE_KEY_ERROR = 11000
+
+_Document = Dict[str, Any]
+_Query = Mapping[str, Any]
+_IndexKeys = Union[str, Sequence[Tuple[str, int]]]
+
+
+def _get(document: _Document, path: str) -> Any:
+    value: Any = document
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _set(document: _Document, path: str, value: Any) -> None:
+    *parents, last = path.split(".")
+    for key in parents:
+        document = document.setdefault(key, dict())
+    document[last] = value
+
+
+def _matches(document: _Document, query: _Query) -> bool:
+    for path, condition in query.items():
+        value = _get(document, path)
+        if isinstance(condition, dict) and "$in" in condition:
+            if value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _apply(document: _Document, update: _Query, inserting: bool) -> None:
+    for path, value in update.get("$set", {}).items():
+        _set(document, path, copy.deepcopy(value))
+
+    if inserting:
+        for path, value in update.get("$setOnInsert", {}).items():
+            _set(document, path, copy.deepcopy(value))
+
+    for path, amount in update.get("$inc", {}).items():
+        _set(document, path, (_get(document, path) or 0) + amount)
+
+    for path, value in update.get("$addToSet", {}).items():
+        values = _get(document, path)
+        if values is None:
+            values = list()
+            _set(document, path, values)
+        if value not in values:
+            values.append(value)
+
+
+class FakeCollection:
+    """Stands in for a motor collection."""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        """
+        :param latency: seconds each operation waits, to stand in for the round trip
+            to a real server.
+        """
+        self.latency: float = latency
+        self.documents: Dict[bson.ObjectId, _Document] = dict()
+        """The documents of the collection, by ``_id``."""
+        self.operations: int = 0
+        """The number of operations served."""
+
+        self._unique: Dict[Tuple[str, ...], Dict[Tuple[Any, ...], _Document]] = dict()
+
+    async def _round_trip(self) -> None:
+        self.operations += 1
+        await asyncio.sleep(self.latency)
+
+    def _index(self, document: _Document, replaces: Optional[_Document]) -> None:
+        """
+        Add ``document`` to the unique indexes, in place of ``replaces`` if given.
+
+        :raises DuplicateKeyError: if another document has the same unique key. The
+            indexes are left untouched.
+        """
+        keys = [
+            (fields, entries, tuple(_get(document, f) for f in fields))
+            for fields, entries in self._unique.items()
+        ]
+        for fields, entries, key in keys:
+            other = entries.get(key)
+            if other is not None and other is not replaces:
+                raise pymongo.errors.DuplicateKeyError(
+                    f"E11000 duplicate key error: {dict(zip(fields, key))}",
+                    _DUPLICATE_KEY_ERROR,
+                )
+
+        for fields, entries, key in keys:
+            if replaces is not None:
+                entries.pop(tuple(_get(replaces, f) for f in fields), None)
+            entries[key] = document
+
+    def _find(self, query: _Query) -> Optional[_Document]:
+        for fields, entries in self._unique.items():
+            if all(f in query and not isinstance(query[f], dict) for f in fields):
+                document = entries.get(tuple(query[f] for f in fields))
+                if document is not None and _matches(document, query):
+                    return document
+                return None
+
+        documents = self.documents.values()
+        return next((d for d in documents if _matches(d, query)), None)
+
+    def _update(
+        self, query: _Query, update: _Query, upsert: bool
+    ) -> Tuple[Optional[_Document], Optional[_Document]]:
+        """Returns the matched document before and after the update."""
+        document = self._find(query)
+        if document is None:
+            if not upsert:
+                return None, None
+
+            # Like mongo, the equality conditions of the query seed the new document.
+            inserted: _Document = {"_id": bson.ObjectId()}
+            for path, condition in query.items():
+                if not isinstance(condition, dict):
+                    _set(inserted, path, copy.deepcopy(condition))
+            _apply(inserted, update, inserting=True)
+
+            self._index(inserted, replaces=None)
+            self.documents[inserted["_id"]] = inserted
+            return None, inserted
+
+        updated = copy.deepcopy(document)
+        _apply(updated, update, inserting=False)
+        self._index(updated, replaces=document)
+        self.documents[updated["_id"]] = updated
+        return document, updated
+
+    async def create_index(
+        self, keys: _IndexKeys, unique: bool = False, **kwargs: Any
+    ) -> None:
+        if not unique:
+            return
+        if isinstance(keys, str):
+            fields: Tuple[str, ...] = (keys,)
+        else:
+            fields = tuple(field for field, _ in keys)
+
+        entries = self._unique.setdefault(fields, dict())
+        for document in self.documents.values():
+            entries[tuple(_get(document, f) for f in fields)] = document
+
+    async def find_one(
+        self, query: _Document, projection: Optional[_Document] = None
+    ) -> Optional[_Document]:
+        await self._round_trip()
+        document = self._find(query)
+        if document is None:
+            return None
+        if projection is not None:
+            document = {k: document.get(k) for k in projection if k in document}
+        return copy.deepcopy(document)
+
+    async def _iterate(self, query: _Document) -> AsyncIterator[_Document]:
+        await self._round_trip()
+        matched = [d for d in self.documents.values() if _matches(d, query)]
+        for document in matched:
+            yield copy.deepcopy(document)
+
+    def find(self, query: _Document) -> AsyncIterator[_Document]:
+        return self._iterate(query)
+
+    async def find_one_and_update(
+        self,
+        query: _Document,
+        update: _Document,
+        upsert: bool = False,
+        return_document: bool = pymongo.ReturnDocument.BEFORE,
+    ) -> Optional[_Document]:
+        await self._round_trip()
+        before, after = self._update(query, update, upsert)
+        if return_document == pymongo.ReturnDocument.AFTER:
+            return copy.deepcopy(after)
+        return copy.deepcopy(before)
+
+    async def bulk_write(
+        self, operations: Sequence[pymongo.UpdateOne], ordered: bool = True
+    ) -> None:
+        await self._round_trip()
+        errors: List[Dict[str, Any]] = list()
+        for index, operation in enumerate(operations):
+            # Aggregation pipeline updates are not supported.
+            assert isinstance(operation._doc, Mapping)
+            try:
+                self._update(
+                    operation._filter, operation._doc, bool(operation._upsert)
+                )
+            except pymongo.errors.DuplicateKeyError as error:
+                errors.append(
+                    {"index": index, "code": error.code, "errmsg": str(error)}
+                )
+                if ordered:
+                    break
+
+        if errors:
+            raise pymongo.errors.BulkWriteError({"writeErrors": errors})
+
+
+class FakeDatabase:
+    """Stands in for a motor database, creating collections on first access."""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        """
+        :param latency: seconds each operation waits, to stand in for the round trip
+            to a real server.
+        """
+        self.latency: float = latency
+        self.collections: Dict[str, FakeCollection] = dict()
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        try:
+            return self.collections[name]
+        except KeyError:
+            collection = FakeCollection(self.latency)
+            self.collections[name] = collection
+            return collection
@@ -0,0 +1,112 @@
+import argparse
+import pymongo
+import pymongo.errors
+import pytest
+
+from zdevelop.benchmarks import (
+    bench_codecs,
+    bench_commands,
+    bench_reports,
+    loadgen_week,
+)
+from zdevelop.tests._mongo import FakeCollection
+
+
+class TestFakeCollection:
+    @pytest.mark.asyncio
+    async def test_upsert_and_unique_index(self) -> None:
+        tickers = FakeCollection()
+        await tickers.create_index(
+            [("user_id", pymongo.ASCENDING), ("week_of", pymongo.ASCENDING)],
+            unique=True,
+        )
+        query = {"user_id": 1, "week_of": 2}
+        update = {
+            "$setOnInsert": {"user_id": 1, "week_of": 2},
+            "$set": {"phases.3": 90},
+            "$inc": {"version": 1},
+        }
+
+        inserted = await tickers.find_one_and_update(
+            query, update, upsert=True, return_document=pymongo.ReturnDocument.AFTER
+        )
+        assert inserted is not None
+        assert (inserted["phases"], inserted["version"]) == ({"3": 90}, 1)
+
+        # A stale version does not match, so the upsert collides with the ticker.
+        stale = dict(query, version={"$in": [0, None]})
+        with pytest.raises(pymongo.errors.DuplicateKeyError):
+            await tickers.find_one_and_update(stale, update, upsert=True)
+
+        assert await tickers.find_one(query, projection={"version": 1}) == {
+            "version": 1
+        }
+
+
+class TestBenchCommands:
+    @pytest.mark.asyncio
+    async def test_scenarios_run_cleanly(self) -> None:
+        args = argparse.Namespace(
+            scenarios=list(bench_commands.SCENARIOS),
+            concurrency=4,
+            requests=8,
+            warmup=0,
+            users=4,
+            guilds=2,
+            servers_per_user=2,
+            db_latency=0,
+            discord_latency=0,
+            mongo_uri=None,
+            render_charts=False,
+            batching=False,
+            single_write=False,
+            seed=0,
+            json=None,
+        )
+        results = await bench_commands.run(args)
+
+        assert [r.scenario for r in results] == list(bench_commands.SCENARIOS)
+        for result in results:
+            assert result.errors == {}
+            assert len(result.latencies) == 8
+
+
+class TestLoadgenWeek:
+    @pytest.mark.asyncio
+    async def test_week_replays_cleanly(self) -> None:
+        args = argparse.Namespace(
+            users=6,
+            guilds=2,
+            servers_per_user=2,
+            duration=1,
+            max_in_flight=None,
+            db_latency=0,
+            discord_latency=0,
+            mongo_uri=None,
+            render_charts=False,
+            batching=False,
+            single_write=False,
+            seed=0,
+        )
+        report = await loadgen_week.run(args)
+
+        summary = report.summary()
+        assert sum(c["count"] for c in summary["commands"].values()) == len(
+            report.events
+        )
+        for row in summary["commands"].values():
+            assert row["errors"] == {}
+            # Every command reads or writes the database.
+            assert row["db_calls"] >= 1
+        assert summary["commands"][loadgen_week.FORECAST]["backend_calls"] >= 1
+
+
+class TestBenchCodecs:
+    def test_runs(self) -> None:
+        results = bench_codecs.run(number=10, repeat=1)
+        assert [r["model"] for r in results] == ["Server", "User", "Ticker"]
+
+
+class TestBenchReports:
+    def test_runs(self) -> None:
+        assert bench_reports.run(calls=50, weeks=2, seed=0)["calls"] == 50
@@ -0,0 +1,959 @@
+import asyncio
+import datetime
+import discord
+import gc
+import grpclib.const
+import grpclib.exceptions
+import pymongo
+import pymongo.errors
+import pytest
+import pytz
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from protogen.stalk_proto import models_pb2 as backend
+
+from stalkbroker import (
+    bot,
+    caching,
+    constants,
+    date_utils,
+    errors,
+    forecasting,
+    models,
+)
+from stalkbroker.bot import _events
+from stalkbroker.bot._bot import _check_forecaster_settings, _report_watcher_stopped
+from stalkbroker.bot._common import fetch_message_ticker_info, get_forecast_from_backend
+from stalkbroker.bot._commands_ticker import (
+    BulletinInfo,
+    send_bulletins_to_all_user_servers,
+    update_ticker,
+)
+from stalkbroker.bot._guild_index import GuildIndex
+from stalkbroker.bot._instrument import is_instrumented
+from stalkbroker.bot._pipeline import Pipeline
+from stalkbroker.bot._role_sync import RoleSyncReport, _RoleChangeQueue
+
+from zdevelop.tests._fakes import (
+    FakeContext,
+    FakeGuild,
+    FakeMember,
+    FakeMessage,
+    FakeTextChannel,
+    register_guilds,
+    setup_fake_db,
+)
+from zdevelop.tests._mongo import FakeCollection
+
+
+# Wednesday morning of last week, so every price is for a past period.
+MESSAGE_TIME = datetime.datetime.combine(
+    date_utils.previous_sunday(datetime.date.today()) - datetime.timedelta(days=4),
+    datetime.time(hour=10),
+    tzinfo=pytz.utc,
+)
+
+
+async def _island_context() -> FakeContext:
+    """
+    Point the bot at an empty in-process database, and return the context of a message
+    from a user on a registered guild.
+    """
+    await setup_fake_db()
+
+    guild = FakeGuild(0, role_names=["@everyone", constants.BULLETIN_ROLE])
+    channel = FakeTextChannel(guild)
+    await register_guilds([guild], [channel])
+
+    member = FakeMember(guild)
+    await bot.STALKBROKER.db.update_user_timezone(member, guild, pytz.utc)
+    return FakeContext(FakeMessage(member, channel, MESSAGE_TIME))
+
+
+async def _indexed_guild(member_count: int) -> FakeGuild:
+    """
+    Point the bot at an empty in-process database, register a guild with
+    ``member_count`` members, and index it.
+    """
+    await setup_fake_db()
+    guild = FakeGuild(member_count, role_names=["@everyone", constants.BULLETIN_ROLE])
+    await register_guilds([guild], [FakeTextChannel(guild)])
+    _index(guild)
+    return guild
+
+
+def _index(guild: FakeGuild) -> GuildIndex:
+    """The bot's index of ``guild``."""
+    return bot.STALKBROKER.guild_indexes[guild]  # type: ignore
+
+
+def _assert_indexed(guild: FakeGuild) -> None:
+    """Check the bot's index of ``guild`` holds exactly its members and roles."""
+    index = _index(guild)
+
+    assert set(index.members) == {member.id for member in guild.members}
+    for member in guild.members:
+        assert index.member(member.id) is member
+    assert set(index.roles) == {role.name for role in guild.roles}
+    for role in guild.roles:
+        assert index.role(role.name) is role
+
+
+def _patch_guilds(monkeypatch: pytest.MonkeyPatch, guilds: List[FakeGuild]) -> None:
+    """Make ``guilds`` the guilds the bot is connected to."""
+    monkeypatch.setattr(type(bot.STALKBROKER), "guilds", property(lambda _: guilds))
+
+
+class RecordingChannel(FakeTextChannel):
+    """A bulletin channel that keeps the messages sent to it."""
+
+    def __init__(self, guild: FakeGuild) -> None:
+        super().__init__(guild)
+        self.messages: List[Tuple[Optional[str], Optional[discord.File]]] = list()
+
+    async def send(self, content: Optional[str] = None, **kwargs: Any) -> None:
+        await super().send(content, **kwargs)
+        self.messages.append((content, kwargs.get("file")))
+
+
+class CountingReporter:
+    """Renders every chart as the same image, and counts the requests."""
+
+    def __init__(self, fail: bool = False) -> None:
+        self.fail: bool = fail
+        self.calls: int = 0
+
+    async def ForecastChart(self, req: backend.ReqForecastChart) -> backend.RespChart:
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise grpclib.exceptions.GRPCError(grpclib.const.Status.UNAVAILABLE)
+        return backend.RespChart(chart=b"chart")
+
+
+async def _forecast_bulletin(
+    server_count: int,
+) -> Tuple[BulletinInfo, List[RecordingChannel]]:
+    """
+    Point the bot at an empty in-process database, and return a forecast bulletin from
+    a user on ``server_count`` servers, along with each server's bulletin channel.
+    """
+    await setup_fake_db()
+    bulletin_roles = ["@everyone", constants.BULLETIN_ROLE]
+    guilds = [FakeGuild(0, role_names=bulletin_roles) for _ in range(server_count)]
+    channels = [RecordingChannel(guild) for guild in guilds]
+    await register_guilds(guilds, channels)
+
+    member = FakeMember(guilds[0])
+    for guild in guilds:
+        stalk_user = await bot.STALKBROKER.db.add_user(member, guild)
+
+    week_of = date_utils.previous_sunday(MESSAGE_TIME.date())
+    ticker = models.Ticker(user_id=stalk_user.id, week_of=week_of, purchase_price=100)
+    ticker[0] = 90
+    ticker_backend = ticker.to_backend(
+        previous_pattern=backend.PricePatterns.UNKNOWN, current_period=4
+    )
+    forecast = await forecasting.LocalForecaster().ForecastPrices(ticker_backend)
+    # Hot enough for a forecast bulletin on every server.
+    forecast.heat = constants.HEAT_MINIMUM
+    forecast.prices_future.max = constants.BULLETIN_MINIMUM
+
+    info = BulletinInfo(
+        ctx=FakeContext(FakeMessage(member, channels[0], MESSAGE_TIME)),
+        stalk_user=stalk_user,
+        discord_user=member,
+        # Too low for a price bulletin.
+        price=90,
+        price_date=week_of + datetime.timedelta(days=3),
+        price_time_of_day=models.TimeOfDay.AM,
+        ticker=ticker,
+        ticker_backend=ticker_backend,
+        forecast=forecast,
+        user_time=MESSAGE_TIME,
+        current_period=4,
+    )
+    return info, channels
+
+
+class FailingForecaster:
+    """A forecaster whose service can't be reached."""
+
+    async def ForecastPrices(self, ticker: backend.Ticker) -> backend.Forecast:
+        raise grpclib.exceptions.GRPCError(grpclib.const.Status.UNAVAILABLE)
+
+
+class TimedOutForecaster:
+    """A forecaster whose calls run past their deadline."""
+
+    async def ForecastPrices(self, ticker: backend.Ticker) -> backend.Forecast:
+        raise asyncio.TimeoutError
+
+
+class InterruptedForecaster:
+    """
+    Forecasts locally, but the first forecast is interrupted by another update to the
+    ticker, like a second message from the same user.
+    """
+
+    def __init__(self, interrupt: Callable[[], Awaitable[object]]) -> None:
+        self.interrupt: Callable[[], Awaitable[object]] = interrupt
+        self.calls: int = 0
+
+    async def ForecastPrices(self, ticker: backend.Ticker) -> backend.Forecast:
+        self.calls += 1
+        if self.calls == 1:
+            await self.interrupt()
+        return await forecasting.LocalForecaster().ForecastPrices(ticker)
+
+
+class TestGetForecast:
+    @pytest.mark.asyncio
+    async def test_deadline_wrapped(self) -> None:
+        ctx = await _island_context()
+        stalkbroker = bot.STALKBROKER
+        forecaster = stalkbroker.client_forecaster
+        stalkbroker.client_forecaster = TimedOutForecaster()
+
+        try:
+            info = await fetch_message_ticker_info(ctx, None)  # type: ignore
+            with pytest.raises(errors.BackendError) as error:
+                await get_forecast_from_backend(ctx, info)  # type: ignore
+        finally:
+            stalkbroker.client_forecaster = forecaster
+
+        assert isinstance(error.value.error, asyncio.TimeoutError)
+        assert isinstance(error.value.convert_to_bot_error(), asyncio.TimeoutError)
+
+
+class TestUpdateTicker:
+    @pytest.mark.asyncio
+    async def test_oversized_price(self) -> None:
+        ctx = await _island_context()
+        tickers = bot.STALKBROKER.db.collections.tickers
+
+        with pytest.raises(errors.BadPriceError) as error:
+            await update_ticker(
+                ctx,  # type: ignore
+                price=99999,
+                price_date_arg=None,
+                price_time_of_day_arg=None,
+            )
+
+        assert error.value.bad_value == 99999
+        assert "99999" in error.value.response()
+        assert tickers.documents == {}
+
+    @pytest.mark.asyncio
+    async def test_single_write_forecast_fails(self) -> None:
+        ctx = await _island_context()
+        stalkbroker = bot.STALKBROKER
+        forecaster = stalkbroker.client_forecaster
+        stalkbroker.client_forecaster = FailingForecaster()
+        stalkbroker.ticker_single_write = True
+
+        try:
+            with pytest.raises(errors.BackendError):
+                await update_ticker(
+                    ctx,  # type: ignore
+                    price=112,
+                    price_date_arg=None,
+                    price_time_of_day_arg=None,
+                )
+        finally:
+            stalkbroker.client_forecaster = forecaster
+            stalkbroker.ticker_single_write = False
+
+        # The price is saved and confirmed even though it could not be forecast.
+        user = await stalkbroker.db.fetch_user(ctx.author, ctx.guild)
+        ticker = await stalkbroker.db.fetch_ticker(
+            user, date_utils.previous_sunday(MESSAGE_TIME.date())
+        )
+        assert ticker.known_prices() == {4: 112}
+        assert ctx.message.reactions
+
+
+class TestBulletinChart:
+    @pytest.mark.asyncio
+    async def test_rendered_once_per_fan_out(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        info, channels = await _forecast_bulletin(3)
+        reporter = CountingReporter()
+        stalkbroker = bot.STALKBROKER
+        monkeypatch.setattr(stalkbroker, "client_reporter", reporter)
+        # Nothing is stored, so only sharing the request can save renders.
+        monkeypatch.setattr(
+            stalkbroker, "chart_store", caching.BlobStore(max_memory_bytes=0)
+        )
+
+        await send_bulletins_to_all_user_servers(info)
+
+        assert reporter.calls == 1
+        files = [file for channel in channels for _, file in channel.messages]
+        assert len(files) == len(channels)
+        # Every channel gets the same image, each in a file object of its own.
+        assert len({id(file) for file in files}) == len(channels)
+        for file in files:
+            assert file is not None
+            assert file.fp.read() == b"chart"
+
+    @pytest.mark.asyncio
+    async def test_chart_failure_sends_text(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+    ) -> None:
+        info, channels = await _forecast_bulletin(3)
+        reporter = CountingReporter(fail=True)
+        stalkbroker = bot.STALKBROKER
+        monkeypatch.setattr(stalkbroker, "client_reporter", reporter)
+        monkeypatch.setattr(
+            stalkbroker, "chart_store", caching.BlobStore(max_memory_bytes=0)
+        )
+
+        loop = asyncio.get_event_loop()
+        unhandled: List[Dict[str, Any]] = list()
+        loop.set_exception_handler(lambda _, context: unhandled.append(context))
+        try:
+            await send_bulletins_to_all_user_servers(info)
+            await asyncio.sleep(0)
+            # Dropping the shared request would log its error if nothing retrieved it.
+            info.forecast_chart = None
+            gc.collect()
+        finally:
+            loop.set_exception_handler(None)
+
+        assert reporter.calls == 1
+        assert unhandled == []
+        assert capsys.readouterr().out.count("bulletin chart failed") == 1
+        for channel in channels:
+            assert len(channel.messages) == 1
+            text, file = channel.messages[0]
+            assert text is not None and "Market Forecast Watch" in text
+            assert file is None
+
+
+class TestGuildIndex:
+    @pytest.mark.asyncio
+    async def test_member_join(self) -> None:
+        guild = await _indexed_guild(3)
+        index = _index(guild)
+
+        member = guild.join()
+        await _events.on_member_join(member)  # type: ignore
+
+        assert _index(guild) is index
+        assert index.member(member.id) is member
+        _assert_indexed(guild)
+
+    @pytest.mark.asyncio
+    async def test_member_leave(self) -> None:
+        guild = await _indexed_guild(3)
+        index = _index(guild)
+
+        member = guild.members[1]
+        guild.leave(member)
+        await _events.on_member_remove(member)  # type: ignore
+
+        assert _index(guild) is index
+        assert index.member(member.id) is None
+        _assert_indexed(guild)
+
+    @pytest.mark.asyncio
+    async def test_member_update(self) -> None:
+        guild = await _indexed_guild(3)
+        index = _index(guild)
+        before = guild.members[0]
+
+        # discord.py hands out a new member object for the updated member.
+        after = FakeMember(guild, roles=guild.roles[1:])
+        after.id = before.id
+        guild._members[before.id] = after
+        await _events.on_member_update(before, after)  # type: ignore
+
+        assert index.member(before.id) is after
+        _assert_indexed(guild)
+
+    @pytest.mark.asyncio
+    async def test_role_add(self) -> None:
+        guild = await _indexed_guild(3)
+        index = _index(guild)
+
+        role = await guild.create_role("traders")
+        await _events.on_guild_role_create(role)  # type: ignore
+
+        assert _index(guild) is index
+        assert index.role("traders") is role
+        _assert_indexed(guild)
+
+    @pytest.mark.asyncio
+    async def test_role_remove(self) -> None:
+        guild = await _indexed_guild(3)
+        index = _index(guild)
+
+        first = await guild.create_role("traders")
+        second = await guild.create_role("traders")
+        await _events.on_guild_role_create(first)  # type: ignore
+        await _events.on_guild_role_create(second)  # type: ignore
+        assert index.role("traders") is first
+
+        # Another role with the same name takes the place of the deleted one.
+        guild.delete_role(first)
+        await _events.on_guild_role_delete(first)  # type: ignore
+        assert index.role("traders") is second
+
+        guild.delete_role(second)
+        await _events.on_guild_role_delete(second)  # type: ignore
+        assert index.role("traders") is None
+        _assert_indexed(guild)
+
+    @pytest.mark.asyncio
+    async def test_guild_remove(self) -> None:
+        guild = await _indexed_guild(3)
+        index = _index(guild)
+
+        await _events.on_guild_remove(guild)  # type: ignore
+
+        assert _index(guild) is not index
+        _assert_indexed(guild)
+
+    @pytest.mark.asyncio
+    async def test_resume_clears(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        guild = await _indexed_guild(3)
+        index = _index(guild)
+        _patch_guilds(monkeypatch, [guild])
+
+        # Members come and go while the bot is disconnected, so it gets no events.
+        joined = guild.join()
+        left = guild.members[0]
+        guild.leave(left)
+        await _events.on_resumed()
+
+        assert _index(guild) is not index
+        index = _index(guild)
+        assert index.member(joined.id) is joined
+        assert index.member(left.id) is None
+        _assert_indexed(guild)
+
+
+class TestResync:
+    @pytest.mark.asyncio
+    async def test_only_changed_guilds_resynced(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        await setup_fake_db()
+        database = bot.STALKBROKER.db
+        unchanged = FakeGuild(3, role_names=["@everyone"])
+        changed = FakeGuild(3, role_names=["@everyone"])
+        await register_guilds([unchanged, changed], [])
+        for guild in (unchanged, changed):
+            await _events._add_guild(guild)  # type: ignore
+        _patch_guilds(monkeypatch, [unchanged, changed])
+
+        synced: List[int] = list()
+        add_guild = _events._add_guild
+
+        async def record_sync(guild: FakeGuild) -> None:
+            synced.append(guild.id)
+            await add_guild(guild)  # type: ignore
+
+        monkeypatch.setattr(_events, "_add_guild", record_sync)
+
+        # A member joins one guild while the bot is disconnected.
+        unchanged_index = _index(unchanged)
+        changed_index = _index(changed)
+        joined = changed.join()
+        await _events.on_resumed()
+
+        assert synced == [changed.id]
+        users = database.collections.users
+        assert await users.find_one({"discord_id": joined.id}) is not None
+
+        # The guild indexes are rebuilt, whether or not the guild was re-synced.
+        assert _index(unchanged) is not unchanged_index
+        assert _index(changed) is not changed_index
+        assert _index(changed).member(joined.id) is joined
+        _assert_indexed(unchanged)
+        _assert_indexed(changed)
+
+    @pytest.mark.asyncio
+    async def test_watermark_persisted(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        await setup_fake_db()
+        database = bot.STALKBROKER.db
+        guild = FakeGuild(3, role_names=["@everyone"])
+        await register_guilds([guild], [])
+
+        async def stored_watermark() -> Any:
+            document = await database.collections.servers.find_one(
+                {"discord_id": guild.id}
+            )
+            return document["sync_member_count"], document["sync_member_hash"]
+
+        await _events._add_guild(guild)  # type: ignore
+        first = await stored_watermark()
+        assert first == _events._membership_watermark(guild)  # type: ignore
+        assert first[0] == 3
+
+        _patch_guilds(monkeypatch, [guild])
+        guild.leave(guild.members[0])
+        await _events.on_resumed()
+
+        second = await stored_watermark()
+        assert second == _events._membership_watermark(guild)  # type: ignore
+        assert second[0] == 2
+        assert second[1] != first[1]
+
+        # The cached server is kept current too, so the next resume skips the guild.
+        assert not await _events._resync_guild(guild)  # type: ignore
+
+
+class TestUserCache:
+    @pytest.mark.asyncio
+    async def test_callers_get_copies(self) -> None:
+        ctx = await _island_context()
+        database = bot.STALKBROKER.db
+
+        user = await database.fetch_user(ctx.author, ctx.guild)
+        user.servers.append(1234)
+        user.timezone = pytz.timezone("Asia/Tokyo")
+
+        cached = await database.fetch_user(ctx.author, ctx.guild)
+        assert cached is not user
+        assert cached.servers == [ctx.guild.id]
+        assert cached.timezone == pytz.utc
+
+    @pytest.mark.asyncio
+    async def test_writes_refresh_cached_user(self) -> None:
+        ctx = await _island_context()
+        database = bot.STALKBROKER.db
+        users = database.collections.users
+
+        await database.fetch_user(ctx.author, ctx.guild)
+        await database.update_user_timezone(
+            ctx.author, ctx.guild, pytz.timezone("US/Pacific")
+        )
+        await database.update_user_notify_on_bulletin(ctx.author, ctx.guild, True)
+
+        reads = users.operations
+        user = await database.fetch_user(ctx.author, ctx.guild)
+        assert user.timezone == pytz.timezone("US/Pacific")
+        assert user.notify_on_bulletin
+        assert users.operations == reads + 1
+
+        # Once refreshed, the user is served from the cache again.
+        await database.fetch_user(ctx.author, ctx.guild)
+        assert users.operations == reads + 1
+
+
+class TestTickerVersions:
+    @pytest.mark.asyncio
+    async def test_stale_version_not_written(self) -> None:
+        ctx = await _island_context()
+        database = bot.STALKBROKER.db
+        user = await database.fetch_user(ctx.author, ctx.guild)
+        week_of = date_utils.previous_sunday(MESSAGE_TIME.date())
+        monday = week_of + datetime.timedelta(days=1)
+
+        async def write(price: int, expected_version: int) -> object:
+            return await database.update_ticker_price_and_pattern(
+                user=user,
+                week_of=week_of,
+                price_date=monday,
+                price_time_of_day=models.TimeOfDay.AM,
+                price=price,
+                pattern=models.Patterns.UNKNOWN,
+                expected_version=expected_version,
+            )
+
+        created = await write(90, expected_version=0)
+        assert isinstance(created, models.Ticker)
+        assert created.version == 1
+
+        # Someone else has written since version 0 was read.
+        assert await write(91, expected_version=0) is None
+        stored = await database.fetch_ticker(user, week_of)
+        assert (stored[0].price, stored.version) == (90, 1)
+
+        updated = await write(92, expected_version=1)
+        assert isinstance(updated, models.Ticker)
+        assert (updated[0].price, updated.version) == (92, 2)
+
+    @pytest.mark.asyncio
+    async def test_single_write_retries_conflict(self) -> None:
+        ctx = await _island_context()
+        stalkbroker = bot.STALKBROKER
+        user = await stalkbroker.db.fetch_user(ctx.author, ctx.guild)
+        week_of = date_utils.previous_sunday(MESSAGE_TIME.date())
+
+        async def concurrent_update() -> object:
+            return await stalkbroker.db.update_ticker_price(
+                user,
+                week_of,
+                week_of + datetime.timedelta(days=1),
+                models.TimeOfDay.AM,
+                100,
+            )
+
+        forecaster = stalkbroker.client_forecaster
+        interrupted = InterruptedForecaster(concurrent_update)
+        stalkbroker.client_forecaster = interrupted
+        stalkbroker.ticker_single_write = True
+        try:
+            await update_ticker(
+                ctx,  # type: ignore
+                price=100,
+                price_date_arg=None,
+                price_time_of_day_arg=None,
+            )
+        finally:
+            stalkbroker.client_forecaster = forecaster
+            stalkbroker.ticker_single_write = False
+
+        # The lost write was forecast again from the other update's ticker, so
+        # neither price is lost.
+        ticker = await stalkbroker.db.fetch_ticker(user, week_of)
+        assert ticker.known_prices() == {0: 100, 4: 100}
+        assert ticker.version == 2
+        assert interrupted.calls == 2
+
+
+class StreamlessCollection(FakeCollection):
+    """A collection whose change streams fail to open with ``errors``, in turn."""
+
+    def __init__(self, errors: List[pymongo.errors.OperationFailure]) -> None:
+        super().__init__()
+        self.errors: List[pymongo.errors.OperationFailure] = errors
+        self.watches: int = 0
+
+    def watch(self, **kwargs: Any) -> Any:
+        self.watches += 1
+        raise self.errors.pop(0)
+
+
+_UNSUPPORTED = pymongo.errors.OperationFailure(
+    "The $changeStream stage is only supported on replica sets", 40573
+)
+
+
+class TestWatchServers:
+    @pytest.mark.asyncio
+    async def test_polling_evicts_deleted_servers(self) -> None:
+        ctx = await _island_context()
+        database = bot.STALKBROKER.db
+        servers = StreamlessCollection([_UNSUPPORTED])
+        servers.documents = database.collections.servers.documents
+        database.collections.servers = servers
+
+        other = FakeGuild(0, role_names=["@everyone"])
+        await database.add_server(other)
+        assert other.id in database.server_cache
+
+        # Another bot process removes the server.
+        for key, document in list(servers.documents.items()):
+            if document["discord_id"] == other.id:
+                del servers.documents[key]
+
+        watcher = asyncio.ensure_future(database.watch_servers(poll_interval=60))
+        await asyncio.sleep(0.01)
+        watcher.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await watcher
+
+        assert servers.watches == 1
+        assert other.id not in database.server_cache
+        assert ctx.guild.id in database.server_cache
+
+    @pytest.mark.asyncio
+    async def test_other_failures_reopen_stream(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        await _island_context()
+        database = bot.STALKBROKER.db
+        history_lost = pymongo.errors.OperationFailure("resume point lost", 286)
+        servers = StreamlessCollection([history_lost, _UNSUPPORTED])
+        database.collections.servers = servers
+
+        sleep = asyncio.sleep
+
+        async def no_wait(seconds: float) -> None:
+            await sleep(0)
+
+        monkeypatch.setattr(asyncio, "sleep", no_wait)
+        watcher = asyncio.ensure_future(database.watch_servers(poll_interval=60))
+        for _ in range(5):
+            await sleep(0)
+        watcher.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await watcher
+
+        assert servers.watches == 2
+
+
+class RacingCollection(FakeCollection):
+    """
+    A collection where another writer registers every user of the first bulk write
+    just before it lands, so each of its upserts fails on the unique index.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.writes: List[Sequence[pymongo.UpdateOne]] = list()
+
+    async def bulk_write(
+        self, operations: Sequence[pymongo.UpdateOne], ordered: bool = True
+    ) -> None:
+        self.writes.append(operations)
+        if len(self.writes) > 1:
+            return await super().bulk_write(operations, ordered)
+
+        for operation in operations:
+            registered = {"$setOnInsert": {"id": uuid.uuid4(), "servers": []}}
+            self._update(operation._filter, registered, upsert=True)
+        write_errors = [
+            {"index": index, "code": 11000, "errmsg": "E11000 duplicate key error"}
+            for index in range(len(operations))
+        ]
+        raise pymongo.errors.BulkWriteError({"writeErrors": write_errors})
+
+
+class TestAddUsersBulk:
+    @pytest.mark.asyncio
+    async def test_duplicate_keys_retried_as_updates(self) -> None:
+        await setup_fake_db()
+        database = bot.STALKBROKER.db
+        users = RacingCollection()
+        database.collections.users = users
+
+        guild = FakeGuild(3, role_names=["@everyone"])
+        members = guild.members
+        added = await database.add_users_bulk(members, guild)
+
+        assert len(users.writes) == 2
+        assert all(not operation._upsert for operation in users.writes[1])
+        assert [user.discord_id for user in added] == [m.id for m in members]
+        for user in added:
+            assert user.servers == [guild.id]
+
+    @pytest.mark.asyncio
+    async def test_input_order_kept(self) -> None:
+        await setup_fake_db()
+        database = bot.STALKBROKER.db
+        guild = FakeGuild(6, role_names=["@everyone"])
+        members = guild.members
+
+        # Some users are cached, and some have to be registered.
+        await database.add_users_bulk(members[::2], guild)
+        added = await database.add_users_bulk(reversed(members), guild, chunk_size=2)
+
+        assert [user.discord_id for user in added] == [m.id for m in members][::-1]
+
+
+class TestStartResources:
+    @pytest.mark.asyncio
+    async def test_only_once(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        connects: List[bool] = list()
+
+        async def connect() -> None:
+            connects.append(True)
+
+        stalkbroker = bot.STALKBROKER
+        monkeypatch.setattr(stalkbroker.db, "connect", connect)
+        monkeypatch.setattr(stalkbroker, "resources_started", True)
+
+        # on_ready fires again after a reconnect.
+        await stalkbroker.start_resources()
+        assert connects == []
+
+    @pytest.mark.asyncio
+    async def test_watcher_errors_reported(
+        self, capsys: pytest.CaptureFixture
+    ) -> None:
+        async def watch() -> None:
+            raise RuntimeError("lost the database")
+
+        task = asyncio.ensure_future(watch())
+        task.add_done_callback(_report_watcher_stopped)
+        with pytest.raises(RuntimeError):
+            await task
+        await asyncio.sleep(0)
+
+        assert "lost the database" in capsys.readouterr().out
+
+    @pytest.mark.parametrize(
+        "env, warnings",
+        [
+            ({"FORECAST_HEDGING": "1", "FORECAST_HEDGE_BUDGET": "0.1"}, []),
+            (
+                {"FORECAST_HEDGE_BUDGET": "0.1", "FORECAST_BATCH_SIZE": "8"},
+                [
+                    "FORECAST_HEDGE_BUDGET is set without FORECAST_HEDGING",
+                    "FORECAST_BATCH_SIZE is set without FORECAST_BATCHING",
+                ],
+            ),
+            (
+                {"LOCAL_FORECASTER": "primary", "FORECAST_BATCHING": "1"},
+                [
+                    "LOCAL_FORECASTER is not supported",
+                    "forecasts come from the forecasting service, with FORECAST_BATCHING",
+                ],
+            ),
+        ],
+    )
+    def test_ignored_forecaster_settings_reported(
+        self,
+        env: Dict[str, str],
+        warnings: List[str],
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture,
+    ) -> None:
+        for name in (
+            "LOCAL_FORECASTER",
+            "FORECAST_HEDGING",
+            "FORECAST_HEDGE_PERCENTILE",
+            "FORECAST_HEDGE_BUDGET",
+            "FORECAST_BATCHING",
+            "FORECAST_BATCH_WINDOW",
+            "FORECAST_BATCH_SIZE",
+        ):
+            monkeypatch.delenv(name, raising=False)
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+
+        _check_forecaster_settings()
+
+        lines = capsys.readouterr().out.splitlines()
+        assert len(lines) == len(warnings)
+        for line, warning in zip(lines, warnings):
+            assert line.startswith(warning)
+
+
+class TestInstrumentation:
+    def test_every_command_instrumented(self) -> None:
+        # discord.py's own help command is left as it is.
+        commands = [
+            command
+            for command in bot.STALKBROKER.walk_commands()
+            if command.qualified_name != "help"
+        ]
+
+        assert "bulletins here" in {command.qualified_name for command in commands}
+        assert [
+            command.qualified_name
+            for command in commands
+            if not is_instrumented(command.callback)
+        ] == []
+
+
+class FakeResponse:
+    """The parts of an aiohttp response ``discord.HTTPException`` reads."""
+
+    def __init__(self, status: int, headers: Dict[str, str]) -> None:
+        self.status: int = status
+        self.reason: str = "rate limited" if status == 429 else "forbidden"
+        self.headers: Dict[str, str] = headers
+
+
+class TestRoleChangeQueue:
+    @pytest.mark.asyncio
+    async def test_concurrency_bounded(self) -> None:
+        in_flight: List[int] = [0]
+        most_in_flight: List[int] = [0]
+
+        async def change() -> None:
+            in_flight[0] += 1
+            most_in_flight[0] = max(most_in_flight[0], in_flight[0])
+            await asyncio.sleep(0)
+            in_flight[0] -= 1
+
+        queue = _RoleChangeQueue(concurrency=2)
+        for _ in range(6):
+            queue.put(change)
+        report = RoleSyncReport()
+        await queue.run(report)
+
+        assert (report.applied, report.failed) == (6, 0)
+        assert most_in_flight == [2]
+
+    @pytest.mark.asyncio
+    async def test_rate_limits_left_to_discord_py(self) -> None:
+        calls: List[bool] = list()
+
+        # discord.py has already retried the change by the time it raises a 429.
+        async def limited() -> None:
+            calls.append(True)
+            response = FakeResponse(429, {"Retry-After": "30"})
+            raise discord.HTTPException(response, "slow down")
+
+        queue = _RoleChangeQueue(concurrency=1)
+        queue.put(limited)
+        report = RoleSyncReport()
+        await queue.run(report)
+
+        assert calls == [True]
+        assert (report.applied, report.failed) == (0, 1)
+
+    @pytest.mark.asyncio
+    async def test_rejections_not_retried(self) -> None:
+        calls: List[bool] = list()
+
+        async def forbidden() -> None:
+            calls.append(True)
+            raise discord.HTTPException(FakeResponse(403, {}), "missing permissions")
+
+        queue = _RoleChangeQueue(concurrency=1)
+        queue.put(forbidden)
+        report = RoleSyncReport()
+        await queue.run(report)
+
+        assert calls == [True]
+        assert (report.applied, report.failed) == (0, 1)
+
+
+class TestPipeline:
+    @pytest.mark.asyncio
+    async def test_stages_get_dependency_results(self) -> None:
+        pipeline = Pipeline("test")
+
+        async def number() -> int:
+            return 2
+
+        async def double(value: int) -> int:
+            return value * 2
+
+        async def add(first: int, second: int) -> int:
+            return first + second
+
+        first = pipeline.stage("number", number)
+        second = pipeline.stage("double", double, first)
+        total = pipeline.stage("add", add, first, second)
+        await pipeline.wait()
+
+        assert total.result() == 6
+        assert set(pipeline.latencies) == {"number", "double", "add"}
+
+    @pytest.mark.asyncio
+    async def test_dependency_error_propagates(self) -> None:
+        pipeline = Pipeline("test")
+        ran: List[str] = list()
+
+        async def fail() -> None:
+            raise RuntimeError("write failed")
+
+        async def after_failure(_: object) -> None:
+            ran.append("after_failure")
+
+        async def independent() -> None:
+            await asyncio.sleep(0.01)
+            ran.append("independent")
+
+        failed = pipeline.stage("fail", fail)
+        dependent = pipeline.stage("dependent", after_failure, failed)
+        pipeline.stage("independent", independent)
+
+        with pytest.raises(RuntimeError, match="write failed"):
+            await pipeline.wait()
+
+        # The dependent stage failed with its dependency's error without running,
+        # while the independent stage was left to finish.
+        assert ran == ["independent"]
+        assert isinstance(dependent.exception(), RuntimeError)
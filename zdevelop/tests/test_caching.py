@@ -0,0 +1,223 @@
+import asyncio
+import os
+import pathlib
+import pytest
+from typing import Awaitable, Callable, List
+
+from stalkbroker import caching
+
+
+def _loader(blob: bytes, calls: List[bytes]) -> Callable[[], Awaitable[bytes]]:
+    """Returns a loader of ``blob`` that records each call in ``calls``."""
+
+    async def load() -> bytes:
+        calls.append(blob)
+        return blob
+
+    return load
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self) -> None:
+        self.now: float = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache:
+    def test_expiry(self) -> None:
+        clock = FakeClock()
+        cache: caching.TTLCache[str, int] = caching.TTLCache(
+            maxsize=4, ttl=10, clock=clock
+        )
+        cache.put("a", 1)
+
+        clock.now = 9.9
+        assert cache.get("a") == 1
+
+        clock.now = 10
+        assert cache.get("a") is None
+        assert "a" not in cache
+        assert len(cache) == 0
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_no_ttl_never_expires(self) -> None:
+        clock = FakeClock()
+        cache: caching.TTLCache[str, int] = caching.TTLCache(
+            maxsize=4, ttl=None, clock=clock
+        )
+        cache.put("a", 1)
+
+        clock.now = 10 ** 9
+        assert cache.get("a") == 1
+
+    def test_evicts_least_recently_used(self) -> None:
+        cache: caching.TTLCache[str, int] = caching.TTLCache(maxsize=2, ttl=None)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        # Reading "a" makes "b" the least recently used.
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+
+    def test_failed_validation_is_miss(self) -> None:
+        cache: caching.TTLCache[str, int] = caching.TTLCache(maxsize=2, ttl=None)
+        cache.put("a", 1)
+
+        assert cache.get("a", validate=lambda value: value > 1) is None
+        assert cache.misses == 1
+
+
+class TestCoalescingCache:
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_load(self) -> None:
+        cache: caching.CoalescingCache[str, int] = caching.CoalescingCache(
+            maxsize=4, ttl=None
+        )
+        loads: List[str] = list()
+        release = asyncio.Event()
+
+        async def load() -> int:
+            loads.append("a")
+            await release.wait()
+            return 1
+
+        waiters = [asyncio.ensure_future(cache.get("a", load)) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert cache.in_flight == 1
+
+        release.set()
+        assert await asyncio.gather(*waiters) == [1, 1, 1]
+        assert await cache.get("a", load) == 1
+
+        assert loads == ["a"]
+        assert cache.coalesced == 2
+        assert cache.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_load_not_cached(self) -> None:
+        cache: caching.CoalescingCache[str, int] = caching.CoalescingCache(
+            maxsize=4, ttl=None
+        )
+
+        async def fail() -> int:
+            raise RuntimeError("backend down")
+
+        async def load() -> int:
+            return 1
+
+        with pytest.raises(RuntimeError):
+            await cache.get("a", fail)
+        await asyncio.sleep(0)
+
+        assert "a" not in cache.cache
+        assert await cache.get("a", load) == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_keeps_load(self) -> None:
+        cache: caching.CoalescingCache[str, int] = caching.CoalescingCache(
+            maxsize=4, ttl=None
+        )
+        release = asyncio.Event()
+
+        async def load() -> int:
+            await release.wait()
+            return 1
+
+        first = asyncio.ensure_future(cache.get("a", load))
+        second = asyncio.ensure_future(cache.get("a", load))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        release.set()
+        assert await second == 1
+
+
+class TestBlobStore:
+    @pytest.mark.asyncio
+    async def test_tiers(self, tmp_path: pathlib.Path) -> None:
+        calls: List[bytes] = list()
+        store = caching.BlobStore(
+            max_memory_bytes=1024, directory=tmp_path, max_disk_bytes=1024
+        )
+        blob = b"chart"
+        key = caching.content_key(blob)
+
+        assert await store.get(key, _loader(blob, calls)) == blob
+        assert await store.get(key, _loader(blob, calls)) == blob
+        assert (tmp_path / key).read_bytes() == blob
+
+        # A new process starts with an empty memory tier, but the same directory.
+        restarted = caching.BlobStore(
+            max_memory_bytes=1024, directory=tmp_path, max_disk_bytes=1024
+        )
+        assert await restarted.get(key, _loader(blob, calls)) == blob
+
+        assert calls == [blob]
+        assert (store.misses, store.memory_hits) == (1, 1)
+        assert (restarted.misses, restarted.disk_hits) == (0, 1)
+
+    @pytest.mark.asyncio
+    async def test_memory_evicts_least_recently_used(self) -> None:
+        calls: List[bytes] = list()
+        store = caching.BlobStore(max_memory_bytes=8)
+        first, second, third = b"aaaa", b"bbbb", b"cccc"
+
+        for blob in (first, second, first, third):
+            await store.get(caching.content_key(blob), _loader(blob, calls))
+
+        # Reading the first blob again kept it, so the second one went.
+        await store.get(caching.content_key(first), _loader(first, calls))
+        await store.get(caching.content_key(second), _loader(second, calls))
+        assert calls == [first, second, third, second]
+
+    @pytest.mark.asyncio
+    async def test_disk_evicts_to_low_water(self, tmp_path: pathlib.Path) -> None:
+        store = caching.BlobStore(
+            max_memory_bytes=0, directory=tmp_path, max_disk_bytes=100
+        )
+        blobs = [bytes([i]) * 20 for i in range(6)]
+        for age, blob in enumerate(blobs[:5]):
+            key = caching.content_key(blob)
+            await store.get(key, _loader(blob, []))
+            os.utime(tmp_path / key, (age, age))
+
+        # Going over the budget evicts the oldest files until there is room to spare,
+        # not just enough for the new blob.
+        await store.get(caching.content_key(blobs[5]), _loader(blobs[5], []))
+
+        kept = {path.name for path in tmp_path.iterdir()}
+        assert kept == {caching.content_key(blob) for blob in blobs[2:]}
+
+    @pytest.mark.asyncio
+    async def test_disk_read_error_is_miss(self, tmp_path: pathlib.Path) -> None:
+        calls: List[bytes] = list()
+        store = caching.BlobStore(
+            max_memory_bytes=0, directory=tmp_path, max_disk_bytes=1024
+        )
+        blob = b"chart"
+        key = caching.content_key(blob)
+        # A directory where the blob's file should be can't be read.
+        (tmp_path / key).mkdir()
+
+        assert await store.get(key, _loader(blob, calls)) == blob
+        assert calls == [blob]
+        assert store.disk_errors == 1
+
+    @pytest.mark.asyncio
+    async def test_disk_write_error_skipped(self, tmp_path: pathlib.Path) -> None:
+        directory = tmp_path / "charts"
+        store = caching.BlobStore(
+            max_memory_bytes=0, directory=directory, max_disk_bytes=1024
+        )
+        directory.rmdir()
+
+        blob = b"chart"
+        assert await store.get(caching.content_key(blob), _loader(blob, [])) == blob
+        assert store.disk_errors == 1
@@ -0,0 +1,45 @@
+import pytest
+
+from protogen.stalk_proto import models_pb2 as backend
+from stalkbroker import charting, forecasting
+
+
+pytest.importorskip("matplotlib")
+
+
+def chart_request(image_format: int) -> backend.ReqForecastChart:
+    ticker = backend.Ticker(
+        purchase_price=100, prices=[86, 82, 78, 74] + [0] * 8, current_period=4
+    )
+    return backend.ReqForecastChart(
+        ticker=ticker,
+        forecast=forecasting.forecast_prices(ticker),
+        format=image_format,
+        color_background="#2C2F33",
+        padding=0.03,
+    )
+
+
+class TestLocalChartRenderer:
+    def test_png(self) -> None:
+        request = chart_request(backend.ImageFormat.PNG)
+        response = backend.RespChart.FromString(
+            charting.render_forecast_chart(request.SerializeToString())
+        )
+        assert response.chart.startswith(b"\x89PNG")
+
+    def test_svg(self) -> None:
+        request = chart_request(backend.ImageFormat.SVG)
+        response = backend.RespChart.FromString(
+            charting.render_forecast_chart(request.SerializeToString())
+        )
+        assert b"<svg" in response.chart
+
+    def test_sunday_cursor(self) -> None:
+        # Sundays are sent with a current period of -1, before the first period.
+        request = chart_request(backend.ImageFormat.PNG)
+        request.ticker.current_period = -1
+        response = backend.RespChart.FromString(
+            charting.render_forecast_chart(request.SerializeToString())
+        )
+        assert response.chart.startswith(b"\x89PNG")
@@ -0,0 +1,90 @@
+import datetime
+import numpy as np
+import pytest
+import pytz
+import pytz.exceptions
+
+from stalkbroker import date_utils, models
+
+
+class TestTimezoneRegistry:
+    def test_get_interns_zones(self) -> None:
+        registry = date_utils.TimezoneRegistry()
+
+        zone = registry.get("Europe/Berlin")
+        assert zone is pytz.timezone("Europe/Berlin")
+        assert registry.get("Europe/Berlin") is zone
+        assert registry.misses == 1
+
+    @pytest.mark.parametrize(
+        "value,expected",
+        [
+            ("pst", "US/Pacific"),
+            ("EST", "US/Eastern"),
+            ("Cst", "US/Central"),
+            ("gmt", "GMT"),
+            ("MST", "MST"),
+            ("hst", "HST"),
+            ("cet", "CET"),
+            ("aedt", "Australia/Sydney"),
+            ("america/new_york", "America/New_York"),
+            ("UTC", "UTC"),
+        ],
+    )
+    def test_parse(self, value: str, expected: str) -> None:
+        assert date_utils.parse_timezone_arg(value).zone == expected
+
+    def test_parse_unknown(self) -> None:
+        with pytest.raises(pytz.exceptions.UnknownTimeZoneError):
+            date_utils.parse_timezone_arg("blahblah")
+
+    def test_preload(self) -> None:
+        registry = date_utils.TimezoneRegistry()
+
+        loaded = registry.preload(["Asia/Tokyo", "Asia/Tokyo", None, "Not/A_Zone"])
+        assert loaded == 1
+
+        registry.get("Asia/Tokyo")
+        assert registry.misses == 2
+
+
+class TestWeeks:
+    def test_previous_sunday(self) -> None:
+        sunday = datetime.date(2020, 4, 5)
+        for offset in range(7):
+            day = sunday + datetime.timedelta(days=offset)
+            assert date_utils.previous_sunday(day) == sunday
+        assert date_utils.previous_sunday(datetime.datetime(2020, 4, 4, 23)) == (
+            datetime.date(2020, 3, 29)
+        )
+
+    def test_bucket_weeks(self) -> None:
+        price_times = np.array(
+            [
+                "2020-04-05T09:00",
+                "2020-04-06T11:59",
+                "2020-04-06T12:00",
+                "2020-04-11T20:00",
+                "1969-12-31T08:00",
+            ],
+            dtype="datetime64[m]",
+        )
+        weeks_of, phases = date_utils.bucket_weeks(price_times)
+
+        assert weeks_of.tolist() == [
+            datetime.date(2020, 4, 5),
+            datetime.date(2020, 4, 5),
+            datetime.date(2020, 4, 5),
+            datetime.date(2020, 4, 5),
+            datetime.date(1969, 12, 28),
+        ]
+        assert phases.tolist() == [date_utils.SUNDAY_PHASE, 0, 1, 11, 4]
+
+    def test_bucket_weeks_dates(self) -> None:
+        dates = np.array(["2020-04-07", "2020-04-07"], dtype="datetime64[D]")
+        times_of_day = np.array(
+            [models.TimeOfDay.AM.value, models.TimeOfDay.PM.value]
+        )
+        _, phases = date_utils.bucket_weeks(dates, times_of_day)
+
+        assert phases.tolist() == [2, 3]
@@ -0,0 +1,308 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import json
+import pathlib
+import grpclib.client
+import grpclib.const
+import grpclib.exceptions
+import grpclib.server
+import pytest
+from typing import Any, AsyncIterator, Dict, List
+
+from google.protobuf import json_format
+
+from protogen.stalk_proto import models_pb2 as backend
+from protogen.stalk_proto import forecaster_grpc as forecaster
+from stalkbroker import forecasting
+
+
+# Responses recorded from the forecasting service by
+# zdevelop/make_scripts/make_forecast_recordings.py. None are committed, as the service
+# could not be reached to record them, so the local forecaster has not been shown to
+# match it.
+RECORDINGS_PATH = pathlib.Path(__file__).parent / "forecast_recordings.jsonl"
+
+
+def load_recordings() -> List[Dict[str, Any]]:
+    if not RECORDINGS_PATH.exists():
+        return list()
+    with RECORDINGS_PATH.open() as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+RECORDINGS = load_recordings()
+
+
+def blank_ticker(previous_pattern: int = backend.UNKNOWN) -> backend.Ticker:
+    return backend.Ticker(previous_pattern=previous_pattern, prices=[0] * 12)
+
+
+def possible_patterns(forecast: backend.Forecast) -> Dict[int, float]:
+    return {
+        p.pattern: p.chance for p in forecast.patterns if len(p.potential_weeks) > 0
+    }
+
+
+def small_spike_week(forecast: backend.Forecast) -> backend.PotentialWeek:
+    """The only possible small spike week of ``forecast``."""
+    (pattern,) = [p for p in forecast.patterns if p.pattern == backend.SMALLSPIKE]
+    (week,) = pattern.potential_weeks
+    return week
+
+
+class TestLocalForecaster:
+    def test_chances_sum_to_one(self) -> None:
+        forecast = forecasting.forecast_prices(blank_ticker())
+
+        assert sum(p.chance for p in forecast.patterns) == pytest.approx(1)
+        for pattern in forecast.patterns:
+            week_chances = sum(w.chance for w in pattern.potential_weeks)
+            assert week_chances == pytest.approx(pattern.chance)
+
+    def test_blank_ticker(self) -> None:
+        """
+        The forecast for a week with no prices. The integration tests expect a heat of
+        207 from the forecasting service for the same ticker, which is why this
+        forecaster is not used in its place.
+        """
+        forecast = forecasting.forecast_prices(blank_ticker())
+
+        most_likely = max(forecast.patterns, key=lambda p: p.chance)
+        likely_average = (
+            most_likely.prices_future.max + most_likely.prices_future.guaranteed
+        ) / 2
+        assert likely_average == 117.5
+        assert forecast.heat == 202
+
+    def test_every_pattern_present(self) -> None:
+        # Reports expect an entry for every pattern, even impossible ones.
+        ticker = backend.Ticker(purchase_price=100, prices=[86, 82, 78, 74] + [0] * 8)
+        forecast = forecasting.forecast_prices(ticker)
+
+        assert {p.pattern for p in forecast.patterns} == {
+            backend.FLUCTUATING,
+            backend.BIGSPIKE,
+            backend.DECREASING,
+            backend.SMALLSPIKE,
+        }
+        assert backend.FLUCTUATING not in possible_patterns(forecast)
+
+    def test_confirmed_decreasing(self) -> None:
+        prices = [86, 83, 79, 75, 72, 68, 65, 61, 58, 55, 51, 48]
+        ticker = backend.Ticker(purchase_price=100, prices=prices, current_period=11)
+        forecast = forecasting.forecast_prices(ticker)
+
+        assert possible_patterns(forecast) == {backend.DECREASING: pytest.approx(1)}
+        assert not forecast.spikes.any.has
+
+    def test_known_prices_are_exact(self) -> None:
+        ticker = backend.Ticker(purchase_price=100, prices=[90, 140] + [0] * 10)
+        forecast = forecasting.forecast_prices(ticker)
+
+        for pattern in forecast.patterns:
+            for week in pattern.potential_weeks:
+                assert (week.prices[0].min, week.prices[0].max) == (90, 90)
+                assert (week.prices[1].min, week.prices[1].max) == (140, 140)
+
+    def test_known_shoulder_raises_peak(self) -> None:
+        # Only a small spike starting on Monday morning fits, with the 190 on the
+        # shoulder before the peak.
+        ticker = backend.Ticker(
+            purchase_price=100, prices=[110, 120, 190] + [0] * 9, current_period=2
+        )
+        forecast = forecasting.forecast_prices(ticker)
+
+        assert possible_patterns(forecast) == {backend.SMALLSPIKE: pytest.approx(1)}
+        week = small_spike_week(forecast)
+        assert [(p.min, p.max) for p in week.prices[3:5]] == [(191, 200), (139, 199)]
+
+    def test_known_peak_caps_shoulder(self) -> None:
+        ticker = backend.Ticker(
+            purchase_price=100, prices=[110, 120, 150, 160] + [0] * 8, current_period=3
+        )
+        forecast = forecasting.forecast_prices(ticker)
+
+        week = small_spike_week(forecast)
+        assert (week.prices[4].min, week.prices[4].max) == (139, 159)
+        assert forecast.prices_future.max == 160
+
+    def test_shoulder_above_peak_impossible(self) -> None:
+        ticker = backend.Ticker(
+            purchase_price=100, prices=[110, 120, 170, 160] + [0] * 8, current_period=3
+        )
+        with pytest.raises(forecasting.ImpossiblePricesError):
+            forecasting.forecast_prices(ticker)
+
+    def test_impossible_prices(self) -> None:
+        ticker = backend.Ticker(purchase_price=100, prices=[900] + [0] * 11)
+        with pytest.raises(forecasting.ImpossiblePricesError):
+            forecasting.forecast_prices(ticker)
+
+    def test_previous_pattern_changes_chances(self) -> None:
+        after_big = forecasting.forecast_prices(blank_ticker(backend.BIGSPIKE))
+        after_decreasing = forecasting.forecast_prices(blank_ticker(backend.DECREASING))
+
+        assert possible_patterns(after_big)[backend.BIGSPIKE] == pytest.approx(0.05)
+        assert possible_patterns(after_decreasing)[backend.BIGSPIKE] == pytest.approx(
+            0.45
+        )
+
+
+class TestLocalForecasterEngine:
+    @pytest.mark.asyncio
+    async def test_forecasts_in_process_pool(self) -> None:
+        ticker = backend.Ticker(purchase_price=100, prices=[90, 140] + [0] * 10)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1) as pool:
+            engine = forecasting.LocalForecaster(pool)
+            forecast = await engine.ForecastPrices(ticker)
+
+            with pytest.raises(forecasting.ImpossiblePricesError):
+                await engine.ForecastPrices(impossible_ticker())
+
+        assert forecast == forecasting.forecast_prices(ticker)
+
+
+class _UnreachableEngine:
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+    async def ForecastPrices(self, ticker: backend.Ticker) -> backend.Forecast:
+        raise self.error
+
+
+class TestFallbackForecaster:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "error",
+        [
+            ConnectionRefusedError(),
+            grpclib.exceptions.GRPCError(grpclib.const.Status.UNAVAILABLE),
+        ],
+    )
+    async def test_falls_back_when_unreachable(self, error: BaseException) -> None:
+        engine = forecasting.FallbackForecaster(
+            primary=_UnreachableEngine(error),
+            fallback=forecasting.LocalForecaster(),
+            timeout=1,
+        )
+
+        forecast = await engine.ForecastPrices(blank_ticker())
+        assert len(forecast.patterns) == 4
+        assert engine.fallbacks == 1
+
+    @pytest.mark.asyncio
+    async def test_passes_on_rejections(self) -> None:
+        error = grpclib.exceptions.GRPCError(
+            grpclib.const.Status.UNKNOWN, "ticker prices are impossible"
+        )
+        engine = forecasting.FallbackForecaster(
+            primary=_UnreachableEngine(error),
+            fallback=forecasting.LocalForecaster(),
+            timeout=1,
+        )
+
+        with pytest.raises(grpclib.exceptions.GRPCError):
+            await engine.ForecastPrices(blank_ticker())
+        assert engine.fallbacks == 0
+
+
+@contextlib.asynccontextmanager
+async def serve_forecasts(
+    socket_path: pathlib.Path, servicer: forecasting.LocalForecastServer,
+) -> AsyncIterator[forecaster.StalkForecasterStub]:
+    """Run the stand-in forecasting service and connect a client stub to it."""
+    server = grpclib.server.Server([servicer])
+    await server.start(path=str(socket_path))
+    channel = grpclib.client.Channel(path=str(socket_path))
+    try:
+        yield forecaster.StalkForecasterStub(channel)
+    finally:
+        channel.close()
+        server.close()
+        await server.wait_closed()
+
+
+def impossible_ticker() -> backend.Ticker:
+    return backend.Ticker(purchase_price=100, prices=[900] + [0] * 11)
+
+
+class TestBatchingForecaster:
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_batched(self, tmp_path: pathlib.Path) -> None:
+        servicer = forecasting.LocalForecastServer()
+        async with serve_forecasts(tmp_path / "forecaster.sock", servicer) as stub:
+            engine = forecasting.BatchingForecaster(stub, window=0.05, max_size=64)
+            tickers = [
+                backend.Ticker(purchase_price=100, prices=[90 - i] + [0] * 11)
+                for i in range(10)
+            ]
+            forecasts = await asyncio.gather(
+                *(engine.ForecastPrices(ticker) for ticker in tickers)
+            )
+
+        assert (servicer.batch_calls, servicer.unary_calls) == (1, 0)
+        for ticker, forecast in zip(tickers, forecasts):
+            assert forecast == forecasting.forecast_prices(ticker)
+
+    @pytest.mark.asyncio
+    async def test_full_batch_sent_early(self, tmp_path: pathlib.Path) -> None:
+        servicer = forecasting.LocalForecastServer()
+        async with serve_forecasts(tmp_path / "forecaster.sock", servicer) as stub:
+            # The window is far longer than the test is allowed to take.
+            engine = forecasting.BatchingForecaster(stub, window=60, max_size=4)
+            requests = (engine.ForecastPrices(blank_ticker()) for _ in range(8))
+            await asyncio.wait_for(asyncio.gather(*requests), timeout=5)
+
+        assert servicer.batch_calls == 2
+
+    @pytest.mark.asyncio
+    async def test_impossible_ticker_fails_alone(self, tmp_path: pathlib.Path) -> None:
+        servicer = forecasting.LocalForecastServer()
+        async with serve_forecasts(tmp_path / "forecaster.sock", servicer) as stub:
+            engine = forecasting.BatchingForecaster(stub, window=0.05, max_size=64)
+            possible, impossible = await asyncio.gather(
+                engine.ForecastPrices(blank_ticker()),
+                engine.ForecastPrices(impossible_ticker()),
+                return_exceptions=True,
+            )
+
+        assert isinstance(possible, backend.Forecast)
+        assert isinstance(impossible, grpclib.exceptions.GRPCError)
+        assert impossible.status is grpclib.const.Status.INVALID_ARGUMENT
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_unary(self, tmp_path: pathlib.Path) -> None:
+        servicer = forecasting.LocalForecastServer(batching=False)
+        async with serve_forecasts(tmp_path / "forecaster.sock", servicer) as stub:
+            engine = forecasting.BatchingForecaster(stub, window=0.05, max_size=64)
+            first = await asyncio.gather(
+                *(engine.ForecastPrices(blank_ticker()) for _ in range(3))
+            )
+            assert not engine.batching_supported
+
+            second = await asyncio.gather(
+                *(engine.ForecastPrices(blank_ticker()) for _ in range(3))
+            )
+
+        assert len(first) == len(second) == 3
+        assert (servicer.batch_calls, servicer.unary_calls) == (0, 6)
+
+
+@pytest.mark.skipif(
+    not RECORDINGS,
+    reason="no recorded forecasts, run make forecast-recordings",
+)
+@pytest.mark.parametrize(
+    "recording", RECORDINGS, ids=[str(i) for i in range(len(RECORDINGS))]
+)
+class TestParity:
+    def test_forecast(self, recording: Dict[str, Any]) -> None:
+        ticker = json_format.ParseDict(recording["ticker"], backend.Ticker())
+        if "error" in recording:
+            with pytest.raises(forecasting.ImpossiblePricesError):
+                forecasting.forecast_prices(ticker)
+            return
+
+        remote = json_format.ParseDict(recording["forecast"], backend.Forecast())
+        assert forecasting.forecast_prices(ticker) == remote
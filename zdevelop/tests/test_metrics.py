@@ -0,0 +1,110 @@
+import aiohttp
+import math
+import pytest
+
+from stalkbroker import metrics
+
+
+class TestLatencyHistogram:
+    def test_quantiles(self) -> None:
+        histogram = metrics.LatencyHistogram(buckets=[0.01, 0.1, 1.0])
+        for seconds in [0.005] * 90 + [0.05] * 9 + [5.0]:
+            histogram.observe(seconds)
+
+        assert histogram.count == 100
+        assert histogram.counts == [90, 9, 0, 1]
+        assert histogram.quantile(0.5) == 0.01
+        assert histogram.quantile(0.99) == 0.1
+        assert histogram.quantile(1.0) == math.inf
+
+
+class TestRegistry:
+    def test_render(self) -> None:
+        registry = metrics.Registry()
+        counter = registry.counter("calls_total", "Calls made.", ["method"])
+        counter.inc('say "hi"')
+        counter.inc('say "hi"', amount=2)
+
+        histogram = registry.histogram(
+            "call_seconds", "Call latency.", buckets=[0.1, 1]
+        )
+        histogram.labels().observe(0.05)
+        histogram.labels().observe(0.5)
+
+        assert registry.render().splitlines() == [
+            "# HELP calls_total Calls made.",
+            "# TYPE calls_total counter",
+            'calls_total{method="say \\"hi\\""} 3.0',
+            "# HELP call_seconds Call latency.",
+            "# TYPE call_seconds histogram",
+            'call_seconds_bucket{le="0.1"} 1',
+            'call_seconds_bucket{le="1.0"} 2',
+            'call_seconds_bucket{le="+Inf"} 2',
+            "call_seconds_sum 0.55",
+            "call_seconds_count 2",
+        ]
+
+    def test_duplicate_names(self) -> None:
+        registry = metrics.Registry()
+        registry.counter("calls_total", "Calls made.")
+        with pytest.raises(ValueError):
+            registry.counter("calls_total", "Calls made.")
+
+        # Callbacks may be replaced when the resources they read are set up again.
+        registry.callback("gauge", "hits", "Cache hits.", [], lambda: [((), 1)])
+        registry.callback("gauge", "hits", "Cache hits.", [], lambda: [((), 2)])
+        assert "hits 2.0" in registry.render().splitlines()
+
+    def test_metric_is_abstract(self) -> None:
+        with pytest.raises(TypeError):
+            metrics.Metric("calls_total", "Calls made.")  # type: ignore[abstract]
+
+
+class TestTiming:
+    @pytest.mark.asyncio
+    async def test_time_methods(self) -> None:
+        latencies = metrics.Histogram("seconds", "Latency.", ["operation"])
+        errors = metrics.Counter("errors_total", "Errors.", ["operation"])
+
+        @metrics.time_methods(latencies, errors=errors, exclude=("skipped",))
+        class Connection:
+            async def fetch(self) -> str:
+                return "fetched"
+
+            async def fail(self) -> None:
+                raise ValueError("failed")
+
+            async def skipped(self) -> None:
+                pass
+
+        connection = Connection()
+        assert await connection.fetch() == "fetched"
+        with pytest.raises(ValueError):
+            await connection.fail()
+        await connection.skipped()
+
+        assert latencies.labels("fetch").count == 1
+        assert latencies.labels("fail").count == 1
+        assert errors.value("fail") == 1
+        assert errors.value("fetch") == 0
+        assert ("skipped",) not in dict(latencies.collect())
+
+
+class TestHTTPServer:
+    @pytest.mark.asyncio
+    async def test_serves_metrics(self, unused_tcp_port: int) -> None:
+        registry = metrics.Registry()
+        registry.counter("calls_total", "Calls made.").inc()
+
+        runner = await metrics.start_http_server(registry, "127.0.0.1", unused_tcp_port)
+        try:
+            async with aiohttp.ClientSession() as session:
+                url = f"http://127.0.0.1:{unused_tcp_port}/metrics"
+                async with session.get(url) as response:
+                    content_type = response.headers["Content-Type"]
+                    body = await response.text()
+        finally:
+            await runner.cleanup()
+
+        assert content_type == metrics.CONTENT_TYPE
+        assert body == registry.render()
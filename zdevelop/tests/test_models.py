@@ -0,0 +1,85 @@
+import datetime
+import uuid
+import pytest
+
+from protogen.stalk_proto import models_pb2 as backend
+from stalkbroker import models
+
+
+WEEK_OF = datetime.date(2020, 4, 5)
+
+
+def _ticker() -> models.Ticker:
+    ticker = models.Ticker(user_id=uuid.uuid4(), week_of=WEEK_OF, purchase_price=98)
+    ticker[0] = 90
+    ticker[3] = 120
+    return ticker
+
+
+class TestTicker:
+    def test_phases(self) -> None:
+        ticker = _ticker()
+
+        assert ticker[3] == models.PhaseInfo(
+            price=120,
+            name="Tuesday PM",
+            date=datetime.date(2020, 4, 7),
+            time_of_day=models.TimeOfDay.PM,
+        )
+        assert [phase.price for phase in ticker][:5] == [90, None, None, 120, None]
+        assert ticker.known_prices() == {0: 90, 3: 120}
+
+        ticker[3] = None
+        assert ticker[3].price is None
+
+    def test_set_price(self) -> None:
+        ticker = _ticker()
+        ticker.set_price(105, datetime.date(2020, 4, 11), models.TimeOfDay.PM)
+        ticker.set_price(100, WEEK_OF, None)
+
+        assert ticker[11].price == 105
+        assert ticker.purchase_price == 100
+
+    @pytest.mark.parametrize(
+        "phase,price,error",
+        [(12, 90, IndexError), (0, "90", TypeError), (0, -5, ValueError)],
+    )
+    def test_bad_price(self, phase: int, price: int, error: type) -> None:
+        with pytest.raises(error):
+            _ticker()[phase] = price
+
+    def test_equality_ignores_version(self) -> None:
+        ticker = _ticker()
+        other = models.Ticker(
+            user_id=ticker.user_id, week_of=WEEK_OF, purchase_price=98, version=4
+        )
+        other[0], other[3] = 90, 120
+
+        assert ticker == other
+        other[0] = 91
+        assert ticker != other
+
+    def test_to_backend(self) -> None:
+        converted = _ticker().to_backend(
+            previous_pattern=backend.PricePatterns.UNKNOWN, current_period=3
+        )
+
+        assert converted.purchase_price == 98
+        assert list(converted.prices) == [90, 0, 0, 120] + [0] * 8
+        assert converted.current_period == 3
+
+
+class TestPhaseTables:
+    def test_phase_names(self) -> None:
+        assert models.Ticker.phase_name(-1) == "Daisey's Deal"
+        assert [models.Ticker.phase_name(p) for p in (0, 5, 11)] == [
+            "Monday AM",
+            "Wednesday PM",
+            "Saturday PM",
+        ]
+
+    def test_phase_dates(self) -> None:
+        dates = models.phase_dates(WEEK_OF)
+        assert dates[0] == datetime.date(2020, 4, 6)
+        assert dates[11] == datetime.date(2020, 4, 11)
+        assert [phase.date for phase in _ticker()] == list(dates)
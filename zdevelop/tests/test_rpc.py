@@ -0,0 +1,333 @@
+import asyncio
+import functools
+import pathlib
+import grpclib.client
+import grpclib.const
+import grpclib.exceptions
+import grpclib.server
+import pytest
+from typing import Any, List
+
+from protogen.stalk_proto import models_pb2 as backend
+from stalkbroker import errors, forecasting, metrics, rpc
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+UNAVAILABLE = grpclib.exceptions.GRPCError(grpclib.const.Status.UNAVAILABLE)
+
+
+class TestChannelPool:
+    def test_least_loaded(self) -> None:
+        pool = rpc.ChannelPool(lambda: None, size=3)  # type: ignore
+
+        first, second, third = pool.acquire(), pool.acquire(), pool.acquire()
+        assert {first, second, third} == {0, 1, 2}
+
+        pool.release(second)
+        assert pool.acquire() == second
+
+    def test_failing_channel_passed_over(self) -> None:
+        clock = FakeClock()
+        pool = rpc.ChannelPool(
+            lambda: None, size=2, recheck_after=5, clock=clock  # type: ignore
+        )
+
+        with pytest.raises(grpclib.exceptions.GRPCError):
+            with pool.lease() as failing:
+                raise UNAVAILABLE
+
+        # The failing channel is idle, but the other one is still picked over it.
+        healthy = 1 - failing
+        for _ in range(3):
+            assert pool.acquire() == healthy
+        assert pool.in_flight[failing] == 0
+
+        clock.now = 5
+        assert pool.acquire() == failing
+        pool.release(failing)
+        assert pool.failed_at == [None, None]
+
+    def test_all_failing_still_used(self) -> None:
+        pool = rpc.ChannelPool(lambda: None, size=2)  # type: ignore
+        for index in range(2):
+            pool.acquire()
+            pool.release(index, ConnectionResetError())
+
+        assert not any(pool.is_healthy(index) for index in range(2))
+        assert pool.acquire() in (0, 1)
+
+    def test_answers_are_not_channel_failures(self) -> None:
+        pool = rpc.ChannelPool(lambda: None, size=1)  # type: ignore
+        for error in (
+            grpclib.exceptions.GRPCError(grpclib.const.Status.INVALID_ARGUMENT),
+            asyncio.TimeoutError(),
+        ):
+            index = pool.acquire()
+            pool.release(index, error)
+            assert pool.is_healthy(index)
+
+
+class TestCircuitBreaker:
+    def test_opens_after_failures(self) -> None:
+        clock = FakeClock()
+        breaker = rpc.CircuitBreaker(
+            "forecaster", failure_threshold=3, reset_timeout=10, clock=clock
+        )
+        for _ in range(3):
+            breaker.check()
+            breaker.record(UNAVAILABLE)
+
+        assert breaker.state is rpc.CircuitState.OPEN
+        with pytest.raises(rpc.CircuitOpenError) as info:
+            breaker.check()
+        assert not isinstance(info.value, grpclib.exceptions.GRPCError)
+        assert info.value.retry_in == 10
+        assert errors.is_backend_unreachable(info.value)
+
+    def test_rejections_are_not_failures(self) -> None:
+        breaker = rpc.CircuitBreaker(
+            "forecaster", failure_threshold=1, reset_timeout=10
+        )
+        breaker.check()
+        breaker.record(
+            grpclib.exceptions.GRPCError(grpclib.const.Status.INVALID_ARGUMENT)
+        )
+        assert breaker.state is rpc.CircuitState.CLOSED
+
+    def test_single_trial_after_reset(self) -> None:
+        clock = FakeClock()
+        breaker = rpc.CircuitBreaker(
+            "forecaster", failure_threshold=1, reset_timeout=10, clock=clock
+        )
+        breaker.check()
+        breaker.record(UNAVAILABLE)
+
+        clock.now = 10
+        assert breaker.state is rpc.CircuitState.HALF_OPEN
+        breaker.check()
+        with pytest.raises(rpc.CircuitOpenError):
+            breaker.check()
+
+        breaker.record(None)
+        assert breaker.state is rpc.CircuitState.CLOSED
+
+    def test_failed_trial_reopens(self) -> None:
+        clock = FakeClock()
+        breaker = rpc.CircuitBreaker(
+            "forecaster", failure_threshold=1, reset_timeout=10, clock=clock
+        )
+        breaker.check()
+        breaker.record(UNAVAILABLE)
+
+        clock.now = 10
+        breaker.check()
+        breaker.record(UNAVAILABLE)
+        assert breaker.state is rpc.CircuitState.OPEN
+        assert breaker.trips == 1
+
+
+class TestHedge:
+    def test_delay_from_recent_latency(self) -> None:
+        hedge = rpc.Hedge(percentile=0.9, budget=0.05, window=100, min_samples=10)
+        assert hedge.start() is None
+
+        for i in range(100):
+            hedge.observe(i / 1000)
+        assert hedge.start() == pytest.approx(0.089)
+
+    def test_budget_caps_hedges(self) -> None:
+        hedge = rpc.Hedge(percentile=0.9, budget=0.05)
+        fired = 0
+        for _ in range(1000):
+            hedge.start()
+            fired += hedge.spend()
+
+        assert fired == hedge.fired == 50
+        assert hedge.fire_rate == pytest.approx(0.05)
+
+
+class FlakyMethod:
+    """Fails with ``errors`` in turn, then answers with ``response``."""
+
+    def __init__(self, errors: List[Exception], response: Any) -> None:
+        self.errors = errors
+        self.response = response
+        self.calls = 0
+
+    async def __call__(self, request: Any, *, timeout: Any = None) -> Any:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.response
+
+
+def managed(method: FlakyMethod, retries: int = 2) -> rpc.ManagedMethod:
+    client = rpc.BackendClient(
+        rpc.ChannelPool(lambda: None, size=1),  # type: ignore
+        deadlines={"Method": 1.0},
+        retries=retries,
+        retry_backoff=0.001,
+        breaker_failures=5,
+        breaker_reset=10,
+    )
+    return client.method("Service", "Method", [method], idempotent=True)  # type: ignore
+
+
+class TestManagedMethod:
+    @pytest.mark.asyncio
+    async def test_retries_unavailable(self) -> None:
+        method = FlakyMethod([UNAVAILABLE, ConnectionResetError()], "answer")
+        call = managed(method)
+
+        assert await call("request") == "answer"
+        assert method.calls == 3
+        assert call.retried == 2
+        assert call.latencies.count == 3
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_retries(self) -> None:
+        method = FlakyMethod([UNAVAILABLE] * 3, "answer")
+        call = managed(method, retries=1)
+
+        with pytest.raises(grpclib.exceptions.GRPCError):
+            await call("request")
+        assert method.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_not_retried_once_circuit_opens(self) -> None:
+        method = FlakyMethod([UNAVAILABLE] * 3, "answer")
+        call = managed(method)
+        call.breaker.failure_threshold = 1
+
+        with pytest.raises(grpclib.exceptions.GRPCError):
+            await call("request")
+        assert method.calls == 1
+        assert call.retried == 0
+
+        with pytest.raises(rpc.CircuitOpenError):
+            await call("request")
+        assert method.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_rejections_not_retried(self) -> None:
+        rejection = grpclib.exceptions.GRPCError(
+            grpclib.const.Status.INVALID_ARGUMENT
+        )
+        method = FlakyMethod([rejection], "answer")
+
+        with pytest.raises(grpclib.exceptions.GRPCError):
+            await managed(method)("request")
+        assert method.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_forecaster_client(self, tmp_path: pathlib.Path) -> None:
+        socket_path = str(tmp_path / "forecaster.sock")
+        server = grpclib.server.Server([forecasting.LocalForecastServer()])
+        await server.start(path=socket_path)
+
+        client = rpc.BackendClient(
+            rpc.ChannelPool(
+                functools.partial(grpclib.client.Channel, path=socket_path), size=2
+            ),
+            deadlines={"ForecastPrices": 5.0},
+            retries=2,
+            retry_backoff=0.01,
+            breaker_failures=5,
+            breaker_reset=10,
+        )
+        try:
+            forecaster = rpc.ForecasterClient(client)
+            ticker = backend.Ticker(purchase_price=100, prices=[90] + [0] * 11)
+            forecasts = await asyncio.gather(
+                *(forecaster.ForecastPrices(ticker) for _ in range(4))
+            )
+        finally:
+            client.close()
+            server.close()
+            await server.wait_closed()
+
+        assert all(f == forecasting.forecast_prices(ticker) for f in forecasts)
+        assert client.latencies["StalkForecaster/ForecastPrices"].count == 4
+        assert client.pool.in_flight == [0, 0]
+
+
+class SlowMethod:
+    def __init__(self, delay: float, response: Any) -> None:
+        self.delay = delay
+        self.response = response
+        self.cancelled = False
+
+    async def __call__(self, request: Any, *, timeout: Any = None) -> Any:
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return self.response
+
+
+class TestHedgedMethod:
+    @pytest.mark.asyncio
+    async def test_hedge_wins_on_other_channel(self) -> None:
+        hedge = rpc.Hedge(percentile=0.5, budget=1.0, window=1, min_samples=1)
+        hedge.observe(0.01)
+
+        pool = rpc.ChannelPool(lambda: None, size=2)  # type: ignore
+        slow, fast = SlowMethod(5, "slow"), SlowMethod(0, "fast")
+        call = rpc.ManagedMethod(
+            "Service/Method",
+            pool=pool,
+            methods=[slow, fast],  # type: ignore
+            breaker=rpc.CircuitBreaker("Service", 5, 10),
+            latencies=metrics.LatencyHistogram(),
+            deadline=None,
+            retries=0,
+            retry_backoff=0,
+            hedge=hedge,
+        )
+
+        assert await asyncio.wait_for(call("request"), timeout=1) == "fast"
+        await asyncio.sleep(0)
+
+        assert (hedge.fired, hedge.won) == (1, 1)
+        assert slow.cancelled
+        assert pool.in_flight == [0, 0]
+        # The cancelled loser's time is not a latency.
+        assert call.latencies.count == 1
+
+    @pytest.mark.asyncio
+    async def test_trial_call_not_hedged(self) -> None:
+        hedge = rpc.Hedge(percentile=0.5, budget=1.0, window=1, min_samples=1)
+        hedge.observe(0.01)
+
+        clock = FakeClock()
+        breaker = rpc.CircuitBreaker(
+            "Service", failure_threshold=1, reset_timeout=10, clock=clock
+        )
+        breaker.check()
+        breaker.record(UNAVAILABLE)
+        clock.now = 10
+
+        trial, other = SlowMethod(0.05, "trial"), SlowMethod(0, "other")
+        call = rpc.ManagedMethod(
+            "Service/Method",
+            pool=rpc.ChannelPool(lambda: None, size=2),  # type: ignore
+            methods=[trial, other],  # type: ignore
+            breaker=breaker,
+            latencies=metrics.LatencyHistogram(),
+            deadline=None,
+            retries=0,
+            retry_backoff=0,
+            hedge=hedge,
+        )
+
+        assert await asyncio.wait_for(call("request"), timeout=1) == "trial"
+        assert hedge.fired == 0
+        assert breaker.state is rpc.CircuitState.CLOSED
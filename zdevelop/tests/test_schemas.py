@@ -0,0 +1,118 @@
+import datetime
+import uuid
+import bson
+import marshmallow
+import pytest
+import pytz
+from typing import Any, Dict
+
+from stalkbroker import models, schemas
+from stalkbroker.db._connection import (
+    CODEC_SERVER,
+    CODEC_TICKER,
+    CODEC_USER,
+    SCHEMA_TICKER_FULL,
+)
+
+
+class TestCodec:
+    @pytest.mark.parametrize(
+        "codec,document",
+        [
+            (
+                CODEC_SERVER,
+                {
+                    "_id": bson.ObjectId(),
+                    "id": uuid.uuid4(),
+                    "discord_id": 1,
+                    "bulletin_channel": 2,
+                    "sync_time": datetime.datetime(2020, 4, 8, 10, 30),
+                },
+            ),
+            (
+                CODEC_USER,
+                {
+                    "id": str(uuid.uuid4()),
+                    "discord_id": 3,
+                    "timezone": "US/Pacific",
+                    "servers": [1, 4],
+                },
+            ),
+            (
+                CODEC_TICKER,
+                {
+                    "user_id": uuid.uuid4(),
+                    "week_of": datetime.datetime(2020, 4, 5),
+                    "purchase_price": 98,
+                    "phases": {"0": 90, "7": 142},
+                    "final_pattern": "BIG_SPIKE",
+                    "version": 9,
+                    "unknown": True,
+                },
+            ),
+            # Only the sunday price has been set.
+            (
+                CODEC_TICKER,
+                {"user_id": uuid.uuid4(), "week_of": datetime.datetime(2020, 4, 5)},
+            ),
+        ],
+    )
+    def test_matches_schema(
+        self, codec: schemas.Codec, document: Dict[str, Any]
+    ) -> None:
+        loaded = codec.load(document)
+        expected = codec.schema.load(document)
+
+        assert loaded == expected
+        # Fields left out of equality checks have to match too.
+        for field in codec.schema.fields:
+            assert getattr(loaded, field) == getattr(expected, field)
+        assert codec.encode(loaded) == codec.schema.dump(expected)
+
+    def test_user_defaults_not_shared(self) -> None:
+        document = {"id": uuid.uuid4(), "discord_id": 3}
+        first = CODEC_USER.load(document)
+        first.servers.append(1)
+
+        assert CODEC_USER.load(document).servers == []
+        assert first.timezone is None
+        assert CODEC_USER.encode(first)["timezone"] is None
+
+    def test_timezone_loaded(self) -> None:
+        user = CODEC_USER.load(
+            {"id": uuid.uuid4(), "discord_id": 3, "timezone": "Asia/Tokyo"}
+        )
+        assert user.timezone is pytz.timezone("Asia/Tokyo")
+
+    def test_missing_required_field(self) -> None:
+        with pytest.raises(marshmallow.ValidationError) as error:
+            CODEC_USER.load({"id": uuid.uuid4()})
+        assert error.value.messages == {
+            "discord_id": ["Missing data for required field."]
+        }
+
+    def test_validate_uses_schema(self) -> None:
+        document = {
+            "user_id": uuid.uuid4(),
+            "week_of": datetime.datetime(2020, 4, 5),
+            "phases": {"0": "ninety"},
+        }
+        with pytest.raises(marshmallow.ValidationError):
+            CODEC_TICKER.load(document, validate=True)
+
+    def test_unsupported_type(self) -> None:
+        with pytest.raises(TypeError):
+            schemas.Codec(models.PhaseInfo, SCHEMA_TICKER_FULL)
+
+    def test_out_of_range_prices_unknown(
+        self, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        ticker = CODEC_TICKER.load(
+            {
+                "user_id": uuid.uuid4(),
+                "week_of": datetime.datetime(2020, 4, 5),
+                "phases": {"0": 90, "3": 99999},
+            }
+        )
+        assert ticker.known_prices() == {0: 90}
+        assert "stored price 99999 for phase 3" in caplog.text
@@ -0,0 +1,161 @@
+import aiohttp.web
+import asyncio
+import json
+import pathlib
+import threading
+import pytest
+from typing import Any, Dict, List, Sequence
+
+from stalkbroker import tracing
+
+
+class ListExporter:
+    def __init__(self) -> None:
+        self.traces: List[List[tracing.Span]] = list()
+
+    def export(self, spans: Sequence[tracing.Span]) -> None:
+        self.traces.append(list(spans))
+
+
+@tracing.traced("fetch")
+async def fetch(key: str) -> str:
+    tracing.current_span().set_attribute("key", key)
+    await asyncio.sleep(0)
+    return key
+
+
+class TestTracer:
+    @pytest.mark.asyncio
+    async def test_spans_follow_tasks(self) -> None:
+        exporter = ListExporter()
+        tracer = tracing.Tracer(exporter)
+
+        with tracer.trace("command ticker", command="ticker") as root:
+            await asyncio.gather(fetch("a"), fetch("b"))
+
+        (spans,) = exporter.traces
+        assert [span.name for span in spans] == ["fetch", "fetch", "command ticker"]
+        assert spans[-1] is root
+        assert root.parent_id is None
+        assert root.attributes == {"command": "ticker"}
+
+        for span in spans[:2]:
+            assert span.trace_id == root.trace_id
+            assert span.parent_id == root.span_id
+        assert {span.attributes["key"] for span in spans[:2]} == {"a", "b"}
+
+    @pytest.mark.asyncio
+    async def test_errors(self) -> None:
+        exporter = ListExporter()
+        tracer = tracing.Tracer(exporter)
+
+        with pytest.raises(ValueError):
+            with tracer.trace("command ticker"):
+                with tracing.span("db fetch_user"):
+                    raise ValueError("no user")
+
+        (spans,) = exporter.traces
+        assert [span.error for span in spans] == ["ValueError: no user"] * 2
+
+    @pytest.mark.asyncio
+    async def test_sampling(self) -> None:
+        exporter = ListExporter()
+        samples = iter([0.5, 0.05])
+        tracer = tracing.Tracer(exporter, sample_rate=0.1, random=lambda: next(samples))
+
+        for _ in range(2):
+            with tracer.trace("command ticker") as root:
+                assert await fetch("a") == "a"
+
+        assert (tracer.sampled, tracer.unsampled) == (1, 1)
+        assert len(exporter.traces) == 1
+        assert [span.name for span in exporter.traces[0]] == ["fetch", root.name]
+
+    def test_no_trace(self) -> None:
+        with tracing.span("db fetch_user") as span:
+            span.set_attribute("key", "value")
+        assert span is tracing.NON_RECORDING_SPAN
+        assert not span.attributes
+
+
+class TestExporters:
+    def test_json_lines(self, tmp_path: pathlib.Path) -> None:
+        path = tmp_path / "traces.jsonl"
+        exporter = tracing.JSONLinesExporter(path)
+        tracer = tracing.Tracer(exporter)
+        for _ in range(2):
+            with tracer.trace("command ticker"):
+                with tracing.span("db fetch_user"):
+                    pass
+        exporter.close()
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        names = [line["name"] for line in lines]
+        assert names == ["db fetch_user", "command ticker"] * 2
+        assert lines[0]["parent_id"] == lines[1]["span_id"]
+        assert lines[0]["duration"] >= 0
+
+    def test_json_lines_written_off_thread(
+        self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        # Holds the writer up on the first span it writes.
+        writing = threading.Event()
+        release = threading.Event()
+        writers: List[threading.Thread] = list()
+        dumps = json.dumps
+
+        def slow_dumps(value: Any) -> str:
+            writers.append(threading.current_thread())
+            writing.set()
+            release.wait()
+            return dumps(value)
+
+        monkeypatch.setattr(json, "dumps", slow_dumps)
+
+        exporter = tracing.JSONLinesExporter(tmp_path / "traces.jsonl", max_pending=1)
+        tracer = tracing.Tracer(exporter)
+        for _ in range(3):
+            with tracer.trace("command ticker"):
+                pass
+            writing.wait()
+
+        # One trace is being written and one is waiting, so the third is dropped.
+        assert exporter.dropped == 1
+        release.set()
+        exporter.close()
+
+        assert threading.current_thread() not in writers
+        assert len((tmp_path / "traces.jsonl").read_text().splitlines()) == 2
+
+    @pytest.mark.asyncio
+    async def test_otlp(self, unused_tcp_port: int) -> None:
+        # Stands in for an OpenTelemetry collector.
+        requests: List[Dict[str, Any]] = list()
+
+        async def collect(request: aiohttp.web.Request) -> aiohttp.web.Response:
+            requests.append(await request.json())
+            return aiohttp.web.json_response({})
+
+        app = aiohttp.web.Application()
+        app.router.add_post("/v1/traces", collect)
+        runner = aiohttp.web.AppRunner(app)
+        await runner.setup()
+        await aiohttp.web.TCPSite(runner, "127.0.0.1", unused_tcp_port).start()
+
+        exporter = tracing.OTLPExporter(
+            f"http://127.0.0.1:{unused_tcp_port}/v1/traces"
+        )
+        try:
+            with tracing.Tracer(exporter).trace("command ticker"):
+                await fetch("a")
+            await exporter.close()
+        finally:
+            await runner.cleanup()
+
+        assert exporter.exported == 2
+        (request,) = requests
+        (resource_spans,) = request["resourceSpans"]
+        child, root = resource_spans["scopeSpans"][0]["spans"]
+        assert child["parentSpanId"] == root["spanId"]
+        assert child["attributes"] == [{"key": "key", "value": {"stringValue": "a"}}]
+        assert "parentSpanId" not in root